@@ -22,7 +22,7 @@ class Command(BaseCommand):
                 "statut_juridique": "ei",
                 "description": "Commerce général de produits alimentaires et de première nécessité dans le centre-ville de Kpalimé.",
                 "rccm": "TG-KPA-2024-001",
-                "ifu": "1234567890123",
+                "cfe": "1234567890123",
                 "date_creation": date(2020, 1, 15),
                 "capital_social": Decimal("5000000.00"),
                 "nom_responsable": "Koffi Mensah",
@@ -47,7 +47,7 @@ class Command(BaseCommand):
                 "statut_juridique": "ei",
                 "description": "Atelier d'artisanat spécialisé dans la fabrication de meubles en bois et objets décoratifs.",
                 "rccm": "TG-KPA-2023-045",
-                "ifu": "2345678901234",
+                "cfe": "2345678901234",
                 "date_creation": date(2019, 6, 10),
                 "capital_social": Decimal("2000000.00"),
                 "nom_responsable": "Ama Adjovi",
@@ -70,7 +70,7 @@ class Command(BaseCommand):
                 "statut_juridique": "sarl",
                 "description": "Entreprise de transport de marchandises et de personnes dans la région des Plateaux.",
                 "rccm": "TG-KPA-2022-078",
-                "ifu": "3456789012345",
+                "cfe": "3456789012345",
                 "date_creation": date(2018, 3, 20),
                 "capital_social": Decimal("10000000.00"),
                 "nom_responsable": "Komlan Agbessi",
@@ -116,7 +116,7 @@ class Command(BaseCommand):
                 "statut_juridique": "sarl",
                 "description": "Restaurant et hôtel de charme offrant des services d'hébergement et de restauration aux visiteurs de Kpalimé.",
                 "rccm": "TG-KPA-2024-156",
-                "ifu": "4567890123456",
+                "cfe": "4567890123456",
                 "date_creation": date(2021, 11, 12),
                 "capital_social": Decimal("25000000.00"),
                 "nom_responsable": "Kossi Amégan",
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+from django.db import migrations, models
+
+from mairie.geohash import encoder_geohash
+
+
+def calculer_cellules(apps, schema_editor):
+    for nom_modele in ('ActeurEconomique', 'InstitutionFinanciere'):
+        modele = apps.get_model('acteurs', nom_modele)
+        a_jour = []
+        for obj in modele.objects.exclude(latitude__isnull=True).exclude(longitude__isnull=True).only('latitude', 'longitude'):
+            obj.cellule_carte = encoder_geohash(obj.latitude, obj.longitude)
+            a_jour.append(obj)
+        modele.objects.bulk_update(a_jour, ['cellule_carte'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acteurs', '0010_sitetouristique_photo_2_sitetouristique_photo_3_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='acteureconomique',
+            name='cellule_carte',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Géohash des coordonnées GPS (index de grille pour la carte), calculé automatiquement.', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='institutionfinanciere',
+            name='cellule_carte',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Géohash des coordonnées GPS (index de grille pour la carte), calculé automatiquement.', max_length=12),
+        ),
+        migrations.RunPython(calculer_cellules, migrations.RunPython.noop),
+    ]
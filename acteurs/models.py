@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from mairie.geohash import encoder_geohash
+from mairie.telephones import normaliser_telephone
+
 
 class ActeurEconomique(models.Model):
     """Représente une entreprise / acteur économique dans la commune."""
@@ -100,6 +103,10 @@ class ActeurEconomique(models.Model):
     fonction_responsable = models.CharField(max_length=255)
     telephone1 = models.CharField(max_length=30)
     telephone2 = models.CharField(max_length=30, blank=True)
+    telephone_e164 = models.CharField(
+        max_length=16, blank=True, editable=False, db_index=True,
+        help_text="Téléphone au format E.164 (+228...), calculé automatiquement pour la recherche."
+    )
     email = models.EmailField()
     site_web = models.URLField(blank=True)
 
@@ -119,6 +126,10 @@ class ActeurEconomique(models.Model):
         max_digits=9, decimal_places=6, null=True, blank=True,
         help_text="Longitude GPS (ex: 0.6287 pour Kpalimé)"
     )
+    cellule_carte = models.CharField(
+        max_length=12, blank=True, editable=False, db_index=True,
+        help_text="Géohash des coordonnées GPS (index de grille pour la carte), calculé automatiquement."
+    )
 
     nombre_employes = models.CharField(
         max_length=20, choices=NB_EMPLOYES_CHOICES, blank=True
@@ -156,6 +167,11 @@ class ActeurEconomique(models.Model):
     def __str__(self) -> str:
         return self.raison_sociale
 
+    def save(self, *args, **kwargs):
+        self.cellule_carte = encoder_geohash(self.latitude, self.longitude)
+        self.telephone_e164 = normaliser_telephone(self.telephone1)
+        super().save(*args, **kwargs)
+
 
 class InstitutionFinanciere(models.Model):
     """Représente une institution financière (banque, IMF, etc.) partenaire de la commune."""
@@ -193,6 +209,10 @@ class InstitutionFinanciere(models.Model):
     fonction_responsable = models.CharField(max_length=255)
     telephone1 = models.CharField(max_length=30)
     telephone2 = models.CharField(max_length=30, blank=True)
+    telephone_e164 = models.CharField(
+        max_length=16, blank=True, editable=False, db_index=True,
+        help_text="Téléphone au format E.164 (+228...), calculé automatiquement pour la recherche."
+    )
     whatsapp = models.CharField(max_length=30, blank=True)
     email = models.EmailField()
     site_web = models.URLField(blank=True)
@@ -214,6 +234,10 @@ class InstitutionFinanciere(models.Model):
         max_digits=9, decimal_places=6, null=True, blank=True,
         help_text="Longitude GPS (ex: 0.6287 pour Kpalimé)"
     )
+    cellule_carte = models.CharField(
+        max_length=12, blank=True, editable=False, db_index=True,
+        help_text="Géohash des coordonnées GPS (index de grille pour la carte), calculé automatiquement."
+    )
 
     nombre_agences = models.PositiveIntegerField(blank=True, null=True)
     horaires = models.CharField(max_length=255)
@@ -249,6 +273,11 @@ class InstitutionFinanciere(models.Model):
     def __str__(self) -> str:
         return self.nom_institution
 
+    def save(self, *args, **kwargs):
+        self.cellule_carte = encoder_geohash(self.latitude, self.longitude)
+        self.telephone_e164 = normaliser_telephone(self.telephone1)
+        super().save(*args, **kwargs)
+
 
 class SiteTouristique(models.Model):
     """Représente un site touristique de la commune."""
@@ -1,3 +1,36 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from mairie.models import ConfigurationMairie
+
+
+class ModelesPdfTest(TestCase):
+    """Formulaires vierges : construits une fois par version de configuration, puis servis tels quels."""
+
+    def setUp(self):
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier, ignore_errors=True)
+        reglages = override_settings(MODELES_PDF_ROOT=self.dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.client.force_login(User.objects.create_user(username='visiteur', password='testpass123'))
+
+    def test_construit_une_fois_et_reconstruit_si_configuration_modifiee(self):
+        url = reverse('acteurs:pdf_acteurs')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertIn('modele_acteurs_economiques.pdf', response['Content-Disposition'])
+        self.assertEqual(os.listdir(self.dossier), ['acteurs-defaut.pdf'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        ConfigurationMairie.objects.create(nom_commune='Mairie de Test')
+        self.client.get(url)
+        fichiers = os.listdir(self.dossier)
+        self.assertEqual(len(fichiers), 1)
+        self.assertNotEqual(fichiers, ['acteurs-defaut.pdf'])
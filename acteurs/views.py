@@ -1,16 +1,18 @@
-from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
+from django.utils.html import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 
+from mairie_kloto_platform import modeles_pdf
+
 from .forms import (
     ActeurEconomiqueForm, 
     InstitutionFinanciereForm, 
@@ -194,13 +196,10 @@ def site_detail(request, pk: int):
     }
     return render(request, "acteurs/detail-site.html", context)
 
-@login_required
-def generer_pdf_acteur(request):
-    """Génère un PDF modèle pour l'enregistrement des acteurs économiques."""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="modele_acteurs_economiques.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
+def construire_pdf_acteur(sortie, conf=None):
+    """Construit dans `sortie` le PDF modèle pour l'enregistrement des acteurs économiques."""
+    doc = SimpleDocTemplate(sortie, pagesize=A4)
+    nom_commune = escape(conf.nom_commune) if conf else "Mairie de Kloto 1"
     story = []
     styles = getSampleStyleSheet()
 
@@ -235,7 +234,7 @@ def generer_pdf_acteur(request):
 
     # Titre
     story.append(Paragraph("ENREGISTREMENT DES ACTEURS ÉCONOMIQUES", title_style))
-    story.append(Paragraph("Mairie de Kloto 1 - Kpalimé, Région des Plateaux, Togo", styles["Normal"]))
+    story.append(Paragraph(f"{nom_commune} - Kpalimé, Région des Plateaux, Togo", styles["Normal"]))
     story.append(Spacer(1, 0.5 * cm))
 
     # Section 1: Informations de base
@@ -346,16 +345,18 @@ def generer_pdf_acteur(request):
     story.append(Paragraph("Date et Signature : _________________________", styles["Normal"]))
 
     doc.build(story)
-    return response
 
 
 @login_required
-def generer_pdf_institution(request):
-    """Génère un PDF modèle pour l'inscription des institutions financières."""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="modele_institutions_financieres.pdf"'
+def generer_pdf_acteur(request):
+    """Sert un PDF modèle pour l'enregistrement des acteurs économiques, construit une fois par version de la configuration."""
+    return modeles_pdf.reponse_modele(request, "acteurs")
 
-    doc = SimpleDocTemplate(response, pagesize=A4)
+
+def construire_pdf_institution(sortie, conf=None):
+    """Construit dans `sortie` le PDF modèle pour l'inscription des institutions financières."""
+    doc = SimpleDocTemplate(sortie, pagesize=A4)
+    nom_commune = escape(conf.nom_commune) if conf else "Mairie de Kloto 1"
     story = []
     styles = getSampleStyleSheet()
 
@@ -381,7 +382,7 @@ def generer_pdf_institution(request):
 
     # Titre
     story.append(Paragraph("INSCRIPTION DES INSTITUTIONS FINANCIÈRES", title_style))
-    story.append(Paragraph("Mairie de Kloto 1 - Kpalimé, Région des Plateaux, Togo", styles["Normal"]))
+    story.append(Paragraph(f"{nom_commune} - Kpalimé, Région des Plateaux, Togo", styles["Normal"]))
     story.append(Spacer(1, 0.5 * cm))
 
     # Section 1: Informations de l'institution
@@ -465,4 +466,9 @@ def generer_pdf_institution(request):
     story.append(table)
     
     doc.build(story)
-    return response
+
+
+@login_required
+def generer_pdf_institution(request):
+    """Sert un PDF modèle pour l'inscription des institutions financières, construit une fois par version de la configuration."""
+    return modeles_pdf.reponse_modele(request, "institutions")
@@ -6,7 +6,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.db.models import Q
 from acteurs.models import ActeurEconomique, InstitutionFinanciere
 from emploi.models import ProfilEmploi
-from .models import Notification
+from .models import Notification, OperationSynchronisee
 from .views import get_recipient_display_name
 
 User = get_user_model()
@@ -161,3 +161,12 @@ class NotificationAdmin(admin.ModelAdmin):
     def mark_as_unread(self, request, queryset):
         queryset.update(is_read=False)
     mark_as_unread.short_description = "Marquer comme non lu"
+
+
+@admin.register(OperationSynchronisee)
+class OperationSynchroniseeAdmin(admin.ModelAdmin):
+    list_display = ("cle_idempotence", "agent", "type_operation", "date_reception")
+    list_filter = ("type_operation", "date_reception")
+    search_fields = ("cle_idempotence", "agent__matricule", "agent__nom")
+    date_hierarchy = "date_reception"
+    readonly_fields = ("agent", "cle_idempotence", "type_operation", "resultat", "date_reception")
@@ -0,0 +1,127 @@
+"""
+Règles d'encaissement des cotisations de boutiques/magasins par les agents collecteurs.
+
+Ces fonctions sont partagées par le formulaire `payer_contribuable` et par l'API de
+synchronisation hors-ligne (`comptes.synchronisation`), afin que les deux chemins
+appliquent exactement les mêmes contrôles (arriérés, répartition par mois, etc.).
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from mairie.archives import montants_archives_par_mois
+from mairie.models import CotisationAnnuelle, PaiementCotisation
+
+
+@transaction.atomic
+def encaisser_cotisation_boutique(cotisation_annuelle, montant, agent, notes="", date_paiement=None):
+    """
+    Enregistre un paiement de cotisation pour une boutique et le répartit sur les mois.
+
+    - refuse le paiement si la boutique a des arriérés sur une année antérieure ;
+    - bascule sur l'année suivante (créée si besoin) si la cotisation est déjà soldée ;
+    - complète d'abord les mois partiellement payés, puis les mois suivants.
+
+    Retourne un tuple (cotisation_annuelle effectivement créditée, liste des mois crédités).
+    Lève ValidationError si le paiement ne peut pas être enregistré.
+    """
+    montant = Decimal(str(montant))
+    if montant <= 0:
+        raise ValidationError("Le montant doit être supérieur à zéro.")
+
+    date_paiement = date_paiement or timezone.now()
+
+    # Vérifier les arriérés des années précédentes pour cette boutique
+    cotisations_anciennes = CotisationAnnuelle.objects.filter(
+        boutique=cotisation_annuelle.boutique,
+        annee__lt=cotisation_annuelle.annee,
+    ).order_by('annee')
+
+    for c in cotisations_anciennes:
+        if c.reste_a_payer() > 0:
+            raise ValidationError(
+                f"Cette boutique a encore des arriérés pour l'année {c.annee}. "
+                f"Veuillez d'abord encaisser ces arriérés avant de commencer les paiements pour {cotisation_annuelle.annee}."
+            )
+
+    # Si la cotisation sélectionnée est déjà totalement soldée,
+    # on bascule automatiquement sur la cotisation de l'année suivante
+    # (créée si nécessaire) pour permettre de continuer les paiements.
+    if cotisation_annuelle.reste_a_payer() <= 0:
+        prochaine_annee = cotisation_annuelle.annee + 1
+        cotisation_annuelle, _ = CotisationAnnuelle.objects.get_or_create(
+            boutique=cotisation_annuelle.boutique,
+            annee=prochaine_annee,
+            defaults={
+                "montant_annuel_du": cotisation_annuelle.boutique.get_prix_annuel(),
+            },
+        )
+
+    # Montant mensuel dû pour cette boutique (en Decimal)
+    monthly_due = cotisation_annuelle.boutique.prix_location_mensuel or Decimal("0")
+    if monthly_due <= 0:
+        raise ValidationError("Montant mensuel de la cotisation non défini pour cette boutique.")
+
+    # Paiements déjà enregistrés, indexés par mois (une seule requête) ; pour un exercice clos,
+    # les montants archivés de chaque mois comptent aussi comme déjà payés
+    paiements_existants = {
+        p.mois: p
+        for p in PaiementCotisation.objects.filter(cotisation_annuelle=cotisation_annuelle)
+    }
+    montants_archives = {}
+    if cotisation_annuelle.montant_paye_archive:
+        montants_archives = montants_archives_par_mois([cotisation_annuelle.pk])[cotisation_annuelle.pk]
+
+    # Répartition séquentielle du montant :
+    # - on complète d'abord les mois partiellement payés (dans l'ordre),
+    # - puis on paie les mois suivants,
+    # afin d'éviter des mois « à moitié payés » au milieu de l'année.
+    montant_restant = montant
+    mois_credites = []
+
+    for mois in range(1, 13):
+        if montant_restant <= 0:
+            break
+
+        paiement_existant = paiements_existants.get(mois)
+        deja_paye = paiement_existant.montant_paye if paiement_existant else Decimal("0")
+        deja_paye += montants_archives.get(mois, Decimal("0"))
+
+        # Si ce mois est déjà entièrement payé, on passe au suivant
+        if deja_paye >= monthly_due:
+            continue
+
+        a_payer_ici = min(montant_restant, monthly_due - deja_paye)
+        if a_payer_ici <= 0:
+            continue
+
+        if paiement_existant:
+            # On complète le paiement existant pour ce mois
+            paiement_existant.montant_paye = paiement_existant.montant_paye + a_payer_ici
+            paiement_existant.encaisse_par_agent = agent
+            paiement_existant.date_paiement = date_paiement
+            if notes:
+                paiement_existant.notes = (paiement_existant.notes + "\n" if paiement_existant.notes else "") + notes
+            paiement_existant.save()
+        else:
+            # Aucun paiement pour ce mois : on crée l'enregistrement
+            PaiementCotisation.objects.create(
+                cotisation_annuelle=cotisation_annuelle,
+                mois=mois,
+                montant_paye=a_payer_ici,
+                date_paiement=date_paiement,
+                encaisse_par_agent=agent,
+                notes=notes,
+            )
+
+        mois_credites.append(mois)
+        montant_restant -= a_payer_ici
+
+    if not mois_credites:
+        raise ValidationError(
+            "Le montant saisi est insuffisant pour enregistrer un paiement sur les mois restants."
+        )
+
+    return cotisation_annuelle, mois_credites
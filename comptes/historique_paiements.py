@@ -0,0 +1,169 @@
+"""
+Historique des paiements d'un profil (contribuable, acteur économique, institution financière)
+par pages, pour l'API JSON de « Mon compte ».
+
+Pagination par curseur sur (date_paiement, id), du plus récent au plus ancien : une page est
+lue avec `WHERE (date, id) < curseur ORDER BY date DESC, id DESC LIMIT n`, sans OFFSET, et
+reste stable si un paiement est enregistré pendant la lecture. Le curseur est opaque pour le
+client (base64 de la date ISO et de l'id du dernier paiement de la page).
+
+Les totaux de la période filtrée (nombre, montant, détail par année) sont calculés en SQL une
+seule fois, avec la première page ; les pages suivantes ne les renvoient pas.
+
+Les paiements des exercices clos (mairie.archives) ne sont lus dans les tables d'archives que
+si la période demandée touche un exercice clos.
+"""
+import base64
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from mairie.archives import fusionner, sources
+from mairie.models import (
+    PaiementCotisation, PaiementCotisationActeur, PaiementCotisationArchive, PaiementCotisationInstitution,
+)
+
+LIMITE_DEFAUT = 20
+LIMITE_MAX = 100
+
+
+def paiements_du_profil(user, profil_type, archives=False):
+    """
+    Querysets des paiements du profil `profil_type` de l'utilisateur (table vivante, suivie de
+    la table d'archives si `archives`), ou None s'il n'a pas ce profil.
+    """
+    if profil_type == "contribuable":
+        contribuable = getattr(user, "contribuable", None)
+        if contribuable is None:
+            return None
+        return [
+            modele.objects.filter(
+                cotisation_annuelle__boutique__contribuable=contribuable
+            ).select_related(
+                "cotisation_annuelle", "cotisation_annuelle__boutique",
+                "cotisation_annuelle__boutique__emplacement", "encaisse_par_agent",
+            )
+            for modele in sources(PaiementCotisation, archives)
+        ]
+    if profil_type == "acteur":
+        acteur = getattr(user, "acteur_economique", None)
+        if acteur is None:
+            return None
+        return [
+            modele.objects.filter(
+                cotisation_annuelle__acteur=acteur
+            ).select_related("cotisation_annuelle", "encaisse_par_agent")
+            for modele in sources(PaiementCotisationActeur, archives)
+        ]
+    if profil_type == "institution":
+        institution = getattr(user, "institution_financiere", None)
+        if institution is None:
+            return None
+        return [
+            modele.objects.filter(
+                cotisation_annuelle__institution=institution
+            ).select_related("cotisation_annuelle", "encaisse_par_agent")
+            for modele in sources(PaiementCotisationInstitution, archives)
+        ]
+    return None
+
+
+def encoder_curseur(paiement):
+    brut = json.dumps([paiement.date_paiement.isoformat(), paiement.pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(brut).decode("ascii")
+
+
+def decoder_curseur(curseur):
+    """(date_paiement, id) du curseur ; ValidationError s'il est illisible."""
+    try:
+        date_iso, pk = json.loads(base64.urlsafe_b64decode(curseur.encode("ascii")))
+        date_paiement = parse_datetime(date_iso)
+        if date_paiement is None or not isinstance(pk, int):
+            raise ValueError
+    except (ValueError, TypeError, UnicodeError):
+        raise ValidationError("Curseur de pagination invalide.")
+    return date_paiement, pk
+
+
+def filtrer_periode(qs, date_du=None, date_au=None):
+    """Bornes en datetime (jour local entier) : la comparaison reste indexable, contrairement à __date."""
+    if date_du:
+        qs = qs.filter(date_paiement__gte=timezone.make_aware(datetime.combine(date_du, time.min)))
+    if date_au:
+        qs = qs.filter(date_paiement__lt=timezone.make_aware(datetime.combine(date_au + timedelta(days=1), time.min)))
+    return qs
+
+
+def totaux_periode(querysets):
+    """Nombre et montant des paiements des querysets, au total et par année de cotisation."""
+    par_annee = defaultdict(lambda: {"nombre": 0, "montant": 0})
+    for qs in querysets:
+        lignes = (
+            qs.order_by()
+            .values("cotisation_annuelle__annee")
+            .annotate(nombre=Count("id"), montant=Sum("montant_paye"))
+        )
+        for ligne in lignes:
+            cumul = par_annee[ligne["cotisation_annuelle__annee"]]
+            cumul["nombre"] += ligne["nombre"]
+            cumul["montant"] += ligne["montant"]
+    return {
+        "nombre": sum(cumul["nombre"] for cumul in par_annee.values()),
+        "montant": sum((cumul["montant"] for cumul in par_annee.values()), 0),
+        "par_annee": [
+            {"annee": annee, "nombre": par_annee[annee]["nombre"], "montant": par_annee[annee]["montant"]}
+            for annee in sorted(par_annee)
+        ],
+    }
+
+
+def _serialiser(paiement):
+    cotisation = paiement.cotisation_annuelle
+    agent = paiement.encaisse_par_agent
+    ligne = {
+        "id": paiement.pk,
+        "date_paiement": paiement.date_paiement,
+        "annee": cotisation.annee,
+        "montant_paye": paiement.montant_paye,
+        "agent": f"{agent.nom} {agent.prenom}" if agent else None,
+        "notes": paiement.notes,
+    }
+    if isinstance(paiement, (PaiementCotisation, PaiementCotisationArchive)):
+        boutique = cotisation.boutique
+        ligne["mois"] = paiement.mois
+        ligne["boutique"] = boutique.matricule
+        ligne["emplacement"] = boutique.emplacement.nom_lieu if boutique.emplacement_id else None
+    return ligne
+
+
+def page_historique(querysets, curseur=None, limite=LIMITE_DEFAUT, date_du=None, date_au=None):
+    """
+    Une page de l'historique : {"paiements": [...], "curseur_suivant": str | None, "totaux": {...}}.
+    Les totaux ne sont présents que pour la première page (sans curseur). Avec la table
+    d'archives, chaque table fournit au plus `limite + 1` lignes, fusionnées sur (date, id) :
+    les identifiants archivés étant ceux d'origine, le curseur reste valable d'une table à l'autre.
+    """
+    limite = max(1, min(limite, LIMITE_MAX))
+    querysets = [filtrer_periode(qs, date_du, date_au) for qs in querysets]
+    page = {}
+    if curseur:
+        date_paiement, pk = decoder_curseur(curseur)
+        filtre = Q(date_paiement__lt=date_paiement) | Q(date_paiement=date_paiement, pk__lt=pk)
+        qs_pages = [qs.filter(filtre) for qs in querysets]
+    else:
+        qs_pages = querysets
+        page["totaux"] = totaux_periode(querysets)
+    paiements = fusionner(
+        [qs.order_by("-date_paiement", "-pk") for qs in qs_pages],
+        cle=lambda p: (p.date_paiement, p.pk),
+        limite=limite + 1,
+    )
+    suivant = encoder_curseur(paiements[limite - 1]) if len(paiements) > limite else None
+    page["paiements"] = [_serialiser(p) for p in paiements[:limite]]
+    page["curseur_suivant"] = suivant
+    return page
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comptes', '0001_initial'),
+        ('mairie', '0037_typelocal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationSynchronisee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle_idempotence', models.CharField(help_text="Identifiant unique de l'opération généré par le terminal de l'agent.", max_length=64)),
+                ('type_operation', models.CharField(choices=[('cotisation', 'Cotisation boutique/magasin'), ('ticket', 'Ticket marché')], max_length=20)),
+                ('resultat', models.JSONField(blank=True, default=dict, help_text="Résultat renvoyé au terminal lors de l'application de l'opération.")),
+                ('date_reception', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operations_synchronisees', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Opération synchronisée',
+                'verbose_name_plural': 'Opérations synchronisées',
+                'ordering': ['-date_reception'],
+                'unique_together': {('agent', 'cle_idempotence')},
+            },
+        ),
+    ]
@@ -37,3 +37,43 @@ class Notification(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class OperationSynchronisee(models.Model):
+    """
+    Opération d'encaissement (cotisation ou ticket) reçue via l'API de synchronisation
+    des agents collecteurs. La clé d'idempotence générée par l'application de l'agent
+    garantit qu'un lot renvoyé après une coupure réseau n'est pas appliqué deux fois.
+    """
+    TYPE_COTISATION = "cotisation"
+    TYPE_TICKET = "ticket"
+    TYPE_CHOICES = [
+        (TYPE_COTISATION, "Cotisation boutique/magasin"),
+        (TYPE_TICKET, "Ticket marché"),
+    ]
+
+    agent = models.ForeignKey(
+        "mairie.AgentCollecteur",
+        on_delete=models.CASCADE,
+        related_name="operations_synchronisees",
+    )
+    cle_idempotence = models.CharField(
+        max_length=64,
+        help_text="Identifiant unique de l'opération généré par le terminal de l'agent.",
+    )
+    type_operation = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    resultat = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Résultat renvoyé au terminal lors de l'application de l'opération.",
+    )
+    date_reception = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Opération synchronisée"
+        verbose_name_plural = "Opérations synchronisées"
+        ordering = ["-date_reception"]
+        unique_together = [["agent", "cle_idempotence"]]
+
+    def __str__(self):
+        return f"{self.cle_idempotence} ({self.get_type_operation_display()})"
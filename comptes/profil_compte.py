@@ -0,0 +1,177 @@
+"""
+Agrégat « Mon compte » : rôles de l'utilisateur et soldes de ses cotisations.
+
+- Les rôles (acteur, institution, profil emploi, contribuable, diaspora) sont lus en une seule
+  requête (select_related sur les relations inverses un-à-un) ; les OSC, seule relation
+  multiple, ne sont chargées que si l'utilisateur en a.
+- Les soldes sont calculés à partir d'une requête par type de cotisation, sommes des paiements
+  faites en SQL (plus le total archivé des exercices clos, porté par la cotisation), puis une
+  seule boucle sur les lignes obtenues.
+
+Le résultat est mis en cache par utilisateur et par mois (le dû des contribuables dépend du mois
+courant). Les signaux (comptes.signals) l'invalident après chaque paiement, cotisation ou
+modification de profil ; DUREE_CACHE borne l'écart pour les écritures en masse sans signaux.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+from mairie.models import (
+    BoutiqueMagasin, CotisationAnnuelle, CotisationAnnuelleActeur, CotisationAnnuelleInstitution,
+    PaiementCotisationActeur, PaiementCotisationInstitution,
+)
+from osc.models import OrganisationSocieteCivile
+
+DUREE_CACHE = 15 * 60
+NB_DERNIERS_PAIEMENTS = 10
+
+
+def cle_cache(user_id, maintenant=None):
+    maintenant = maintenant or timezone.now()
+    return f"profil_compte:{user_id}:{maintenant:%Y-%m}"
+
+
+def invalider_profil_compte(*user_ids):
+    """
+    Supprime l'agrégat en cache des utilisateurs donnés, tout de suite puis de nouveau une fois la
+    transaction validée (une requête concurrente a pu remettre en cache l'état d'avant le commit).
+    """
+    cles = [cle_cache(user_id) for user_id in set(user_ids) if user_id]
+    if cles:
+        cache.delete_many(cles)
+        transaction.on_commit(lambda: cache.delete_many(cles))
+
+
+def _soldes_contribuable(contribuable, maintenant):
+    """Arriérés, dû en ce jour, total payé et reste à payer, sur toutes les boutiques du contribuable."""
+    lignes = (
+        CotisationAnnuelle.objects.filter(boutique__contribuable=contribuable).order_by()
+        .values("id", "annee", "montant_annuel_du", "montant_paye_archive", "boutique__prix_location_mensuel")
+        .annotate(paye=Sum("paiements__montant_paye"))
+    )
+    zero = Decimal("0")
+    soldes = {"a_cotisations": False, "arrieres": zero, "du_aujourdhui": zero, "paye": zero, "reste": zero}
+    arrieres_annees_precedentes = arrieres_annee_courante = du_cette_annee = zero
+    for ligne in lignes:
+        soldes["a_cotisations"] = True
+        paye = (ligne["paye"] or zero) + ligne["montant_paye_archive"]
+        soldes["paye"] += paye
+        if ligne["annee"] < maintenant.year:
+            arrieres_annees_precedentes += max(zero, ligne["montant_annuel_du"] - paye)
+        elif ligne["annee"] == maintenant.year:
+            # Année en cours : dû jusqu'au mois courant inclus
+            mensuel = ligne["boutique__prix_location_mensuel"] or zero
+            if mensuel > 0:
+                du = mensuel * maintenant.month
+                du_cette_annee += du
+                arrieres_annee_courante += max(zero, du - paye)
+    soldes["arrieres"] = arrieres_annees_precedentes + arrieres_annee_courante
+    soldes["du_aujourdhui"] = arrieres_annees_precedentes + du_cette_annee
+    soldes["reste"] = max(zero, soldes["du_aujourdhui"] - soldes["paye"])
+    return soldes
+
+
+def _cotisation_annuelle(modele_cotisation, modele_paiement, filtre, maintenant):
+    """
+    Cotisation de l'année courante (à défaut la plus récente) d'un acteur / d'une institution,
+    avec ses 10 derniers paiements, toutes années confondues.
+    """
+    lignes = list(
+        modele_cotisation.objects.filter(**filtre).order_by("-annee")
+        .annotate(paye=Sum("paiements__montant_paye"), nb_paiements=Count("paiements"))
+        .values("annee", "montant_annuel_du", "montant_paye_archive", "paye", "nb_paiements")
+    )
+    if not lignes:
+        return None
+    retenue = next((ligne for ligne in lignes if ligne["annee"] == maintenant.year), lignes[0])
+    paye = (retenue["paye"] or Decimal("0")) + retenue["montant_paye_archive"]
+    nb_paiements = sum(ligne["nb_paiements"] for ligne in lignes)
+    derniers = []
+    if nb_paiements:
+        derniers = list(
+            modele_paiement.objects.filter(**{f"cotisation_annuelle__{cle}": valeur for cle, valeur in filtre.items()})
+            .select_related("cotisation_annuelle", "encaisse_par_agent")
+            .order_by("-date_paiement")[:NB_DERNIERS_PAIEMENTS]
+        )
+    return {
+        "montant_annuel_du": retenue["montant_annuel_du"],
+        "montant_paye": paye,
+        "reste_a_payer": max(Decimal("0"), retenue["montant_annuel_du"] - paye),
+        "derniers_paiements": derniers,
+        "nb_paiements": nb_paiements,
+    }
+
+
+def calculer_profil_compte(user, maintenant=None):
+    """Agrégat complet (sans cache) : profils liés, types de profil et soldes."""
+    maintenant = maintenant or timezone.now()
+    utilisateur = (
+        get_user_model().objects
+        .select_related("acteur_economique", "institution_financiere", "profil_emploi", "contribuable", "membre_diaspora")
+        .annotate(a_osc=Exists(OrganisationSocieteCivile.objects.filter(user=OuterRef("pk"))))
+        .get(pk=user.pk)
+    )
+    acteur = getattr(utilisateur, "acteur_economique", None)
+    institution = getattr(utilisateur, "institution_financiere", None)
+    emploi = getattr(utilisateur, "profil_emploi", None)
+    contribuable = getattr(utilisateur, "contribuable", None)
+    diaspora = getattr(utilisateur, "membre_diaspora", None)
+    osc_list = list(utilisateur.organisations_societe_civile.all()) if utilisateur.a_osc else []
+
+    # Un utilisateur peut avoir plusieurs rôles
+    types = []
+    if acteur:
+        types.append("Acteur Économique")
+    if institution:
+        types.append("Institution Financière")
+    if emploi:
+        types.append(emploi.get_type_profil_display())
+    if osc_list:
+        types.append("Organisation de la Société Civile (OSC)")
+    if diaspora:
+        types.append("Diaspora")
+    if contribuable:
+        types.append("Contribuable (Marché / Place publique)")
+
+    agregat = {
+        "acteur": acteur,
+        "institution": institution,
+        "emploi": emploi,
+        "contribuable": contribuable,
+        "diaspora": diaspora,
+        "osc_list": osc_list,
+        "types": types,
+        "boutiques": None,
+        "soldes_contribuable": None,
+        "cotisation_acteur": None,
+        "cotisation_institution": None,
+    }
+    if contribuable:
+        agregat["boutiques"] = list(
+            BoutiqueMagasin.objects.filter(contribuable=contribuable, est_actif=True).select_related("emplacement")
+        )
+        agregat["soldes_contribuable"] = _soldes_contribuable(contribuable, maintenant)
+    if acteur:
+        agregat["cotisation_acteur"] = _cotisation_annuelle(
+            CotisationAnnuelleActeur, PaiementCotisationActeur, {"acteur": acteur}, maintenant
+        )
+    if institution:
+        agregat["cotisation_institution"] = _cotisation_annuelle(
+            CotisationAnnuelleInstitution, PaiementCotisationInstitution, {"institution": institution}, maintenant
+        )
+    return agregat
+
+
+def profil_compte(user):
+    """Agrégat « Mon compte » de l'utilisateur, depuis le cache si possible."""
+    maintenant = timezone.now()
+    cle = cle_cache(user.pk, maintenant)
+    agregat = cache.get(cle)
+    if agregat is None:
+        agregat = calculer_profil_compte(user, maintenant)
+        cache.set(cle, agregat, DUREE_CACHE)
+    return agregat
@@ -0,0 +1,260 @@
+"""
+Reçus de paiement signés (cotisations contribuable / acteur / institution, tickets marché).
+
+Chaque paiement reçoit un jeton compact « <code><id>.<signature> » (ex. « a42.Xy3...ZQ ») :
+la signature est un HMAC (SECRET_KEY, sel propre aux reçus) du type, de l'id, du montant et de
+la date du paiement, tronqué à 12 octets et encodé en base64 URL (16 caractères). Le jeton est
+imprimé en clair et dans un QR code qui pointe vers la page publique de vérification.
+
+Un mois de cotisation de boutique peut être payé en plusieurs fois : sa ligne PaiementCotisation
+cumule alors les versements. Le reçu d'une cotisation de boutique atteste donc un
+VersementCotisation (montant et date réellement encaissés, jamais modifiés) : un reçu partiel
+reste valable après le complément du mois, et la page de vérification affiche le cumul.
+
+La vérification lit le paiement par sa clé primaire (aucune recherche) puis recalcule la
+signature : un reçu falsifié n'est pas reconnu. Le versement, lui, n'est jamais modifié : la page
+de vérification compare donc les versements du mois jusqu'à celui-ci au cumul de PaiementCotisation,
+et ne reconnaît plus le reçu quand la mairie a corrigé le mois à la baisse ou l'a supprimé. Les
+paiements d'un exercice clos gardent leur id dans les tables d'archives (mairie.archives) :
+leurs reçus restent vérifiables et réimprimables.
+
+Mise en page pour imprimante thermique 80 mm : un reçu par page, les reçus d'une journée de
+collecte d'un agent sont regroupés dans un seul PDF.
+"""
+import base64
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from mairie.archives import ARCHIVE_DE, archives_necessaires, sources
+from mairie.models import (
+    ConfigurationMairie, PaiementCotisation, PaiementCotisationActeur, PaiementCotisationInstitution, TicketMarche,
+    VersementCotisation,
+)
+
+SEL_RECU = "comptes.recus"
+LONGUEUR_SIGNATURE = 12
+
+LARGEUR_RECU = 80 * mm
+HAUTEUR_RECU = 150 * mm
+TAILLE_QR = 38 * mm
+
+# code : préfixe du jeton ; montant / date : champs signés ; relations : select_related du reçu
+TypeRecu = namedtuple("TypeRecu", ["code", "modele", "libelle", "montant", "date", "relations"])
+
+TYPES_RECU = {
+    "contribuable": TypeRecu(
+        "c", VersementCotisation, "Cotisation boutique / magasin", "montant_paye", "date_paiement",
+        ["cotisation_annuelle__boutique__contribuable", "cotisation_annuelle__boutique__emplacement",
+         "encaisse_par_agent"],
+    ),
+    "ticket": TypeRecu(
+        "t", TicketMarche, "Ticket marché", "montant", "date", ["emplacement", "encaisse_par_agent"],
+    ),
+    "acteur": TypeRecu(
+        "a", PaiementCotisationActeur, "Cotisation acteur économique", "montant_paye", "date_paiement",
+        ["cotisation_annuelle__acteur", "encaisse_par_agent"],
+    ),
+    "institution": TypeRecu(
+        "i", PaiementCotisationInstitution, "Cotisation institution financière", "montant_paye", "date_paiement",
+        ["cotisation_annuelle__institution", "encaisse_par_agent"],
+    ),
+}
+TYPES_PAR_CODE = {type_recu.code: nom for nom, type_recu in TYPES_RECU.items()}
+
+MOIS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre",
+        "novembre", "décembre"]
+
+
+def _message(type_recu, objet):
+    definition = TYPES_RECU[type_recu]
+    montant = Decimal(str(getattr(objet, definition.montant) or 0)).quantize(Decimal("0.01"))
+    date = getattr(objet, definition.date)
+    # Horodatage à la seconde : identique avant et après un aller-retour en base
+    date = int(date.timestamp()) if isinstance(date, datetime) else date.isoformat()
+    return f"{definition.code}|{objet.pk}|{montant}|{date}"
+
+
+def _signature(message):
+    brut = salted_hmac(SEL_RECU, message, algorithm="sha256").digest()[:LONGUEUR_SIGNATURE]
+    return base64.urlsafe_b64encode(brut).decode("ascii")
+
+
+def modeles_du_recu(type_recu, archives=True):
+    """Tables où chercher les paiements d'un type : la table vivante, puis son archive s'il y en a une."""
+    modele = TYPES_RECU[type_recu].modele
+    return [modele] + ([ARCHIVE_DE[modele]] if archives and modele in ARCHIVE_DE else [])
+
+
+def jeton_recu(type_recu, objet):
+    return f"{TYPES_RECU[type_recu].code}{objet.pk}.{_signature(_message(type_recu, objet))}"
+
+
+def verifier_jeton(jeton):
+    """(type de reçu, paiement) si le jeton est authentique et le paiement inchangé, sinon None."""
+    prefixe, _, signature = (jeton or "").partition(".")
+    type_recu = TYPES_PAR_CODE.get(prefixe[:1])
+    if type_recu is None or not prefixe[1:].isdigit() or len(signature) != 16:
+        return None
+    definition = TYPES_RECU[type_recu]
+    objet = None
+    # Table vivante d'abord ; un paiement absent peut appartenir à un exercice clos
+    for modele in modeles_du_recu(type_recu):
+        try:
+            objet = modele.objects.select_related(*definition.relations).get(pk=int(prefixe[1:]))
+            break
+        except modele.DoesNotExist:
+            continue
+    if objet is None:
+        return None
+    if not constant_time_compare(signature, _signature(_message(type_recu, objet))):
+        return None
+    return type_recu, objet
+
+
+def numero_recu(type_recu, objet):
+    return f"{TYPES_RECU[type_recu].code.upper()}-{objet.pk:06d}"
+
+
+def details_recu(type_recu, objet):
+    """Lignes (libellé, valeur) décrivant le paiement, communes au PDF et à la page de vérification."""
+    agent = objet.encaisse_par_agent
+    lignes = [("Reçu n°", numero_recu(type_recu, objet)), ("Objet", TYPES_RECU[type_recu].libelle)]
+    if type_recu == "contribuable":
+        boutique = objet.cotisation_annuelle.boutique
+        titulaire = boutique.contribuable.nom_complet if boutique.contribuable_id else ""
+        lignes += [
+            ("Payé par", titulaire),
+            ("Boutique", boutique.matricule),
+            ("Marché", boutique.emplacement.nom_lieu if boutique.emplacement_id else ""),
+            ("Période", f"{MOIS[objet.mois - 1]} {objet.cotisation_annuelle.annee}"),
+            ("Date", timezone.localtime(objet.date_paiement).strftime("%d/%m/%Y %H:%M")),
+        ]
+    elif type_recu == "ticket":
+        lignes += [
+            ("Payé par", objet.nom_vendeur),
+            ("Marché", objet.emplacement.nom_lieu),
+            ("Date", objet.date.strftime("%d/%m/%Y")),
+        ]
+    else:
+        cotisation = objet.cotisation_annuelle
+        payeur = cotisation.acteur.raison_sociale if type_recu == "acteur" else cotisation.institution.nom_institution
+        lignes += [
+            ("Payé par", payeur),
+            ("Période", f"Année {cotisation.annee}"),
+            ("Date", timezone.localtime(objet.date_paiement).strftime("%d/%m/%Y %H:%M")),
+        ]
+    lignes.append(("Montant", _fcfa(getattr(objet, TYPES_RECU[type_recu].montant))))
+    lignes.append(("Agent", f"{agent.nom} {agent.prenom} ({agent.matricule})" if agent else "—"))
+    return lignes
+
+
+def details_verification(type_recu, objet):
+    """
+    details_recu, plus le cumul du mois quand le versement attesté n'en est qu'une partie.
+
+    None si le paiement du mois, corrigé à la baisse ou supprimé depuis, ne couvre plus ce
+    versement (ni ceux qui l'ont précédé) : le reçu n'est alors plus reconnu.
+    """
+    lignes = details_recu(type_recu, objet)
+    if type_recu == "contribuable":
+        mois = {"cotisation_annuelle_id": objet.cotisation_annuelle_id, "mois": objet.mois}
+        cumul = sum(
+            modele.objects.filter(**mois).aggregate(total=Sum("montant_paye"))["total"] or 0
+            for modele in sources(PaiementCotisation, True)
+        )
+        verse = VersementCotisation.objects.filter(pk__lte=objet.pk, **mois).aggregate(
+            total=Sum("montant_paye")
+        )["total"]
+        if verse > cumul:
+            return None
+        if cumul != objet.montant_paye:
+            lignes.append(("Total payé pour le mois", f"{_fcfa(cumul)} (plusieurs versements)"))
+    return lignes
+
+
+def _fcfa(montant):
+    return f"{montant or 0:,.0f} FCFA".replace(",", " ")
+
+
+def paiements_de_la_journee(agent, jour):
+    """[(type de reçu, paiement), ...] encaissés par l'agent le jour donné, dans l'ordre chronologique."""
+    debut = timezone.make_aware(datetime.combine(jour, time.min))
+    fin = debut + timedelta(days=1)
+    archives = archives_necessaires(date_du=jour, date_au=jour)
+    recus = []
+    for type_recu, definition in TYPES_RECU.items():
+        for modele in modeles_du_recu(type_recu, archives):
+            qs = modele.objects.select_related(*definition.relations).filter(encaisse_par_agent=agent)
+            if type_recu == "ticket":
+                qs = qs.filter(date=jour)
+            else:
+                qs = qs.filter(date_paiement__gte=debut, date_paiement__lt=fin)
+            recus.extend((type_recu, objet) for objet in qs)
+
+    def moment(recu):
+        type_recu, objet = recu
+        return objet.date_creation if type_recu == "ticket" else objet.date_paiement
+
+    return sorted(recus, key=moment)
+
+
+def _dessiner_recu(pdf, commune, type_recu, objet, jeton, url):
+    y = HAUTEUR_RECU - 8 * mm
+    pdf.setFont("Helvetica-Bold", 11)
+    pdf.drawCentredString(LARGEUR_RECU / 2, y, commune[:40])
+    y -= 6 * mm
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawCentredString(LARGEUR_RECU / 2, y, "REÇU DE PAIEMENT")
+    y -= 3 * mm
+    pdf.setDash(1, 2)
+    pdf.line(4 * mm, y, LARGEUR_RECU - 4 * mm, y)
+    pdf.setDash()
+    y -= 6 * mm
+    for libelle, valeur in details_recu(type_recu, objet):
+        pdf.setFont("Helvetica-Bold" if libelle == "Montant" else "Helvetica", 8)
+        pdf.drawString(4 * mm, y, f"{libelle} :")
+        pdf.drawRightString(LARGEUR_RECU - 4 * mm, y, str(valeur)[:38])
+        y -= 4.5 * mm
+
+    qr = QrCodeWidget(url, barLevel="M")
+    x1, y1, x2, y2 = qr.getBounds()
+    dessin = Drawing(TAILLE_QR, TAILLE_QR, transform=[TAILLE_QR / (x2 - x1), 0, 0, TAILLE_QR / (y2 - y1), 0, 0])
+    dessin.add(qr)
+    y -= TAILLE_QR + 2 * mm
+    renderPDF.draw(dessin, pdf, (LARGEUR_RECU - TAILLE_QR) / 2, y)
+
+    y -= 4 * mm
+    pdf.setFont("Courier", 7)
+    pdf.drawCentredString(LARGEUR_RECU / 2, y, jeton)
+    y -= 4 * mm
+    pdf.setFont("Helvetica", 6)
+    pdf.drawCentredString(LARGEUR_RECU / 2, y, "Scannez le QR code pour vérifier l'authenticité de ce reçu.")
+    pdf.showPage()
+
+
+def recus_pdf(recus, url_verification):
+    """
+    PDF (bytes) d'un reçu par page pour [(type de reçu, paiement), ...].
+    url_verification(jeton) donne l'adresse absolue encodée dans le QR code.
+    """
+    conf = ConfigurationMairie.objects.filter(est_active=True).first()
+    commune = getattr(conf, "nom_commune", None) or "Mairie de Kloto 1"
+    tampon = BytesIO()
+    pdf = canvas.Canvas(tampon, pagesize=(LARGEUR_RECU, HAUTEUR_RECU))
+    pdf.setTitle("Reçus de paiement")
+    for type_recu, objet in recus:
+        jeton = jeton_recu(type_recu, objet)
+        _dessiner_recu(pdf, commune, type_recu, objet, jeton, url_verification(jeton))
+    pdf.save()
+    return tampon.getvalue()
@@ -0,0 +1,66 @@
+"""Invalidation de l'agrégat « Mon compte » (comptes.profil_compte) après chaque écriture qui le modifie."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from diaspora.models import MembreDiaspora
+from emploi.models import ProfilEmploi
+from mairie.models import (
+    BoutiqueMagasin, Contribuable, CotisationAnnuelle, CotisationAnnuelleActeur, CotisationAnnuelleInstitution,
+    PaiementCotisation, PaiementCotisationActeur, PaiementCotisationInstitution,
+)
+from osc.models import OrganisationSocieteCivile
+
+from .profil_compte import invalider_profil_compte
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def utilisateur_modifie(sender, instance, **kwargs):
+    invalider_profil_compte(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ActeurEconomique)
+@receiver([post_save, post_delete], sender=InstitutionFinanciere)
+@receiver([post_save, post_delete], sender=ProfilEmploi)
+@receiver([post_save, post_delete], sender=Contribuable)
+@receiver([post_save, post_delete], sender=MembreDiaspora)
+@receiver([post_save, post_delete], sender=OrganisationSocieteCivile)
+def profil_modifie(sender, instance, **kwargs):
+    invalider_profil_compte(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=BoutiqueMagasin)
+def boutique_modifiee(sender, instance, **kwargs):
+    if instance.contribuable_id:
+        invalider_profil_compte(*Contribuable.objects.filter(pk=instance.contribuable_id).values_list("user_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=CotisationAnnuelle)
+@receiver([post_save, post_delete], sender=PaiementCotisation)
+def cotisation_boutique_modifiee(sender, instance, **kwargs):
+    if sender is CotisationAnnuelle:
+        filtre = {"boutiques_magasins": instance.boutique_id}
+    else:
+        filtre = {"boutiques_magasins__cotisations_annuelles": instance.cotisation_annuelle_id}
+    invalider_profil_compte(*Contribuable.objects.filter(**filtre).values_list("user_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=CotisationAnnuelleActeur)
+@receiver([post_save, post_delete], sender=PaiementCotisationActeur)
+def cotisation_acteur_modifiee(sender, instance, **kwargs):
+    if sender is CotisationAnnuelleActeur:
+        filtre = {"pk": instance.acteur_id}
+    else:
+        filtre = {"cotisations_annuelles": instance.cotisation_annuelle_id}
+    invalider_profil_compte(*ActeurEconomique.objects.filter(**filtre).values_list("user_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=CotisationAnnuelleInstitution)
+@receiver([post_save, post_delete], sender=PaiementCotisationInstitution)
+def cotisation_institution_modifiee(sender, instance, **kwargs):
+    if sender is CotisationAnnuelleInstitution:
+        filtre = {"pk": instance.institution_id}
+    else:
+        filtre = {"cotisations_annuelles": instance.cotisation_annuelle_id}
+    invalider_profil_compte(*InstitutionFinanciere.objects.filter(**filtre).values_list("user_id", flat=True))
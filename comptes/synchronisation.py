@@ -0,0 +1,302 @@
+"""
+Synchronisation hors-ligne des agents collecteurs.
+
+L'application de l'agent télécharge un instantané compact de sa zone (emplacements,
+boutiques, contribuables, cotisations ouvertes), enregistre les encaissements sans
+réseau, puis renvoie un lot d'opérations. Chaque opération porte une clé d'idempotence
+générée côté terminal : un lot renvoyé après une coupure n'est jamais appliqué deux fois.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from mairie.archives import montants_archives_par_mois
+from mairie.models import (
+    BoutiqueMagasin, Contribuable, CotisationAnnuelle, PaiementCotisation,
+    TicketMarche,
+)
+from .encaissement import encaisser_cotisation_boutique
+from .models import OperationSynchronisee
+
+# Nombre maximal d'opérations acceptées dans un même lot
+TAILLE_MAX_LOT = 500
+
+
+def construire_instantane_agent(agent):
+    """
+    Retourne l'instantané de la zone de l'agent sous forme de listes de lignes
+    (colonnes décrites dans `colonnes`) afin de limiter la taille du JSON.
+    """
+    emplacement_ids = list(agent.emplacements_assignes.values_list("id", flat=True))
+
+    boutiques = list(
+        BoutiqueMagasin.objects.filter(emplacement_id__in=emplacement_ids, est_actif=True)
+        .order_by("emplacement_id", "matricule")
+        .values_list(
+            "id", "matricule", "emplacement_id", "contribuable_id", "type_local",
+            "prix_location_mensuel", "prix_location_annuel",
+        )
+    )
+    boutique_ids = [b[0] for b in boutiques]
+    contribuable_ids = {b[3] for b in boutiques if b[3]}
+
+    contribuables = Contribuable.objects.filter(id__in=contribuable_ids).order_by("nom", "prenom").values_list(
+        "id", "nom", "prenom", "telephone",
+    )
+
+    cotisations = (
+        CotisationAnnuelle.objects.filter(boutique_id__in=boutique_ids)
+        .annotate(
+            total_paye=Coalesce(
+                Sum("paiements__montant_paye"),
+                Value(Decimal("0")),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ) + F("montant_paye_archive")
+        )
+        .order_by("boutique_id", "annee")
+        .values_list("id", "boutique_id", "annee", "montant_annuel_du", "total_paye", "montant_paye_archive")
+    )
+    cotisations_ouvertes = [c[:5] for c in cotisations if c[4] < c[3]]
+
+    # Montant déjà payé par mois pour les cotisations ouvertes (pour l'affichage des 12 mois),
+    # paiements archivés compris pour les arriérés d'un exercice clos
+    payes = defaultdict(lambda: defaultdict(Decimal))
+    for cotisation_id, mois, montant in PaiementCotisation.objects.filter(
+        cotisation_annuelle_id__in=[c[0] for c in cotisations_ouvertes]
+    ).values_list("cotisation_annuelle_id", "mois", "montant_paye"):
+        payes[cotisation_id][mois] += montant
+    archivees = [c[0] for c in cotisations if c[4] < c[3] and c[5]]
+    for cotisation_id, par_mois in montants_archives_par_mois(archivees).items():
+        for mois, montant in par_mois.items():
+            payes[cotisation_id][mois] += montant
+    mois_payes = {
+        cotisation_id: {mois: _montant_json(montant) for mois, montant in par_mois.items()}
+        for cotisation_id, par_mois in payes.items()
+    }
+
+    emplacements = agent.emplacements_assignes.order_by("id").values_list("id", "nom_lieu", "quartier")
+
+    return {
+        "genere_le": timezone.now().isoformat(),
+        "agent": {"id": agent.id, "matricule": agent.matricule},
+        "colonnes": {
+            "emplacements": ["id", "nom_lieu", "quartier"],
+            "boutiques": [
+                "id", "matricule", "emplacement", "contribuable", "type_local",
+                "prix_mensuel", "prix_annuel",
+            ],
+            "contribuables": ["id", "nom", "prenom", "telephone"],
+            "cotisations": ["id", "boutique", "annee", "montant_du", "montant_paye", "mois_payes"],
+        },
+        "emplacements": [list(e) for e in emplacements],
+        "boutiques": [
+            [
+                b[0], b[1], b[2], b[3], b[4], _montant_json(b[5]),
+                _montant_json(b[6] if b[6] is not None else b[5] * 12),
+            ]
+            for b in boutiques
+        ],
+        "contribuables": [list(c) for c in contribuables],
+        "cotisations": [
+            [c[0], c[1], c[2], _montant_json(c[3]), _montant_json(c[4]), mois_payes.get(c[0], {})]
+            for c in cotisations_ouvertes
+        ],
+    }
+
+
+def appliquer_lot(agent, operations):
+    """
+    Applique un lot d'opérations dans une seule transaction.
+
+    Chaque opération est isolée dans un point de sauvegarde : une opération invalide est
+    rejetée (et pourra être corrigée puis renvoyée) sans annuler les autres. Les clés déjà
+    reçues renvoient le résultat enregistré lors de la première application.
+    """
+    if not isinstance(operations, list):
+        raise ValidationError("Le champ « operations » doit être une liste.")
+    if len(operations) > TAILLE_MAX_LOT:
+        raise ValidationError(f"Un lot ne peut pas dépasser {TAILLE_MAX_LOT} opérations.")
+
+    cles = [str(op.get("cle", "")) for op in operations if isinstance(op, dict)]
+    deja_recues = {
+        op.cle_idempotence: op.resultat
+        for op in OperationSynchronisee.objects.filter(agent=agent, cle_idempotence__in=cles)
+    }
+    emplacement_ids = set(agent.emplacements_assignes.values_list("id", flat=True))
+
+    resultats = []
+    with transaction.atomic():
+        for op in operations:
+            cle = str(op.get("cle", "")) if isinstance(op, dict) else ""
+            if not cle or len(cle) > 64:
+                resultats.append({"cle": cle, "statut": "rejete", "erreur": "Clé d'idempotence manquante ou invalide."})
+                continue
+            if cle in deja_recues:
+                resultats.append({"cle": cle, "statut": "deja_applique", **deja_recues[cle]})
+                continue
+
+            try:
+                with transaction.atomic():
+                    type_operation = op.get("type")
+                    if type_operation == OperationSynchronisee.TYPE_COTISATION:
+                        resultat = _appliquer_cotisation(agent, op, emplacement_ids)
+                    elif type_operation == OperationSynchronisee.TYPE_TICKET:
+                        resultat = _appliquer_ticket(agent, op, emplacement_ids)
+                    else:
+                        raise ValidationError("Type d'opération inconnu.")
+                    OperationSynchronisee.objects.create(
+                        agent=agent,
+                        cle_idempotence=cle,
+                        type_operation=type_operation,
+                        resultat=resultat,
+                    )
+            except ValidationError as e:
+                resultats.append({"cle": cle, "statut": "rejete", "erreur": e.messages[0]})
+                continue
+            except IntegrityError:
+                # Même clé reçue en parallèle par une autre requête : déjà appliquée
+                resultats.append({"cle": cle, "statut": "deja_applique"})
+                continue
+
+            deja_recues[cle] = resultat
+            resultats.append({"cle": cle, "statut": "applique", **resultat})
+
+    return {
+        "appliquees": sum(1 for r in resultats if r["statut"] == "applique"),
+        "deja_appliquees": sum(1 for r in resultats if r["statut"] == "deja_applique"),
+        "rejetees": sum(1 for r in resultats if r["statut"] == "rejete"),
+        "resultats": resultats,
+    }
+
+
+def _appliquer_cotisation(agent, op, emplacement_ids):
+    montant = _lire_montant(op.get("montant"), PaiementCotisation._meta.get_field("montant_paye"))
+    date_paiement = _lire_date_paiement(op.get("date"))
+
+    if op.get("cotisation"):
+        cotisation = (
+            CotisationAnnuelle.objects.select_related("boutique")
+            .filter(id=_lire_id(op.get("cotisation"), "Cotisation"))
+            .first()
+        )
+        if cotisation is None:
+            raise ValidationError("Cotisation introuvable.")
+    else:
+        boutique = BoutiqueMagasin.objects.filter(
+            id=_lire_id(op.get("boutique"), "Boutique/magasin"), est_actif=True
+        ).first()
+        if boutique is None:
+            raise ValidationError("Boutique/magasin introuvable.")
+        try:
+            annee = int(op.get("annee") or date_paiement.year)
+        except (TypeError, ValueError):
+            raise ValidationError("Année invalide.")
+        cotisation, _ = CotisationAnnuelle.objects.get_or_create(
+            boutique=boutique,
+            annee=annee,
+            defaults={"montant_annuel_du": boutique.get_prix_annuel()},
+        )
+
+    if cotisation.boutique.emplacement_id not in emplacement_ids:
+        raise ValidationError("Cette cotisation n'est pas dans votre zone de supervision.")
+
+    cotisation, mois_credites = encaisser_cotisation_boutique(
+        cotisation, montant, agent, notes=str(op.get("notes") or ""), date_paiement=date_paiement
+    )
+    return {"cotisation": cotisation.id, "annee": cotisation.annee, "mois": mois_credites}
+
+
+def _appliquer_ticket(agent, op, emplacement_ids):
+    montant = _lire_montant(op.get("montant"), TicketMarche._meta.get_field("montant"))
+    try:
+        emplacement_id = int(op.get("emplacement"))
+    except (TypeError, ValueError):
+        raise ValidationError("Emplacement invalide.")
+    if emplacement_id not in emplacement_ids:
+        raise ValidationError("Cet emplacement n'est pas dans votre zone de supervision.")
+
+    try:
+        date_ticket = parse_date(str(op.get("date") or ""))
+    except ValueError:
+        date_ticket = None
+    if date_ticket is None:
+        raise ValidationError("Date du ticket invalide (format attendu : AAAA-MM-JJ).")
+
+    contribuable_id = _lire_id(op.get("contribuable"), "Contribuable") if op.get("contribuable") else None
+    if contribuable_id and not Contribuable.objects.filter(id=contribuable_id).exists():
+        raise ValidationError("Contribuable introuvable.")
+
+    nom_vendeur = str(op.get("nom_vendeur") or "").strip()
+    if not nom_vendeur:
+        raise ValidationError("Le nom du vendeur est obligatoire.")
+
+    ticket = TicketMarche.objects.create(
+        date=date_ticket,
+        emplacement_id=emplacement_id,
+        contribuable_id=contribuable_id,
+        nom_vendeur=nom_vendeur[:255],
+        telephone_vendeur=str(op.get("telephone_vendeur") or "")[:30],
+        montant=montant,
+        encaisse_par_agent=agent,
+        notes=str(op.get("notes") or ""),
+    )
+    return {"ticket": ticket.id}
+
+
+def _lire_montant(valeur, champ):
+    """Montant positif arrondi aux décimales du champ décimal `champ` et tenant dans ses max_digits."""
+    try:
+        montant = Decimal(str(valeur))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValidationError("Montant invalide. Veuillez saisir un nombre.")
+    if not montant.is_finite():
+        raise ValidationError("Montant invalide. Veuillez saisir un nombre.")
+    if montant >= Decimal(10) ** (champ.max_digits - champ.decimal_places):
+        raise ValidationError("Montant trop élevé.")
+    montant = montant.quantize(Decimal(1).scaleb(-champ.decimal_places))
+    if montant <= 0:
+        raise ValidationError("Le montant doit être supérieur à zéro.")
+    return montant
+
+
+def _lire_id(valeur, libelle):
+    """Identifiant entier envoyé par l'application ; ValidationError (opération rejetée) sinon."""
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{libelle} : identifiant invalide.")
+
+
+def _lire_date_paiement(valeur):
+    """Date d'encaissement saisie hors-ligne (ISO 8601), bornée à l'instant présent."""
+    maintenant = timezone.now()
+    if not valeur:
+        return maintenant
+    try:
+        # parse_date / parse_datetime lèvent ValueError sur une date bien formée mais impossible (30 février)
+        date_paiement = parse_datetime(str(valeur))
+        jour = parse_date(str(valeur)) if date_paiement is None else None
+    except ValueError:
+        date_paiement = jour = None
+    if date_paiement is None:
+        if jour is None:
+            raise ValidationError("Date de paiement invalide.")
+        date_paiement = datetime(jour.year, jour.month, jour.day, 12, 0)
+    if timezone.is_naive(date_paiement):
+        date_paiement = timezone.make_aware(date_paiement)
+    return min(date_paiement, maintenant)
+
+
+def _montant_json(valeur):
+    """Montant FCFA sérialisé en entier si possible (plus compact), sinon en chaîne."""
+    if valeur is None:
+        return None
+    valeur = Decimal(valeur)
+    return int(valeur) if valeur == valeur.to_integral_value() else str(valeur)
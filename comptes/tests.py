@@ -1,3 +1,267 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from comptes.profil_compte import profil_compte
+from mairie.models import (
+    AgentCollecteur, BoutiqueMagasin, Contribuable, CotisationAnnuelle,
+    EmplacementMarche, PaiementCotisation, TicketMarche, VersementCotisation,
+)
+
+
+class SynchronisationAgentTest(TestCase):
+    """Tests de l'API de synchronisation hors-ligne des agents collecteurs."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.agent = AgentCollecteur.objects.create(
+            user=self.user, matricule='AGT-001', nom='Agent', prenom='Test', telephone='90000000',
+        )
+        self.emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        self.agent.emplacements_assignes.add(self.emplacement)
+        self.contribuable = Contribuable.objects.create(nom='Kossi', prenom='Ama', telephone='91000000')
+        self.boutique = BoutiqueMagasin.objects.create(
+            matricule='MKT-001',
+            emplacement=self.emplacement,
+            contribuable=self.contribuable,
+            prix_location_mensuel=Decimal('1000'),
+        )
+        self.annee = timezone.now().year
+        # Créée à l'enregistrement de la boutique (12 × 1000)
+        self.cotisation = CotisationAnnuelle.objects.get(boutique=self.boutique, annee=self.annee)
+        self.client.login(username='agent', password='testpass123')
+
+    def _envoyer(self, operations):
+        return self.client.post(
+            reverse('comptes:api_sync_envoyer'),
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+    def test_instantane_contient_la_zone_de_l_agent(self):
+        response = self.client.get(reverse('comptes:api_sync_instantane'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([b[1] for b in data['boutiques']], ['MKT-001'])
+        self.assertEqual([c[0] for c in data['contribuables']], [self.contribuable.id])
+        self.assertEqual([c[0] for c in data['cotisations']], [self.cotisation.id])
+
+    def test_lot_applique_une_seule_fois(self):
+        operations = [
+            {'cle': 'op-1', 'type': 'cotisation', 'cotisation': self.cotisation.id, 'montant': '2500'},
+            {
+                'cle': 'op-2', 'type': 'ticket', 'emplacement': self.emplacement.id,
+                'date': timezone.now().date().isoformat(), 'nom_vendeur': 'Vendeuse', 'montant': '100',
+            },
+        ]
+        premier = self._envoyer(operations).json()
+        self.assertEqual(premier['appliquees'], 2)
+        self.assertEqual(premier['resultats'][0]['mois'], [1, 2, 3])
+
+        second = self._envoyer(operations).json()
+        self.assertEqual(second['appliquees'], 0)
+        self.assertEqual(second['deja_appliquees'], 2)
+        self.assertEqual(PaiementCotisation.objects.count(), 3)
+        self.assertEqual(TicketMarche.objects.count(), 1)
+
+    def test_operation_hors_zone_rejetee(self):
+        autre = EmplacementMarche.objects.create(quartier='Nord', nom_lieu='Autre marché')
+        rapport = self._envoyer([
+            {
+                'cle': 'op-3', 'type': 'ticket', 'emplacement': autre.id,
+                'date': timezone.now().date().isoformat(), 'nom_vendeur': 'X', 'montant': '100',
+            },
+        ]).json()
+        self.assertEqual(rapport['rejetees'], 1)
+        self.assertFalse(TicketMarche.objects.exists())
+
+    def test_operation_mal_formee_rejetee_seule(self):
+        jour = timezone.now().date().isoformat()
+        ticket = {'type': 'ticket', 'emplacement': self.emplacement.id, 'nom_vendeur': 'V', 'montant': '100'}
+        response = self._envoyer([
+            {'cle': 'ok-1', **ticket, 'date': jour},
+            {'cle': 'ko-1', 'type': 'cotisation', 'cotisation': 'abc', 'montant': '1000'},
+            {'cle': 'ko-2', 'type': 'cotisation', 'boutique': 'abc', 'montant': '1000'},
+            {'cle': 'ko-3', **ticket, 'date': jour, 'contribuable': 'abc'},
+            {'cle': 'ko-4', **ticket, 'date': '2026-02-30'},
+            {'cle': 'ko-5', 'type': 'cotisation', 'cotisation': self.cotisation.id, 'montant': '1000',
+             'date': '2026-02-30T10:00:00'},
+            {'cle': 'ko-6', **ticket, 'date': jour, 'montant': '1e15'},
+            {'cle': 'ko-7', **ticket, 'date': jour, 'montant': '1e40'},
+            {'cle': 'ko-8', **ticket, 'date': jour, 'montant': '0.001'},
+            {'cle': 'ok-2', 'type': 'cotisation', 'cotisation': self.cotisation.id, 'montant': '1000'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        rapport = response.json()
+        self.assertEqual((rapport['appliquees'], rapport['rejetees']), (2, 8))
+        self.assertEqual(TicketMarche.objects.count(), 1)
+        self.assertEqual(PaiementCotisation.objects.count(), 1)
+
+    def test_reserve_aux_agents(self):
+        User.objects.create_user(username='simple', password='testpass123')
+        self.client.login(username='simple', password='testpass123')
+        response = self.client.get(reverse('comptes:api_sync_instantane'))
+        self.assertEqual(response.status_code, 403)
+
+
+class ProfilCompteTest(TestCase):
+    """Agrégat « Mon compte » : soldes du contribuable, mise en cache et invalidation par les paiements."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kossi', password='testpass123')
+        self.contribuable = Contribuable.objects.create(
+            nom='Kossi', prenom='Ama', telephone='91000000', user=self.user,
+        )
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        self.annee = timezone.now().year
+        self.cotisations = []
+        for i in range(2):
+            boutique = BoutiqueMagasin.objects.create(
+                matricule=f'MKT-{i:03d}', emplacement=emplacement, contribuable=self.contribuable,
+                prix_location_mensuel=Decimal('1000'),
+            )
+            self.cotisations.append(CotisationAnnuelle.objects.get(boutique=boutique, annee=self.annee))
+        ancienne = CotisationAnnuelle.objects.create(
+            boutique=boutique, annee=self.annee - 1, montant_annuel_du=Decimal('12000'),
+        )
+        PaiementCotisation.objects.create(cotisation_annuelle=ancienne, mois=1, montant_paye=Decimal('2000'))
+        PaiementCotisation.objects.create(cotisation_annuelle=self.cotisations[0], mois=1, montant_paye=Decimal('1000'))
+        self.client.login(username='kossi', password='testpass123')
+
+    def test_soldes_cache_et_invalidation(self):
+        mois = timezone.now().month
+        response = self.client.get(reverse('comptes:profil'))
+        self.assertEqual(response.context['total_arrieres'], Decimal('10000') + 2000 * mois - 1000)
+        self.assertEqual(response.context['total_du_aujourdhui'], Decimal('10000') + 2000 * mois)
+        self.assertEqual(response.context['total_paye_contribuable'], Decimal('3000'))
+        self.assertEqual(len(response.context['boutiques_magasins']), 2)
+
+        with self.assertNumQueries(0):
+            profil_compte(self.user)
+        PaiementCotisation.objects.create(cotisation_annuelle=self.cotisations[1], mois=1, montant_paye=Decimal('1000'))
+        self.assertEqual(profil_compte(self.user)['soldes_contribuable']['paye'], Decimal('4000'))
+
+    def test_api_historique_paiements_pagination(self):
+        debut = timezone.now() - timedelta(days=100)
+        for cotisation in self.cotisations:
+            for mois in range(2, 13):
+                PaiementCotisation.objects.create(
+                    cotisation_annuelle=cotisation, mois=mois, montant_paye=Decimal('1000'),
+                    date_paiement=debut + timedelta(days=mois),  # deux paiements par date
+                )
+        url = reverse('comptes:api_historique_paiements', args=['contribuable'])
+        vus, curseur, pages = [], None, 0
+        while True:
+            page = self.client.get(url, {'limite': 10, **({'curseur': curseur} if curseur else {})}).json()
+            self.assertEqual('totaux' in page, curseur is None)
+            if curseur is None:
+                self.assertEqual(page['totaux']['nombre'], 24)
+                self.assertEqual(Decimal(page['totaux']['montant']), Decimal('25000'))
+            vus += [p['id'] for p in page['paiements']]
+            pages += 1
+            curseur = page['curseur_suivant']
+            if not curseur:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(vus), len(set(vus)))
+        self.assertEqual(len(vus), 24)
+
+        jour = (debut + timedelta(days=5)).date()
+        filtre = self.client.get(url, {'date_du': jour, 'date_au': jour}).json()
+        self.assertEqual(filtre['totaux']['nombre'], 2)
+        self.assertEqual(self.client.get(reverse('comptes:api_historique_paiements', args=['acteur'])).status_code, 404)
+
+
+class RecusPaiementTest(TestCase):
+    """Reçus signés : un par versement, vérifiable publiquement, périmé si corrigé, impression par journée."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.agent = AgentCollecteur.objects.create(
+            user=self.user, matricule='AGT-001', nom='Agent', prenom='Test', telephone='90000000',
+        )
+        self.emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        self.agent.emplacements_assignes.add(self.emplacement)
+        contribuable = Contribuable.objects.create(nom='Kossi', prenom='Ama', telephone='91000000')
+        boutique = BoutiqueMagasin.objects.create(
+            matricule='MKT-001', emplacement=self.emplacement, contribuable=contribuable,
+            prix_location_mensuel=Decimal('1000'),
+        )
+        self.cotisation = CotisationAnnuelle.objects.get(boutique=boutique, annee=timezone.now().year)
+        PaiementCotisation.objects.create(
+            cotisation_annuelle=self.cotisation, mois=1, montant_paye=Decimal('500'), encaisse_par_agent=self.agent,
+        )
+        self.versement = VersementCotisation.objects.get()
+        TicketMarche.objects.create(
+            date=timezone.localdate(), emplacement=self.emplacement, nom_vendeur='Vendeuse',
+            montant=Decimal('100'), encaisse_par_agent=self.agent,
+        )
+
+    def test_verification_du_jeton(self):
+        from comptes.recus import jeton_recu, verifier_jeton
+
+        jeton = jeton_recu('contribuable', self.versement)
+        with self.assertNumQueries(1):
+            self.assertEqual(verifier_jeton(jeton)[1], self.versement)
+        url = reverse('comptes:verifier_recu', args=[jeton])
+        response = self.client.get(url)
+        self.assertTrue(response.context['valide'])
+        self.assertContains(response, 'MKT-001')
+
+        faux = jeton[:-1] + ('A' if jeton[-1] != 'A' else 'B')
+        self.assertEqual(self.client.get(reverse('comptes:verifier_recu', args=[faux])).status_code, 404)
+
+        # Versement corrigé par la mairie : l'ancien reçu ne fait plus foi
+        VersementCotisation.objects.filter(pk=self.versement.pk).update(montant_paye=Decimal('400'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('comptes:verifier_recu', args=['x1.abc'])).status_code, 404)
+
+    def test_recu_partiel_reste_valable_apres_complement(self):
+        from comptes.recus import jeton_recu
+
+        url = reverse('comptes:verifier_recu', args=[jeton_recu('contribuable', self.versement)])
+        self.client.login(username='agent', password='testpass123')
+        response = self.client.post(
+            reverse('comptes:payer_contribuable', args=[self.cotisation.boutique.contribuable_id]),
+            {'type': 'cotisation', 'cotisation_annuelle': self.cotisation.pk, 'montant': '1500'},
+        )
+        # 500 complètent janvier, 1000 paient février : un reçu par versement
+        complement, fevrier = VersementCotisation.objects.exclude(pk=self.versement.pk).order_by('mois')
+        self.assertEqual((complement.mois, complement.montant_paye, fevrier.mois), (1, Decimal('500'), 2))
+        self.assertTrue(response.url.endswith(f'recu=contribuable&ids={complement.pk},{fevrier.pk}'))
+
+        # Le reçu du premier versement reste authentique et indique le cumul du mois
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(response.context['details'])['Montant'], '500 FCFA')
+        self.assertContains(response, '1 000 FCFA (plusieurs versements)')
+
+        # La mairie ramène janvier à 700 : le premier versement reste couvert, pas le complément
+        PaiementCotisation.objects.filter(cotisation_annuelle=self.cotisation, mois=1).update(montant_paye=Decimal('700'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        url_complement = reverse('comptes:verifier_recu', args=[jeton_recu('contribuable', complement)])
+        self.assertEqual(self.client.get(url_complement).status_code, 404)
+
+        # Mois supprimé : plus aucun reçu de janvier n'est reconnu
+        PaiementCotisation.objects.filter(cotisation_annuelle=self.cotisation, mois=1).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_recus_de_la_journee(self):
+        self.client.login(username='agent', password='testpass123')
+        response = self.client.get(reverse('comptes:recus_journee'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(response.content.count(b'/Type /Page\n'), 2)
 
-# Create your tests here.
+        autre = User.objects.create_user(username='autre', password='testpass123')
+        AgentCollecteur.objects.create(user=autre, matricule='AGT-002', nom='Autre', prenom='Agent', telephone='1')
+        self.client.login(username='autre', password='testpass123')
+        url = reverse('comptes:recus_paiement', args=['contribuable']) + f'?ids={self.versement.id}'
+        self.assertEqual(self.client.get(url).status_code, 404)
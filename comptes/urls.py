@@ -18,5 +18,12 @@ urlpatterns = [
     path('payer-contribuable/<int:contribuable_id>/', views.payer_contribuable, name='payer_contribuable'),
     path('payer-acteur/<int:acteur_id>/', views.payer_acteur, name='payer_acteur'),
     path('payer-institution/<int:institution_id>/', views.payer_institution, name='payer_institution'),
+    path('recus/journee/', views.recus_journee, name='recus_journee'),
+    path('recus/verifier/<str:jeton>/', views.verifier_recu, name='verifier_recu'),
+    path('recus/<str:type_recu>/', views.recus_paiement, name='recus_paiement'),
+    # API de synchronisation hors-ligne (agents collecteurs)
+    path('api/sync/instantane/', views.api_sync_instantane, name='api_sync_instantane'),
+    path('api/sync/envoyer/', views.api_sync_envoyer, name='api_sync_envoyer'),
+    path('api/paiements/<str:profil_type>/', views.api_historique_paiements, name='api_historique_paiements'),
     path('profil/fiche-paiements/<str:profil_type>/', views.telecharger_fiche_paiements, name='telecharger_fiche_paiements'),
 ]
@@ -3,24 +3,37 @@ from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
 from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.utils import timezone
 from django.views import View
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
 
 from .models import Notification
+from .encaissement import encaisser_cotisation_boutique
+from .historique_paiements import LIMITE_DEFAUT, page_historique, paiements_du_profil
+from .profil_compte import profil_compte
+from .recus import (
+    TYPES_RECU, details_verification, modeles_du_recu, numero_recu, paiements_de_la_journee, recus_pdf,
+    verifier_jeton,
+)
+from .synchronisation import appliquer_lot, construire_instantane_agent
+from mairie.archives import archives_necessaires, montants_archives_par_mois, sources
 from mairie.models import (
     CampagnePublicitaire, AgentCollecteur, Contribuable, BoutiqueMagasin, 
     CotisationAnnuelle, PaiementCotisation, TicketMarche, EmplacementMarche,
     CotisationAnnuelleActeur, CotisationAnnuelleInstitution,
-    PaiementCotisationActeur, PaiementCotisationInstitution
+    PaiementCotisationActeur, PaiementCotisationInstitution, VersementCotisation
 )
 from acteurs.models import ActeurEconomique, InstitutionFinanciere
 from mairie.forms import CampagnePublicitaireForm, PubliciteForm
+from mairie.telephones import filtre_telephone
+from mairie_kloto_platform.profilage import budget_requetes
 from django.db.models import Q, Sum
 from datetime import datetime
+import json
 from decimal import Decimal, InvalidOperation
 
 from reportlab.lib.pagesizes import A4, landscape
@@ -28,7 +41,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.units import cm
-from mairie_kloto_platform.views import _draw_pdf_header, NumberedCanvas, PDF_HEADER_HEIGHT_CM
+from mairie_kloto_platform.views import _draw_pdf_header, NumberedCanvas, PDF_HEADER_HEIGHT_CM, is_staff_user
 
 User = get_user_model()
 
@@ -122,35 +135,21 @@ def deconnexion(request):
 
 
 @login_required
+@budget_requetes(20)
 def profil(request):
     """Vue pour afficher le profil de l'utilisateur (Mon compte)."""
     user = request.user
     context = {}
 
-    # Profils liés potentiels
-    acteur_profile = getattr(user, "acteur_economique", None)
-    institution_profile = getattr(user, "institution_financiere", None)
-    emploi_profile = getattr(user, "profil_emploi", None)
-    contribuable_profile = getattr(user, "contribuable", None)
-
-    osc_manager = getattr(user, "organisations_societe_civile", None)
-    osc_list = osc_manager.all() if osc_manager is not None else []
-    diaspora_profile = getattr(user, "membre_diaspora", None)
-
-    # Liste des types de profil pour affichage (un utilisateur peut avoir plusieurs rôles)
-    profile_types_list = []
-    if acteur_profile:
-        profile_types_list.append("Acteur Économique")
-    if institution_profile:
-        profile_types_list.append("Institution Financière")
-    if emploi_profile:
-        profile_types_list.append(emploi_profile.get_type_profil_display())
-    if osc_list:
-        profile_types_list.append("Organisation de la Société Civile (OSC)")
-    if diaspora_profile:
-        profile_types_list.append("Diaspora")
-    if contribuable_profile:
-        profile_types_list.append("Contribuable (Marché / Place publique)")
+    # Profils liés et soldes : un seul agrégat, mis en cache par utilisateur (voir profil_compte)
+    agregat = profil_compte(user)
+    acteur_profile = agregat["acteur"]
+    institution_profile = agregat["institution"]
+    emploi_profile = agregat["emploi"]
+    contribuable_profile = agregat["contribuable"]
+    osc_list = agregat["osc_list"]
+    diaspora_profile = agregat["diaspora"]
+    profile_types_list = agregat["types"]
 
     can_request_ads = False
     campagne_publicitaire = None
@@ -176,81 +175,6 @@ def profil(request):
         context['profile'] = None
         context['profile_type'] = 'Utilisateur standard'
 
-    # Récupérer les cotisations pour les contribuables
-    cotisations_contribuable = None
-    boutiques_magasins = None
-    total_arrieres = None
-    total_du_aujourdhui = None
-    total_paye = None
-    total_reste_a_payer = None
-
-    if contribuable_profile:
-        from mairie.models import BoutiqueMagasin, CotisationAnnuelle, PaiementCotisation
-
-        boutiques_magasins = BoutiqueMagasin.objects.filter(
-            contribuable=contribuable_profile,
-            est_actif=True
-        ).select_related('emplacement')
-
-        # Récupérer toutes les cotisations annuelles du contribuable
-        cotisations_contribuable = CotisationAnnuelle.objects.filter(
-            boutique__contribuable=contribuable_profile
-        ).select_related('boutique', 'boutique__emplacement').prefetch_related('paiements')
-
-        if cotisations_contribuable.exists():
-            maintenant = timezone.now()
-            annee_courante = maintenant.year
-            mois_courant = maintenant.month
-
-            # 1) Montant total des arriérés (années < année courante)
-            total_arrieres_annees_precedentes = sum(
-                (c.reste_a_payer() for c in cotisations_contribuable if c.annee < annee_courante),
-                start=Decimal("0"),
-            )
-
-            # 2) Arriérés de l'année en cours (mois précédents non payés)
-            arrieres_annee_courante = Decimal("0")
-            for c in cotisations_contribuable:
-                if c.annee == annee_courante:
-                    monthly_due = c.boutique.prix_location_mensuel or Decimal("0")
-                    if monthly_due > 0:
-                        # Montant dû jusqu'au mois courant (mois précédents)
-                        montant_du_jusqu_aujourdhui = monthly_due * mois_courant
-                        # Montant payé pour l'année en cours
-                        montant_paye_annee_courante = c.montant_paye()
-                        # Arriérés = dû - payé (si positif)
-                        arrieres = montant_du_jusqu_aujourdhui - montant_paye_annee_courante
-                        if arrieres > 0:
-                            arrieres_annee_courante += arrieres
-
-            # 3) Montant total des arriérés (années précédentes + mois précédents de l'année en cours)
-            total_arrieres = total_arrieres_annees_precedentes + arrieres_annee_courante
-
-            # 4) Montant total payé (toutes années, toutes boutiques) - gardé pour le calcul du reste à payer
-            total_paye = PaiementCotisation.objects.filter(
-                cotisation_annuelle__in=cotisations_contribuable
-            ).aggregate(total=Sum("montant_paye"))["total"] or Decimal("0")
-
-            # 5) Montant total dû en ce jour = arriérés + dû de l'année courante (jusqu'au mois courant)
-            total_du_cette_annee = Decimal("0")
-            for c in cotisations_contribuable:
-                if c.annee == annee_courante:
-                    monthly_due = c.boutique.prix_location_mensuel or Decimal("0")
-                    if monthly_due > 0:
-                        total_du_cette_annee += monthly_due * mois_courant
-            total_du_aujourdhui = total_arrieres_annees_precedentes + total_du_cette_annee
-
-            # 6) Reste à payer = dû en ce jour - payé (minimum 0)
-            total_reste_a_payer = total_du_aujourdhui - total_paye
-            if total_reste_a_payer < 0:
-                total_reste_a_payer = Decimal("0")
-        else:
-            # Initialiser les valeurs à 0 si pas de cotisations
-            total_arrieres = Decimal("0")
-            total_du_aujourdhui = Decimal("0")
-            total_paye = Decimal("0")
-            total_reste_a_payer = Decimal("0")
-
     # Nom d'affichage pour "Bienvenue, NOM ET PRENOM"
     context["user_display_name"] = get_user_display_name_for_welcome(user)
 
@@ -263,87 +187,24 @@ def profil(request):
     context["diaspora_profile"] = diaspora_profile
     context["profile_types_list"] = profile_types_list
     context["has_any_profile"] = bool(profile_types_list)
-    context["boutiques_magasins"] = boutiques_magasins
-    context["cotisations_contribuable"] = cotisations_contribuable
-    context["total_arrieres"] = total_arrieres
-    context["total_du_aujourdhui"] = total_du_aujourdhui
-    context["total_paye_contribuable"] = total_paye
-    context["total_reste_a_payer_contribuable"] = total_reste_a_payer
-
-    # Récupérer les cotisations pour les acteurs économiques et institutions financières
-    cotisations_acteur = None
-    cotisations_institution = None
-    paiements_acteur = None
-    paiements_institution = None
-    total_montant_annuel_du_acteur = None
-    total_montant_paye_acteur = None
-    total_reste_a_payer_acteur = None
-    total_montant_annuel_du_institution = None
-    total_montant_paye_institution = None
-    total_reste_a_payer_institution = None
 
-    if acteur_profile:
-        annee_courante = timezone.now().year
-        # Récupérer toutes les cotisations annuelles de l'acteur
-        cotisations_acteur = CotisationAnnuelleActeur.objects.filter(
-            acteur=acteur_profile
-        ).order_by('-annee')
-        
-        # Récupérer tous les paiements
-        paiements_acteur = PaiementCotisationActeur.objects.filter(
-            cotisation_annuelle__acteur=acteur_profile
-        ).select_related('cotisation_annuelle', 'encaisse_par_agent').order_by('-date_paiement')
-        
-        # Calculer les totaux pour l'année courante
-        cotisation_courante = cotisations_acteur.filter(annee=annee_courante).first()
-        if cotisation_courante:
-            total_montant_annuel_du_acteur = cotisation_courante.montant_annuel_du
-            total_montant_paye_acteur = cotisation_courante.montant_paye()
-            total_reste_a_payer_acteur = cotisation_courante.reste_a_payer()
-        else:
-            # Si pas de cotisation pour l'année courante, chercher la plus récente
-            cotisation_recente = cotisations_acteur.first()
-            if cotisation_recente:
-                total_montant_annuel_du_acteur = cotisation_recente.montant_annuel_du
-                total_montant_paye_acteur = cotisation_recente.montant_paye()
-                total_reste_a_payer_acteur = cotisation_recente.reste_a_payer()
-
-    if institution_profile:
-        annee_courante = timezone.now().year
-        # Récupérer toutes les cotisations annuelles de l'institution
-        cotisations_institution = CotisationAnnuelleInstitution.objects.filter(
-            institution=institution_profile
-        ).order_by('-annee')
-        
-        # Récupérer tous les paiements
-        paiements_institution = PaiementCotisationInstitution.objects.filter(
-            cotisation_annuelle__institution=institution_profile
-        ).select_related('cotisation_annuelle', 'encaisse_par_agent').order_by('-date_paiement')
-        
-        # Calculer les totaux pour l'année courante
-        cotisation_courante = cotisations_institution.filter(annee=annee_courante).first()
-        if cotisation_courante:
-            total_montant_annuel_du_institution = cotisation_courante.montant_annuel_du
-            total_montant_paye_institution = cotisation_courante.montant_paye()
-            total_reste_a_payer_institution = cotisation_courante.reste_a_payer()
-        else:
-            # Si pas de cotisation pour l'année courante, chercher la plus récente
-            cotisation_recente = cotisations_institution.first()
-            if cotisation_recente:
-                total_montant_annuel_du_institution = cotisation_recente.montant_annuel_du
-                total_montant_paye_institution = cotisation_recente.montant_paye()
-                total_reste_a_payer_institution = cotisation_recente.reste_a_payer()
-
-    context["cotisations_acteur"] = cotisations_acteur
-    context["cotisations_institution"] = cotisations_institution
-    context["paiements_acteur"] = paiements_acteur
-    context["paiements_institution"] = paiements_institution
-    context["total_montant_annuel_du_acteur"] = total_montant_annuel_du_acteur
-    context["total_montant_paye_acteur"] = total_montant_paye_acteur
-    context["total_reste_a_payer_acteur"] = total_reste_a_payer_acteur
-    context["total_montant_annuel_du_institution"] = total_montant_annuel_du_institution
-    context["total_montant_paye_institution"] = total_montant_paye_institution
-    context["total_reste_a_payer_institution"] = total_reste_a_payer_institution
+    # Cotisations des boutiques / magasins (contribuables)
+    soldes = agregat["soldes_contribuable"]
+    context["boutiques_magasins"] = agregat["boutiques"]
+    context["cotisations_contribuable"] = soldes["a_cotisations"] if soldes else None
+    context["total_arrieres"] = soldes["arrieres"] if soldes else None
+    context["total_du_aujourdhui"] = soldes["du_aujourdhui"] if soldes else None
+    context["total_paye_contribuable"] = soldes["paye"] if soldes else None
+    context["total_reste_a_payer_contribuable"] = soldes["reste"] if soldes else None
+
+    # Cotisations des acteurs économiques et institutions financières (année courante, sinon la plus récente)
+    for suffixe, cotisation in (("acteur", agregat["cotisation_acteur"]), ("institution", agregat["cotisation_institution"])):
+        context[f"cotisations_{suffixe}"] = cotisation is not None
+        context[f"paiements_{suffixe}"] = cotisation["derniers_paiements"] if cotisation else None
+        context[f"nb_paiements_{suffixe}"] = cotisation["nb_paiements"] if cotisation else 0
+        context[f"total_montant_annuel_du_{suffixe}"] = cotisation["montant_annuel_du"] if cotisation else None
+        context[f"total_montant_paye_{suffixe}"] = cotisation["montant_paye"] if cotisation else None
+        context[f"total_reste_a_payer_{suffixe}"] = cotisation["reste_a_payer"] if cotisation else None
 
     # Campagne publicitaire éventuelle pour ce compte
     if can_request_ads:
@@ -408,8 +269,7 @@ def telecharger_fiche_paiements(request, profil_type: str):
     date_du = _parse_date(date_du_raw)
     date_au = _parse_date(date_au_raw)
 
-    # Sélection du queryset selon le type de profil
-    qs = None
+    # Sélection du modèle de paiement selon le type de profil
     title = ""
     filename = ""
     subtitle = ""
@@ -420,18 +280,14 @@ def telecharger_fiche_paiements(request, profil_type: str):
             messages.error(request, "Aucun profil contribuable associé à votre compte.")
             return redirect("comptes:profil")
 
-        qs = (
-            PaiementCotisation.objects.filter(
-                cotisation_annuelle__boutique__contribuable=contribuable
-            )
-            .select_related(
-                "cotisation_annuelle",
-                "cotisation_annuelle__boutique",
-                "cotisation_annuelle__boutique__emplacement",
-                "encaisse_par_agent",
-            )
-            .order_by("date_paiement")
-        )
+        modele = PaiementCotisation
+        filtre = {"cotisation_annuelle__boutique__contribuable": contribuable}
+        relations = [
+            "cotisation_annuelle",
+            "cotisation_annuelle__boutique",
+            "cotisation_annuelle__boutique__emplacement",
+            "encaisse_par_agent",
+        ]
         title = "Votre relevé de paiements"
         filename = "fiche_paiements_contribuable.pdf"
         subtitle = f"Titulaire : {contribuable.nom_complet}"
@@ -442,13 +298,9 @@ def telecharger_fiche_paiements(request, profil_type: str):
             messages.error(request, "Aucun profil acteur économique associé à votre compte.")
             return redirect("comptes:profil")
 
-        qs = (
-            PaiementCotisationActeur.objects.filter(
-                cotisation_annuelle__acteur=acteur
-            )
-            .select_related("cotisation_annuelle", "encaisse_par_agent")
-            .order_by("date_paiement")
-        )
+        modele = PaiementCotisationActeur
+        filtre = {"cotisation_annuelle__acteur": acteur}
+        relations = ["cotisation_annuelle", "encaisse_par_agent"]
         title = "Fiche de paiements – Acteur économique"
         filename = "fiche_paiements_acteur.pdf"
         subtitle = f"Acteur économique : {acteur.raison_sociale}"
@@ -459,13 +311,9 @@ def telecharger_fiche_paiements(request, profil_type: str):
             messages.error(request, "Aucun profil institution financière associé à votre compte.")
             return redirect("comptes:profil")
 
-        qs = (
-            PaiementCotisationInstitution.objects.filter(
-                cotisation_annuelle__institution=institution
-            )
-            .select_related("cotisation_annuelle", "encaisse_par_agent")
-            .order_by("date_paiement")
-        )
+        modele = PaiementCotisationInstitution
+        filtre = {"cotisation_annuelle__institution": institution}
+        relations = ["cotisation_annuelle", "encaisse_par_agent"]
         title = "Fiche de paiements – Institution financière"
         filename = "fiche_paiements_institution.pdf"
         subtitle = f"Institution financière : {institution.nom_institution}"
@@ -474,11 +322,16 @@ def telecharger_fiche_paiements(request, profil_type: str):
         messages.error(request, "Type de profil inconnu pour la fiche de paiements.")
         return redirect("comptes:profil")
 
-    # Filtre par dates si fourni
-    if date_du:
-        qs = qs.filter(date_paiement__date__gte=date_du)
-    if date_au:
-        qs = qs.filter(date_paiement__date__lte=date_au)
+    # Table vivante, et archives des exercices clos si la période en touche un ; filtre par dates si fourni
+    paiements = []
+    for source in sources(modele, archives_necessaires(date_du=date_du, date_au=date_au)):
+        qs = source.objects.filter(**filtre).select_related(*relations)
+        if date_du:
+            qs = qs.filter(date_paiement__date__gte=date_du)
+        if date_au:
+            qs = qs.filter(date_paiement__date__lte=date_au)
+        paiements.extend(qs.order_by("date_paiement"))
+    paiements.sort(key=lambda paiement: paiement.date_paiement)
 
     # Préparation des données pour le tableau PDF
     headers = [
@@ -492,11 +345,11 @@ def telecharger_fiche_paiements(request, profil_type: str):
     ]
     rows = []
 
-    for paiement in qs:
+    for paiement in paiements:
         date_p = getattr(paiement, "date_paiement", None)
         date_str = date_p.strftime("%d/%m/%Y %H:%M") if date_p else ""
 
-        if isinstance(paiement, PaiementCotisation):
+        if profil_type == "contribuable":
             cotisation = paiement.cotisation_annuelle
             boutique = getattr(cotisation, "boutique", None)
             emplacement = getattr(boutique, "emplacement", None) if boutique else None
@@ -758,6 +611,7 @@ def creer_publicite(request):
 
 
 @login_required
+@budget_requetes(30)
 def espace_agent(request):
     """Espace agent collecteur - Dashboard avec les contribuables supervisés."""
     # Vérifier que l'utilisateur est un agent collecteur actif
@@ -839,7 +693,7 @@ def espace_agent(request):
         contribuables = contribuables.filter(
             Q(nom__icontains=search_query) |
             Q(prenom__icontains=search_query) |
-            Q(telephone__icontains=search_query)
+            filtre_telephone(search_query)
         )
     
     context = {
@@ -885,20 +739,11 @@ def payer_contribuable(request, contribuable_id):
         messages.error(request, "Ce contribuable n'est pas dans votre zone de supervision.")
         return redirect('comptes:espace_agent')
     
-    # Récupérer/garantir les cotisations annuelles pour les boutiques du contribuable
-    # On prend toutes les années afin de pouvoir encaisser d'abord les arriérés.
-    # Si aucune cotisation n'existe encore pour l'année courante pour une boutique donnée,
-    # on crée automatiquement la ligne de cotisation annuelle correspondante.
+    # Cotisations annuelles des boutiques du contribuable, toutes années confondues afin de
+    # pouvoir encaisser d'abord les arriérés. Les lignes sont créées à l'enregistrement de la
+    # boutique et au passage d'année (commande generer_cotisations_annuelles).
     annee_courante = timezone.now().year
 
-    for boutique in boutiques_contribuable:
-        if not CotisationAnnuelle.objects.filter(boutique=boutique, annee=annee_courante).exists():
-            CotisationAnnuelle.objects.create(
-                boutique=boutique,
-                annee=annee_courante,
-                montant_annuel_du=boutique.get_prix_annuel(),
-            )
-
     cotisations_annuelles = (
         CotisationAnnuelle.objects.filter(boutique__in=boutiques_contribuable)
         .select_related('boutique', 'boutique__emplacement')
@@ -909,6 +754,10 @@ def payer_contribuable(request, contribuable_id):
     # Préparer un résumé par mois pour affichage (payé / partiel / non payé)
     mois_noms = ["Jan.", "Fév.", "Mars", "Avr.", "Mai", "Juin", "Juil.", "Août", "Sept.", "Oct.", "Nov.", "Déc."]
     cotisations_resume = []
+    # Mois payés des exercices clos, lus dans les archives en une requête
+    montants_archives = montants_archives_par_mois(
+        [cotisation.pk for cotisation in cotisations_annuelles if cotisation.montant_paye_archive]
+    )
     for cotisation in cotisations_annuelles:
         monthly_due = float(cotisation.boutique.prix_location_mensuel or 0)
         paiements_par_mois = (
@@ -916,6 +765,8 @@ def payer_contribuable(request, contribuable_id):
             .annotate(total=Sum("montant_paye"))
         )
         map_paiements = {p["mois"]: float(p["total"] or 0) for p in paiements_par_mois}
+        for mois, montant in montants_archives.get(cotisation.pk, {}).items():
+            map_paiements[mois] = map_paiements.get(mois, 0.0) + float(montant)
         mois_list = []
         for m in range(1, 13):
             total_m = map_paiements.get(m, 0.0)
@@ -982,101 +833,12 @@ def payer_contribuable(request, contribuable_id):
                     messages.error(request, "Cette cotisation n'est pas dans votre zone de supervision.")
                     return redirect('comptes:espace_agent')
 
-                # Vérifier les arriérés des années précédentes pour cette boutique
-                cotisations_anciennes = CotisationAnnuelle.objects.filter(
-                    boutique=cotisation_annuelle.boutique,
-                    annee__lt=cotisation_annuelle.annee,
-                ).order_by('annee')
-
-                for c in cotisations_anciennes:
-                    if c.reste_a_payer() > 0:
-                        messages.error(
-                            request,
-                            f"Cette boutique a encore des arriérés pour l'année {c.annee}. "
-                            f"Veuillez d'abord encaisser ces arriérés avant de commencer les paiements pour {cotisation_annuelle.annee}."
-                        )
-                        return redirect('comptes:payer_contribuable', contribuable_id=contribuable.id)
-
-                # Si la cotisation sélectionnée est déjà totalement soldée,
-                # on bascule automatiquement sur la cotisation de l'année suivante
-                # (créée si nécessaire) pour permettre de continuer les paiements.
                 try:
-                    reste_selectionnee = cotisation_annuelle.reste_a_payer()
-                except Exception:
-                    reste_selectionnee = Decimal("0")
-                if reste_selectionnee <= 0:
-                    prochaine_annee = cotisation_annuelle.annee + 1
-                    cotisation_annuelle, _ = CotisationAnnuelle.objects.get_or_create(
-                        boutique=cotisation_annuelle.boutique,
-                        annee=prochaine_annee,
-                        defaults={
-                            "montant_annuel_du": cotisation_annuelle.boutique.get_prix_annuel(),
-                        },
-                    )
-
-                # Montant mensuel dû pour cette boutique (en Decimal)
-                monthly_due = cotisation_annuelle.boutique.prix_location_mensuel or Decimal("0")
-                if monthly_due <= 0:
-                    messages.error(request, "Montant mensuel de la cotisation non défini pour cette boutique.")
-                    return redirect('comptes:payer_contribuable', contribuable_id=contribuable.id)
-
-                # Répartition séquentielle du montant :
-                # - on complète d'abord les mois partiellement payés (dans l'ordre),
-                # - puis on paie les mois suivants,
-                # afin d'éviter des mois « à moitié payés » au milieu de l'année.
-                montant_restant = montant_value
-                paiements_crees = []
-
-                # Pour chaque mois de 1 à 12, on regarde combien est déjà payé
-                # et on complète si nécessaire, avant de passer au mois suivant.
-                for mois in range(1, 13):
-                    if montant_restant <= 0:
-                        break
-
-                    paiement_existant = PaiementCotisation.objects.filter(
-                        cotisation_annuelle=cotisation_annuelle,
-                        mois=mois,
-                    ).first()
-
-                    deja_paye = paiement_existant.montant_paye if paiement_existant else Decimal("0")
-
-                    # Si ce mois est déjà entièrement payé, on passe au suivant
-                    if deja_paye >= monthly_due:
-                        continue
-
-                    reste_pour_mois = monthly_due - deja_paye
-                    a_payer_ici = min(montant_restant, reste_pour_mois)
-
-                    if a_payer_ici <= 0:
-                        continue
-
-                    if paiement_existant:
-                        # On complète le paiement existant pour ce mois
-                        paiement_existant.montant_paye = paiement_existant.montant_paye + a_payer_ici
-                        paiement_existant.encaisse_par_agent = agent
-                        # On met à jour la date de paiement et les notes
-                        paiement_existant.date_paiement = timezone.now()
-                        if notes:
-                            paiement_existant.notes = (paiement_existant.notes + "\n" if paiement_existant.notes else "") + notes
-                        paiement_existant.save()
-                    else:
-                        # Aucun paiement pour ce mois : on crée l'enregistrement
-                        PaiementCotisation.objects.create(
-                            cotisation_annuelle=cotisation_annuelle,
-                            mois=mois,
-                            montant_paye=a_payer_ici,
-                            encaisse_par_agent=agent,
-                            notes=notes,
-                        )
-
-                    paiements_crees.append(mois)
-                    montant_restant -= a_payer_ici
-
-                if not paiements_crees:
-                    messages.error(
-                        request,
-                        "Le montant saisi est insuffisant pour enregistrer un paiement sur les mois restants."
+                    cotisation_annuelle, paiements_crees = encaisser_cotisation_boutique(
+                        cotisation_annuelle, montant_value, agent, notes=notes
                     )
+                except ValidationError as e:
+                    messages.error(request, e.messages[0])
                     return redirect('comptes:payer_contribuable', contribuable_id=contribuable.id)
 
                 # Message récapitulatif
@@ -1085,7 +847,15 @@ def payer_contribuable(request, contribuable_id):
                     request,
                     f"Paiement de {montant_value:.0f} FCFA enregistré et réparti sur les mois suivants : {mois_str}."
                 )
-                return redirect('comptes:payer_contribuable', contribuable_id=contribuable.id)
+                # Reçus des versements qui viennent d'être encaissés (le dernier de chaque mois crédité)
+                ids_recus = {
+                    mois: pk for pk, mois in VersementCotisation.objects.filter(
+                        cotisation_annuelle=cotisation_annuelle, mois__in=paiements_crees
+                    ).order_by('pk').values_list('id', 'mois')
+                }.values()
+                return _redirect_avec_recus(
+                    'comptes:payer_contribuable', {'contribuable_id': contribuable.id}, 'contribuable', ids_recus
+                )
             except Exception as e:
                 messages.error(request, f"Erreur lors de l'enregistrement du paiement : {str(e)}")
         
@@ -1116,7 +886,9 @@ def payer_contribuable(request, contribuable_id):
                         notes=notes
                     )
                     messages.success(request, f"Ticket marché enregistré avec succès : {montant} FCFA.")
-                    return redirect('comptes:payer_contribuable', contribuable_id=contribuable.id)
+                    return _redirect_avec_recus(
+                        'comptes:payer_contribuable', {'contribuable_id': contribuable.id}, 'ticket', [ticket.id]
+                    )
             except Exception as e:
                 messages.error(request, f"Erreur lors de l'enregistrement du ticket : {str(e)}")
     
@@ -1132,6 +904,7 @@ def payer_contribuable(request, contribuable_id):
         'emplacements': emplacements,
         'type_paiement': type_paiement,
         'annee_courante': annee_courante,
+        'lien_recus': _lien_recus(request),
     }
     
     return render(request, 'comptes/payer_contribuable.html', context)
@@ -1229,7 +1002,7 @@ def payer_acteur(request, acteur_id):
                 return redirect('comptes:payer_acteur', acteur_id=acteur.id)
             
             # Créer le paiement annuel
-            PaiementCotisationActeur.objects.create(
+            paiement = PaiementCotisationActeur.objects.create(
                 cotisation_annuelle=cotisation_annuelle,
                 montant_paye=montant_value,
                 encaisse_par_agent=agent,
@@ -1240,7 +1013,7 @@ def payer_acteur(request, acteur_id):
                 request,
                 f"Paiement de {montant_value:,.0f} FCFA enregistré pour {acteur.raison_sociale} ({cotisation_annuelle.annee})."
             )
-            return redirect('comptes:payer_acteur', acteur_id=acteur.id)
+            return _redirect_avec_recus('comptes:payer_acteur', {'acteur_id': acteur.id}, 'acteur', [paiement.id])
             
         except CotisationAnnuelleActeur.DoesNotExist:
             messages.error(request, "Cotisation introuvable.")
@@ -1267,6 +1040,7 @@ def payer_acteur(request, acteur_id):
         'acteur': acteur,
         'cotisations_annuelles': cotisations_annuelles,
         'annee_courante': annee_courante,
+        'lien_recus': _lien_recus(request),
     }
     
     return render(request, 'comptes/payer_acteur.html', context)
@@ -1364,7 +1138,7 @@ def payer_institution(request, institution_id):
                 return redirect('comptes:payer_institution', institution_id=institution.id)
             
             # Créer le paiement annuel
-            PaiementCotisationInstitution.objects.create(
+            paiement = PaiementCotisationInstitution.objects.create(
                 cotisation_annuelle=cotisation_annuelle,
                 montant_paye=montant_value,
                 encaisse_par_agent=agent,
@@ -1375,7 +1149,7 @@ def payer_institution(request, institution_id):
                 request,
                 f"Paiement de {montant_value:,.0f} FCFA enregistré pour {institution.nom_institution} ({cotisation_annuelle.annee})."
             )
-            return redirect('comptes:payer_institution', institution_id=institution.id)
+            return _redirect_avec_recus('comptes:payer_institution', {'institution_id': institution.id}, 'institution', [paiement.id])
             
         except CotisationAnnuelleInstitution.DoesNotExist:
             messages.error(request, "Cotisation introuvable.")
@@ -1402,6 +1176,185 @@ def payer_institution(request, institution_id):
         'institution': institution,
         'cotisations_annuelles': cotisations_annuelles,
         'annee_courante': annee_courante,
+        'lien_recus': _lien_recus(request),
     }
     
     return render(request, 'comptes/payer_institution.html', context)
+
+
+def _agent_actif_ou_none(user):
+    """Retourne l'agent collecteur actif associé à l'utilisateur, ou None."""
+    agent = AgentCollecteur.objects.filter(user=user).first()
+    if agent is None or agent.statut != 'actif':
+        return None
+    return agent
+
+
+def _redirect_avec_recus(nom_url, kwargs, type_recu, ids):
+    """Retour au formulaire de paiement avec le lien d'impression du reçu des paiements enregistrés."""
+    ids = ",".join(str(pk) for pk in ids)
+    return redirect(f"{reverse(nom_url, kwargs=kwargs)}?recu={type_recu}&ids={ids}")
+
+
+def _lien_recus(request):
+    """Lien vers le PDF des reçus annoncés par `_redirect_avec_recus`, ou None."""
+    type_recu = request.GET.get('recu')
+    ids = ",".join(valeur for valeur in request.GET.get('ids', '').split(',') if valeur.isdigit())
+    if type_recu not in TYPES_RECU or not ids:
+        return None
+    return f"{reverse('comptes:recus_paiement', args=[type_recu])}?ids={ids}"
+
+
+def _reponse_recus(request, recus, nom_fichier):
+    contenu = recus_pdf(
+        recus, lambda jeton: request.build_absolute_uri(reverse('comptes:verifier_recu', args=[jeton]))
+    )
+    response = HttpResponse(contenu, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{nom_fichier}"'
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def recus_paiement(request, type_recu: str):
+    """
+    Reçus (PDF 80 mm, un par page) des paiements `?ids=1,2,3` d'un type donné.
+    Un agent n'imprime que les paiements qu'il a encaissés ; le personnel imprime tous les reçus.
+    """
+    definition = TYPES_RECU.get(type_recu)
+    if definition is None:
+        raise Http404("Type de reçu inconnu.")
+    ids = [int(valeur) for valeur in request.GET.get('ids', '').split(',') if valeur.strip().isdigit()][:50]
+    filtres = {'pk__in': ids}
+    if not is_staff_user(request.user):
+        agent = _agent_actif_ou_none(request.user)
+        if agent is None:
+            messages.error(request, "Vous n'êtes pas autorisé à imprimer des reçus.")
+            return redirect('comptes:profil')
+        filtres['encaisse_par_agent'] = agent
+    recus = []
+    # Les ids introuvables dans la table vivante sont cherchés dans l'archive des exercices clos
+    for modele in modeles_du_recu(type_recu):
+        if len(recus) < len(set(ids)):
+            qs = modele.objects.select_related(*definition.relations).filter(**filtres).order_by('pk')
+            recus.extend((type_recu, paiement) for paiement in qs)
+    if not recus:
+        raise Http404("Aucun paiement correspondant.")
+    nom = numero_recu(*recus[0]) if len(recus) == 1 else f"{type_recu}-{len(recus)}"
+    return _reponse_recus(request, recus, f"recu_{nom}.pdf")
+
+
+@login_required
+@require_http_methods(["GET"])
+def recus_journee(request):
+    """
+    Reçus de toute une journée de collecte (`?date=AAAA-MM-JJ`, aujourd'hui par défaut) de l'agent
+    connecté, en un seul PDF à imprimer. Le personnel choisit l'agent avec `?agent=<id>`.
+    """
+    jour = timezone.localdate()
+    if request.GET.get('date'):
+        try:
+            jour = datetime.strptime(request.GET['date'], "%Y-%m-%d").date()
+        except ValueError:
+            messages.error(request, "Date invalide (attendu AAAA-MM-JJ).")
+            return redirect('comptes:espace_agent')
+
+    if is_staff_user(request.user) and request.GET.get('agent'):
+        agent = get_object_or_404(AgentCollecteur, pk=request.GET['agent'])
+    else:
+        agent = _agent_actif_ou_none(request.user)
+        if agent is None:
+            messages.error(request, "Vous n'êtes pas autorisé à imprimer des reçus.")
+            return redirect('comptes:profil')
+
+    recus = paiements_de_la_journee(agent, jour)
+    if not recus:
+        messages.info(request, f"Aucun paiement encaissé le {jour:%d/%m/%Y}.")
+        return redirect('comptes:espace_agent')
+    return _reponse_recus(request, recus, f"recus_{agent.matricule}_{jour:%Y-%m-%d}.pdf")
+
+
+@require_http_methods(["GET"])
+def verifier_recu(request, jeton: str):
+    """
+    Vérification publique d'un reçu (cible du QR code) : lecture du paiement par sa clé primaire
+    et contrôle de la signature du jeton.
+    """
+    resultat = verifier_jeton(jeton)
+    details = details_verification(*resultat) if resultat is not None else None
+    context = {'jeton': jeton, 'valide': details is not None, 'details': details}
+    response = render(request, 'comptes/verifier_recu.html', context, status=200 if details is not None else 404)
+    response['X-Robots-Tag'] = 'noindex'
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_sync_instantane(request):
+    """
+    API de synchronisation (hors-ligne) : instantané compact de la zone de l'agent
+    (emplacements, boutiques, contribuables et cotisations ouvertes).
+    """
+    agent = _agent_actif_ou_none(request.user)
+    if agent is None:
+        return JsonResponse({'success': False, 'error': "Accès réservé aux agents collecteurs actifs."}, status=403)
+
+    return JsonResponse({'success': True, **construire_instantane_agent(agent)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_sync_envoyer(request):
+    """
+    API de synchronisation (hors-ligne) : reçoit un lot de paiements de cotisations et
+    de tickets marché, identifiés par des clés d'idempotence, et l'applique en une transaction.
+    """
+    agent = _agent_actif_ou_none(request.user)
+    if agent is None:
+        return JsonResponse({'success': False, 'error': "Accès réservé aux agents collecteurs actifs."}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': "Corps JSON invalide."}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': "Corps JSON invalide."}, status=400)
+
+    try:
+        rapport = appliquer_lot(agent, payload.get('operations'))
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'error': e.messages[0]}, status=400)
+
+    return JsonResponse({'success': True, **rapport})
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_historique_paiements(request, profil_type: str):
+    """
+    API « Mon compte » : historique des paiements du profil connecté (contribuable, acteur,
+    institution), par pages de `limite` paiements du plus récent au plus ancien.
+    Paramètres : date_du, date_au (AAAA-MM-JJ), limite, curseur (renvoyé par la page précédente).
+    """
+    dates = {}
+    for param in ('date_du', 'date_au'):
+        valeur = request.GET.get(param) or ''
+        if valeur:
+            try:
+                dates[param] = datetime.strptime(valeur, "%Y-%m-%d").date()
+            except ValueError:
+                return JsonResponse({'success': False, 'error': f"{param} invalide (attendu AAAA-MM-JJ)."}, status=400)
+
+    querysets = paiements_du_profil(request.user, profil_type, archives_necessaires(**dates))
+    if querysets is None:
+        return JsonResponse({'success': False, 'error': "Aucun profil de ce type associé à votre compte."}, status=404)
+    try:
+        limite = int(request.GET.get('limite') or LIMITE_DEFAUT)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "limite invalide."}, status=400)
+
+    try:
+        page = page_historique(querysets, curseur=request.GET.get('curseur'), limite=limite, **dates)
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'error': e.messages[0]}, status=400)
+    return JsonResponse({'success': True, **page})
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import MembreDiaspora
+from .statistiques import rafraichir_instantane
 
 
 @admin.register(MembreDiaspora)
@@ -149,6 +150,7 @@ class MembreDiasporaAdmin(admin.ModelAdmin):
     def valider_membres(self, request, queryset):
         """Action pour valider plusieurs membres à la fois."""
         updated = queryset.update(est_valide_par_mairie=True)
+        rafraichir_instantane()  # update() ne déclenche pas les signaux
         self.message_user(
             request, 
             f'{updated} membre(s) de la diaspora validé(s) avec succès.'
@@ -158,6 +160,7 @@ class MembreDiasporaAdmin(admin.ModelAdmin):
     def invalider_membres(self, request, queryset):
         """Action pour invalider plusieurs membres à la fois."""
         updated = queryset.update(est_valide_par_mairie=False)
+        rafraichir_instantane()
         self.message_user(
             request, 
             f'{updated} membre(s) de la diaspora invalidé(s) avec succès.'
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class DiasporaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'diaspora'
-    verbose_name = 'Diaspora'
\ No newline at end of file
+    verbose_name = 'Diaspora'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaspora', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneStatistiquesDiaspora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donnees', models.JSONField(default=dict, verbose_name='Données agrégées')),
+                ('date_calcul', models.DateTimeField(auto_now=True, verbose_name='Date du calcul')),
+            ],
+            options={
+                'verbose_name': 'Instantané des statistiques diaspora',
+                'verbose_name_plural': 'Instantanés des statistiques diaspora',
+            },
+        ),
+    ]
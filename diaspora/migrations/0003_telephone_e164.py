@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+from mairie.telephones import remplir_telephones_e164
+
+
+def remplir(apps, schema_editor):
+    remplir_telephones_e164(apps.get_model('diaspora', 'MembreDiaspora'), 'telephone_whatsapp')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaspora', '0002_instantanestatistiquesdiaspora'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membrediaspora',
+            name='telephone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Téléphone au format E.164 (+228...), calculé automatiquement pour la recherche.', max_length=16),
+        ),
+        migrations.RunPython(remplir, migrations.RunPython.noop),
+    ]
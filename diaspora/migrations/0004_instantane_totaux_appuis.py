@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def supprimer_instantane(apps, schema_editor):
+    """Instantané calculé avec les anciens totaux d'appui : recalculé à la première lecture."""
+    apps.get_model('diaspora', 'InstantaneStatistiquesDiaspora').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diaspora', '0003_telephone_e164'),
+    ]
+
+    operations = [
+        migrations.RunPython(supprimer_instantane, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from mairie.telephones import normaliser_telephone
+
 
 class MembreDiaspora(models.Model):
     """Modèle pour l'enregistrement des membres de la diaspora de Kloto 1."""
@@ -71,6 +73,13 @@ class MembreDiaspora(models.Model):
         max_length=30, 
         verbose_name="Téléphone (WhatsApp)"
     )
+    telephone_e164 = models.CharField(
+        max_length=16,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Téléphone au format E.164 (+228...), calculé automatiquement pour la recherche."
+    )
     email = models.EmailField(verbose_name="Email")
     reseaux_sociaux = models.CharField(
         max_length=200, 
@@ -296,6 +305,10 @@ class MembreDiaspora(models.Model):
     def __str__(self):
         return f"{self.nom} {self.prenoms} ({self.pays_residence_actuelle})"
 
+    def save(self, *args, **kwargs):
+        self.telephone_e164 = normaliser_telephone(self.telephone_whatsapp)
+        super().save(*args, **kwargs)
+
     def get_appuis_financiers(self):
         """Retourne la liste des types d'appui financier sélectionnés."""
         appuis = []
@@ -322,4 +335,19 @@ class MembreDiaspora(models.Model):
             competences.append("Conseils techniques / expertise")
         if self.encadrement_mentorat:
             competences.append("Encadrement à distance (mentorat)")
-        return competences
\ No newline at end of file
+        return competences
+
+class InstantaneStatistiquesDiaspora(models.Model):
+    """
+    Statistiques agrégées de la diaspora, recalculées à chaque modification d'un membre
+    (voir diaspora/statistiques.py). Une seule ligne : la page publique ne fait qu'une lecture.
+    """
+    donnees = models.JSONField(default=dict, verbose_name="Données agrégées")
+    date_calcul = models.DateTimeField(auto_now=True, verbose_name="Date du calcul")
+
+    class Meta:
+        verbose_name = "Instantané des statistiques diaspora"
+        verbose_name_plural = "Instantanés des statistiques diaspora"
+
+    def __str__(self):
+        return f"Statistiques diaspora du {self.date_calcul:%d/%m/%Y %H:%M}"
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import MembreDiaspora
+from .statistiques import rafraichir_instantane
+
+
+@receiver(post_save, sender=MembreDiaspora)
+@receiver(post_delete, sender=MembreDiaspora)
+def membre_diaspora_modifie(sender, **kwargs):
+    """Rafraîchit l'instantané des statistiques une fois la transaction validée."""
+    transaction.on_commit(rafraichir_instantane)
@@ -0,0 +1,123 @@
+"""
+Moteur de statistiques de la diaspora.
+
+Deux requêtes suffisent pour tout calculer :
+- un GROUP BY (pays, secteur, statut professionnel) sur les membres validés ;
+- un agrégat conditionnel pour les totaux et les types d'appui.
+
+Le résultat est matérialisé dans InstantaneStatistiquesDiaspora, rafraîchi par les signaux
+post_save / post_delete de MembreDiaspora (voir diaspora/signals.py).
+"""
+from collections import Counter
+
+from django.db.models import Count, Q
+
+from .models import InstantaneStatistiquesDiaspora, MembreDiaspora
+
+INSTANTANE_PK = 1
+
+# Catégories d'appui (mêmes regroupements que le formulaire d'inscription)
+TYPES_APPUI = [
+    ("financier", "Appui financier", [
+        "appui_investissement_projets", "appui_financement_infrastructures",
+        "appui_parrainage_communautaire", "appui_jeunes_femmes_entrepreneurs",
+    ]),
+    ("technique", "Appui technique & compétences", [
+        "transfert_competences", "formation_jeunes", "appui_digitalisation",
+        "conseils_techniques", "encadrement_mentorat",
+    ]),
+    ("emploi", "Création d'emplois", [
+        "creation_entreprise_locale", "appui_pme_locales", "recrutement_jeunes_commune",
+    ]),
+    ("partenariat", "Partenariats & relations internationales", [
+        "mise_relation_ong", "cooperation_decentralisee",
+        "recherche_financements_internationaux", "promotion_commune_international",
+    ]),
+    ("engagement", "Engagement citoyen", [
+        "participation_activites_communales", "participation_reunions_diaspora",
+        "appui_actions_sociales_culturelles",
+    ]),
+]
+
+# Les totaux « financier » et « technique » de la page publique n'ont jamais compté que ces
+# drapeaux : ils gardent cette définition, les autres drapeaux de la catégorie ne figurent que
+# dans `detail`. Les autres catégories comptent tous leurs drapeaux.
+CHAMPS_DU_TOTAL = {
+    "financier": ["appui_investissement_projets", "appui_financement_infrastructures"],
+    "technique": ["transfert_competences", "formation_jeunes"],
+}
+
+
+def calculer_statistiques():
+    """Calcule toutes les répartitions (deux requêtes SQL) et retourne un dict sérialisable en JSON."""
+    valides = Q(est_valide_par_mairie=True)
+
+    agregats = {
+        "total": Count("id"),
+        "valides": Count("id", filter=valides),
+        "pays_unique": Count("pays_residence_actuelle", distinct=True),
+    }
+    for _, _, champs in TYPES_APPUI:
+        for champ in champs:
+            agregats[champ] = Count("id", filter=valides & Q(**{champ: True}))
+    totaux = MembreDiaspora.objects.aggregate(**agregats)
+
+    pays, secteurs, statuts = Counter(), Counter(), Counter()
+    lignes = (
+        MembreDiaspora.objects.filter(valides)
+        .values_list("pays_residence_actuelle", "secteur_activite", "statut_professionnel")
+        .annotate(nombre=Count("id"))
+        .order_by()
+    )
+    for pays_residence, secteur, statut, nombre in lignes:
+        pays[pays_residence] += nombre
+        secteurs[secteur] += nombre
+        statuts[statut] += nombre
+
+    libelles_secteurs = dict(MembreDiaspora.SECTEUR_ACTIVITE_CHOICES)
+    libelles_statuts = dict(MembreDiaspora.STATUT_PROFESSIONNEL_CHOICES)
+    libelles_champs = {f.name: str(f.verbose_name) for f in MembreDiaspora._meta.fields}
+
+    appuis = []
+    for code, libelle, champs in TYPES_APPUI:
+        detail = [{"code": c, "libelle": libelles_champs[c], "nombre": totaux[c]} for c in champs]
+        appuis.append({
+            "code": code,
+            "libelle": libelle,
+            "nombre": sum(d["nombre"] for d in detail if d["code"] in CHAMPS_DU_TOTAL.get(code, champs)),
+            "detail": detail,
+        })
+
+    return {
+        "total_membres": totaux["valides"],
+        "inscrits": totaux["total"],
+        "en_attente": totaux["total"] - totaux["valides"],
+        "pays_unique": totaux["pays_unique"],
+        "pays": [{"libelle": p, "nombre": n} for p, n in pays.most_common()],
+        "secteurs": [
+            {"code": s, "libelle": libelles_secteurs.get(s, s), "nombre": n} for s, n in secteurs.most_common()
+        ],
+        "statuts_professionnels": [
+            {"code": s, "libelle": libelles_statuts.get(s, s), "nombre": n} for s, n in statuts.most_common()
+        ],
+        "appuis": appuis,
+    }
+
+
+def rafraichir_instantane():
+    """Recalcule et enregistre l'instantané (appelé par les signaux et les actions groupées)."""
+    donnees = calculer_statistiques()
+    instantane, _ = InstantaneStatistiquesDiaspora.objects.update_or_create(
+        pk=INSTANTANE_PK, defaults={"donnees": donnees}
+    )
+    return instantane
+
+
+def obtenir_statistiques():
+    """Statistiques matérialisées : une seule lecture, calcul initial si l'instantané n'existe pas."""
+    instantane = InstantaneStatistiquesDiaspora.objects.filter(pk=INSTANTANE_PK).first()
+    if instantane is None:
+        instantane = rafraichir_instantane()
+    donnees = dict(instantane.donnees)
+    donnees["date_calcul"] = instantane.date_calcul
+    return donnees
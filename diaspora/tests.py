@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
 from .models import MembreDiaspora
+from .statistiques import obtenir_statistiques
 
 
 class MembreDiasporaModelTest(TestCase):
@@ -153,4 +154,53 @@ class DiasporaViewTest(TestCase):
         """Test que la modification nécessite d'être connecté."""
         response = self.client.get(reverse('diaspora:modifier'))
         # Doit rediriger vers la page de connexion
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+class StatistiquesDiasporaTest(TestCase):
+    """Tests du moteur de statistiques et de l'instantané matérialisé."""
+
+    def _creer_membre(self, nom, pays, secteur, valide=True, **appuis):
+        return MembreDiaspora.objects.create(
+            nom=nom, prenoms='Test', sexe='masculin', date_naissance='1990-01-01',
+            nationalites='Togolaise', numero_piece_identite=nom, pays_residence_actuelle=pays,
+            ville_residence_actuelle='Ville', adresse_complete_etranger='Adresse',
+            commune_origine='Kloto 1', quartier_village_origine='Centre',
+            nom_parent_tuteur_originaire='Parent', annee_depart_pays=2015,
+            frequence_retour_pays='chaque_annee', telephone_whatsapp='+33100000000',
+            email=f'{nom}@example.com', contact_au_pays_nom='Contact',
+            contact_au_pays_telephone='+22890000000', niveau_etudes='master',
+            domaine_formation='Informatique', profession_actuelle='Développeur',
+            secteur_activite=secteur, annees_experience=5, statut_professionnel='salarie',
+            comment_contribuer='-', disposition_participation='oui',
+            domaine_intervention_prioritaire='-', accepte_rgpd=True,
+            est_valide_par_mairie=valide, **appuis,
+        )
+
+    def test_instantane_rafraichi_par_les_signaux(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._creer_membre('A', 'France', 'informatique', appui_investissement_projets=True)
+            self._creer_membre('B', 'France', 'sante', formation_jeunes=True)
+            self._creer_membre('C', 'Canada', 'informatique', appui_financement_infrastructures=True)
+            self._creer_membre('D', 'Ghana', 'sante', valide=False)
+            self._creer_membre('E', 'Togo', 'sante', appui_parrainage_communautaire=True, appui_digitalisation=True)
+
+        with self.assertNumQueries(1):
+            obtenir_statistiques()
+        data = self.client.get(reverse('diaspora:statistiques_json')).json()
+        self.assertEqual(data['total_membres'], 4)
+        self.assertEqual(data['en_attente'], 1)
+        self.assertEqual(data['pays'][0], {'libelle': 'France', 'nombre': 2})
+        appuis = {a['code']: a for a in data['appuis']}
+        # Totaux historiques : investissement + infrastructures, transfert de compétences + formation
+        self.assertEqual(appuis['financier']['nombre'], 2)
+        self.assertEqual(appuis['technique']['nombre'], 1)
+        detail = {d['code']: d['nombre'] for d in appuis['financier']['detail']}
+        self.assertEqual(detail['appui_parrainage_communautaire'], 1)
+
+        membre = MembreDiaspora.objects.get(nom='D')
+        with self.captureOnCommitCallbacks(execute=True):
+            membre.est_valide_par_mairie = True
+            membre.save()
+        response = self.client.get(reverse('diaspora:statistiques'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_membres'], 5)
@@ -15,4 +15,5 @@ urlpatterns = [
     
     # Statistiques publiques
     path("statistiques/", views.statistiques_diaspora, name="statistiques"),
+    path("statistiques/donnees/", views.statistiques_diaspora_json, name="statistiques_json"),
 ]
\ No newline at end of file
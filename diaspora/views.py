@@ -9,6 +9,7 @@ from django.core.paginator import Paginator
 
 from .forms import MembreDiasporaForm, MembreDiasporaEditForm
 from .models import MembreDiaspora
+from .statistiques import obtenir_statistiques
 
 
 @require_http_methods(["GET", "POST"])
@@ -133,12 +134,13 @@ def liste_diaspora(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Statistiques
+    # Statistiques (instantané matérialisé)
+    statistiques = obtenir_statistiques()
     stats = {
-        'total': MembreDiaspora.objects.count(),
-        'valides': MembreDiaspora.objects.filter(est_valide_par_mairie=True).count(),
-        'en_attente': MembreDiaspora.objects.filter(est_valide_par_mairie=False).count(),
-        'pays_unique': MembreDiaspora.objects.values('pays_residence_actuelle').distinct().count(),
+        'total': statistiques['inscrits'],
+        'valides': statistiques['total_membres'],
+        'en_attente': statistiques['en_attente'],
+        'pays_unique': statistiques['pays_unique'],
     }
     
     context = {
@@ -203,53 +205,26 @@ def valider_membre(request, membre_id):
 
 
 def statistiques_diaspora(request):
-    """Statistiques publiques de la diaspora."""
-    
-    # Compter les membres par pays
-    pays_stats = {}
-    for membre in MembreDiaspora.objects.filter(est_valide_par_mairie=True):
-        pays = membre.pays_residence_actuelle
-        if pays in pays_stats:
-            pays_stats[pays] += 1
-        else:
-            pays_stats[pays] = 1
-    
-    # Compter par secteur d'activité
-    secteur_stats = {}
-    for secteur_key, secteur_label in MembreDiaspora.SECTEUR_ACTIVITE_CHOICES:
-        count = MembreDiaspora.objects.filter(
-            est_valide_par_mairie=True,
-            secteur_activite=secteur_key
-        ).count()
-        if count > 0:
-            secteur_stats[secteur_label] = count
-    
-    # Statistiques générales
-    total_membres = MembreDiaspora.objects.filter(est_valide_par_mairie=True).count()
-    
-    # Types d'appui proposés (agrégation)
-    appuis_financiers = MembreDiaspora.objects.filter(
-        est_valide_par_mairie=True,
-        appui_investissement_projets=True
-    ).count() + MembreDiaspora.objects.filter(
-        est_valide_par_mairie=True,
-        appui_financement_infrastructures=True
-    ).count()
-    
-    appuis_techniques = MembreDiaspora.objects.filter(
-        est_valide_par_mairie=True,
-        transfert_competences=True
-    ).count() + MembreDiaspora.objects.filter(
-        est_valide_par_mairie=True,
-        formation_jeunes=True
-    ).count()
+    """Statistiques publiques de la diaspora (lecture de l'instantané matérialisé)."""
+    
+    statistiques = obtenir_statistiques()
+    appuis = {a['code']: a['nombre'] for a in statistiques['appuis']}
     
     context = {
-        'total_membres': total_membres,
-        'pays_stats': pays_stats,
-        'secteur_stats': secteur_stats,
-        'appuis_financiers': appuis_financiers,
-        'appuis_techniques': appuis_techniques,
+        'statistiques': statistiques,
+        'total_membres': statistiques['total_membres'],
+        'pays_stats': {p['libelle']: p['nombre'] for p in statistiques['pays']},
+        'secteur_stats': {s['libelle']: s['nombre'] for s in statistiques['secteurs']},
+        'appuis_financiers': appuis['financier'],
+        'appuis_techniques': appuis['technique'],
     }
     
-    return render(request, "diaspora/statistiques.html", context)
\ No newline at end of file
+    return render(request, "diaspora/statistiques.html", context)
+
+
+def statistiques_diaspora_json(request):
+    """Statistiques de la diaspora au format JSON (graphiques)."""
+    
+    statistiques = obtenir_statistiques()
+    statistiques['date_calcul'] = statistiques['date_calcul'].isoformat()
+    return JsonResponse(statistiques)
@@ -1,16 +1,18 @@
-from django.http import HttpResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login
 from django.contrib import messages
+from django.utils.html import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 
+from mairie_kloto_platform import modeles_pdf
+
 from .forms import (
     ProfilJeuneForm, 
     ProfilRetraiteForm,
@@ -160,13 +162,10 @@ def modifier_retraite(request):
     return render(request, "emploi/modifier_retraite.html", context)
 
 
-@login_required
-def generer_pdf_jeune(request):
-    """Génère un PDF modèle pour l'inscription des jeunes demandeurs d'emploi."""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="modele_jeunes_demandeurs_emploi.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
+def construire_pdf_jeune(sortie, conf=None):
+    """Construit dans `sortie` le PDF modèle pour l'inscription des jeunes demandeurs d'emploi."""
+    doc = SimpleDocTemplate(sortie, pagesize=A4)
+    nom_commune = escape(conf.nom_commune) if conf else "Mairie de Kloto 1"
     story = []
     styles = getSampleStyleSheet()
 
@@ -192,7 +191,7 @@ def generer_pdf_jeune(request):
 
     # Titre
     story.append(Paragraph("INSCRIPTION DES JEUNES DEMANDEURS D'EMPLOI", title_style))
-    story.append(Paragraph("Mairie de Kloto 1 - Plateforme Emploi & Compétences", styles["Normal"]))
+    story.append(Paragraph(f"{nom_commune} - Plateforme Emploi & Compétences", styles["Normal"]))
     story.append(Spacer(1, 0.5 * cm))
 
     # Section 1: Informations personnelles
@@ -302,16 +301,18 @@ def generer_pdf_jeune(request):
     story.append(Paragraph("Date et Signature : _________________________", styles["Normal"]))
 
     doc.build(story)
-    return response
 
 
 @login_required
-def generer_pdf_retraite(request):
-    """Génère un PDF modèle pour l'inscription des retraités."""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="modele_retraites_actifs.pdf"'
+def generer_pdf_jeune(request):
+    """Sert un PDF modèle pour l'inscription des jeunes demandeurs d'emploi, construit une fois par version de la configuration."""
+    return modeles_pdf.reponse_modele(request, "jeunes")
 
-    doc = SimpleDocTemplate(response, pagesize=A4)
+
+def construire_pdf_retraite(sortie, conf=None):
+    """Construit dans `sortie` le PDF modèle pour l'inscription des retraités."""
+    doc = SimpleDocTemplate(sortie, pagesize=A4)
+    nom_commune = escape(conf.nom_commune) if conf else "Mairie de Kloto 1"
     story = []
     styles = getSampleStyleSheet()
 
@@ -327,9 +328,14 @@ def generer_pdf_retraite(request):
 
     # Titre
     story.append(Paragraph("INSCRIPTION DES RETRAITÉS ACTIFS", title_style))
-    story.append(Paragraph("Mairie de Kloto 1 - Plateforme Emploi & Compétences", styles["Normal"]))
+    story.append(Paragraph(f"{nom_commune} - Plateforme Emploi & Compétences", styles["Normal"]))
     
     # ... Contenu similaire à adapter ...
     
     doc.build(story)
-    return response
+
+
+@login_required
+def generer_pdf_retraite(request):
+    """Sert un PDF modèle pour l'inscription des retraités, construit une fois par version de la configuration."""
+    return modeles_pdf.reponse_modele(request, "retraites")
@@ -35,6 +35,8 @@ from .models import (
     PaiementCotisationActeur,
     PaiementCotisationInstitution,
     TypeLocal,
+    FaitRecetteMensuelle,
+    ExerciceClos,
 )
 
 
@@ -1219,3 +1221,50 @@ class TicketMarcheAdmin(admin.ModelAdmin):
     raw_id_fields = ("emplacement", "contribuable", "encaisse_par_agent", "encaisse_par")
     date_hierarchy = "date"
     readonly_fields = ("date_creation",)
+
+
+@admin.register(FaitRecetteMensuelle)
+class FaitRecetteMensuelleAdmin(admin.ModelAdmin):
+    """Table de faits des recettes (lecture seule : alimentée par rafraichir_faits_recettes)."""
+
+    list_display = (
+        "mois",
+        "type_recette",
+        "emplacement",
+        "agent",
+        "montant_du",
+        "montant_encaisse",
+        "nb_encaissements",
+        "date_calcul",
+    )
+    list_filter = ("type_recette", "mois")
+    raw_id_fields = ("emplacement", "agent")
+    date_hierarchy = "mois"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExerciceClos)
+class ExerciceClosAdmin(admin.ModelAdmin):
+    """Exercices clos (lecture seule : alimentée par cloturer_exercice)."""
+
+    list_display = (
+        "annee",
+        "nb_paiements_archives",
+        "nb_tickets_archives",
+        "montant_archive",
+        "date_debut",
+        "date_fin",
+        "date_cloture",
+        "cloture_par",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
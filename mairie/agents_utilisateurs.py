@@ -0,0 +1,91 @@
+"""
+Classement des user-agents des visites (VisiteSite) : robot ou humain, type d'appareil.
+
+Le classement est fait une fois, à l'enregistrement de la visite, et stocké dans des colonnes
+indexées (`est_robot`, `type_appareil`) : les statistiques filtrent les robots par un simple
+WHERE, sans expression régulière au moment de la requête.
+
+Chaque famille de jetons (robots, tablettes, mobiles) est compilée en une seule expression
+régulière dont les alternatives sont factorisées en arbre de préfixes (« bot|bingbot|baidu »
+devient « b(?:aidu|ingbot|ot) ») : le moteur n'essaie plus chaque mot à chaque position.
+Les user-agents d'un site municipal sont peu variés ; un cache LRU évite de reclasser les
+mêmes chaînes d'une requête à l'autre.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ORDINATEUR = "ordinateur"
+MOBILE = "mobile"
+TABLETTE = "tablette"
+ROBOT = "robot"
+INCONNU = "inconnu"
+
+TYPES_APPAREIL = [
+    (ORDINATEUR, "Ordinateur"),
+    (MOBILE, "Mobile"),
+    (TABLETTE, "Tablette"),
+    (ROBOT, "Robot"),
+    (INCONNU, "Inconnu"),
+]
+
+JETONS_ROBOTS = [
+    "bot", "crawl", "spider", "slurp", "scrap", "fetch", "monitor", "preview", "headless",
+    "lighthouse", "python-", "curl/", "wget/", "java/", "go-http", "okhttp", "axios", "libwww",
+    "httpclient", "facebookexternalhit", "whatsapp", "telegram", "pingdom", "uptime", "feed",
+]
+JETONS_TABLETTES = ["ipad", "tablet", "kindle", "silk/", "playbook", "sm-t", "nexus 7", "nexus 10"]
+JETONS_MOBILES = [
+    "mobile", "iphone", "ipod", "android", "blackberry", "opera mini", "windows phone", "iemobile",
+    "kaios", "nokia",
+]
+
+TAILLE_CACHE = 4096
+
+Classement = namedtuple("Classement", ["est_robot", "type_appareil"])
+
+
+def motif_arbre(mots):
+    """Expression régulière (sans groupe capturant) reconnaissant l'un des `mots`, factorisée par préfixes."""
+    arbre = {}
+    for mot in mots:
+        noeud = arbre
+        for caractere in mot:
+            noeud = noeud.setdefault(caractere, {})
+        noeud[""] = {}
+
+    def motif(noeud):
+        fin = "" in noeud
+        branches = [re.escape(c) + motif(suite) for c, suite in sorted(noeud.items()) if c]
+        if not branches:
+            return ""
+        corps = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if fin:
+            # Un mot se termine ici et d'autres continuent : la suite est optionnelle
+            return ("(?:" + corps + ")?") if len(branches) == 1 else corps + "?"
+        return corps
+
+    return motif(arbre)
+
+
+_ROBOTS = re.compile(motif_arbre(JETONS_ROBOTS), re.IGNORECASE)
+_TABLETTES = re.compile(motif_arbre(JETONS_TABLETTES), re.IGNORECASE)
+_MOBILES = re.compile(motif_arbre(JETONS_MOBILES), re.IGNORECASE)
+_NAVIGATEUR = re.compile(r"mozilla/|opera/", re.IGNORECASE)
+
+
+@lru_cache(maxsize=TAILLE_CACHE)
+def classer_user_agent(user_agent):
+    """Classement d'un user-agent ; un user-agent vide est traité comme un robot."""
+    if not user_agent or _ROBOTS.search(user_agent):
+        return Classement(True, ROBOT)
+    if _TABLETTES.search(user_agent):
+        return Classement(False, TABLETTE)
+    if _MOBILES.search(user_agent):
+        # Android sans « Mobile » : tablette
+        if "android" in user_agent.lower() and "mobile" not in user_agent.lower():
+            return Classement(False, TABLETTE)
+        return Classement(False, MOBILE)
+    if _NAVIGATEUR.search(user_agent):
+        return Classement(False, ORDINATEUR)
+    return Classement(False, INCONNU)
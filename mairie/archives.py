@@ -0,0 +1,166 @@
+"""
+Clôture des exercices : archivage des paiements et tickets des années terminées.
+
+`cloturer_exercice(annee)` déplace par lots dans les tables *Archive (mêmes identifiants, les
+reçus signés restent donc vérifiables) :
+- les paiements de cotisation des boutiques, acteurs et institutions dont la cotisation porte
+  sur l'année ;
+- les tickets marché datés de l'année.
+
+Les lignes de résumé restent dans les tables vivantes : chaque cotisation annuelle cumule le
+montant archivé dans `montant_paye_archive` (soldes et arriérés inchangés), les faits de
+recettes mensuelles sont conservés et ExerciceClos garde les effectifs, le montant et la plage
+de dates archivée.
+
+Les rapports demandent `archives_necessaires(...)` pour leur période puis lisent
+`sources(modele, archives)` : la table vivante seule tant que la période ne touche aucun
+exercice clos, la table vivante et son archive sinon. Un arriéré encaissé après la clôture
+reste dans la table vivante ; une nouvelle clôture de la même année l'archive à son tour.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import (
+    CotisationAnnuelle, CotisationAnnuelleActeur, CotisationAnnuelleInstitution, ExerciceClos,
+    PaiementCotisation, PaiementCotisationActeur, PaiementCotisationActeurArchive, PaiementCotisationArchive,
+    PaiementCotisationInstitution, PaiementCotisationInstitutionArchive, TicketMarche, TicketMarcheArchive,
+)
+
+TAILLE_LOT = 1000
+
+# cotisation : modèle portant montant_paye_archive (None pour les tickets)
+Archivage = namedtuple("Archivage", ["modele", "archive", "champ_montant", "champ_date", "cotisation"])
+
+ARCHIVAGES = [
+    Archivage(PaiementCotisation, PaiementCotisationArchive, "montant_paye", "date_paiement", CotisationAnnuelle),
+    Archivage(
+        PaiementCotisationActeur, PaiementCotisationActeurArchive, "montant_paye", "date_paiement",
+        CotisationAnnuelleActeur,
+    ),
+    Archivage(
+        PaiementCotisationInstitution, PaiementCotisationInstitutionArchive, "montant_paye", "date_paiement",
+        CotisationAnnuelleInstitution,
+    ),
+    Archivage(TicketMarche, TicketMarcheArchive, "montant", "date", None),
+]
+ARCHIVE_DE = {archivage.modele: archivage.archive for archivage in ARCHIVAGES}
+
+
+def archives_necessaires(annee=None, date_du=None, date_au=None):
+    """
+    Vrai si la période demandée touche un exercice clos (une requête sur la petite table
+    ExerciceClos). `annee` : année de cotisation (ou du ticket) ; date_du / date_au : dates de
+    paiement, comparées à la plage de dates effectivement archivée.
+    """
+    exercices = ExerciceClos.objects.exclude(date_debut=None)
+    if annee:
+        exercices = exercices.filter(annee=annee)
+    if date_du:
+        exercices = exercices.filter(date_fin__gte=date_du)
+    if date_au:
+        exercices = exercices.filter(date_debut__lte=date_au)
+    return exercices.exists()
+
+
+def sources(modele, archives):
+    """Modèles à interroger : la table vivante, suivie de son archive si `archives`."""
+    return [modele, ARCHIVE_DE[modele]] if archives else [modele]
+
+
+def fusionner(querysets, cle, limite):
+    """
+    Les `limite` premières lignes (toutes si None), par ordre décroissant de `cle`, de querysets
+    triés de la même façon.
+    """
+    lignes = [ligne for qs in querysets for ligne in qs[:limite]]
+    lignes.sort(key=cle, reverse=True)
+    return lignes[:limite]
+
+
+def annees_closes():
+    return list(ExerciceClos.objects.order_by().values_list("annee", flat=True))
+
+
+def montants_archives_par_mois(cotisation_ids):
+    """{cotisation_id: {mois: montant}} des paiements archivés des cotisations de boutiques données."""
+    montants = defaultdict(dict)
+    if cotisation_ids:
+        lignes = (
+            PaiementCotisationArchive.objects.filter(cotisation_annuelle_id__in=cotisation_ids).order_by()
+            .values_list("cotisation_annuelle_id", "mois")
+            .annotate(total=Sum("montant_paye"))
+        )
+        for cotisation_id, mois, total in lignes:
+            montants[cotisation_id][mois] = total
+    return montants
+
+
+def _filtre_annee(archivage, annee):
+    if archivage.cotisation is None:
+        return {"date__gte": date(annee, 1, 1), "date__lt": date(annee + 1, 1, 1)}
+    return {"cotisation_annuelle__annee": annee}
+
+
+def _jour(valeur):
+    return timezone.localtime(valeur).date() if isinstance(valeur, datetime) else valeur
+
+
+def cloturer_exercice(annee, auteur=None, simulation=False, taille_lot=TAILLE_LOT):
+    """
+    Archive les paiements et tickets de l'exercice `annee` (antérieur à l'année courante).
+    Retourne {"paiements": n, "tickets": n, "montant": Decimal, "date_debut": date, "date_fin": date}.
+    En simulation, tout est annulé en fin de transaction. ValueError si l'exercice n'est pas terminé.
+    """
+    if annee >= timezone.now().year:
+        raise ValueError("Seul un exercice terminé (année antérieure à l'année en cours) peut être clos.")
+
+    bilan = {"paiements": 0, "tickets": 0, "montant": Decimal("0"), "date_debut": None, "date_fin": None}
+    with transaction.atomic():
+        for archivage in ARCHIVAGES:
+            champs = [f.attname for f in archivage.archive._meta.concrete_fields if f.attname != "date_archivage"]
+            a_archiver = archivage.modele.objects.filter(**_filtre_annee(archivage, annee)).order_by("pk")
+            while True:
+                lot = list(a_archiver.values(*champs)[:taille_lot])
+                if not lot:
+                    break
+                archivage.archive.objects.bulk_create([archivage.archive(**ligne) for ligne in lot])
+
+                if archivage.cotisation is not None:
+                    par_cotisation = defaultdict(Decimal)
+                    for ligne in lot:
+                        par_cotisation[ligne["cotisation_annuelle_id"]] += ligne[archivage.champ_montant]
+                    for cotisation_id, montant in par_cotisation.items():
+                        archivage.cotisation.objects.filter(pk=cotisation_id).update(
+                            montant_paye_archive=F("montant_paye_archive") + montant
+                        )
+
+                # Suppression directe, sans signaux : les soldes sont reportés ci-dessus et les faits
+                # de recettes, déjà à jour, se recalculent à l'identique en lisant les archives.
+                archivage.modele.objects.filter(pk__in=[ligne["id"] for ligne in lot])._raw_delete(
+                    archivage.modele.objects.db
+                )
+
+                jours = [_jour(ligne[archivage.champ_date]) for ligne in lot]
+                bilan["date_debut"] = min([j for j in (bilan["date_debut"], *jours) if j])
+                bilan["date_fin"] = max([j for j in (bilan["date_fin"], *jours) if j])
+                bilan["montant"] += sum((ligne[archivage.champ_montant] for ligne in lot), Decimal("0"))
+                bilan["tickets" if archivage.cotisation is None else "paiements"] += len(lot)
+
+        exercice, _ = ExerciceClos.objects.get_or_create(annee=annee)
+        exercice.nb_paiements_archives += bilan["paiements"]
+        exercice.nb_tickets_archives += bilan["tickets"]
+        exercice.montant_archive += bilan["montant"]
+        exercice.date_debut = min([j for j in (exercice.date_debut, bilan["date_debut"]) if j], default=None)
+        exercice.date_fin = max([j for j in (exercice.date_fin, bilan["date_fin"]) if j], default=None)
+        exercice.date_cloture = timezone.now()
+        exercice.cloture_par = auteur
+        exercice.save()
+
+        if simulation:
+            transaction.set_rollback(True)
+    return bilan
@@ -0,0 +1,105 @@
+"""
+Marqueurs de carte au format GeoJSON, filtrés par emprise (bbox) et regroupés par grille.
+
+Les points sont lus avec des requêtes `values()` légères. Au-delà de SEUIL_POINTS_INDIVIDUELS
+points dans l'emprise (et sous ZOOM_POINTS_INDIVIDUELS), ils sont regroupés par préfixe de
+géohash (`cellule_carte`) : une requête GROUP BY par couche.
+"""
+from django.db.models import Avg, Count
+from django.db.models.functions import Substr
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+
+from .geohash import precision_pour_zoom
+from .models import InfrastructureCommune
+
+SEUIL_POINTS_INDIVIDUELS = 300
+ZOOM_POINTS_INDIVIDUELS = 17
+
+# couche -> (modèle, champs exportés pour un point individuel, champ libellé)
+COUCHES = {
+    "acteurs": (ActeurEconomique, ["id", "raison_sociale"], "raison_sociale"),
+    "institutions": (InstitutionFinanciere, ["id", "nom_institution"], "nom_institution"),
+    "infrastructures": (
+        InfrastructureCommune,
+        ["id", "nom", "type_infrastructure", "description", "adresse", "est_active"],
+        "nom",
+    ),
+}
+COUCHES_PUBLIQUES = {"infrastructures"}
+
+
+class ParametreCarteInvalide(ValueError):
+    pass
+
+
+def lire_bbox(valeur):
+    """`ouest,sud,est,nord` (format Leaflet toBBoxString) -> tuple de floats, ou None."""
+    if not valeur:
+        return None
+    try:
+        ouest, sud, est, nord = (float(v) for v in valeur.split(","))
+    except ValueError:
+        raise ParametreCarteInvalide("Paramètre bbox invalide (attendu : ouest,sud,est,nord).")
+    if sud > nord or not (-90 <= sud <= 90 and -90 <= nord <= 90):
+        raise ParametreCarteInvalide("Paramètre bbox invalide (latitudes).")
+    return max(ouest, -180.0), sud, min(est, 180.0), nord
+
+
+def _queryset_couche(couche, bbox, staff):
+    modele = COUCHES[couche][0]
+    qs = modele.objects.exclude(cellule_carte="")
+    if couche == "infrastructures":
+        # Comme les pages de carte : uniquement la cartographie de la configuration active
+        qs = qs.filter(cartographie__configuration__est_active=True)
+        if not staff:
+            qs = qs.filter(est_active=True)
+    if bbox:
+        ouest, sud, est, nord = bbox
+        qs = qs.filter(latitude__gte=sud, latitude__lte=nord)
+        if ouest <= est:
+            qs = qs.filter(longitude__gte=ouest, longitude__lte=est)
+        else:
+            # Emprise à cheval sur l'antiméridien
+            qs = qs.filter(longitude__gte=ouest) | qs.filter(longitude__lte=est)
+    return qs.order_by()
+
+
+def _point(lat, lng, proprietes):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [round(float(lng), 6), round(float(lat), 6)]},
+        "properties": proprietes,
+    }
+
+
+def marqueurs_geojson(couches, bbox=None, zoom=12, staff=False):
+    """FeatureCollection des couches demandées ; `staff` donne accès à toutes les couches."""
+    precision = precision_pour_zoom(zoom)
+    features = []
+    for couche in couches:
+        if couche not in COUCHES or (couche not in COUCHES_PUBLIQUES and not staff):
+            continue
+        _, champs, champ_libelle = COUCHES[couche]
+        qs = _queryset_couche(couche, bbox, staff)
+
+        cellules = list(
+            qs.annotate(cellule=Substr("cellule_carte", 1, precision))
+            .values("cellule")
+            .annotate(nombre=Count("id"), lat=Avg("latitude"), lng=Avg("longitude"))
+        )
+        total = sum(c["nombre"] for c in cellules)
+        if total <= SEUIL_POINTS_INDIVIDUELS or zoom >= ZOOM_POINTS_INDIVIDUELS:
+            for ligne in qs.values("latitude", "longitude", *champs):
+                proprietes = {k: ligne[k] for k in champs if k != champ_libelle}
+                proprietes.update({"couche": couche, "nom": ligne[champ_libelle], "nombre": 1})
+                features.append(_point(ligne["latitude"], ligne["longitude"], proprietes))
+        else:
+            for c in cellules:
+                features.append(_point(c["lat"], c["lng"], {
+                    "couche": couche,
+                    "cellule": c["cellule"],
+                    "nombre": c["nombre"],
+                    "regroupement": True,
+                }))
+    return {"type": "FeatureCollection", "zoom": zoom, "features": features}
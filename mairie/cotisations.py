@@ -0,0 +1,99 @@
+"""
+Génération en masse des cotisations annuelles (passage d'année).
+
+Pour une année donnée, crée en un seul `bulk_create(ignore_conflicts=True)` par type :
+- une CotisationAnnuelle par boutique active occupée (montant : `get_prix_annuel()`) ;
+- une CotisationAnnuelleActeur / CotisationAnnuelleInstitution par acteur / institution suivi
+  par au moins un agent collecteur (montant : celui de la dernière année définie, sinon 0).
+
+Les lignes existantes ne sont jamais modifiées : le traitement peut être relancé sans risque.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+
+from .models import (
+    BoutiqueMagasin, CotisationAnnuelle, CotisationAnnuelleActeur, CotisationAnnuelleInstitution,
+)
+
+TAILLE_LOT = 500
+
+
+def _derniers_montants(modele, champ_fk, annee):
+    """{id: montant_annuel_du de la dernière année < annee} (une requête)."""
+    montants = {}
+    lignes = (
+        modele.objects.filter(annee__lt=annee)
+        .order_by(champ_fk, "annee")
+        .values_list(champ_fk, "montant_annuel_du")
+    )
+    for cle, montant in lignes:
+        montants[cle] = montant
+    return montants
+
+
+def _creer_manquantes(modele, champ_fk, candidats, annee, simulation):
+    """
+    candidats : {id: montant_annuel_du}. Crée les lignes absentes pour `annee`.
+    Retourne (créées, déjà présentes).
+    """
+    existantes = set(modele.objects.filter(annee=annee).order_by().values_list(champ_fk, flat=True))
+    a_creer = [
+        modele(**{champ_fk: cle, "annee": annee, "montant_annuel_du": montant})
+        for cle, montant in candidats.items()
+        if cle not in existantes
+    ]
+    deja_presentes = len(candidats) - len(a_creer)
+    if simulation or not a_creer:
+        return len(a_creer), deja_presentes
+    avant = modele.objects.filter(annee=annee).count()
+    modele.objects.bulk_create(a_creer, batch_size=TAILLE_LOT, ignore_conflicts=True)
+    # ignore_conflicts : une exécution concurrente a pu créer certaines lignes entre-temps
+    creees = modele.objects.filter(annee=annee).count() - avant
+    return creees, len(candidats) - creees
+
+
+def generer_cotisations_boutiques(annee, boutiques=None, simulation=False):
+    """Cotisations de l'année pour les boutiques actives occupées (ou la sélection fournie)."""
+    if boutiques is None:
+        boutiques = BoutiqueMagasin.objects.filter(est_actif=True, contribuable__isnull=False)
+    candidats = {
+        b.id: b.get_prix_annuel()
+        for b in boutiques.order_by().only("id", "prix_location_mensuel", "prix_location_annuel")
+    }
+    return _creer_manquantes(CotisationAnnuelle, "boutique_id", candidats, annee, simulation)
+
+
+def generer_cotisations_acteurs(annee, simulation=False):
+    montants = _derniers_montants(CotisationAnnuelleActeur, "acteur_id", annee)
+    ids = (
+        ActeurEconomique.objects.filter(agents_collecteurs__isnull=False)
+        .order_by().values_list("id", flat=True).distinct()
+    )
+    candidats = {i: montants.get(i, Decimal("0")) for i in ids}
+    return _creer_manquantes(CotisationAnnuelleActeur, "acteur_id", candidats, annee, simulation)
+
+
+def generer_cotisations_institutions(annee, simulation=False):
+    montants = _derniers_montants(CotisationAnnuelleInstitution, "institution_id", annee)
+    ids = (
+        InstitutionFinanciere.objects.filter(agents_collecteurs__isnull=False)
+        .order_by().values_list("id", flat=True).distinct()
+    )
+    candidats = {i: montants.get(i, Decimal("0")) for i in ids}
+    return _creer_manquantes(CotisationAnnuelleInstitution, "institution_id", candidats, annee, simulation)
+
+
+@transaction.atomic
+def generer_cotisations_annuelles(annee, simulation=False):
+    """
+    Crée toutes les cotisations manquantes de l'année.
+    Retourne {"boutiques": (créées, déjà présentes), "acteurs": (...), "institutions": (...)}.
+    """
+    return {
+        "boutiques": generer_cotisations_boutiques(annee, simulation=simulation),
+        "acteurs": generer_cotisations_acteurs(annee, simulation=simulation),
+        "institutions": generer_cotisations_institutions(annee, simulation=simulation),
+    }
@@ -0,0 +1,263 @@
+"""
+Détection des doublons entre les registres d'inscription (acteurs économiques, institutions
+financières, profils emploi, diaspora, contribuables).
+
+Chaque fiche est réduite à des clés de blocage stockées dans la table indexée CleDoublon :
+- téléphone au format E.164 (mairie.telephones) ;
+- email en minuscules ;
+- nom sans accents ni mots vides (« SARL », « Ets »...), chaque mot réduit à son squelette
+  consonantique (« Koffi » et « Kofi » donnent « kf ») et les mots triés (l'ordre nom / prénoms
+  varie d'une saisie à l'autre).
+
+Seules les fiches qui partagent une clé (un « bloc ») sont comparées deux à deux : la détection
+ne balaie jamais toutes les paires de fiches. Les blocs trop grands (numéro factice, nom très
+courant) sont ignorés. Chaque paire reçoit un score ; au-delà de SEUIL_SCORE elle entre dans la
+file d'examen (DoublonPotentiel), où une paire déjà écartée par le personnel le reste. Un nom
+suffisamment ressemblant (SEUIL_NOM) suffit à lui seul : « Koffi Mensah » / « Kofi Mensah » sur
+deux téléphones différents est bien examiné.
+
+Les clés d'une fiche sont recalculées à chaque enregistrement (mairie.signals) ;
+`manage.py detecter_doublons --reindexer` reconstruit tout l'index (imports en masse).
+"""
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import Q
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from diaspora.models import MembreDiaspora
+from emploi.models import ProfilEmploi
+
+from .models import CleDoublon, Contribuable, DoublonPotentiel
+from .telephones import normaliser_telephone
+
+SEUIL_SCORE = Decimal("0.5")
+SEUIL_NOM = 0.85
+TAILLE_BLOC_MAX = 20
+TAILLE_LOT = 1000
+
+POIDS_TELEPHONE = Decimal("0.5")
+POIDS_EMAIL = Decimal("0.4")
+POIDS_NOM = Decimal("0.7")  # nom identique ; SEUIL_SCORE au ratio SEUIL_NOM
+
+# noms : groupes de champs concaténés pour former un nom (raison sociale, responsable, nom + prénoms)
+Source = namedtuple("Source", ["modele", "noms", "telephones", "emails"])
+
+SOURCES = {
+    "acteur": Source(
+        ActeurEconomique, [("raison_sociale",), ("nom_responsable",)], ["telephone1", "telephone2"], ["email"]
+    ),
+    "institution": Source(
+        InstitutionFinanciere, [("nom_institution",), ("nom_responsable",)],
+        ["telephone1", "telephone2", "whatsapp"], ["email"],
+    ),
+    "emploi": Source(ProfilEmploi, [("nom", "prenoms")], ["telephone1", "telephone2"], ["email"]),
+    "diaspora": Source(MembreDiaspora, [("nom", "prenoms")], ["telephone_whatsapp"], ["email"]),
+    "contribuable": Source(Contribuable, [("nom", "prenom")], ["telephone"], []),
+}
+
+MOTS_VIDES = {
+    "sarl", "sarlu", "sa", "sas", "suarl", "ets", "etablissement", "etablissements", "ste", "societe",
+    "entreprise", "groupe", "cie", "et", "de", "du", "des", "la", "le", "les",
+}
+
+
+def type_fiche_du_modele(modele):
+    return next((cle for cle, source in SOURCES.items() if source.modele is modele), None)
+
+
+def jetons_nom(texte):
+    texte = unicodedata.normalize("NFKD", str(texte or "")).encode("ascii", "ignore").decode().lower()
+    return [jeton for jeton in re.split(r"[^a-z0-9]+", texte) if len(jeton) > 1 and jeton not in MOTS_VIDES]
+
+
+def squelette(jeton):
+    """Première lettre puis consonnes, lettres doublées réduites : tolère voyelles et redoublements."""
+    reste = re.sub(r"[aeiouy]", "", jeton[1:])
+    return re.sub(r"(.)\1+", r"\1", jeton[0] + reste)
+
+
+def cles_fiche(type_fiche, fiche):
+    """Clés de blocage (nature, clé, valeur) d'une fiche, sans doublons."""
+    source = SOURCES[type_fiche]
+    cles = set()
+    for champs in source.telephones:
+        telephone = normaliser_telephone(getattr(fiche, champs))
+        if telephone:
+            cles.add(("telephone", telephone, telephone))
+    for champ in source.emails:
+        email = (getattr(fiche, champ) or "").strip().lower()
+        if email:
+            cles.add(("email", email[:255], email[:255]))
+    for champs in source.noms:
+        jetons = jetons_nom(" ".join(str(getattr(fiche, champ) or "") for champ in champs))
+        if jetons:
+            cle = " ".join(sorted(squelette(jeton) for jeton in jetons))
+            cles.add(("nom", cle[:255], " ".join(sorted(jetons))[:255]))
+    return cles
+
+
+def _lignes_cles(type_fiche, fiche):
+    return [
+        CleDoublon(type_fiche=type_fiche, fiche_id=fiche.pk, nature=nature, cle=cle, valeur=valeur)
+        for nature, cle, valeur in cles_fiche(type_fiche, fiche)
+    ]
+
+
+def score_paire(cles_a, cles_b):
+    """(score, motifs) de deux fiches d'après leurs clés [(nature, clé, valeur), ...]."""
+    def valeurs(cles, nature):
+        return {valeur for n, _, valeur in cles if n == nature}
+
+    score = Decimal("0")
+    motifs = []
+    if valeurs(cles_a, "telephone") & valeurs(cles_b, "telephone"):
+        score += POIDS_TELEPHONE
+        motifs.append("téléphone")
+    if valeurs(cles_a, "email") & valeurs(cles_b, "email"):
+        score += POIDS_EMAIL
+        motifs.append("email")
+    ressemblance = max(
+        (SequenceMatcher(None, a, b).ratio() for a in valeurs(cles_a, "nom") for b in valeurs(cles_b, "nom")),
+        default=0,
+    )
+    if ressemblance >= SEUIL_NOM:
+        # Ratio ramené linéairement de [SEUIL_NOM, 1] à [SEUIL_SCORE, POIDS_NOM]
+        echelle = Decimal(str(round((ressemblance - SEUIL_NOM) / (1 - SEUIL_NOM), 3)))
+        score += SEUIL_SCORE + (POIDS_NOM - SEUIL_SCORE) * echelle
+        motifs.append(f"nom ({ressemblance:.0%})")
+    return min(score, Decimal("1")).quantize(Decimal("0.001")), ", ".join(motifs)
+
+
+def _paires_des_blocs(cles_par_fiche, blocs):
+    """Paires de fiches (ordonnées) partageant au moins un bloc, chacune scorée une seule fois."""
+    paires = {}
+    for fiches in blocs:
+        fiches = sorted(fiches)
+        for i, a in enumerate(fiches):
+            for b in fiches[i + 1:]:
+                if (a, b) not in paires:
+                    paires[(a, b)] = score_paire(cles_par_fiche[a], cles_par_fiche[b])
+    return {paire: resultat for paire, resultat in paires.items() if resultat[0] >= SEUIL_SCORE}
+
+
+def _enregistrer_paires(paires):
+    """Ajoute les paires à la file d'examen ; une paire existante garde son statut, son score est mis à jour."""
+    DoublonPotentiel.objects.bulk_create(
+        [
+            DoublonPotentiel(type_a=a[0], id_a=a[1], type_b=b[0], id_b=b[1], score=score, motifs=motifs)
+            for (a, b), (score, motifs) in paires.items()
+        ],
+        batch_size=TAILLE_LOT,
+        update_conflicts=True,
+        unique_fields=["type_a", "id_a", "type_b", "id_b"],
+        update_fields=["score", "motifs"],
+    )
+
+
+def _filtre_fiche(type_fiche, fiche_id):
+    return Q(type_a=type_fiche, id_a=fiche_id) | Q(type_b=type_fiche, id_b=fiche_id)
+
+
+def actualiser_fiche(type_fiche, fiche):
+    """Recalcule les clés d'une fiche et ses doublons potentiels (après enregistrement)."""
+    moi = (type_fiche, fiche.pk)
+    lignes = _lignes_cles(type_fiche, fiche)
+    with transaction.atomic():
+        CleDoublon.objects.filter(type_fiche=type_fiche, fiche_id=fiche.pk).delete()
+        CleDoublon.objects.bulk_create(lignes)
+
+        # Blocs de la fiche, hors blocs trop grands
+        filtre_blocs = Q()
+        for ligne in lignes:
+            filtre_blocs |= Q(nature=ligne.nature, cle=ligne.cle)
+        voisins = set()
+        if lignes:
+            blocs = defaultdict(set)
+            for type_voisin, id_voisin, nature, cle in CleDoublon.objects.filter(filtre_blocs).values_list(
+                "type_fiche", "fiche_id", "nature", "cle"
+            ):
+                blocs[(nature, cle)].add((type_voisin, id_voisin))
+            for fiches in blocs.values():
+                if len(fiches) <= TAILLE_BLOC_MAX:
+                    voisins |= fiches
+            voisins.discard(moi)
+
+        cles_par_fiche = defaultdict(set)
+        cles_par_fiche[moi] = {(l.nature, l.cle, l.valeur) for l in lignes}
+        if voisins:
+            filtre_voisins = Q()
+            for type_voisin, id_voisin in voisins:
+                filtre_voisins |= Q(type_fiche=type_voisin, fiche_id=id_voisin)
+            for type_voisin, id_voisin, nature, cle, valeur in CleDoublon.objects.filter(filtre_voisins).values_list(
+                "type_fiche", "fiche_id", "nature", "cle", "valeur"
+            ):
+                cles_par_fiche[(type_voisin, id_voisin)].add((nature, cle, valeur))
+
+        paires = _paires_des_blocs(cles_par_fiche, [{moi, voisin} for voisin in voisins])
+        # Paires en attente qui ne tiennent plus (fiche corrigée)
+        en_attente = DoublonPotentiel.objects.filter(_filtre_fiche(*moi), statut="a_examiner")
+        for paire in paires:
+            (type_a, id_a), (type_b, id_b) = paire
+            en_attente = en_attente.exclude(type_a=type_a, id_a=id_a, type_b=type_b, id_b=id_b)
+        en_attente.delete()
+        _enregistrer_paires(paires)
+    return paires
+
+
+def retirer_fiche(type_fiche, fiche_id):
+    """Fiche supprimée : ses clés et ses paires disparaissent."""
+    CleDoublon.objects.filter(type_fiche=type_fiche, fiche_id=fiche_id).delete()
+    DoublonPotentiel.objects.filter(_filtre_fiche(type_fiche, fiche_id)).delete()
+
+
+def reindexer():
+    """Reconstruit toute la table des clés à partir des registres ; retourne le nombre de clés."""
+    nombre = 0
+    with transaction.atomic():
+        CleDoublon.objects.all().delete()
+        for type_fiche, source in SOURCES.items():
+            champs = {champ for groupe in source.noms for champ in groupe} | set(source.telephones) | set(source.emails)
+            lot = []
+            for fiche in source.modele.objects.only(*champs).iterator(chunk_size=TAILLE_LOT):
+                lot.extend(_lignes_cles(type_fiche, fiche))
+                if len(lot) >= TAILLE_LOT:
+                    CleDoublon.objects.bulk_create(lot)
+                    nombre += len(lot)
+                    lot = []
+            CleDoublon.objects.bulk_create(lot)
+            nombre += len(lot)
+    return nombre
+
+
+def detecter_doublons():
+    """Compare les fiches de chaque bloc (2 à TAILLE_BLOC_MAX fiches) et alimente la file d'examen."""
+    blocs = defaultdict(set)
+    cles_par_fiche = defaultdict(set)
+    for type_fiche, fiche_id, nature, cle, valeur in CleDoublon.objects.order_by().values_list(
+        "type_fiche", "fiche_id", "nature", "cle", "valeur"
+    ).iterator(chunk_size=TAILLE_LOT):
+        cles_par_fiche[(type_fiche, fiche_id)].add((nature, cle, valeur))
+        blocs[(nature, cle)].add((type_fiche, fiche_id))
+    paires = _paires_des_blocs(
+        cles_par_fiche, [fiches for fiches in blocs.values() if 1 < len(fiches) <= TAILLE_BLOC_MAX]
+    )
+    with transaction.atomic():
+        _enregistrer_paires(paires)
+    return paires
+
+
+def libelles_fiches(fiches):
+    """{(type, id): libellé} pour une liste de fiches, en une requête par type."""
+    par_type = defaultdict(list)
+    for type_fiche, fiche_id in fiches:
+        par_type[type_fiche].append(fiche_id)
+    libelles = {}
+    for type_fiche, ids in par_type.items():
+        for pk, fiche in SOURCES[type_fiche].modele.objects.in_bulk(ids).items():
+            libelles[(type_fiche, pk)] = str(fiche)
+    return libelles
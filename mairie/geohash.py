@@ -0,0 +1,69 @@
+"""
+Géohash (encodage base 32 standard) utilisé comme index de grille pour la carte.
+
+Chaque point géolocalisé stocke son géohash (colonne `cellule_carte`, indexée). Deux points
+dont les géohashs partagent les p premiers caractères sont dans la même cellule de la grille
+de précision p : le regroupement côté serveur est un simple GROUP BY sur un préfixe.
+"""
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+PRECISION_STOCKEE = 9  # ~5 m : suffisant pour tous les niveaux de zoom
+
+# Précision de grille par niveau de zoom Leaflet (~ 1/4 de tuile par cellule)
+PRECISIONS_ZOOM = [
+    (2, 1),
+    (4, 2),
+    (7, 3),
+    (9, 4),
+    (12, 5),
+    (14, 6),
+    (16, 7),
+]
+PRECISION_MAX = 8
+
+
+def encoder_geohash(latitude, longitude, precision=PRECISION_STOCKEE):
+    """Géohash d'un point ; chaîne vide si les coordonnées sont absentes ou invalides."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return ""
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return ""
+
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    caracteres = []
+    bits, nb_bits, pair = 0, 0, True
+    while len(caracteres) < precision:
+        if pair:
+            milieu = (lng_min + lng_max) / 2
+            if longitude >= milieu:
+                bits = (bits << 1) | 1
+                lng_min = milieu
+            else:
+                bits <<= 1
+                lng_max = milieu
+        else:
+            milieu = (lat_min + lat_max) / 2
+            if latitude >= milieu:
+                bits = (bits << 1) | 1
+                lat_min = milieu
+            else:
+                bits <<= 1
+                lat_max = milieu
+        pair = not pair
+        nb_bits += 1
+        if nb_bits == 5:
+            caracteres.append(BASE32[bits])
+            bits, nb_bits = 0, 0
+    return "".join(caracteres)
+
+
+def precision_pour_zoom(zoom):
+    """Longueur de préfixe de géohash utilisée pour regrouper les points à ce niveau de zoom."""
+    for zoom_max, precision in PRECISIONS_ZOOM:
+        if zoom <= zoom_max:
+            return precision
+    return PRECISION_MAX
@@ -0,0 +1,475 @@
+"""
+Import en masse (CSV / XLSX) des contribuables, boutiques, paiements historiques et tickets marché.
+
+Chaîne de traitement :
+1. `lire_lignes` lit le fichier en flux (module csv, ou openpyxl en mode read_only) ;
+2. chaque importeur charge une fois ses tables de correspondance (emplacements, types de local,
+   matricules, agents…) dans des dictionnaires, puis valide les lignes sans requête SQL ;
+3. les objets valides sont écrits par `bulk_create`, un lot de TAILLE_LOT lignes par transaction ;
+4. les lignes rejetées sont consignées dans le rapport (numéro de ligne + message).
+
+`bulk_create` ne déclenche pas les signaux : chaque importeur refait explicitement ce qu'ils
+auraient fait (cotisation de l'année pour les nouvelles boutiques, versements des paiements,
+table de faits des recettes).
+"""
+import csv
+import io
+import unicodedata
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cotisations import generer_cotisations_boutiques
+from .models import (
+    AgentCollecteur, BoutiqueMagasin, Contribuable, CotisationAnnuelle, EmplacementMarche,
+    PaiementCotisation, TicketMarche, TypeLocal, VersementCotisation,
+)
+from .recettes import mois_de_l_annee, rafraichir_mois
+from .telephones import normaliser_telephone
+
+TAILLE_LOT = 1000
+MAX_ERREURS_AFFICHEES = 500
+
+
+class ErreurLigne(ValueError):
+    pass
+
+
+class RapportImport:
+    """Résultat d'un import : compteurs et erreurs ligne par ligne."""
+
+    def __init__(self, type_import, simulation=False):
+        self.type_import = type_import
+        self.simulation = simulation
+        self.lignes_lues = 0
+        self.creees = 0
+        self.erreurs = []
+
+    def ajouter_erreur(self, numero, message):
+        self.erreurs.append((numero, message))
+
+    @property
+    def nb_erreurs(self):
+        return len(self.erreurs)
+
+    def erreurs_csv(self):
+        """Rapport d'erreurs au format CSV (ligne;erreur)."""
+        sortie = io.StringIO()
+        ecrivain = csv.writer(sortie, delimiter=";")
+        ecrivain.writerow(["ligne", "erreur"])
+        ecrivain.writerows(self.erreurs)
+        return sortie.getvalue()
+
+
+# --- Lecture des fichiers ---
+
+def normaliser(texte):
+    """Clé de comparaison : minuscules, sans accents ni espaces superflus."""
+    texte = unicodedata.normalize("NFKD", str(texte or "")).encode("ascii", "ignore").decode()
+    return " ".join(texte.lower().split())
+
+
+def _entete(valeur):
+    return normaliser(valeur).replace(" ", "_")
+
+
+def lire_lignes(fichier, nom_fichier):
+    """
+    Générateur de (numéro de ligne, {colonne: valeur}) ; la première ligne donne les en-têtes.
+    `fichier` est un fichier binaire ouvert (upload Django ou open(..., "rb")).
+    """
+    if nom_fichier.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        classeur = load_workbook(fichier, read_only=True, data_only=True)
+        try:
+            lignes = classeur.active.iter_rows(values_only=True)
+            entetes = [_entete(v) for v in next(lignes, [])]
+            for numero, valeurs in enumerate(lignes, start=2):
+                if any(v not in (None, "") for v in valeurs):
+                    yield numero, dict(zip(entetes, valeurs))
+        finally:
+            classeur.close()
+        return
+
+    texte = io.TextIOWrapper(fichier, encoding="utf-8-sig", newline="")
+    debut = texte.read(4096)
+    texte.seek(0)
+    try:
+        dialecte = csv.Sniffer().sniff(debut, delimiters=";,\t")
+    except csv.Error:
+        dialecte = csv.excel
+    try:
+        lecteur = csv.reader(texte, dialecte)
+        entetes = [_entete(v) for v in next(lecteur, [])]
+        for numero, valeurs in enumerate(lecteur, start=2):
+            if any(v.strip() for v in valeurs):
+                yield numero, dict(zip(entetes, valeurs))
+    finally:
+        texte.detach()  # ne pas fermer le fichier de l'appelant
+
+
+# --- Conversion des valeurs ---
+
+def _texte(ligne, colonne, obligatoire=False, longueur=None):
+    valeur = ligne.get(colonne)
+    valeur = "" if valeur is None else str(valeur).strip()
+    if obligatoire and not valeur:
+        raise ErreurLigne(f"Colonne « {colonne} » obligatoire.")
+    if longueur and len(valeur) > longueur:
+        raise ErreurLigne(f"Colonne « {colonne} » : {longueur} caractères maximum.")
+    return valeur
+
+
+def _montant(ligne, colonne, modele, obligatoire=True):
+    """Montant positif et fini, tenant dans le champ décimal `colonne` du modèle (max_digits)."""
+    valeur = ligne.get(colonne)
+    if valeur in (None, ""):
+        if obligatoire:
+            raise ErreurLigne(f"Colonne « {colonne} » obligatoire.")
+        return None
+    if isinstance(valeur, (int, float, Decimal)):
+        montant = Decimal(str(valeur))
+    else:
+        try:
+            montant = Decimal(str(valeur).replace("\xa0", "").replace(" ", "").replace(",", "."))
+        except InvalidOperation:
+            raise ErreurLigne(f"Colonne « {colonne} » : montant invalide ({valeur}).")
+    if not montant.is_finite():
+        raise ErreurLigne(f"Colonne « {colonne} » : montant invalide ({valeur}).")
+    if montant < 0:
+        raise ErreurLigne(f"Colonne « {colonne} » : montant négatif.")
+    champ = modele._meta.get_field(colonne)
+    if montant >= Decimal(10) ** (champ.max_digits - champ.decimal_places):
+        raise ErreurLigne(f"Colonne « {colonne} » : montant trop élevé ({valeur}).")
+    return montant
+
+
+def _entier(ligne, colonne, minimum, maximum):
+    valeur = ligne.get(colonne)
+    try:
+        entier = int(float(str(valeur).strip()))
+    except (TypeError, ValueError, OverflowError):  # OverflowError : « inf »
+        raise ErreurLigne(f"Colonne « {colonne} » : entier attendu ({valeur}).")
+    if not minimum <= entier <= maximum:
+        raise ErreurLigne(f"Colonne « {colonne} » : valeur hors limites ({entier}).")
+    return entier
+
+
+def _date(ligne, colonne, obligatoire=True):
+    valeur = ligne.get(colonne)
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    valeur = "" if valeur is None else str(valeur).strip()
+    if not valeur:
+        if obligatoire:
+            raise ErreurLigne(f"Colonne « {colonne} » obligatoire.")
+        return None
+    for format_date in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(valeur[:10], format_date).date()
+        except ValueError:
+            continue
+    raise ErreurLigne(f"Colonne « {colonne} » : date invalide ({valeur}), attendu AAAA-MM-JJ ou JJ/MM/AAAA.")
+
+
+def _telephone(valeur):
+    """Clé de correspondance d'un téléphone : E.164 si possible (« 90 00 00 00 » = « +22890000000 »)."""
+    return normaliser_telephone(valeur) or "".join(c for c in str(valeur or "") if c.isdigit())
+
+
+def _chercher(table, cle, libelle, obligatoire=True):
+    if not cle:
+        if obligatoire:
+            raise ErreurLigne(f"{libelle} obligatoire.")
+        return None
+    try:
+        return table[normaliser(cle)]
+    except KeyError:
+        raise ErreurLigne(f"{libelle} inconnu(e) : « {cle} ».")
+
+
+# --- Importeurs ---
+
+class Importeur:
+    """Squelette commun : références préchargées, validation par ligne, écriture par lots."""
+
+    modele = None
+    colonnes = []
+
+    def charger_references(self):
+        pass
+
+    def construire(self, ligne):
+        """Objet non enregistré pour une ligne valide ; lève ErreurLigne sinon."""
+        raise NotImplementedError
+
+    def ecrire(self, objets):
+        self.modele.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+
+    def terminer(self):
+        """Traitements différés après le dernier lot (remplacent les signaux)."""
+
+    def importer(self, lignes, rapport):
+        self.charger_references()
+        lot = []
+        for numero, ligne in lignes:
+            rapport.lignes_lues += 1
+            try:
+                lot.append(self.construire(ligne))
+            except ErreurLigne as exc:
+                rapport.ajouter_erreur(numero, str(exc))
+                continue
+            if len(lot) >= TAILLE_LOT:
+                self._ecrire_lot(lot, rapport)
+                lot = []
+        if lot:
+            self._ecrire_lot(lot, rapport)
+        if not rapport.simulation and rapport.creees:
+            self.terminer()
+        return rapport
+
+    def _ecrire_lot(self, lot, rapport):
+        if not rapport.simulation:
+            with transaction.atomic():
+                self.ecrire(lot)
+        rapport.creees += len(lot)
+
+
+def _index_agents():
+    return {normaliser(m): i for i, m in AgentCollecteur.objects.order_by().values_list("id", "matricule")}
+
+
+def _index_contribuables():
+    index = {}
+    for i, telephone in Contribuable.objects.order_by("id").values_list("id", "telephone"):
+        index.setdefault(_telephone(telephone), i)
+    return index
+
+
+def _index_emplacements():
+    return {normaliser(n): i for i, n in EmplacementMarche.objects.order_by().values_list("id", "nom_lieu")}
+
+
+class ImporteurContribuables(Importeur):
+    modele = Contribuable
+    colonnes = ["nom", "prenom", "telephone", "date_naissance", "lieu_naissance", "nationalite"]
+
+    def charger_references(self):
+        self.telephones = set(_index_contribuables())
+
+    def construire(self, ligne):
+        telephone = _texte(ligne, "telephone", obligatoire=True, longueur=30)
+        cle = _telephone(telephone)
+        if cle in self.telephones:
+            raise ErreurLigne(f"Un contribuable existe déjà avec le téléphone {telephone}.")
+        self.telephones.add(cle)
+        return Contribuable(
+            nom=_texte(ligne, "nom", obligatoire=True, longueur=100),
+            prenom=_texte(ligne, "prenom", obligatoire=True, longueur=150),
+            telephone=telephone,
+            telephone_e164=normaliser_telephone(telephone),
+            date_naissance=_date(ligne, "date_naissance", obligatoire=False),
+            lieu_naissance=_texte(ligne, "lieu_naissance", longueur=255),
+            nationalite=_texte(ligne, "nationalite", longueur=100) or "Togolaise",
+        )
+
+
+class ImporteurBoutiques(Importeur):
+    modele = BoutiqueMagasin
+    colonnes = [
+        "matricule", "emplacement", "type_local", "superficie_m2", "prix_location_mensuel",
+        "prix_location_annuel", "telephone_contribuable", "activite_vendue", "matricule_agent",
+    ]
+
+    def charger_references(self):
+        self.emplacements = _index_emplacements()
+        self.types = {normaliser(code): code for code, _ in BoutiqueMagasin.TYPE_LOCAL_CHOICES}
+        for code, nom in TypeLocal.objects.filter(est_actif=True).order_by().values_list("code", "nom"):
+            self.types[normaliser(code)] = code
+            self.types[normaliser(nom)] = code
+        self.matricules = {normaliser(m) for m in BoutiqueMagasin.objects.order_by().values_list("matricule", flat=True)}
+        self.agents = _index_agents()
+        self.contribuables = _index_contribuables()
+        self.creees = []
+
+    def construire(self, ligne):
+        matricule = _texte(ligne, "matricule", obligatoire=True, longueur=50)
+        if normaliser(matricule) in self.matricules:
+            raise ErreurLigne(f"Matricule déjà utilisé : {matricule}.")
+        telephone = _telephone(ligne.get("telephone_contribuable"))
+        contribuable_id = None
+        if telephone:
+            contribuable_id = self.contribuables.get(telephone)
+            if contribuable_id is None:
+                raise ErreurLigne(f"Aucun contribuable avec le téléphone {ligne.get('telephone_contribuable')}.")
+        boutique = BoutiqueMagasin(
+            matricule=matricule,
+            emplacement_id=_chercher(self.emplacements, _texte(ligne, "emplacement"), "Emplacement"),
+            type_local=_chercher(self.types, _texte(ligne, "type_local") or "boutique", "Type de local"),
+            superficie_m2=_montant(ligne, "superficie_m2", BoutiqueMagasin, obligatoire=False) or 0,
+            prix_location_mensuel=_montant(ligne, "prix_location_mensuel", BoutiqueMagasin),
+            prix_location_annuel=_montant(ligne, "prix_location_annuel", BoutiqueMagasin, obligatoire=False),
+            contribuable_id=contribuable_id,
+            activite_vendue=_texte(ligne, "activite_vendue", longueur=255),
+            agent_collecteur_id=_chercher(
+                self.agents, _texte(ligne, "matricule_agent"), "Agent collecteur", obligatoire=False
+            ),
+        )
+        self.matricules.add(normaliser(matricule))
+        return boutique
+
+    def ecrire(self, objets):
+        super().ecrire(objets)
+        self.creees.extend(b.matricule for b in objets)
+
+    def terminer(self):
+        # Comme le signal post_save : cotisation de l'année courante des boutiques occupées
+        annee = timezone.now().year
+        for debut in range(0, len(self.creees), TAILLE_LOT):
+            generer_cotisations_boutiques(
+                annee,
+                boutiques=BoutiqueMagasin.objects.filter(
+                    matricule__in=self.creees[debut:debut + TAILLE_LOT], est_actif=True, contribuable__isnull=False
+                ),
+            )
+        for mois in mois_de_l_annee(annee):
+            rafraichir_mois(mois)
+
+
+class ImporteurPaiements(Importeur):
+    """Paiements historiques de cotisations de boutiques (les cotisations manquantes sont créées)."""
+
+    modele = PaiementCotisation
+    colonnes = ["matricule_boutique", "annee", "mois", "montant_paye", "date_paiement", "matricule_agent", "notes"]
+
+    def charger_references(self):
+        self.boutiques = {
+            normaliser(m): i for i, m in BoutiqueMagasin.objects.order_by().values_list("id", "matricule")
+        }
+        self.cotisations = {
+            (b, a): i for i, b, a in CotisationAnnuelle.objects.order_by().values_list("id", "boutique_id", "annee")
+        }
+        self.deja_payes = set(
+            PaiementCotisation.objects.order_by().values_list("cotisation_annuelle__boutique_id", "cotisation_annuelle__annee", "mois")
+        )
+        self.agents = _index_agents()
+        self.mois_touches = set()
+        self.annees_creees = set()
+
+    def construire(self, ligne):
+        boutique_id = _chercher(self.boutiques, _texte(ligne, "matricule_boutique"), "Boutique")
+        annee = _entier(ligne, "annee", 2000, 2100)
+        mois = _entier(ligne, "mois", 1, 12)
+        if (boutique_id, annee, mois) in self.deja_payes:
+            raise ErreurLigne(f"Le mois {mois}/{annee} est déjà payé pour cette boutique.")
+        date_paiement = _date(ligne, "date_paiement", obligatoire=False) or date(annee, mois, 1)
+        paiement = PaiementCotisation(
+            mois=mois,
+            montant_paye=_montant(ligne, "montant_paye", PaiementCotisation),
+            date_paiement=timezone.make_aware(datetime.combine(date_paiement, datetime.min.time())),
+            encaisse_par_agent_id=_chercher(
+                self.agents, _texte(ligne, "matricule_agent"), "Agent collecteur", obligatoire=False
+            ),
+            notes=_texte(ligne, "notes"),
+        )
+        paiement.cle_cotisation = (boutique_id, annee)
+        self.deja_payes.add((boutique_id, annee, mois))
+        return paiement
+
+    def ecrire(self, objets):
+        manquantes = {o.cle_cotisation for o in objets} - set(self.cotisations)
+        for annee in {a for _, a in manquantes}:
+            generer_cotisations_boutiques(
+                annee, boutiques=BoutiqueMagasin.objects.filter(id__in=[b for b, a in manquantes if a == annee])
+            )
+            self.annees_creees.add(annee)
+        if manquantes:
+            self.cotisations.update({
+                (b, a): i for i, b, a in CotisationAnnuelle.objects.filter(
+                    boutique_id__in={b for b, _ in manquantes}
+                ).order_by().values_list("id", "boutique_id", "annee")
+            })
+        for objet in objets:
+            objet.cotisation_annuelle_id = self.cotisations[objet.cle_cotisation]
+            self.mois_touches.add(date(objet.cle_cotisation[1], objet.mois, 1))
+        super().ecrire(objets)
+        # Comme le signal post_save : le versement que les reçus attestent
+        VersementCotisation.objects.bulk_create(
+            [
+                VersementCotisation(
+                    cotisation_annuelle_id=o.cotisation_annuelle_id, mois=o.mois, montant_paye=o.montant_paye,
+                    date_paiement=o.date_paiement, encaisse_par_agent_id=o.encaisse_par_agent_id,
+                )
+                for o in objets
+            ],
+            batch_size=TAILLE_LOT,
+        )
+
+    def terminer(self):
+        # Cotisations créées : leur dû porte sur les 12 mois de l'année, pas seulement les mois payés
+        for annee in self.annees_creees:
+            self.mois_touches.update(mois_de_l_annee(annee))
+        for mois in sorted(self.mois_touches):
+            rafraichir_mois(mois)
+
+
+class ImporteurTickets(Importeur):
+    modele = TicketMarche
+    colonnes = ["date", "emplacement", "nom_vendeur", "telephone_vendeur", "montant", "matricule_agent", "notes"]
+
+    def charger_references(self):
+        self.emplacements = _index_emplacements()
+        self.contribuables = _index_contribuables()
+        self.agents = _index_agents()
+        self.mois_touches = set()
+
+    def construire(self, ligne):
+        jour = _date(ligne, "date")
+        telephone = _texte(ligne, "telephone_vendeur", longueur=30)
+        ticket = TicketMarche(
+            date=jour,
+            emplacement_id=_chercher(self.emplacements, _texte(ligne, "emplacement"), "Emplacement"),
+            contribuable_id=self.contribuables.get(_telephone(telephone)) if telephone else None,
+            nom_vendeur=_texte(ligne, "nom_vendeur", obligatoire=True, longueur=255),
+            telephone_vendeur=telephone,
+            montant=_montant(ligne, "montant", TicketMarche),
+            encaisse_par_agent_id=_chercher(
+                self.agents, _texte(ligne, "matricule_agent"), "Agent collecteur", obligatoire=False
+            ),
+            notes=_texte(ligne, "notes"),
+        )
+        self.mois_touches.add(date(jour.year, jour.month, 1))
+        return ticket
+
+    def terminer(self):
+        for mois in sorted(self.mois_touches):
+            rafraichir_mois(mois)
+
+
+IMPORTEURS = {
+    "contribuables": ("Contribuables", ImporteurContribuables),
+    "boutiques": ("Boutiques / magasins", ImporteurBoutiques),
+    "paiements": ("Paiements de cotisations (historique)", ImporteurPaiements),
+    "tickets": ("Tickets marché (historique)", ImporteurTickets),
+}
+
+
+def importer_fichier(type_import, fichier, nom_fichier, simulation=False):
+    """Importe un fichier CSV / XLSX ; retourne un RapportImport."""
+    if type_import not in IMPORTEURS:
+        raise ValueError(f"Type d'import inconnu : {type_import}")
+    rapport = RapportImport(type_import, simulation=simulation)
+    try:
+        return IMPORTEURS[type_import][1]().importer(lire_lignes(fichier, nom_fichier), rapport)
+    except UnicodeDecodeError:
+        raise ValueError(
+            f"Fichier illisible après la ligne {rapport.lignes_lues + 1} : enregistrez le CSV en UTF-8."
+        )
+    except zipfile.BadZipFile:
+        raise ValueError("Fichier Excel invalide (format .xlsx attendu).")
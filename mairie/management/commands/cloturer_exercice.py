@@ -0,0 +1,47 @@
+"""
+Clôture d'un exercice terminé (voir mairie.archives) : les paiements de cotisation et les
+tickets marché de l'année passent dans les tables d'archives, les soldes des cotisations et les
+faits de recettes mensuelles restent inchangés.
+
+À lancer une fois par an, après l'encaissement des derniers arriérés de l'exercice ; la
+commande peut être relancée pour archiver les paiements encaissés depuis la clôture.
+
+Usage:
+    python manage.py cloturer_exercice 2024 --simulation   # compter sans rien déplacer
+    python manage.py cloturer_exercice 2024
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from mairie.archives import TAILLE_LOT, cloturer_exercice
+
+
+class Command(BaseCommand):
+    help = "Archive les paiements et tickets d'un exercice terminé."
+
+    def add_arguments(self, parser):
+        parser.add_argument("annee", type=int, help="Année de l'exercice à clore.")
+        parser.add_argument(
+            "--simulation", action="store_true", help="Calculer le bilan puis tout annuler."
+        )
+        parser.add_argument(
+            "--taille-lot", type=int, default=TAILLE_LOT, help=f"Lignes déplacées par lot (défaut {TAILLE_LOT})."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            bilan = cloturer_exercice(
+                options["annee"], simulation=options["simulation"], taille_lot=options["taille_lot"]
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        periode = ""
+        if bilan["date_debut"]:
+            periode = f" (du {bilan['date_debut']:%d/%m/%Y} au {bilan['date_fin']:%d/%m/%Y})"
+        message = (
+            f"Exercice {options['annee']} : {bilan['paiements']} paiement(s) et {bilan['tickets']} ticket(s) "
+            f"archivé(s), {bilan['montant']:,.0f} FCFA{periode}.".replace(",", " ")
+        )
+        if options["simulation"]:
+            self.stdout.write(self.style.WARNING(f"[simulation, rien n'a été modifié] {message}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
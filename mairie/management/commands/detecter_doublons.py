@@ -0,0 +1,32 @@
+"""
+Détection des doublons entre registres d'inscription (voir mairie.doublons).
+
+Les clés de blocage sont tenues à jour à chaque enregistrement ; cette commande reconstruit
+l'index après un import en masse (ou au premier déploiement) et recalcule la file d'examen.
+
+Usage:
+    python manage.py detecter_doublons --reindexer   # reconstruire les clés puis détecter
+    python manage.py detecter_doublons               # détecter sur les clés existantes
+"""
+from django.core.management.base import BaseCommand
+
+from mairie.doublons import detecter_doublons, reindexer
+from mairie.models import DoublonPotentiel
+
+
+class Command(BaseCommand):
+    help = "Recherche les fiches probablement en double entre les registres d'inscription."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reindexer", action="store_true", help="Reconstruire les clés de blocage à partir des registres."
+        )
+
+    def handle(self, *args, **options):
+        if options["reindexer"]:
+            self.stdout.write(f"{reindexer()} clé(s) de blocage indexée(s).")
+        paires = detecter_doublons()
+        a_examiner = DoublonPotentiel.objects.filter(statut="a_examiner").count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(paires)} paire(s) au-dessus du seuil ; {a_examiner} doublon(s) à examiner."
+        ))
@@ -0,0 +1,53 @@
+"""
+Génère en masse les cotisations annuelles manquantes (boutiques, acteurs, institutions).
+
+À lancer au passage d'année (ex. cron le 1er janvier) ; la commande peut être relancée
+sans risque : les cotisations existantes ne sont ni dupliquées ni modifiées.
+
+Usage:
+    python manage.py generer_cotisations_annuelles                 # année courante
+    python manage.py generer_cotisations_annuelles --annee 2027 --simulation
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mairie.cotisations import generer_cotisations_annuelles
+from mairie.recettes import mois_de_l_annee, rafraichir_mois
+
+LIBELLES = {
+    "boutiques": "Boutiques / magasins",
+    "acteurs": "Acteurs économiques",
+    "institutions": "Institutions financières",
+}
+
+
+class Command(BaseCommand):
+    help = "Crée toutes les cotisations annuelles manquantes d'une année (bulk_create, ré-exécutable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--annee", type=int, default=None, help="Année à générer (défaut : année courante).")
+        parser.add_argument(
+            "--simulation",
+            action="store_true",
+            help="Afficher ce qui serait créé sans rien écrire en base.",
+        )
+
+    def handle(self, *args, **options):
+        annee = options["annee"] or timezone.now().year
+        if not 2000 <= annee <= 2100:
+            raise CommandError(f"Année invalide : {annee}")
+
+        resultats = generer_cotisations_annuelles(annee, simulation=options["simulation"])
+
+        if not options["simulation"]:
+            # bulk_create ne déclenche pas les signaux : dû de l'année dans la table de faits
+            for mois in mois_de_l_annee(annee):
+                rafraichir_mois(mois)
+
+        verbe = "à créer" if options["simulation"] else "créée(s)"
+        total = 0
+        for cle, (creees, existantes) in resultats.items():
+            total += creees
+            self.stdout.write(f"  {LIBELLES[cle]:28s} {creees:6d} {verbe}, {existantes:6d} déjà présente(s)")
+        message = f"Cotisations {annee} : {total} {verbe}."
+        self.stdout.write(self.style.WARNING(message) if options["simulation"] else self.style.SUCCESS(message))
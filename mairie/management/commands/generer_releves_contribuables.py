@@ -0,0 +1,47 @@
+"""
+Génère en masse les relevés de paiement annuels (PDF) des contribuables dans une archive ZIP.
+
+Le rendu des PDF est réparti sur plusieurs processus ; le débit (relevés/s) est affiché à la fin.
+
+Usage:
+    python manage.py generer_releves_contribuables --annee 2025 --sortie releves_2025.zip
+    python manage.py generer_releves_contribuables --emplacement 3 --processus 8
+    python manage.py generer_releves_contribuables --agent 12 --annee 2025
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mairie.models import ConfigurationMairie
+from mairie_kloto_platform import releves
+
+
+class Command(BaseCommand):
+    help = "Génère les relevés de paiement annuels des contribuables (marché, zone d'agent ou tous) dans un ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--annee", type=int, default=None, help="Année des relevés (défaut : année courante).")
+        parser.add_argument("--emplacement", type=int, default=None, help="ID du marché (EmplacementMarche).")
+        parser.add_argument("--agent", type=int, default=None, help="ID de l'agent collecteur.")
+        parser.add_argument("--sortie", default=None, help="Fichier ZIP à écrire (défaut : releves_<annee>.zip).")
+        parser.add_argument("--processus", type=int, default=None, help="Nombre de processus de rendu (défaut : 4 max).")
+
+    def handle(self, *args, **options):
+        annee = options["annee"] or timezone.now().year
+        if not 2000 <= annee <= timezone.now().year:
+            raise CommandError(f"Année invalide : {annee}")
+        start, end = releves.periode_annee(annee)
+        sortie = options["sortie"] or f"releves_{annee}.zip"
+
+        contribuables = releves.contribuables_cibles(options["emplacement"], options["agent"])
+        donnees = releves.preparer_releves(contribuables, start, end)
+        if not donnees:
+            self.stdout.write(self.style.WARNING("Aucun contribuable pour ces critères."))
+            return
+        self.stdout.write(f"{len(donnees)} relevé(s) à générer ({start:%d/%m/%Y} – {end:%d/%m/%Y})…")
+
+        entete = releves.entete_pdf(ConfigurationMairie.objects.filter(est_active=True).first())
+        resume = releves.ecrire_releves_zip(donnees, entete, sortie, processus=options["processus"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resume['nombre']} relevé(s) écrit(s) dans {sortie} en {resume['duree']:.1f} s "
+            f"({resume['par_seconde']:.1f} relevés/s)."
+        ))
@@ -0,0 +1,53 @@
+"""
+Importe en masse un fichier CSV ou XLSX (contribuables, boutiques, paiements historiques, tickets).
+
+La première ligne du fichier contient les noms de colonnes (voir mairie.importation, attribut
+`colonnes` de chaque importeur). Les lignes invalides sont ignorées et listées dans le rapport.
+
+Usage:
+    python manage.py importer_donnees boutiques boutiques_marche_central.xlsx
+    python manage.py importer_donnees paiements historique_2024.csv --simulation --rapport erreurs.csv
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from mairie.importation import IMPORTEURS, importer_fichier
+
+
+class Command(BaseCommand):
+    help = "Importe un fichier CSV / XLSX de contribuables, boutiques, paiements ou tickets (bulk_create par lots)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("type_import", choices=sorted(IMPORTEURS), help="Type de données à importer.")
+        parser.add_argument("fichier", help="Chemin du fichier CSV (séparateur ; ou ,) ou XLSX.")
+        parser.add_argument(
+            "--simulation",
+            action="store_true",
+            help="Valider le fichier sans rien écrire en base.",
+        )
+        parser.add_argument("--rapport", default=None, help="Écrire les erreurs dans ce fichier CSV.")
+
+    def handle(self, *args, **options):
+        try:
+            fichier = open(options["fichier"], "rb")
+        except OSError as exc:
+            raise CommandError(f"Impossible d'ouvrir le fichier : {exc}")
+        with fichier:
+            rapport = importer_fichier(
+                options["type_import"], fichier, options["fichier"], simulation=options["simulation"]
+            )
+
+        for numero, message in rapport.erreurs[:20]:
+            self.stdout.write(self.style.ERROR(f"  Ligne {numero} : {message}"))
+        if rapport.nb_erreurs > 20:
+            self.stdout.write(f"  … et {rapport.nb_erreurs - 20} autre(s) erreur(s).")
+        if options["rapport"] and rapport.erreurs:
+            with open(options["rapport"], "w", encoding="utf-8-sig", newline="") as sortie:
+                sortie.write(rapport.erreurs_csv())
+            self.stdout.write(f"Rapport d'erreurs écrit dans {options['rapport']}.")
+
+        verbe = "valide(s) (simulation)" if options["simulation"] else "importée(s)"
+        message = (
+            f"{IMPORTEURS[options['type_import']][0]} : {rapport.lignes_lues} ligne(s) lue(s), "
+            f"{rapport.creees} {verbe}, {rapport.nb_erreurs} rejetée(s)."
+        )
+        self.stdout.write(self.style.SUCCESS(message) if not rapport.erreurs else self.style.WARNING(message))
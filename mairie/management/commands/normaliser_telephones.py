@@ -0,0 +1,32 @@
+"""
+Recalcule la colonne `telephone_e164` (recherche par téléphone, voir mairie.telephones) des
+contribuables, acteurs économiques, institutions financières et membres de la diaspora.
+
+La colonne est tenue à jour à chaque enregistrement ; la commande sert après une écriture en
+masse qui ne passe pas par save() (update(), import SQL...) :
+    python manage.py normaliser_telephones
+"""
+from django.core.management.base import BaseCommand
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from diaspora.models import MembreDiaspora
+from mairie.models import Contribuable
+from mairie.telephones import remplir_telephones_e164
+
+# modèle : champ saisi d'où est tiré le numéro E.164
+SOURCES = [
+    (Contribuable, "telephone"),
+    (ActeurEconomique, "telephone1"),
+    (InstitutionFinanciere, "telephone1"),
+    (MembreDiaspora, "telephone_whatsapp"),
+]
+
+
+class Command(BaseCommand):
+    help = "Recalcule les numéros de téléphone normalisés (E.164) utilisés par les recherches."
+
+    def handle(self, *args, **options):
+        for modele, champ in SOURCES:
+            modifiees = remplir_telephones_e164(modele, champ)
+            self.stdout.write(f"{modele._meta.verbose_name_plural} : {modifiees} numéro(s) mis à jour.")
+        self.stdout.write(self.style.SUCCESS("Numéros de téléphone normalisés."))
@@ -23,6 +23,7 @@ from mairie.models import (
     PaiementCotisation,
     TicketMarche,
 )
+from mairie.cotisations import generer_cotisations_boutiques
 
 
 class Command(BaseCommand):
@@ -259,16 +260,17 @@ class Command(BaseCommand):
         # --- 4. Cotisations annuelles (2024 et 2025) + paiements mensuels ---
         self.stdout.write(self.style.SUCCESS("Création des cotisations annuelles et paiements mensuels..."))
         annee_courante = date.today().year
+        ids_boutiques = [b.id for b in boutiques]
         for annee in (annee_courante - 1, annee_courante):
+            generer_cotisations_boutiques(annee, boutiques=BoutiqueMagasin.objects.filter(id__in=ids_boutiques))
+            cotisations = {
+                c.boutique_id: c
+                for c in CotisationAnnuelle.objects.filter(boutique_id__in=ids_boutiques, annee=annee)
+            }
             for b in boutiques:
-                montant_annuel = b.get_prix_annuel()
-                cot, created = CotisationAnnuelle.objects.get_or_create(
-                    boutique=b,
-                    annee=annee,
-                    defaults={"montant_annuel_du": montant_annuel},
-                )
-                if not created and force:
-                    cot.montant_annuel_du = montant_annuel
+                cot = cotisations[b.id]
+                if force and cot.montant_annuel_du != b.get_prix_annuel():
+                    cot.montant_annuel_du = b.get_prix_annuel()
                     cot.save()
                 # Paiements mensuels : pour 2025, simuler quelques mois payés (1 à 6)
                 if annee == annee_courante:
@@ -0,0 +1,51 @@
+"""
+Reconstruit la table de faits des recettes mensuelles (FaitRecetteMensuelle).
+
+Les paiements enregistrés par l'application mettent déjà à jour leur mois ; cette commande
+sert après un import en masse, une réaffectation de boutiques, ou en cron de nuit.
+
+Usage:
+    python manage.py rafraichir_faits_recettes                  # année courante
+    python manage.py rafraichir_faits_recettes --annee 2025
+    python manage.py rafraichir_faits_recettes --mois 2026-03
+    python manage.py rafraichir_faits_recettes --depuis 2020    # toutes les années depuis 2020
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mairie.recettes import mois_de_l_annee, rafraichir_mois
+
+
+class Command(BaseCommand):
+    help = "Recalcule la table de faits des recettes mensuelles pour une année, un mois ou une période."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--annee", type=int, default=None, help="Année à recalculer (défaut : année courante).")
+        parser.add_argument("--mois", default=None, help="Mois à recalculer (AAAA-MM).")
+        parser.add_argument("--depuis", type=int, default=None, help="Recalculer toutes les années depuis celle-ci.")
+
+    def handle(self, *args, **options):
+        annee_courante = timezone.now().year
+        if options["mois"]:
+            try:
+                liste_mois = [datetime.strptime(options["mois"], "%Y-%m").date()]
+            except ValueError:
+                raise CommandError(f"Mois invalide : {options['mois']} (attendu AAAA-MM)")
+        elif options["depuis"]:
+            if not 2000 <= options["depuis"] <= annee_courante:
+                raise CommandError(f"Année invalide : {options['depuis']}")
+            liste_mois = [m for a in range(options["depuis"], annee_courante + 1) for m in mois_de_l_annee(a)]
+        else:
+            annee = options["annee"] or annee_courante
+            if not 2000 <= annee <= 2100:
+                raise CommandError(f"Année invalide : {annee}")
+            liste_mois = mois_de_l_annee(annee)
+
+        lignes = 0
+        for mois in liste_mois:
+            lignes += rafraichir_mois(mois)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(liste_mois)} mois recalculé(s), {lignes} ligne(s) de faits."
+        ))
@@ -0,0 +1,62 @@
+"""
+Index trigrammes (pg_trgm) pour les recherches `icontains` du tableau de bord.
+
+Sous PostgreSQL, Django traduit `champ__icontains=q` en `UPPER("champ"::text) LIKE UPPER('%q%')` :
+un index B-tree ne peut pas servir, un index GIN trigramme sur la même expression oui.
+Sans effet sur SQLite.
+"""
+from django.db import migrations
+
+# (table, colonnes recherchées avec icontains dans mairie_kloto_platform/views.py)
+COLONNES_RECHERCHE = [
+    ("acteurs_acteureconomique", ["raison_sociale", "sigle", "nom_responsable", "email", "telephone1"]),
+    ("acteurs_institutionfinanciere", ["nom_institution", "sigle", "nom_responsable", "email", "telephone1"]),
+    ("acteurs_sitetouristique", ["nom_site"]),
+    ("emploi_profilemploi", ["nom", "prenoms", "email", "telephone1", "domaine_competence"]),
+    ("diaspora_membrediaspora", ["nom", "prenoms", "email", "telephone_whatsapp", "profession_actuelle", "domaine_formation"]),
+    ("osc_organisationsocietecivile", ["nom_osc", "sigle", "email", "telephone"]),
+    ("mairie_contribuable", ["nom", "prenom", "telephone"]),
+    ("mairie_boutiquemagasin", ["matricule"]),
+    ("mairie_agentcollecteur", ["matricule", "nom", "prenom", "telephone"]),
+    ("mairie_ticketmarche", ["nom_vendeur"]),
+    ("mairie_appeloffre", ["titre", "reference"]),
+]
+
+
+def _nom_index(table, colonne):
+    return f"{table}_{colonne}_trgm"[:63]
+
+
+def creer_index_trigrammes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, colonnes in COLONNES_RECHERCHE:
+        for colonne in colonnes:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{_nom_index(table, colonne)}" '
+                f'ON "{table}" USING gin (UPPER("{colonne}"::text) gin_trgm_ops)'
+            )
+
+
+def supprimer_index_trigrammes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, colonnes in COLONNES_RECHERCHE:
+        for colonne in colonnes:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{_nom_index(table, colonne)}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0037_typelocal'),
+        ('acteurs', '0010_sitetouristique_photo_2_sitetouristique_photo_3_and_more'),
+        ('diaspora', '0001_initial'),
+        ('emploi', '0004_profilemploi_service_citoyen_obligatoire'),
+        ('osc', '0002_add_papiers_justificatifs'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index_trigrammes, supprimer_index_trigrammes),
+    ]
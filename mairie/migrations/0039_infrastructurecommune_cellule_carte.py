@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+from django.db import migrations, models
+
+from mairie.geohash import encoder_geohash
+
+
+def calculer_cellules(apps, schema_editor):
+    InfrastructureCommune = apps.get_model('mairie', 'InfrastructureCommune')
+    a_jour = []
+    for infra in InfrastructureCommune.objects.only('latitude', 'longitude'):
+        infra.cellule_carte = encoder_geohash(infra.latitude, infra.longitude)
+        a_jour.append(infra)
+    InfrastructureCommune.objects.bulk_update(a_jour, ['cellule_carte'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0038_index_trigrammes_postgresql'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='infrastructurecommune',
+            name='cellule_carte',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Géohash du point (index de grille pour la carte), calculé automatiquement.', max_length=12),
+        ),
+        migrations.RunPython(calculer_cellules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0039_infrastructurecommune_cellule_carte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaitRecetteMensuelle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois concerné.')),
+                ('type_recette', models.CharField(choices=[('cotisation_boutique', 'Cotisations boutiques / magasins'), ('ticket_marche', 'Tickets marché'), ('cotisation_acteur', 'Cotisations acteurs économiques'), ('cotisation_institution', 'Cotisations institutions financières')], max_length=30)),
+                ('montant_du', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('montant_encaisse', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nb_redevables', models.PositiveIntegerField(default=0, help_text="Nombre de cotisations (ou tickets) à l'origine du montant dû.")),
+                ('nb_encaissements', models.PositiveIntegerField(default=0)),
+                ('date_calcul', models.DateTimeField(auto_now=True)),
+                ('agent', models.ForeignKey(blank=True, help_text="Agent collecteur (assigné pour le dû, encaisseur pour l'encaissé).", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='faits_recettes', to='mairie.agentcollecteur')),
+                ('emplacement', models.ForeignKey(blank=True, help_text='Marché ou place publique (vide pour les acteurs et institutions).', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='faits_recettes', to='mairie.emplacementmarche')),
+            ],
+            options={
+                'verbose_name': 'Fait de recette mensuelle',
+                'verbose_name_plural': 'Faits de recettes mensuelles',
+                'ordering': ['-mois', 'type_recette'],
+                'indexes': [models.Index(fields=['mois', 'type_recette'], name='mairie_fait_mois_00423f_idx'), models.Index(fields=['emplacement', 'mois'], name='mairie_fait_emplace_7ae0a3_idx'), models.Index(fields=['agent', 'mois'], name='mairie_fait_agent_i_271d27_idx')],
+                'unique_together': {('mois', 'emplacement', 'agent', 'type_recette')},
+            },
+        ),
+    ]
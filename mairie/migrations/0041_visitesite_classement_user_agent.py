@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+from mairie.agents_utilisateurs import classer_user_agent
+
+
+def classer_visites(apps, schema_editor):
+    # Une mise à jour par user-agent distinct (peu nombreux) plutôt qu'une par visite
+    VisiteSite = apps.get_model('mairie', 'VisiteSite')
+    for user_agent in VisiteSite.objects.order_by().values_list('user_agent', flat=True).distinct():
+        est_robot, type_appareil = classer_user_agent(user_agent)
+        VisiteSite.objects.filter(user_agent=user_agent).update(est_robot=est_robot, type_appareil=type_appareil)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0040_faitrecettemensuelle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitesite',
+            name='est_robot',
+            field=models.BooleanField(default=False, editable=False, help_text="Robot d'indexation ou script, d'après le user-agent (calculé automatiquement)."),
+        ),
+        migrations.AddField(
+            model_name='visitesite',
+            name='type_appareil',
+            field=models.CharField(blank=True, choices=[('ordinateur', 'Ordinateur'), ('mobile', 'Mobile'), ('tablette', 'Tablette'), ('robot', 'Robot'), ('inconnu', 'Inconnu')], editable=False, help_text="Type d'appareil, d'après le user-agent (calculé automatiquement).", max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='visitesite',
+            index=models.Index(fields=['est_robot', 'date'], name='mairie_visi_est_rob_d5901c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitesite',
+            index=models.Index(fields=['type_appareil', 'date'], name='mairie_visi_type_ap_9689e3_idx'),
+        ),
+        migrations.RunPython(classer_visites, migrations.RunPython.noop),
+    ]
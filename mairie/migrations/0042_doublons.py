@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0041_visitesite_classement_user_agent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleDoublon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_fiche', models.CharField(choices=[('acteur', 'Acteur économique'), ('institution', 'Institution financière'), ('emploi', 'Profil emploi'), ('diaspora', 'Membre de la diaspora'), ('contribuable', 'Contribuable')], max_length=20)),
+                ('fiche_id', models.PositiveIntegerField()),
+                ('nature', models.CharField(choices=[('telephone', 'Téléphone'), ('email', 'Email'), ('nom', 'Nom')], max_length=10)),
+                ('cle', models.CharField(max_length=255)),
+                ('valeur', models.CharField(blank=True, help_text='Valeur normalisée complète (nom sans accents...), utilisée pour le score.', max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Clé de doublon',
+                'verbose_name_plural': 'Clés de doublons',
+                'indexes': [models.Index(fields=['nature', 'cle'], name='mairie_cled_nature_1b93dc_idx'), models.Index(fields=['type_fiche', 'fiche_id'], name='mairie_cled_type_fi_88e374_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoublonPotentiel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_a', models.CharField(choices=[('acteur', 'Acteur économique'), ('institution', 'Institution financière'), ('emploi', 'Profil emploi'), ('diaspora', 'Membre de la diaspora'), ('contribuable', 'Contribuable')], max_length=20)),
+                ('id_a', models.PositiveIntegerField()),
+                ('type_b', models.CharField(choices=[('acteur', 'Acteur économique'), ('institution', 'Institution financière'), ('emploi', 'Profil emploi'), ('diaspora', 'Membre de la diaspora'), ('contribuable', 'Contribuable')], max_length=20)),
+                ('id_b', models.PositiveIntegerField()),
+                ('score', models.DecimalField(decimal_places=3, max_digits=4)),
+                ('motifs', models.CharField(blank=True, max_length=255)),
+                ('statut', models.CharField(choices=[('a_examiner', 'À examiner'), ('confirme', 'Doublon confirmé'), ('ecarte', 'Écarté (personnes différentes)')], default='a_examiner', max_length=20)),
+                ('date_detection', models.DateTimeField(auto_now_add=True)),
+                ('date_traitement', models.DateTimeField(blank=True, null=True)),
+                ('traite_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doublons_traites', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Doublon potentiel',
+                'verbose_name_plural': 'Doublons potentiels',
+                'ordering': ['-score', '-date_detection'],
+                'indexes': [models.Index(fields=['statut', 'score'], name='mairie_doub_statut_790ee7_idx')],
+                'unique_together': {('type_a', 'id_a', 'type_b', 'id_b')},
+            },
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0043_telephone_e164'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotisationannuelle',
+            name='montant_paye_archive',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).", max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cotisationannuelleacteur',
+            name='montant_paye_archive',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).", max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cotisationannuelleinstitution',
+            name='montant_paye_archive',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).", max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='ExerciceClos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('annee', models.PositiveIntegerField(help_text="Année de l'exercice clos.", unique=True)),
+                ('date_debut', models.DateField(blank=True, help_text='Plus ancienne date de paiement ou de ticket archivée.', null=True)),
+                ('date_fin', models.DateField(blank=True, help_text='Plus récente date de paiement ou de ticket archivée.', null=True)),
+                ('nb_paiements_archives', models.PositiveIntegerField(default=0)),
+                ('nb_tickets_archives', models.PositiveIntegerField(default=0)),
+                ('montant_archive', models.DecimalField(decimal_places=2, default=0, help_text='Montant total des paiements et tickets archivés (FCFA).', max_digits=14)),
+                ('date_cloture', models.DateTimeField(default=django.utils.timezone.now, help_text='Date de la dernière clôture (une année close peut être clôturée de nouveau).')),
+                ('cloture_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exercice clos',
+                'verbose_name_plural': 'Exercices clos',
+                'ordering': ['-annee'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaiementCotisationActeurArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('montant_paye', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date_paiement', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cotisation_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paiements_archives', to='mairie.cotisationannuelleacteur')),
+                ('encaisse_par_agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Paiement de cotisation archivé (acteur économique)',
+                'verbose_name_plural': 'Paiements de cotisation archivés (acteurs économiques)',
+                'ordering': ['-date_paiement', 'cotisation_annuelle'],
+                'indexes': [models.Index(fields=['date_paiement'], name='mairie_paie_date_pa_96ff15_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaiementCotisationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('mois', models.PositiveSmallIntegerField(choices=[(1, 'Mois 1'), (2, 'Mois 2'), (3, 'Mois 3'), (4, 'Mois 4'), (5, 'Mois 5'), (6, 'Mois 6'), (7, 'Mois 7'), (8, 'Mois 8'), (9, 'Mois 9'), (10, 'Mois 10'), (11, 'Mois 11'), (12, 'Mois 12')])),
+                ('montant_paye', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date_paiement', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cotisation_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paiements_archives', to='mairie.cotisationannuelle')),
+                ('encaisse_par_agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Paiement de cotisation archivé (mois)',
+                'verbose_name_plural': 'Paiements de cotisation archivés (mois)',
+                'ordering': ['cotisation_annuelle', 'mois'],
+                'indexes': [models.Index(fields=['date_paiement'], name='mairie_paie_date_pa_576adf_idx'), models.Index(fields=['encaisse_par_agent', 'date_paiement'], name='mairie_paie_encaiss_9f7728_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaiementCotisationInstitutionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('montant_paye', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date_paiement', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cotisation_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paiements_archives', to='mairie.cotisationannuelleinstitution')),
+                ('encaisse_par_agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Paiement de cotisation archivé (institution financière)',
+                'verbose_name_plural': 'Paiements de cotisation archivés (institutions financières)',
+                'ordering': ['-date_paiement', 'cotisation_annuelle'],
+                'indexes': [models.Index(fields=['date_paiement'], name='mairie_paie_date_pa_ae7a03_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TicketMarcheArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('nom_vendeur', models.CharField(max_length=255)),
+                ('telephone_vendeur', models.CharField(blank=True, max_length=30)),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('notes', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField()),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now)),
+                ('contribuable', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.contribuable')),
+                ('emplacement', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mairie.emplacementmarche')),
+                ('encaisse_par_agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Ticket marché archivé',
+                'verbose_name_plural': 'Tickets marché archivés',
+                'ordering': ['-date', '-date_creation'],
+                'indexes': [models.Index(fields=['date'], name='mairie_tick_date_4f8fa0_idx'), models.Index(fields=['encaisse_par_agent', 'date'], name='mairie_tick_encaiss_c24aba_idx')],
+            },
+        ),
+    ]
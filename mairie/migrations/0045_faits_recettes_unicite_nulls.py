@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def supprimer_doublons(apps, schema_editor):
+    """Cellules en double (marché ou agent NULL) : seule la ligne la plus récente est gardée."""
+    FaitRecetteMensuelle = apps.get_model('mairie', 'FaitRecetteMensuelle')
+    doublons = (
+        FaitRecetteMensuelle.objects.order_by()
+        .values('mois', 'emplacement_id', 'agent_id', 'type_recette')
+        .annotate(nombre=Count('id'), garder=Max('id'))
+        .filter(nombre__gt=1)
+    )
+    for cellule in doublons:
+        FaitRecetteMensuelle.objects.filter(
+            mois=cellule['mois'], emplacement_id=cellule['emplacement_id'],
+            agent_id=cellule['agent_id'], type_recette=cellule['type_recette'],
+        ).exclude(pk=cellule['garder']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0044_archives_exercices'),
+    ]
+
+    operations = [
+        migrations.RunPython(supprimer_doublons, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='faitrecettemensuelle',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='faitrecettemensuelle',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', False), ('emplacement__isnull', False)), fields=('mois', 'emplacement', 'agent', 'type_recette'), name='fait_recette_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='faitrecettemensuelle',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', False), ('emplacement__isnull', True)), fields=('mois', 'agent', 'type_recette'), name='fait_recette_unique_sans_marche'),
+        ),
+        migrations.AddConstraint(
+            model_name='faitrecettemensuelle',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', True), ('emplacement__isnull', False)), fields=('mois', 'emplacement', 'type_recette'), name='fait_recette_unique_sans_agent'),
+        ),
+        migrations.AddConstraint(
+            model_name='faitrecettemensuelle',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', True), ('emplacement__isnull', True)), fields=('mois', 'type_recette'), name='fait_recette_unique_sans_marche_ni_agent'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def creer_versements(apps, schema_editor):
+    """
+    Un versement par paiement existant (vivant ou archivé), sous le même identifiant : les
+    reçus déjà imprimés (jeton « c<id> ») restent vérifiables.
+    """
+    VersementCotisation = apps.get_model('mairie', 'VersementCotisation')
+    for nom in ('PaiementCotisation', 'PaiementCotisationArchive'):
+        modele = apps.get_model('mairie', nom)
+        lignes = modele.objects.order_by('pk').values_list(
+            'pk', 'cotisation_annuelle_id', 'mois', 'montant_paye', 'date_paiement', 'encaisse_par_agent_id'
+        )
+        VersementCotisation.objects.bulk_create(
+            [
+                VersementCotisation(
+                    pk=pk, cotisation_annuelle_id=cotisation_id, mois=mois, montant_paye=montant,
+                    date_paiement=date_paiement, encaisse_par_agent_id=agent_id,
+                )
+                for pk, cotisation_id, mois, montant, date_paiement, agent_id in lignes
+            ],
+            batch_size=1000,
+        )
+    # Identifiants imposés : la séquence (PostgreSQL) repart après le plus grand
+    connexion = schema_editor.connection
+    with connexion.cursor() as curseur:
+        for sql in connexion.ops.sequence_reset_sql(no_style(), [VersementCotisation]):
+            curseur.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mairie', '0045_faits_recettes_unicite_nulls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersementCotisation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.PositiveSmallIntegerField(choices=[(1, 'Mois 1'), (2, 'Mois 2'), (3, 'Mois 3'), (4, 'Mois 4'), (5, 'Mois 5'), (6, 'Mois 6'), (7, 'Mois 7'), (8, 'Mois 8'), (9, 'Mois 9'), (10, 'Mois 10'), (11, 'Mois 11'), (12, 'Mois 12')])),
+                ('montant_paye', models.DecimalField(decimal_places=2, help_text='Montant encaissé lors de ce versement (FCFA).', max_digits=12)),
+                ('date_paiement', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cotisation_annuelle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versements', to='mairie.cotisationannuelle')),
+                ('encaisse_par_agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mairie.agentcollecteur')),
+            ],
+            options={
+                'verbose_name': 'Versement de cotisation',
+                'verbose_name_plural': 'Versements de cotisation',
+                'ordering': ['cotisation_annuelle', 'mois', 'date_paiement'],
+                'indexes': [models.Index(fields=['cotisation_annuelle', 'mois'], name='mairie_vers_cotisat_c883ad_idx'), models.Index(fields=['encaisse_par_agent', 'date_paiement'], name='mairie_vers_encaiss_a1b8f6_idx')],
+            },
+        ),
+        migrations.RunPython(creer_versements, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,10 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
 
+from .agents_utilisateurs import TYPES_APPAREIL, classer_user_agent
+from .geohash import encoder_geohash
+from .telephones import normaliser_telephone
+
 
 def validate_file_size(value):
     limit = 5 * 1024 * 1024  # 5 Mo
@@ -910,6 +914,13 @@ class InfrastructureCommune(models.Model):
         decimal_places=6,
         help_text="Longitude du point (ex: 0.627845).",
     )
+    cellule_carte = models.CharField(
+        max_length=12,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Géohash du point (index de grille pour la carte), calculé automatiquement.",
+    )
     est_active = models.BooleanField(
         default=True,
         help_text="Afficher cette infrastructure sur la carte publique.",
@@ -926,6 +937,10 @@ class InfrastructureCommune(models.Model):
     def __str__(self):
         return f"{self.nom} ({self.get_type_infrastructure_display()})"
 
+    def save(self, *args, **kwargs):
+        self.cellule_carte = encoder_geohash(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
 
 class VisiteSite(models.Model):
     """Enregistre une visite sur le site (à des fins de statistiques)."""
@@ -935,15 +950,35 @@ class VisiteSite(models.Model):
     user_agent = models.CharField(max_length=255, blank=True)
     path = models.CharField(max_length=255, blank=True)
     session_key = models.CharField(max_length=40, blank=True)
+    est_robot = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Robot d'indexation ou script, d'après le user-agent (calculé automatiquement).",
+    )
+    type_appareil = models.CharField(
+        max_length=12,
+        choices=TYPES_APPAREIL,
+        blank=True,
+        editable=False,
+        help_text="Type d'appareil, d'après le user-agent (calculé automatiquement).",
+    )
     
     class Meta:
         verbose_name = "Visite du site"
         verbose_name_plural = "Visites du site"
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["est_robot", "date"]),
+            models.Index(fields=["type_appareil", "date"]),
+        ]
 
     def __str__(self):
         return f"Visite le {self.date.strftime('%d/%m/%Y %H:%M')} sur {self.path or '/'}"
 
+    def save(self, *args, **kwargs):
+        self.est_robot, self.type_appareil = classer_user_agent(self.user_agent)
+        super().save(*args, **kwargs)
+
 
 class CampagnePublicitaire(models.Model):
     """Campagne de publicité achetée par une entreprise ou institution financière."""
@@ -1540,39 +1575,36 @@ class AgentCollecteur(models.Model):
         # Cotisations collectées (import différé pour éviter référence circulaire)
         # Utilisation de get_model pour éviter les imports circulaires
         from django.apps import apps
+        from .archives import archives_necessaires, sources
         PaiementCotisation = apps.get_model('mairie', 'PaiementCotisation')
         TicketMarche = apps.get_model('mairie', 'TicketMarche')
         PaiementCotisationActeur = apps.get_model('mairie', 'PaiementCotisationActeur')
         PaiementCotisationInstitution = apps.get_model('mairie', 'PaiementCotisationInstitution')
 
-        cotisations = PaiementCotisation.objects.filter(
-            encaisse_par_agent=self,
-            date_paiement__gte=date_debut,
-            date_paiement__lte=date_fin,
-        ).aggregate(total=Sum("montant_paye"))["total"] or 0
+        jour_debut = date_debut.date() if hasattr(date_debut, "date") else date_debut
+        jour_fin = date_fin.date() if hasattr(date_fin, "date") else date_fin
+        # Tables d'archives seulement si la période touche un exercice clos
+        archives = archives_necessaires(date_du=jour_debut, date_au=jour_fin)
+
+        total = 0
+        # Cotisations boutiques, acteurs économiques et institutions financières collectées
+        for modele in (PaiementCotisation, PaiementCotisationActeur, PaiementCotisationInstitution):
+            for source in sources(modele, archives):
+                total += source.objects.filter(
+                    encaisse_par_agent=self,
+                    date_paiement__gte=date_debut,
+                    date_paiement__lte=date_fin,
+                ).aggregate(total=Sum("montant_paye"))["total"] or 0
 
         # Tickets marché collectés
-        tickets = TicketMarche.objects.filter(
-            encaisse_par_agent=self,
-            date__gte=date_debut.date() if hasattr(date_debut, "date") else date_debut,
-            date__lte=date_fin.date() if hasattr(date_fin, "date") else date_fin,
-        ).aggregate(total=Sum("montant"))["total"] or 0
-
-        # Cotisations acteurs économiques collectées
-        cotisations_acteurs = PaiementCotisationActeur.objects.filter(
-            encaisse_par_agent=self,
-            date_paiement__gte=date_debut,
-            date_paiement__lte=date_fin,
-        ).aggregate(total=Sum("montant_paye"))["total"] or 0
-
-        # Cotisations institutions financières collectées
-        cotisations_institutions = PaiementCotisationInstitution.objects.filter(
-            encaisse_par_agent=self,
-            date_paiement__gte=date_debut,
-            date_paiement__lte=date_fin,
-        ).aggregate(total=Sum("montant_paye"))["total"] or 0
+        for source in sources(TicketMarche, archives):
+            total += source.objects.filter(
+                encaisse_par_agent=self,
+                date__gte=jour_debut,
+                date__lte=jour_fin,
+            ).aggregate(total=Sum("montant"))["total"] or 0
 
-        return cotisations + tickets + cotisations_acteurs + cotisations_institutions
+        return total
 
 
 class EmplacementMarche(models.Model):
@@ -1638,6 +1670,13 @@ class Contribuable(models.Model):
         max_length=30,
         help_text="Numéro de téléphone du contribuable.",
     )
+    telephone_e164 = models.CharField(
+        max_length=16,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Téléphone au format E.164 (+228...), calculé automatiquement pour la recherche.",
+    )
     date_naissance = models.DateField(
         blank=True,
         null=True,
@@ -1664,6 +1703,10 @@ class Contribuable(models.Model):
     def __str__(self):
         return f"{self.nom} {self.prenom}"
 
+    def save(self, *args, **kwargs):
+        self.telephone_e164 = normaliser_telephone(self.telephone)
+        super().save(*args, **kwargs)
+
     @property
     def nom_complet(self):
         return f"{self.nom} {self.prenom}".strip()
@@ -1788,6 +1831,13 @@ class CotisationAnnuelle(models.Model):
         decimal_places=2,
         help_text="Montant total dû pour l'année (FCFA).",
     )
+    montant_paye_archive = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).",
+    )
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
 
@@ -1801,10 +1851,10 @@ class CotisationAnnuelle(models.Model):
         return f"{self.boutique.matricule} - {self.annee}"
 
     def montant_paye(self):
-        """Somme des paiements enregistrés pour cette année."""
+        """Somme des paiements enregistrés pour cette année (archives de l'exercice clos comprises)."""
         from django.db.models import Sum
         result = self.paiements.aggregate(total=Sum("montant_paye"))
-        return result["total"] or 0
+        return (result["total"] or 0) + self.montant_paye_archive
 
     def reste_a_payer(self):
         """Montant restant à payer pour cette année."""
@@ -1812,9 +1862,10 @@ class CotisationAnnuelle(models.Model):
 
     def mois_payes(self):
         """Liste des numéros de mois (1-12) déjà payés."""
-        return list(
-            self.paiements.values_list("mois", flat=True).order_by("mois")
-        )
+        mois = set(self.paiements.values_list("mois", flat=True))
+        if self.montant_paye_archive:
+            mois.update(self.paiements_archives.values_list("mois", flat=True))
+        return sorted(mois)
 
 
 class PaiementCotisation(models.Model):
@@ -1874,6 +1925,46 @@ class PaiementCotisation(models.Model):
         return f"{self.cotisation_annuelle} - Mois {self.mois} ({self.montant_paye} FCFA)"
 
 
+class VersementCotisation(models.Model):
+    """
+    Somme effectivement encaissée sur un mois de cotisation, lors d'un passage de l'agent.
+    Un mois complété en plusieurs fois a un seul PaiementCotisation (son cumul) mais un versement
+    par encaissement : c'est le versement, jamais modifié ensuite, que le reçu signé atteste.
+    Créé par les signaux de PaiementCotisation (voir mairie.signals).
+    """
+    cotisation_annuelle = models.ForeignKey(
+        CotisationAnnuelle,
+        on_delete=models.CASCADE,
+        related_name="versements",
+    )
+    mois = models.PositiveSmallIntegerField(choices=PaiementCotisation.MOIS_CHOICES)
+    montant_paye = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text="Montant encaissé lors de ce versement (FCFA).",
+    )
+    date_paiement = models.DateTimeField(default=timezone.now)
+    encaisse_par_agent = models.ForeignKey(
+        "AgentCollecteur",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+
+    class Meta:
+        verbose_name = "Versement de cotisation"
+        verbose_name_plural = "Versements de cotisation"
+        ordering = ["cotisation_annuelle", "mois", "date_paiement"]
+        indexes = [
+            models.Index(fields=["cotisation_annuelle", "mois"]),
+            models.Index(fields=["encaisse_par_agent", "date_paiement"]),
+        ]
+
+    def __str__(self):
+        return f"{self.cotisation_annuelle} - Mois {self.mois} : versement de {self.montant_paye} FCFA"
+
+
 class TicketMarche(models.Model):
     """
     Ticket vendu au marché pour les petits étalages qui n'ont pas de magasin ni boutique.
@@ -1964,6 +2055,13 @@ class CotisationAnnuelleActeur(models.Model):
         decimal_places=2,
         help_text="Montant total dû pour l'année (FCFA).",
     )
+    montant_paye_archive = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).",
+    )
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
 
@@ -1977,10 +2075,10 @@ class CotisationAnnuelleActeur(models.Model):
         return f"{self.acteur.raison_sociale} - {self.annee}"
 
     def montant_paye(self):
-        """Somme des paiements enregistrés pour cette année."""
+        """Somme des paiements enregistrés pour cette année (archives de l'exercice clos comprises)."""
         from django.db.models import Sum
         result = self.paiements.aggregate(total=Sum("montant_paye"))
-        return result["total"] or Decimal("0")
+        return (result["total"] or Decimal("0")) + self.montant_paye_archive
 
     def reste_a_payer(self):
         """Montant restant à payer pour cette année."""
@@ -2006,6 +2104,13 @@ class CotisationAnnuelleInstitution(models.Model):
         decimal_places=2,
         help_text="Montant total dû pour l'année (FCFA).",
     )
+    montant_paye_archive = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Total des paiements déplacés dans les archives à la clôture de l'exercice (FCFA).",
+    )
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
 
@@ -2019,10 +2124,10 @@ class CotisationAnnuelleInstitution(models.Model):
         return f"{self.institution.nom_institution} - {self.annee}"
 
     def montant_paye(self):
-        """Somme des paiements enregistrés pour cette année."""
+        """Somme des paiements enregistrés pour cette année (archives de l'exercice clos comprises)."""
         from django.db.models import Sum
         result = self.paiements.aggregate(total=Sum("montant_paye"))
-        return result["total"] or Decimal("0")
+        return (result["total"] or Decimal("0")) + self.montant_paye_archive
 
     def reste_a_payer(self):
         """Montant restant à payer pour cette année."""
@@ -2141,4 +2246,365 @@ class TypeLocal(models.Model):
         ordering = ["nom"]
 
     def __str__(self):
-        return self.nom
\ No newline at end of file
+        return self.nom
+
+class FaitRecetteMensuelle(models.Model):
+    """
+    Table de faits des recettes (cube OLAP) : une ligne par (mois, emplacement, agent, type de recette)
+    avec le montant dû, le montant encaissé et les effectifs correspondants.
+
+    Alimentée par mairie.recettes (rafraîchissement par mois, déclenché par les signaux des tables
+    de paiement ou par la commande rafraichir_faits_recettes) ; les tableaux de bord de recettes
+    lisent cette table au lieu de ré-agréger les paiements.
+    """
+    TYPE_RECETTE_CHOICES = [
+        ("cotisation_boutique", "Cotisations boutiques / magasins"),
+        ("ticket_marche", "Tickets marché"),
+        ("cotisation_acteur", "Cotisations acteurs économiques"),
+        ("cotisation_institution", "Cotisations institutions financières"),
+    ]
+
+    mois = models.DateField(
+        help_text="Premier jour du mois concerné.",
+    )
+    emplacement = models.ForeignKey(
+        EmplacementMarche,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="faits_recettes",
+        help_text="Marché ou place publique (vide pour les acteurs et institutions).",
+    )
+    agent = models.ForeignKey(
+        "AgentCollecteur",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="faits_recettes",
+        help_text="Agent collecteur (assigné pour le dû, encaisseur pour l'encaissé).",
+    )
+    type_recette = models.CharField(
+        max_length=30,
+        choices=TYPE_RECETTE_CHOICES,
+    )
+    montant_du = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    montant_encaisse = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    nb_redevables = models.PositiveIntegerField(
+        default=0,
+        help_text="Nombre de cotisations (ou tickets) à l'origine du montant dû.",
+    )
+    nb_encaissements = models.PositiveIntegerField(default=0)
+    date_calcul = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Fait de recette mensuelle"
+        verbose_name_plural = "Faits de recettes mensuelles"
+        ordering = ["-mois", "type_recette"]
+        # Une ligne par cellule, y compris sans marché ou sans agent (NULL) : un index unique
+        # partiel par combinaison de NULL, un seul unique_together laisserait passer les doublons.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["mois", "emplacement", "agent", "type_recette"],
+                condition=models.Q(emplacement__isnull=False, agent__isnull=False),
+                name="fait_recette_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["mois", "agent", "type_recette"],
+                condition=models.Q(emplacement__isnull=True, agent__isnull=False),
+                name="fait_recette_unique_sans_marche",
+            ),
+            models.UniqueConstraint(
+                fields=["mois", "emplacement", "type_recette"],
+                condition=models.Q(emplacement__isnull=False, agent__isnull=True),
+                name="fait_recette_unique_sans_agent",
+            ),
+            models.UniqueConstraint(
+                fields=["mois", "type_recette"],
+                condition=models.Q(emplacement__isnull=True, agent__isnull=True),
+                name="fait_recette_unique_sans_marche_ni_agent",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["mois", "type_recette"]),
+            models.Index(fields=["emplacement", "mois"]),
+            models.Index(fields=["agent", "mois"]),
+        ]
+
+    def __str__(self):
+        return f"{self.mois:%m/%Y} - {self.get_type_recette_display()}"
+
+
+# ============================================================================
+# ARCHIVES DES EXERCICES CLOS
+# ============================================================================
+
+class ExerciceClos(models.Model):
+    """
+    Exercice (année civile) clos : ses paiements et tickets ont été déplacés dans les tables
+    d'archives (mairie.archives.cloturer_exercice). Les cotisations annuelles restent en place et
+    portent le total archivé (montant_paye_archive) ; les faits de recettes mensuelles sont conservés.
+    """
+    annee = models.PositiveIntegerField(
+        unique=True,
+        help_text="Année de l'exercice clos.",
+    )
+    date_debut = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Plus ancienne date de paiement ou de ticket archivée.",
+    )
+    date_fin = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Plus récente date de paiement ou de ticket archivée.",
+    )
+    nb_paiements_archives = models.PositiveIntegerField(default=0)
+    nb_tickets_archives = models.PositiveIntegerField(default=0)
+    montant_archive = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Montant total des paiements et tickets archivés (FCFA).",
+    )
+    date_cloture = models.DateTimeField(
+        default=timezone.now,
+        help_text="Date de la dernière clôture (une année close peut être clôturée de nouveau).",
+    )
+    cloture_par = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        verbose_name = "Exercice clos"
+        verbose_name_plural = "Exercices clos"
+        ordering = ["-annee"]
+
+    def __str__(self):
+        return f"Exercice {self.annee}"
+
+
+class PaiementCotisationArchive(models.Model):
+    """Paiement de cotisation (boutique / magasin) d'un exercice clos, avec son identifiant d'origine."""
+    id = models.BigIntegerField(primary_key=True)
+    cotisation_annuelle = models.ForeignKey(
+        CotisationAnnuelle,
+        on_delete=models.CASCADE,
+        related_name="paiements_archives",
+    )
+    mois = models.PositiveSmallIntegerField(choices=PaiementCotisation.MOIS_CHOICES)
+    montant_paye = models.DecimalField(max_digits=12, decimal_places=2)
+    date_paiement = models.DateTimeField()
+    encaisse_par_agent = models.ForeignKey(
+        AgentCollecteur,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    notes = models.TextField(blank=True)
+    date_archivage = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Paiement de cotisation archivé (mois)"
+        verbose_name_plural = "Paiements de cotisation archivés (mois)"
+        ordering = ["cotisation_annuelle", "mois"]
+        indexes = [
+            models.Index(fields=["date_paiement"]),
+            models.Index(fields=["encaisse_par_agent", "date_paiement"]),
+        ]
+
+    def __str__(self):
+        return f"{self.cotisation_annuelle} - Mois {self.mois} ({self.montant_paye} FCFA, archivé)"
+
+
+class TicketMarcheArchive(models.Model):
+    """Ticket marché d'un exercice clos, avec son identifiant d'origine."""
+    id = models.BigIntegerField(primary_key=True)
+    date = models.DateField()
+    emplacement = models.ForeignKey(
+        EmplacementMarche,
+        on_delete=models.PROTECT,
+        related_name="+",
+    )
+    contribuable = models.ForeignKey(
+        Contribuable,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    nom_vendeur = models.CharField(max_length=255)
+    telephone_vendeur = models.CharField(max_length=30, blank=True)
+    montant = models.DecimalField(max_digits=10, decimal_places=2)
+    encaisse_par_agent = models.ForeignKey(
+        AgentCollecteur,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    notes = models.TextField(blank=True)
+    date_creation = models.DateTimeField()
+    date_archivage = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Ticket marché archivé"
+        verbose_name_plural = "Tickets marché archivés"
+        ordering = ["-date", "-date_creation"]
+        indexes = [
+            models.Index(fields=["date"]),
+            models.Index(fields=["encaisse_par_agent", "date"]),
+        ]
+
+    def __str__(self):
+        return f"Ticket {self.date} - {self.nom_vendeur} ({self.montant} FCFA, archivé)"
+
+
+class PaiementCotisationActeurArchive(models.Model):
+    """Paiement de cotisation d'un acteur économique pour un exercice clos, avec son identifiant d'origine."""
+    id = models.BigIntegerField(primary_key=True)
+    cotisation_annuelle = models.ForeignKey(
+        CotisationAnnuelleActeur,
+        on_delete=models.CASCADE,
+        related_name="paiements_archives",
+    )
+    montant_paye = models.DecimalField(max_digits=12, decimal_places=2)
+    date_paiement = models.DateTimeField()
+    encaisse_par_agent = models.ForeignKey(
+        AgentCollecteur,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    notes = models.TextField(blank=True)
+    date_archivage = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Paiement de cotisation archivé (acteur économique)"
+        verbose_name_plural = "Paiements de cotisation archivés (acteurs économiques)"
+        ordering = ["-date_paiement", "cotisation_annuelle"]
+        indexes = [
+            models.Index(fields=["date_paiement"]),
+        ]
+
+    def __str__(self):
+        return f"{self.cotisation_annuelle} - {self.montant_paye} FCFA ({self.date_paiement.date()}, archivé)"
+
+
+class PaiementCotisationInstitutionArchive(models.Model):
+    """Paiement de cotisation d'une institution financière pour un exercice clos, avec son identifiant d'origine."""
+    id = models.BigIntegerField(primary_key=True)
+    cotisation_annuelle = models.ForeignKey(
+        CotisationAnnuelleInstitution,
+        on_delete=models.CASCADE,
+        related_name="paiements_archives",
+    )
+    montant_paye = models.DecimalField(max_digits=12, decimal_places=2)
+    date_paiement = models.DateTimeField()
+    encaisse_par_agent = models.ForeignKey(
+        AgentCollecteur,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    notes = models.TextField(blank=True)
+    date_archivage = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Paiement de cotisation archivé (institution financière)"
+        verbose_name_plural = "Paiements de cotisation archivés (institutions financières)"
+        ordering = ["-date_paiement", "cotisation_annuelle"]
+        indexes = [
+            models.Index(fields=["date_paiement"]),
+        ]
+
+    def __str__(self):
+        return f"{self.cotisation_annuelle} - {self.montant_paye} FCFA ({self.date_paiement.date()}, archivé)"
+
+
+TYPE_FICHE_CHOICES = [
+    ("acteur", "Acteur économique"),
+    ("institution", "Institution financière"),
+    ("emploi", "Profil emploi"),
+    ("diaspora", "Membre de la diaspora"),
+    ("contribuable", "Contribuable"),
+]
+
+
+class CleDoublon(models.Model):
+    """
+    Clé de blocage d'une fiche d'inscription (téléphone E.164, email, nom normalisé) : deux
+    fiches qui partagent une clé sont comparées par la détection des doublons (mairie.doublons).
+    """
+
+    NATURE_CHOICES = [
+        ("telephone", "Téléphone"),
+        ("email", "Email"),
+        ("nom", "Nom"),
+    ]
+
+    type_fiche = models.CharField(max_length=20, choices=TYPE_FICHE_CHOICES)
+    fiche_id = models.PositiveIntegerField()
+    nature = models.CharField(max_length=10, choices=NATURE_CHOICES)
+    cle = models.CharField(max_length=255)
+    valeur = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Valeur normalisée complète (nom sans accents...), utilisée pour le score.",
+    )
+
+    class Meta:
+        verbose_name = "Clé de doublon"
+        verbose_name_plural = "Clés de doublons"
+        indexes = [
+            models.Index(fields=["nature", "cle"]),
+            models.Index(fields=["type_fiche", "fiche_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type_fiche} #{self.fiche_id} - {self.nature} : {self.cle}"
+
+
+class DoublonPotentiel(models.Model):
+    """Paire de fiches probablement en double, à examiner par le personnel de la mairie."""
+
+    STATUT_CHOICES = [
+        ("a_examiner", "À examiner"),
+        ("confirme", "Doublon confirmé"),
+        ("ecarte", "Écarté (personnes différentes)"),
+    ]
+
+    type_a = models.CharField(max_length=20, choices=TYPE_FICHE_CHOICES)
+    id_a = models.PositiveIntegerField()
+    type_b = models.CharField(max_length=20, choices=TYPE_FICHE_CHOICES)
+    id_b = models.PositiveIntegerField()
+    score = models.DecimalField(max_digits=4, decimal_places=3)
+    motifs = models.CharField(max_length=255, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default="a_examiner")
+    date_detection = models.DateTimeField(auto_now_add=True)
+    date_traitement = models.DateTimeField(null=True, blank=True)
+    traite_par = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="doublons_traites",
+    )
+
+    class Meta:
+        verbose_name = "Doublon potentiel"
+        verbose_name_plural = "Doublons potentiels"
+        ordering = ["-score", "-date_detection"]
+        unique_together = [["type_a", "id_a", "type_b", "id_b"]]
+        indexes = [
+            models.Index(fields=["statut", "score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.type_a} #{self.id_a} / {self.type_b} #{self.id_b} ({self.score})"
@@ -0,0 +1,355 @@
+"""
+Table de faits des recettes mensuelles (FaitRecetteMensuelle) : alimentation et interrogation.
+
+Un mois est toujours recalculé en entier (suppression puis bulk_create de ses lignes) à partir
+de quelques requêtes GROUP BY sur les tables de cotisations et de paiements :
+- cotisations boutiques : dû = montant annuel / 12 par mois de l'année (marché et agent de la
+  boutique), encaissé = paiements du mois de cotisation (agent encaisseur) ;
+- tickets marché : dû = encaissé = tickets du jour, regroupés par mois ;
+- cotisations acteurs / institutions : dû = montant annuel / 12, encaissé = paiements du mois
+  de leur date de paiement.
+
+Les signaux (mairie.signals) marquent ce qui a changé et le recalculent après le commit :
+- un paiement ou un ticket : son mois entier ;
+- une cotisation ou une boutique (montant, année, marché, agent) : seulement les cellules de dû
+  touchées, c.-à-d. (année, marché, agent, type) avant et après la modification, recalculées
+  exactement comme par rafraichir_mois mais en quelques requêtes pour les 12 mois.
+Un rollback abandonne ce qui a été marqué pendant la transaction. La commande
+rafraichir_faits_recettes reconstruit une période (imports en masse, cron de nuit). Pour un
+exercice clos, les encaissements sont relus dans les tables d'archives (mairie.archives).
+"""
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+
+from .archives import archives_necessaires, sources
+from .models import (
+    AgentCollecteur, CotisationAnnuelle, CotisationAnnuelleActeur, CotisationAnnuelleInstitution,
+    EmplacementMarche, FaitRecetteMensuelle, PaiementCotisation, PaiementCotisationActeur,
+    PaiementCotisationInstitution, TicketMarche,
+)
+
+CENTIME = Decimal("0.01")
+
+AXES = {
+    "marche": ("emplacement_id", "Marché"),
+    "agent": ("agent_id", "Agent collecteur"),
+    "type": ("type_recette", "Type de recette"),
+}
+PERIODES = {
+    "mois": TruncMonth,
+    "trimestre": TruncQuarter,
+    "annee": TruncYear,
+}
+
+
+def premier_jour(valeur):
+    """Premier jour du mois d'une date / datetime."""
+    return date(valeur.year, valeur.month, 1)
+
+
+def mois_suivant(mois):
+    return date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def mois_de_l_annee(annee):
+    return [date(annee, m, 1) for m in range(1, 13)]
+
+
+def _ajouter(faits, cle, du=Decimal("0"), encaisse=Decimal("0"), nb_redevables=0, nb_encaissements=0):
+    fait = faits[cle]
+    fait["montant_du"] += du or Decimal("0")
+    fait["montant_encaisse"] += encaisse or Decimal("0")
+    fait["nb_redevables"] += nb_redevables
+    fait["nb_encaissements"] += nb_encaissements
+
+
+def _faits_du_mois(mois):
+    """
+    {(emplacement_id, agent_id, type_recette): valeurs} pour un mois (7 requêtes, plus 2 sur
+    ExerciceClos et celles des tables d'archives si le mois touche un exercice clos).
+    """
+    faits = defaultdict(lambda: {
+        "montant_du": Decimal("0"), "montant_encaisse": Decimal("0"),
+        "nb_redevables": 0, "nb_encaissements": 0,
+    })
+
+    # Cotisations boutiques
+    dus = (
+        CotisationAnnuelle.objects.filter(annee=mois.year).order_by()
+        .values("boutique__emplacement_id", "boutique__agent_collecteur_id")
+        .annotate(total=Sum("montant_annuel_du"), nombre=Count("id"))
+    )
+    for ligne in dus:
+        cle = (ligne["boutique__emplacement_id"], ligne["boutique__agent_collecteur_id"], "cotisation_boutique")
+        _ajouter(faits, cle, du=ligne["total"] / 12, nb_redevables=ligne["nombre"])
+    for source in sources(PaiementCotisation, archives_necessaires(annee=mois.year)):
+        encaissements = (
+            source.objects.filter(cotisation_annuelle__annee=mois.year, mois=mois.month).order_by()
+            .values("cotisation_annuelle__boutique__emplacement_id", "encaisse_par_agent_id")
+            .annotate(total=Sum("montant_paye"), nombre=Count("id"))
+        )
+        for ligne in encaissements:
+            cle = (ligne["cotisation_annuelle__boutique__emplacement_id"], ligne["encaisse_par_agent_id"], "cotisation_boutique")
+            _ajouter(faits, cle, encaisse=ligne["total"], nb_encaissements=ligne["nombre"])
+
+    # Paiements datés du mois : archives seulement si le mois touche un exercice clos
+    archives_du_mois = archives_necessaires(date_du=mois, date_au=mois_suivant(mois) - timedelta(days=1))
+
+    # Tickets marché (payés sur place : dû = encaissé)
+    for source in sources(TicketMarche, archives_du_mois):
+        tickets = (
+            source.objects.filter(date__gte=mois, date__lt=mois_suivant(mois)).order_by()
+            .values("emplacement_id", "encaisse_par_agent_id")
+            .annotate(total=Sum("montant"), nombre=Count("id"))
+        )
+        for ligne in tickets:
+            cle = (ligne["emplacement_id"], ligne["encaisse_par_agent_id"], "ticket_marche")
+            _ajouter(
+                faits, cle, du=ligne["total"], encaisse=ligne["total"],
+                nb_redevables=ligne["nombre"], nb_encaissements=ligne["nombre"],
+            )
+
+    # Cotisations acteurs et institutions (sans emplacement) ; bornes en datetime pour utiliser l'index
+    debut, fin = (
+        timezone.make_aware(datetime.combine(m, datetime.min.time())) for m in (mois, mois_suivant(mois))
+    )
+    for type_recette, cotisations, paiements in (
+        ("cotisation_acteur", CotisationAnnuelleActeur, PaiementCotisationActeur),
+        ("cotisation_institution", CotisationAnnuelleInstitution, PaiementCotisationInstitution),
+    ):
+        du = cotisations.objects.filter(annee=mois.year).order_by().aggregate(
+            total=Sum("montant_annuel_du"), nombre=Count("id")
+        )
+        if du["nombre"]:
+            _ajouter(faits, (None, None, type_recette), du=(du["total"] or 0) / 12, nb_redevables=du["nombre"])
+        for source in sources(paiements, archives_du_mois):
+            encaissements = (
+                source.objects.filter(date_paiement__gte=debut, date_paiement__lt=fin).order_by()
+                .values("encaisse_par_agent_id")
+                .annotate(total=Sum("montant_paye"), nombre=Count("id"))
+            )
+            for ligne in encaissements:
+                _ajouter(
+                    faits, (None, ligne["encaisse_par_agent_id"], type_recette),
+                    encaisse=ligne["total"], nb_encaissements=ligne["nombre"],
+                )
+    return faits
+
+
+@transaction.atomic
+def rafraichir_mois(mois):
+    """Recalcule toutes les lignes de faits d'un mois ; retourne le nombre de lignes écrites."""
+    mois = premier_jour(mois)
+    faits = _faits_du_mois(mois)
+    FaitRecetteMensuelle.objects.filter(mois=mois).delete()
+    FaitRecetteMensuelle.objects.bulk_create([
+        FaitRecetteMensuelle(
+            mois=mois,
+            emplacement_id=emplacement_id,
+            agent_id=agent_id,
+            type_recette=type_recette,
+            montant_du=valeurs["montant_du"].quantize(CENTIME),
+            montant_encaisse=valeurs["montant_encaisse"].quantize(CENTIME),
+            nb_redevables=valeurs["nb_redevables"],
+            nb_encaissements=valeurs["nb_encaissements"],
+        )
+        for (emplacement_id, agent_id, type_recette), valeurs in faits.items()
+    ])
+    return len(faits)
+
+
+def _filtre_cellules(cellules, prefixe=""):
+    """Q des lignes appartenant à l'une des cellules (emplacement_id, agent_id, type_recette)."""
+    return reduce(or_, (
+        Q(**{f"{prefixe}emplacement_id": emplacement_id, f"{prefixe}agent_id": agent_id})
+        for emplacement_id, agent_id, _ in cellules
+    ), Q())
+
+
+@transaction.atomic
+def rafraichir_dus(annee, cellules):
+    """
+    Recalcule le dû (montant_du, nb_redevables) des 12 mois de l'année pour les cellules
+    (emplacement_id, agent_id, type_recette) de cotisation données, sans toucher aux encaissements.
+    Les lignes sans dû ni encaissement sont supprimées. Retourne le nombre de lignes écrites.
+    """
+    dus = {cellule: (Decimal("0"), 0) for cellule in cellules}
+    boutiques = [c for c in cellules if c[2] == "cotisation_boutique"]
+    if boutiques:
+        lignes = (
+            CotisationAnnuelle.objects.filter(annee=annee)
+            .filter(reduce(or_, (
+                Q(boutique__emplacement_id=emplacement_id, boutique__agent_collecteur_id=agent_id)
+                for emplacement_id, agent_id, _ in boutiques
+            )))
+            .order_by()
+            .values("boutique__emplacement_id", "boutique__agent_collecteur_id")
+            .annotate(total=Sum("montant_annuel_du"), nombre=Count("id"))
+        )
+        for ligne in lignes:
+            cle = (ligne["boutique__emplacement_id"], ligne["boutique__agent_collecteur_id"], "cotisation_boutique")
+            dus[cle] = (ligne["total"] / 12, ligne["nombre"])
+    for type_recette, cotisations in (
+        ("cotisation_acteur", CotisationAnnuelleActeur),
+        ("cotisation_institution", CotisationAnnuelleInstitution),
+    ):
+        if (None, None, type_recette) in dus:
+            du = cotisations.objects.filter(annee=annee).order_by().aggregate(
+                total=Sum("montant_annuel_du"), nombre=Count("id")
+            )
+            dus[(None, None, type_recette)] = ((du["total"] or 0) / 12, du["nombre"])
+
+    liste_mois = mois_de_l_annee(annee)
+    existants = {
+        (f.mois, f.emplacement_id, f.agent_id, f.type_recette): f
+        for f in FaitRecetteMensuelle.objects.filter(
+            _filtre_cellules(cellules), mois__in=liste_mois, type_recette__in={c[2] for c in cellules}
+        )
+    }
+    maintenant = timezone.now()
+    a_creer, a_modifier, a_supprimer = [], [], []
+    for (emplacement_id, agent_id, type_recette), (du, nombre) in dus.items():
+        du = Decimal(du).quantize(CENTIME)
+        for mois in liste_mois:
+            fait = existants.get((mois, emplacement_id, agent_id, type_recette))
+            if fait is None:
+                if nombre:
+                    a_creer.append(FaitRecetteMensuelle(
+                        mois=mois, emplacement_id=emplacement_id, agent_id=agent_id, type_recette=type_recette,
+                        montant_du=du, nb_redevables=nombre,
+                    ))
+            elif not nombre and not fait.nb_encaissements:
+                a_supprimer.append(fait.pk)
+            elif (fait.montant_du, fait.nb_redevables) != (du, nombre):
+                fait.montant_du, fait.nb_redevables, fait.date_calcul = du, nombre, maintenant
+                a_modifier.append(fait)
+    if a_supprimer:
+        FaitRecetteMensuelle.objects.filter(pk__in=a_supprimer).delete()
+    if a_modifier:
+        FaitRecetteMensuelle.objects.bulk_update(a_modifier, ["montant_du", "nb_redevables", "date_calcul"])
+    if a_creer:
+        FaitRecetteMensuelle.objects.bulk_create(a_creer)
+    return len(a_creer) + len(a_modifier)
+
+
+class _RecalculsEnAttente:
+    """Mois et cellules de dû marqués pendant une transaction (dédoublonnés), recalculés au commit."""
+
+    def __init__(self):
+        self.mois = set()
+        self.dus = defaultdict(set)
+        self.traite = False
+
+    def traiter(self):
+        self.traite = True
+        while self.mois:
+            rafraichir_mois(self.mois.pop())
+        while self.dus:
+            rafraichir_dus(*self.dus.popitem())
+
+
+_en_attente = threading.local()
+
+
+def _marquer(ajouter):
+    """
+    Ajoute au lot de la transaction courante. Le lot n'est rattaché qu'à son on_commit : après un
+    rollback (on_commit abandonné par Django), la transaction suivante repart d'un lot vide.
+    """
+    lot = getattr(_en_attente, "lot", None)
+    rattache = lot is not None and not lot.traite and any(
+        rappel == lot.traiter for _, rappel, _ in transaction.get_connection().run_on_commit
+    )
+    if not rattache:
+        lot = _en_attente.lot = _RecalculsEnAttente()
+    ajouter(lot)
+    if not rattache:
+        # Hors transaction, le recalcul est immédiat
+        transaction.on_commit(lot.traiter)
+
+
+def signaler_mois(*mois):
+    """Marque des mois à recalculer entièrement dès que la transaction courante est validée."""
+    _marquer(lambda lot: lot.mois.update(premier_jour(m) for m in mois))
+
+
+def signaler_dus(annee, *cellules):
+    """Marque des cellules (emplacement_id, agent_id, type_recette) dont le dû de l'année est à recalculer."""
+    _marquer(lambda lot: lot.dus[annee].update(cellules))
+
+
+def libelle_periode(valeur, periode):
+    if periode == "mois":
+        return f"{valeur:%m/%Y}"
+    if periode == "trimestre":
+        return f"T{(valeur.month - 1) // 3 + 1} {valeur.year}"
+    return str(valeur.year)
+
+
+def interroger_recettes(axe="marche", periode="mois", annee=None, type_recette=None):
+    """
+    Tableau croisé (lignes : axe, colonnes : périodes) lu uniquement dans la table de faits.
+    Retourne {"periodes": [dates], "libelles_periodes": [...], "lignes": [{"libelle", "cellules": [{du, encaisse}], "du", "encaisse"}]}.
+    """
+    champ, _ = AXES[axe]
+    qs = FaitRecetteMensuelle.objects.order_by()
+    if annee:
+        qs = qs.filter(mois__year=annee)
+    if type_recette:
+        qs = qs.filter(type_recette=type_recette)
+    agregats = (
+        qs.annotate(periode=PERIODES[periode]("mois"))
+        .values(champ, "periode")
+        .annotate(du=Sum("montant_du"), encaisse=Sum("montant_encaisse"))
+    )
+
+    periodes = set()
+    par_cle = defaultdict(dict)
+    for ligne in agregats:
+        periodes.add(ligne["periode"])
+        par_cle[ligne[champ]][ligne["periode"]] = ligne
+    periodes = sorted(periodes)
+
+    if axe == "marche":
+        noms = {e.id: str(e) for e in EmplacementMarche.objects.filter(id__in=[c for c in par_cle if c])}
+        defaut = "Hors marché (acteurs / institutions)"
+    elif axe == "agent":
+        noms = {
+            a.id: f"{a.nom} {a.prenom}"
+            for a in AgentCollecteur.objects.filter(id__in=[c for c in par_cle if c])
+        }
+        defaut = "Non assigné"
+    else:
+        noms = dict(FaitRecetteMensuelle.TYPE_RECETTE_CHOICES)
+        defaut = "-"
+
+    lignes = []
+    for cle, cellules_par_periode in par_cle.items():
+        cellules = [
+            {
+                "du": cellules_par_periode[p]["du"] if p in cellules_par_periode else Decimal("0"),
+                "encaisse": cellules_par_periode[p]["encaisse"] if p in cellules_par_periode else Decimal("0"),
+            }
+            for p in periodes
+        ]
+        lignes.append({
+            "libelle": noms.get(cle, defaut),
+            "cellules": cellules,
+            "du": sum((c["du"] for c in cellules), Decimal("0")),
+            "encaisse": sum((c["encaisse"] for c in cellules), Decimal("0")),
+        })
+    lignes.sort(key=lambda ligne: ligne["encaisse"], reverse=True)
+    return {
+        "periodes": periodes,
+        "libelles_periodes": [libelle_periode(p, periode) for p in periodes],
+        "lignes": lignes,
+    }
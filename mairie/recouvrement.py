@@ -0,0 +1,204 @@
+"""
+Arriérés, taux de recouvrement et ancienneté des impayés des boutiques / magasins.
+
+Une seule requête ramène les lignes (cotisation, boutique, année, montant dû, mois payé,
+montant payé), une seconde les paiements archivés si une cotisation en porte ; les
+calculs sont ensuite faits sur des tableaux NumPy :
+- une matrice (cotisations × 12 mois) des montants payés ;
+- le dû mensuel (montant_annuel_du / 12) sur les seuls mois échus
+  (années passées : 12 mois, année courante : jusqu'au mois courant inclus) ;
+- pour chaque mois échu : recouvré = min(payé, dû), arriéré = dû - recouvré ;
+- l'ancienneté d'un arriéré est le nombre de mois écoulés depuis le mois concerné.
+
+Les totaux sont ensuite regroupés par marché, par agent collecteur et par type de local
+avec `np.bincount`.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import AgentCollecteur, BoutiqueMagasin, CotisationAnnuelle, EmplacementMarche, TypeLocal
+
+# (libellé, borne basse incluse, borne haute exclue) en mois d'ancienneté
+TRANCHES_ANCIENNETE = [
+    ("0-3 mois", 0, 3),
+    ("3-6 mois", 3, 6),
+    ("6-12 mois", 6, 12),
+    ("Plus de 12 mois", 12, None),
+]
+_BORNES_TRANCHES = np.array([t[1] for t in TRANCHES_ANCIENNETE[1:]])
+
+SANS_AGENT = "Non assigné"
+
+
+def _lignes(annee=None):
+    """Lignes plates (une par paiement, ou une seule ligne vide si la cotisation n'a aucun paiement)."""
+    qs = CotisationAnnuelle.objects.all()
+    if annee:
+        qs = qs.filter(annee=annee)
+
+    def lignes(cotisations, relation):
+        # Cast en flottant côté SQL : évite la conversion Decimal ligne par ligne
+        return list(
+            cotisations.order_by()
+            .annotate(
+                du_flottant=Cast("montant_annuel_du", FloatField()),
+                paye_flottant=Cast(f"{relation}__montant_paye", FloatField()),
+            )
+            .values_list(
+                "id",
+                "boutique_id",
+                "annee",
+                "du_flottant",
+                "boutique__emplacement_id",
+                "boutique__agent_collecteur_id",
+                "boutique__type_local",
+                f"{relation}__mois",
+                "paye_flottant",
+                "montant_paye_archive",
+            )
+        )
+
+    resultat = lignes(qs, "paiements")
+    # Exercices clos : paiements archivés, lus seulement si une cotisation en porte
+    if any(ligne[9] for ligne in resultat):
+        resultat += lignes(qs.filter(montant_paye_archive__gt=0), "paiements_archives")
+    return resultat
+
+
+def _regrouper(codes, nb_groupes, boutiques, du, recouvre, arrieres_tranches):
+    """Sommes par groupe (codes : indice de groupe de chaque cotisation)."""
+    nb_boutiques = np.zeros(nb_groupes, dtype=np.int64)
+    if len(codes):
+        paires = np.unique(np.stack([codes, boutiques]), axis=1)
+        nb_boutiques = np.bincount(paires[0], minlength=nb_groupes)
+    return {
+        "nb_boutiques": nb_boutiques,
+        "du": np.bincount(codes, weights=du, minlength=nb_groupes),
+        "recouvre": np.bincount(codes, weights=recouvre, minlength=nb_groupes),
+        "tranches": np.stack(
+            [np.bincount(codes, weights=arrieres_tranches[:, i], minlength=nb_groupes)
+             for i in range(len(TRANCHES_ANCIENNETE))],
+            axis=1,
+        ) if len(codes) else np.zeros((nb_groupes, len(TRANCHES_ANCIENNETE))),
+    }
+
+
+def _ligne_resultat(libelle, nb_boutiques, du, recouvre, tranches):
+    du = Decimal(str(round(float(du))))
+    recouvre = Decimal(str(round(float(recouvre))))
+    return {
+        "libelle": libelle,
+        "nb_boutiques": int(nb_boutiques),
+        "du": du,
+        "recouvre": recouvre,
+        "arrieres": du - recouvre,
+        "taux": round(float(recouvre) * 100 / float(du), 1) if du else None,
+        "tranches": [Decimal(str(round(float(t)))) for t in tranches],
+    }
+
+
+def _libelles(modele, ids, libelle):
+    objets = modele.objects.filter(id__in=[int(i) for i in ids if i]).order_by()
+    return {o.id: libelle(o) for o in objets}
+
+
+def calculer_recouvrement(annee=None, maintenant=None):
+    """
+    Arriérés et taux de recouvrement des boutiques (toutes années, ou `annee`).
+
+    Retourne {"global": ligne, "par_marche": [...], "par_agent": [...], "par_type_local": [...],
+    "tranches": [libellés], "nb_cotisations": n}, chaque ligne contenant nb_boutiques, du,
+    recouvre, arrieres, taux (%) et tranches (arriérés par ancienneté).
+    """
+    maintenant = maintenant or timezone.now()
+    lignes = _lignes(annee)
+
+    if lignes:
+        colonnes = list(zip(*lignes))
+        ids_cotisation = np.array(colonnes[0], dtype=np.int64)
+        mois = np.array([m or 0 for m in colonnes[7]], dtype=np.int64)
+        montants = np.array([m or 0.0 for m in colonnes[8]], dtype=np.float64)
+    else:
+        colonnes = [()] * 9
+        ids_cotisation = np.zeros(0, dtype=np.int64)
+        mois = np.zeros(0, dtype=np.int64)
+        montants = np.zeros(0, dtype=np.float64)
+
+    # Une ligne de matrice par cotisation (les jointures dupliquent la cotisation par paiement)
+    _, premieres, indices = np.unique(ids_cotisation, return_index=True, return_inverse=True)
+    nb = len(premieres)
+
+    def par_cotisation(i, dtype=None, defaut=0):
+        valeurs = [colonnes[i][j] for j in premieres]
+        if dtype is None:
+            return np.array(valeurs, dtype=object)
+        return np.array([defaut if v is None else v for v in valeurs], dtype=dtype)
+
+    boutiques = par_cotisation(1, np.int64)
+    annees = par_cotisation(2, np.int64)
+    du_mensuel = par_cotisation(3, np.float64) / 12
+    emplacements = par_cotisation(4, np.int64)
+    agents = par_cotisation(5, np.int64)
+    types_local = par_cotisation(6)
+
+    paye = np.zeros((nb, 12), dtype=np.float64)
+    avec_paiement = mois > 0
+    np.add.at(paye, (indices[avec_paiement], mois[avec_paiement] - 1), montants[avec_paiement])
+
+    # Mois échus : 12 pour les années passées, jusqu'au mois courant pour l'année en cours
+    mois_echus = np.clip((maintenant.year - annees) * 12 + maintenant.month, 0, 12)
+    numeros_mois = np.arange(1, 13)
+    echu = numeros_mois[None, :] <= mois_echus[:, None]
+    du = np.where(echu, du_mensuel[:, None], 0.0)
+    recouvre = np.minimum(paye, du)
+    arrieres = du - recouvre
+
+    anciennete = (maintenant.year * 12 + maintenant.month) - (annees[:, None] * 12 + numeros_mois[None, :])
+    tranche = np.digitize(anciennete, _BORNES_TRANCHES)
+    arrieres_tranches = np.stack(
+        [np.where(tranche == i, arrieres, 0.0).sum(axis=1) for i in range(len(TRANCHES_ANCIENNETE))],
+        axis=1,
+    ) if nb else np.zeros((0, len(TRANCHES_ANCIENNETE)))
+    du_cotisation = du.sum(axis=1)
+    recouvre_cotisation = recouvre.sum(axis=1)
+
+    resultats = {
+        "tranches": [t[0] for t in TRANCHES_ANCIENNETE],
+        "nb_cotisations": nb,
+        "global": _ligne_resultat(
+            "Ensemble des marchés",
+            len(np.unique(boutiques)),
+            du_cotisation.sum(),
+            recouvre_cotisation.sum(),
+            arrieres_tranches.sum(axis=0),
+        ),
+    }
+
+    libelles_types = dict(BoutiqueMagasin.TYPE_LOCAL_CHOICES)
+    libelles_types.update(TypeLocal.objects.order_by().values_list("code", "nom"))
+    regroupements = [
+        ("par_marche", emplacements, lambda ids: _libelles(EmplacementMarche, ids, str)),
+        ("par_agent", agents, lambda ids: _libelles(AgentCollecteur, ids, lambda a: f"{a.nom} {a.prenom}")),
+        ("par_type_local", types_local, lambda codes: libelles_types),
+    ]
+    for cle, valeurs, libelles in regroupements:
+        groupes, codes = np.unique(valeurs, return_inverse=True) if nb else (np.zeros(0), np.zeros(0, dtype=np.int64))
+        sommes = _regrouper(codes.ravel(), len(groupes), boutiques, du_cotisation, recouvre_cotisation, arrieres_tranches)
+        noms = libelles(groupes)
+        liste = [
+            _ligne_resultat(
+                noms.get(g, SANS_AGENT if cle == "par_agent" and not g else str(g)),
+                sommes["nb_boutiques"][i],
+                sommes["du"][i],
+                sommes["recouvre"][i],
+                sommes["tranches"][i],
+            )
+            for i, g in enumerate(groupes.tolist())
+        ]
+        liste.sort(key=lambda ligne: ligne["arrieres"], reverse=True)
+        resultats[cle] = liste
+    return resultats
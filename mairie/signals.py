@@ -0,0 +1,192 @@
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from diaspora.models import MembreDiaspora
+from emploi.models import ProfilEmploi
+
+from .cotisations import generer_cotisations_boutiques
+from .doublons import actualiser_fiche, retirer_fiche, type_fiche_du_modele
+from .models import (
+    BoutiqueMagasin, Contribuable, CotisationAnnuelle, CotisationAnnuelleActeur,
+    CotisationAnnuelleInstitution, PaiementCotisation, PaiementCotisationActeur, PaiementCotisationInstitution,
+    TicketMarche, VersementCotisation,
+)
+from .recettes import mois_de_l_annee, signaler_dus, signaler_mois
+
+
+@receiver(pre_save, sender=BoutiqueMagasin)
+def boutique_avant_enregistrement(sender, instance, raw=False, **kwargs):
+    # Marché / agent en base avant la modification (None pour une nouvelle boutique)
+    instance._marche_agent_precedents = None
+    if instance.pk and not raw:
+        instance._marche_agent_precedents = (
+            BoutiqueMagasin.objects.filter(pk=instance.pk)
+            .values_list("emplacement_id", "agent_collecteur_id").first()
+        )
+
+
+@receiver(post_save, sender=BoutiqueMagasin)
+def boutique_enregistree(sender, instance, raw=False, **kwargs):
+    """
+    Une boutique active occupée a toujours sa cotisation de l'année courante : les pages
+    d'encaissement n'ont ainsi rien à créer (les autres années : generer_cotisations_annuelles).
+    """
+    if raw:
+        return
+    cellule = (instance.emplacement_id, instance.agent_collecteur_id, "cotisation_boutique")
+    if instance.est_actif and instance.contribuable_id:
+        annee = timezone.now().year
+        creees, _ = generer_cotisations_boutiques(annee, boutiques=BoutiqueMagasin.objects.filter(pk=instance.pk))
+        if creees:
+            signaler_dus(annee, cellule)
+    # Marché / agent changés : le dû de chaque année passe de l'ancienne cellule à la nouvelle
+    precedents = getattr(instance, "_marche_agent_precedents", None)
+    if precedents is not None and precedents != cellule[:2]:
+        for annee in instance.cotisations_annuelles.order_by().values_list("annee", flat=True):
+            signaler_dus(annee, cellule, (*precedents, "cotisation_boutique"))
+
+
+# --- Table de faits des recettes : recalcul des cellules et mois touchés après commit ---
+
+TYPES_RECETTE_COTISATION = {
+    CotisationAnnuelleActeur: "cotisation_acteur",
+    CotisationAnnuelleInstitution: "cotisation_institution",
+}
+
+
+def _dus_de_la_cotisation(sender, pk):
+    """(année, cellule de faits) de la cotisation telle qu'en base, ou None."""
+    if sender is CotisationAnnuelle:
+        ligne = (
+            sender.objects.filter(pk=pk)
+            .values_list("annee", "boutique__emplacement_id", "boutique__agent_collecteur_id").first()
+        )
+        return ligne and (ligne[0], (ligne[1], ligne[2], "cotisation_boutique"))
+    annee = sender.objects.filter(pk=pk).values_list("annee", flat=True).first()
+    return annee and (annee, (None, None, TYPES_RECETTE_COTISATION[sender]))
+
+
+@receiver([pre_save, pre_delete], sender=CotisationAnnuelle)
+@receiver([pre_save, pre_delete], sender=CotisationAnnuelleActeur)
+@receiver([pre_save, pre_delete], sender=CotisationAnnuelleInstitution)
+def cotisation_avant_modification(sender, instance, raw=False, **kwargs):
+    instance._dus_precedents = _dus_de_la_cotisation(sender, instance.pk) if instance.pk and not raw else None
+
+
+@receiver([post_save, post_delete], sender=CotisationAnnuelle)
+@receiver([post_save, post_delete], sender=CotisationAnnuelleActeur)
+@receiver([post_save, post_delete], sender=CotisationAnnuelleInstitution)
+def cotisation_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Dû retiré de la cellule d'avant (année, marché, agent) et ajouté à celle d'après
+    touches = [getattr(instance, "_dus_precedents", None)]
+    if kwargs["signal"] is post_save:
+        touches.append(_dus_de_la_cotisation(sender, instance.pk))
+    for dus in filter(None, touches):
+        signaler_dus(*dus)
+
+
+def _mois_en_base(sender, pk):
+    """Mois de faits d'une recette (paiement, ticket) telle qu'en base, ou None."""
+    if sender is PaiementCotisation:
+        ligne = sender.objects.filter(pk=pk).values_list("cotisation_annuelle__annee", "mois").first()
+        return ligne and mois_de_l_annee(ligne[0])[ligne[1] - 1]
+    if sender is TicketMarche:
+        return sender.objects.filter(pk=pk).values_list("date", flat=True).first()
+    date_paiement = sender.objects.filter(pk=pk).values_list("date_paiement", flat=True).first()
+    return date_paiement and timezone.localtime(date_paiement)
+
+
+@receiver(pre_save, sender=PaiementCotisation)
+@receiver(pre_save, sender=PaiementCotisationActeur)
+@receiver(pre_save, sender=PaiementCotisationInstitution)
+@receiver(pre_save, sender=TicketMarche)
+def recette_avant_modification(sender, instance, raw=False, **kwargs):
+    # Mois d'avant : une modification du mois, de la date ou de la cotisation en retire le montant
+    instance._mois_precedent = _mois_en_base(sender, instance.pk) if instance.pk and not raw else None
+
+
+def _signaler_mois_precedent(instance):
+    mois = getattr(instance, "_mois_precedent", None)
+    if mois:
+        signaler_mois(mois)
+
+
+@receiver([post_save, post_delete], sender=PaiementCotisation)
+def paiement_cotisation_modifie(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _signaler_mois_precedent(instance)
+    annee = CotisationAnnuelle.objects.filter(pk=instance.cotisation_annuelle_id).values_list("annee", flat=True).first()
+    if annee:
+        signaler_mois(mois_de_l_annee(annee)[instance.mois - 1])
+
+
+# --- Versements : la part de chaque enregistrement qui a réellement été encaissée (reçus signés) ---
+
+@receiver(pre_save, sender=PaiementCotisation)
+def paiement_cotisation_avant_enregistrement(sender, instance, raw=False, **kwargs):
+    instance._montant_precedent = None
+    if instance.pk and not raw:
+        instance._montant_precedent = (
+            sender.objects.filter(pk=instance.pk).values_list("montant_paye", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=PaiementCotisation)
+def paiement_cotisation_encaisse(sender, instance, raw=False, **kwargs):
+    """Nouveau mois ou mois complété : versement du montant ajouté (une correction à la baisse n'en crée pas)."""
+    if raw:
+        return
+    verse = Decimal(str(instance.montant_paye)) - (getattr(instance, "_montant_precedent", None) or 0)
+    if verse > 0:
+        VersementCotisation.objects.create(
+            cotisation_annuelle_id=instance.cotisation_annuelle_id, mois=instance.mois, montant_paye=verse,
+            date_paiement=instance.date_paiement, encaisse_par_agent_id=instance.encaisse_par_agent_id,
+        )
+
+
+@receiver([post_save, post_delete], sender=PaiementCotisationActeur)
+@receiver([post_save, post_delete], sender=PaiementCotisationInstitution)
+def paiement_date_modifie(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _signaler_mois_precedent(instance)
+    if instance.date_paiement:
+        signaler_mois(timezone.localtime(instance.date_paiement))
+
+
+@receiver([post_save, post_delete], sender=TicketMarche)
+def ticket_modifie(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _signaler_mois_precedent(instance)
+    if instance.date:
+        signaler_mois(instance.date)
+
+
+
+# --- Détection des doublons entre registres : clés de blocage de la fiche enregistrée ---
+
+@receiver(post_save, sender=ActeurEconomique)
+@receiver(post_save, sender=InstitutionFinanciere)
+@receiver(post_save, sender=ProfilEmploi)
+@receiver(post_save, sender=MembreDiaspora)
+@receiver(post_save, sender=Contribuable)
+def fiche_enregistree(sender, instance, raw=False, **kwargs):
+    if not raw:
+        actualiser_fiche(type_fiche_du_modele(sender), instance)
+
+
+@receiver(post_delete, sender=ActeurEconomique)
+@receiver(post_delete, sender=InstitutionFinanciere)
+@receiver(post_delete, sender=ProfilEmploi)
+@receiver(post_delete, sender=MembreDiaspora)
+@receiver(post_delete, sender=Contribuable)
+def fiche_supprimee(sender, instance, **kwargs):
+    retirer_fiche(type_fiche_du_modele(sender), instance.pk)
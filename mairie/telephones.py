@@ -0,0 +1,97 @@
+"""
+Normalisation des numéros de téléphone saisis en texte libre (« +228 90 00 00 00 »,
+« 90000000 », « 0022890000000 »...) au format E.164 (« +22890000000 »).
+
+Un numéro à 8 chiffres sans indicatif est un numéro togolais. Les numéros saisis avec un
+indicatif (« + » ou « 00 ») le gardent ; un numéro long sans préfixe est supposé contenir
+déjà son indicatif.
+
+La forme E.164 est stockée dans une colonne indexée `telephone_e164` (contribuables, acteurs
+économiques, institutions financières, diaspora), calculée à l'enregistrement ; les recherches
+par téléphone s'y font par égalité (numéro complet) ou par préfixe (début de numéro), quel que
+soit le format saisi.
+"""
+import re
+
+from django.db.models import Q
+
+INDICATIF_PAYS = "228"
+LONGUEUR_NATIONALE = 8
+
+
+def normaliser_telephone(valeur, indicatif=INDICATIF_PAYS):
+    """Numéro au format E.164, ou chaîne vide si la valeur n'est pas un numéro exploitable."""
+    texte = str(valeur or "").strip()
+    chiffres = "".join(c for c in texte if c.isdigit())
+    if texte.startswith("+"):
+        international = chiffres
+    elif chiffres.startswith("00"):
+        international = chiffres[2:]
+    elif len(chiffres) == LONGUEUR_NATIONALE:
+        international = indicatif + chiffres
+    else:
+        international = chiffres
+    # E.164 : 15 chiffres au plus, indicatif compris
+    if not 9 <= len(international) <= 15 or international.startswith("0"):
+        return ""
+    return "+" + international
+
+
+def prefixes_telephone(recherche, indicatif=INDICATIF_PAYS):
+    """
+    (numéro E.164 complet, []) ou (None, [préfixes E.164]) pour une recherche qui ressemble à un
+    numéro de téléphone ; (None, []) sinon. Un début de numéro qui commence par l'indicatif
+    (« 22890 ») peut être national ou international : les deux préfixes sont retenus.
+    """
+    texte = str(recherche or "").strip()
+    if not re.fullmatch(r"\+?[\d\s.\-()/]+", texte):
+        return None, []
+    chiffres = "".join(c for c in texte if c.isdigit())
+    if len(chiffres) < 3:
+        return None, []
+    complet = normaliser_telephone(texte, indicatif)
+    if complet:
+        return complet, []
+    if texte.startswith("+"):
+        return None, ["+" + chiffres]
+    if chiffres.startswith("00"):
+        return None, ["+" + chiffres[2:]]
+    if len(chiffres) < LONGUEUR_NATIONALE:
+        prefixes = ["+" + indicatif + chiffres]
+        if chiffres.startswith(indicatif):
+            prefixes.append("+" + chiffres)
+        return None, prefixes
+    return None, []
+
+
+def filtre_telephone(recherche, champ="telephone_e164"):
+    """
+    Q de recherche sur la colonne E.164 : égalité pour un numéro complet, intervalle
+    [préfixe, préfixe suivant[ pour un début de numéro (parcours d'index sur tous les moteurs,
+    contrairement à LIKE sous SQLite) ; ne correspond à rien si la recherche n'est pas un numéro.
+    """
+    complet, prefixes = prefixes_telephone(recherche)
+    if complet:
+        return Q(**{champ: complet})
+    filtre = Q(pk__in=[])
+    for prefixe in prefixes:
+        suivant = prefixe[:-1] + chr(ord(prefixe[-1]) + 1)
+        filtre |= Q(**{f"{champ}__gte": prefixe, f"{champ}__lt": suivant})
+    return filtre
+
+
+def remplir_telephones_e164(modele, champ_source, taille_lot=1000):
+    """Recalcule `telephone_e164` de toutes les lignes de `modele` ; retourne le nombre de lignes modifiées."""
+    a_jour = []
+    modifiees = 0
+    for objet in modele.objects.only("pk", champ_source, "telephone_e164").iterator(chunk_size=taille_lot):
+        valeur = normaliser_telephone(getattr(objet, champ_source))
+        if valeur != objet.telephone_e164:
+            objet.telephone_e164 = valeur
+            a_jour.append(objet)
+        if len(a_jour) >= taille_lot:
+            modele.objects.bulk_update(a_jour, ["telephone_e164"])
+            modifiees += len(a_jour)
+            a_jour = []
+    modele.objects.bulk_update(a_jour, ["telephone_e164"])
+    return modifiees + len(a_jour)
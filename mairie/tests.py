@@ -1,3 +1,973 @@
-from django.test import TestCase
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+import os
+import shutil
+import tempfile
+import warnings
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from acteurs.models import ActeurEconomique
+from comptes.models import Notification
+from comptes.recus import jeton_recu, verifier_jeton
+from diaspora.models import MembreDiaspora
+from diaspora.statistiques import obtenir_statistiques
+from mairie.archives import cloturer_exercice
+from mairie.cotisations import generer_cotisations_annuelles
+from mairie.geohash import encoder_geohash
+from mairie.importation import importer_fichier
+from mairie.recettes import interroger_recettes
+from mairie.recouvrement import calculer_recouvrement
+from mairie.telephones import filtre_telephone
+from mairie.models import (
+    AgentCollecteur, AppelOffre, BoutiqueMagasin, Candidature, Contribuable, CotisationAnnuelle,
+    CotisationAnnuelleActeur, DoublonPotentiel, EmplacementMarche, ExerciceClos, FaitRecetteMensuelle, ImageCarousel,
+    PaiementCotisation, PaiementCotisationActeur, PaiementCotisationArchive, TicketMarche, TicketMarcheArchive, VersementCotisation, VisiteSite,
+)
+from mairie_kloto_platform import profilage, releves
+from mairie_kloto_platform.profilage import BudgetRequetesMixin, empreinte_sql
+from mairie_kloto_platform.moderation import moderer_en_lot
+from mairie_kloto_platform.routers import (
+    REPLICA_DB_ALIAS, RepliqueLectureRouter, _lecture_sur_replique,
+)
+from mairie_kloto_platform.stockage import compter_references
+
+
+class BudgetRequetesTest(BudgetRequetesMixin, TestCase):
+    """Les vues critiques restent dans leur budget de requêtes SQL, quel que soit le volume."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        cls.user_agent = User.objects.create_user(username='agent', password='testpass123')
+        cls.agent = AgentCollecteur.objects.create(
+            user=cls.user_agent, matricule='AGT-001', nom='Agent', prenom='Test', telephone='90000000',
+        )
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        cls.agent.emplacements_assignes.add(emplacement)
+        annee = timezone.now().year
+        for i in range(15):
+            contribuable = Contribuable.objects.create(nom=f'Nom{i}', prenom='Prénom', telephone=f'910000{i:02d}')
+            boutique = BoutiqueMagasin.objects.create(
+                matricule=f'MKT-{i:03d}',
+                emplacement=emplacement,
+                contribuable=contribuable,
+                agent_collecteur=cls.agent,
+                prix_location_mensuel=Decimal('1000'),
+            )
+            cotisation = CotisationAnnuelle.objects.get(boutique=boutique, annee=annee)
+            PaiementCotisation.objects.create(
+                cotisation_annuelle=cotisation, mois=1, montant_paye=Decimal('1000'), encaisse_par_agent=cls.agent,
+            )
+
+    def test_vues_tableau_bord(self):
+        self.client.force_login(self.staff)
+        for nom in ('tableau_bord', 'liste_contribuables'):
+            response = self.assertBudgetRequetes(reverse(nom))
+            self.assertEqual(response.status_code, 200)
+
+    def test_vues_agent(self):
+        self.client.force_login(self.user_agent)
+        for nom in ('comptes:espace_agent', 'comptes:profil'):
+            response = self.assertBudgetRequetes(reverse(nom))
+            self.assertEqual(response.status_code, 200)
+
+    def test_empreinte_sql(self):
+        self.assertEqual(
+            empreinte_sql("SELECT * FROM t WHERE id = 12 AND nom = 'a''b'"),
+            empreinte_sql("SELECT *  FROM t WHERE id = 7 AND nom = 'x'"),
+        )
+
+
+@override_settings(PROFILAGE_SQL_ACTIF=True)
+class ProfilageSQLMiddlewareTest(TestCase):
+
+    def setUp(self):
+        profilage.vider_profils()
+        self.staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(self.staff)
+
+    def test_profil_enregistre_et_page_tableau_bord(self):
+        self.client.get(reverse('liste_contribuables'))
+        profils = profilage.lister_profils()
+        self.assertEqual(profils[-1]['vue'], 'liste_contribuables')
+        self.assertGreater(profils[-1]['requetes'], 0)
+        self.assertEqual(profils[-1]['budget'], 12)
+
+        response = self.client.get(reverse('profilage_sql'))
+        self.assertContains(response, 'liste_contribuables')
+
+
+def _declarer_base_sqlite(alias, chemin):
+    """Alias de connexion vers un fichier SQLite portant le schéma complet du projet (hors migrations)."""
+    connections.databases[alias] = {
+        **connections.databases['default'], 'NAME': chemin, 'TEST': {}, 'CONN_MAX_AGE': 0, 'OPTIONS': {},
+    }
+    with connections[alias].schema_editor() as editor:
+        for modele in apps.get_models():
+            if modele._meta.managed and not modele._meta.proxy:
+                editor.create_model(modele)
+    return connections.databases[alias]
+
+
+def _retirer_alias(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+class RepliqueLectureTest(TestCase):
+    """Routage des lectures vers la réplique (une seconde base SQLite en tient lieu) et copie SQLite."""
+
+    def _autoriser(self, alias):
+        """Autorise, le temps du test, les connexions à un alias déclaré dynamiquement."""
+        databases = type(self).databases
+        type(self).databases = databases | {alias}
+        self.addCleanup(setattr, type(self), 'databases', databases)
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        self.dossier = dossier
+        self.staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(self.staff)
+        Contribuable.objects.create(nom='Principale', prenom='Base', telephone='91000001')
+
+    def _avec_replique(self):
+        self._autoriser(REPLICA_DB_ALIAS)
+        config = _declarer_base_sqlite(REPLICA_DB_ALIAS, os.path.join(self.dossier, 'replique.sqlite3'))
+        self.addCleanup(_retirer_alias, REPLICA_DB_ALIAS)
+        reglages = override_settings(DATABASES={**settings.DATABASES, REPLICA_DB_ALIAS: config})
+        with warnings.catch_warnings():
+            # Avertissement attendu : seul l'alias ajouté change, les connexions existantes restent valables
+            warnings.simplefilter('ignore', UserWarning)
+            reglages.enable()
+        self.addCleanup(reglages.disable)
+        # Session et utilisateur répliqués, comme le ferait la réplication PostgreSQL
+        for modele in (User, Session):
+            modele._base_manager.using(REPLICA_DB_ALIAS).bulk_create(list(modele._base_manager.all()))
+        Contribuable.objects.using(REPLICA_DB_ALIAS).create(nom='Replique', prenom='Base', telephone='91000002')
+
+    def test_listes_lues_sur_la_replique(self):
+        self._avec_replique()
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as sur_replique:
+            response = self.client.get(reverse('liste_contribuables'))
+        self.assertContains(response, 'Replique')
+        self.assertNotContains(response, 'Principale')
+        self.assertGreater(len(sur_replique), 0)
+        # Le marqueur de la requête est remis à zéro après la réponse
+        self.assertFalse(_lecture_sur_replique.get())
+
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as sur_replique:
+            self.client.get(reverse('taux_recouvrement'))
+            self.client.post(reverse('liste_contribuables'))
+        self.assertEqual(len(sur_replique), 0)
+
+        routeur = RepliqueLectureRouter()
+        jeton = _lecture_sur_replique.set(True)
+        try:
+            self.assertEqual(routeur.db_for_read(Contribuable), REPLICA_DB_ALIAS)
+            self.assertEqual(routeur.db_for_write(Contribuable), 'default')
+        finally:
+            _lecture_sur_replique.reset(jeton)
+        self.assertIsNone(routeur.db_for_read(Contribuable))
+
+    def test_copie_depuis_sqlite(self):
+        chemin = os.path.join(self.dossier, 'source.sqlite3')
+        self._autoriser('preparation')
+        self._autoriser('sqlite_source')
+        _declarer_base_sqlite('preparation', chemin)
+        recorder = MigrationRecorder(connections['preparation'])
+        recorder.ensure_schema()
+        for app_label, nom in MigrationRecorder(connection).applied_migrations():
+            recorder.record_applied(app_label, nom)
+        Contribuable.objects.using('preparation').create(id=500, nom='Copie', prenom='Source', telephone='91000003')
+        _retirer_alias('preparation')
+
+        with self.assertRaises(CommandError):
+            call_command('copier_donnees_sqlite', source=chemin, stdout=StringIO())
+        call_command('copier_donnees_sqlite', source=chemin, vider=True, stdout=StringIO())
+        self.addCleanup(_retirer_alias, 'sqlite_source')
+        self.assertEqual(list(Contribuable.objects.values_list('id', 'nom')), [(500, 'Copie')])
+        # Compteur d'identifiants repositionné après les insertions à id explicite
+        nouveau = Contribuable.objects.create(nom='Suivant', prenom='Base', telephone='91000004')
+        self.assertGreater(nouveau.pk, 500)
+
+
+class SuiviVisiteursTest(TestCase):
+    """Visiteurs anonymes suivis par cookie signé, sans session en base ; robots marqués."""
+
+    def test_visiteur_anonyme_sans_session(self):
+        navigateur = 'Mozilla/5.0 (Linux; Android 13) Chrome/120.0 Mobile Safari/537.36'
+        self.client.get('/', HTTP_USER_AGENT=navigateur)
+        self.client.get('/', HTTP_USER_AGENT=navigateur)
+        self.assertEqual(Session.objects.count(), 0)
+        visites = list(VisiteSite.objects.values_list('session_key', flat=True))
+        self.assertEqual(len(visites), 2)
+        self.assertEqual(len(set(visites)), 1)
+        self.assertEqual(len(visites[0]), 32)
+        self.assertEqual(set(VisiteSite.objects.values_list('type_appareil', flat=True)), {'mobile'})
+
+        self.client.get('/', HTTP_USER_AGENT='Mozilla/5.0 (compatible; Googlebot/2.1)')
+        robot = VisiteSite.objects.get(est_robot=True)
+        self.assertEqual((robot.type_appareil, robot.session_key), ('robot', ''))
+        self.assertEqual(VisiteSite.objects.filter(est_robot=False).count(), 2)
+
+    def test_compacter_sessions(self):
+        vide = SessionStore()
+        vide.create()
+        pleine = SessionStore()
+        pleine['panier'] = 1
+        pleine.create()
+        call_command('compacter_sessions', stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [pleine.session_key])
+
+
+class ModerationLotTest(TestCase):
+
+    def test_validation_en_lot(self):
+        staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(staff)
+        demandeur = User.objects.create_user('demandeur', password='testpass123')
+        acteurs = [
+            ActeurEconomique.objects.create(raison_sociale='Acteur notifié', user=demandeur),
+            ActeurEconomique.objects.create(raison_sociale='Acteur sans compte'),
+            ActeurEconomique.objects.create(raison_sociale='Déjà validé', est_valide_par_mairie=True),
+        ]
+        ids = [str(a.pk) for a in acteurs] + ['999999']
+
+        with self.assertNumQueries(9):  # constant, quel que soit le nombre de lignes cochées
+            data = self.client.post(
+                reverse('moderer_lot', args=['acteur']), {'ids': ids, 'action': 'accepter'},
+                HTTP_ACCEPT='application/json',
+            ).json()
+        self.assertEqual(
+            data, {'success': True, 'demandes': 4, 'modifies': 2, 'inchanges': 1, 'introuvables': 1, 'notifies': 1}
+        )
+        self.assertEqual(ActeurEconomique.objects.filter(est_valide_par_mairie=True).count(), 3)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.created_by), (demandeur, staff))
+        self.assertIn('Acteur notifié', notification.message)
+
+        response = self.client.post(reverse('moderer_lot', args=['acteur']), {'ids': ids, 'action': 'supprimer'})
+        self.assertRedirects(response, reverse('liste_acteurs'), fetch_redirect_response=False)
+
+    def test_validation_diaspora_rafraichit_instantane(self):
+        membre = MembreDiaspora.objects.create(
+            nom='Amegah', prenoms='Kodjo', sexe='masculin', date_naissance='1990-01-01',
+            nationalites='Togolaise', numero_piece_identite='P1', pays_residence_actuelle='France',
+            ville_residence_actuelle='Lyon', adresse_complete_etranger='Adresse',
+            commune_origine='Kloto 1', quartier_village_origine='Centre',
+            nom_parent_tuteur_originaire='Parent', annee_depart_pays=2015,
+            frequence_retour_pays='chaque_annee', telephone_whatsapp='+33100000000',
+            email='amegah@example.com', contact_au_pays_nom='Contact',
+            contact_au_pays_telephone='+22890000000', niveau_etudes='master',
+            domaine_formation='Informatique', profession_actuelle='Développeur',
+            secteur_activite='informatique', annees_experience=5, statut_professionnel='salarie',
+            comment_contribuer='-', disposition_participation='oui',
+            domaine_intervention_prioritaire='-', accepte_rgpd=True,
+        )
+        self.assertEqual(obtenir_statistiques()['total_membres'], 0)
+
+        # update() contourne post_save : l'instantané est rafraîchi après la validation
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            moderer_en_lot('diaspora', [membre.pk], 'accepter')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(obtenir_statistiques()['total_membres'], 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:  # rien ne change : pas de recalcul
+            moderer_en_lot('diaspora', [membre.pk], 'accepter')
+        self.assertEqual(callbacks, [])
+
+
+class DoublonsTest(TestCase):
+    """Doublons entre registres : seules les fiches qui partagent une clé de blocage sont comparées."""
+
+    def setUp(self):
+        self.acteur = ActeurEconomique.objects.create(
+            raison_sociale='Ets Mensah & Fils', nom_responsable='Koffi MENSAH', telephone1='+228 90 11 22 33',
+        )
+        self.contribuable = Contribuable.objects.create(nom='Mensah', prenom='Kofi', telephone='0022890112233')
+        Contribuable.objects.create(nom='Mensah', prenom='Ama', telephone='91000000')
+
+    def test_detection_et_file_d_examen(self):
+        doublon = DoublonPotentiel.objects.get()
+        self.assertEqual(
+            (doublon.type_a, doublon.id_a, doublon.type_b, doublon.id_b),
+            ('acteur', self.acteur.pk, 'contribuable', self.contribuable.pk),
+        )
+        self.assertIn('téléphone', doublon.motifs)
+        self.assertIn('nom', doublon.motifs)
+
+        staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(staff)
+        self.assertContains(self.client.get(reverse('liste_doublons')), 'Ets Mensah &amp; Fils')
+        self.client.post(reverse('traiter_doublon', args=[doublon.pk, 'ecarter']))
+
+        # Reconstruction complète : la paire est retrouvée mais reste écartée
+        call_command('detecter_doublons', '--reindexer', stdout=StringIO())
+        self.assertEqual(DoublonPotentiel.objects.get().statut, 'ecarte')
+
+        # Fiche corrigée : la paire en attente disparaît
+        doublon.statut = 'a_examiner'
+        doublon.save()
+        self.contribuable.nom, self.contribuable.prenom, self.contribuable.telephone = 'Adjo', 'Afi', '92000000'
+        self.contribuable.save()
+        self.assertFalse(DoublonPotentiel.objects.exists())
+
+    def test_nom_seul_suffit(self):
+        # Aucun téléphone ni email en commun : seule l'orthographe du nom rapproche les fiches
+        DoublonPotentiel.objects.all().delete()
+        variante = Contribuable.objects.create(nom='Mensah', prenom='Koffi', telephone='93000000')
+        agbeko = Contribuable.objects.create(nom='Agbeko', prenom='Kossi', telephone='94000000')
+        agbeko_bis = Contribuable.objects.create(nom='Agbeko', prenom='Kosi', telephone='95000000')
+
+        paires = {
+            (d.id_a, d.id_b): d for d in DoublonPotentiel.objects.filter(type_a='contribuable', type_b='contribuable')
+        }
+        self.assertIn((self.contribuable.pk, variante.pk), paires)
+        self.assertIn((agbeko.pk, agbeko_bis.pk), paires)
+        doublon = paires[(agbeko.pk, agbeko_bis.pk)]
+        self.assertGreaterEqual(doublon.score, Decimal('0.5'))
+        self.assertEqual(doublon.motifs, 'nom (96%)')
+        # « Ama Mensah » reste trop éloigné de « Kofi Mensah »
+        self.assertEqual(len(paires), 2)
+
+
+class RechercheTelephoneTest(TestCase):
+    """Recherche par téléphone sur la colonne E.164, quel que soit le format saisi."""
+
+    def test_formats_et_prefixe(self):
+        Contribuable.objects.create(nom='Adjo', prenom='Afi', telephone='+228 90 11 22 33')
+        Contribuable.objects.create(nom='Kossi', prenom='Ama', telephone='0022891000000')
+        Contribuable.objects.filter(nom='Kossi').update(telephone_e164='')
+        call_command('normaliser_telephones', stdout=StringIO())
+        self.assertEqual(Contribuable.objects.get(nom='Kossi').telephone_e164, '+22891000000')
+
+        def noms(recherche):
+            return sorted(Contribuable.objects.filter(filtre_telephone(recherche)).values_list('nom', flat=True))
+
+        self.assertEqual(noms('90112233'), ['Adjo'])
+        self.assertEqual(noms('0022890112233'), ['Adjo'])
+        self.assertEqual(noms('90 11'), ['Adjo'])
+        self.assertEqual(noms('+2289'), ['Adjo', 'Kossi'])
+        self.assertEqual(noms('Adjo'), [])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+        response = self.client.get(reverse('liste_contribuables'), {'q': '91 00'})
+        self.assertContains(response, 'Kossi')
+        self.assertNotContains(response, 'Adjo')
+
+
+class CarteMarqueursTest(TestCase):
+    """Marqueurs GeoJSON de la carte : emprise, regroupement par géohash et droits d'accès."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        for i in range(4):
+            ActeurEconomique.objects.create(
+                raison_sociale=f'Acteur {i}', latitude=Decimal('6.9057') + Decimal(i) / 1000,
+                longitude=Decimal('0.6287'), accepte_conditions=True,
+            )
+        ActeurEconomique.objects.create(raison_sociale='Lomé', latitude=Decimal('6.1319'), longitude=Decimal('1.2228'))
+        ActeurEconomique.objects.create(raison_sociale='Sans GPS')
+
+    def test_geohash(self):
+        self.assertEqual(encoder_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encoder_geohash(None, None), '')
+
+    def test_bbox_et_regroupement(self):
+        self.client.force_login(self.staff)
+        url = reverse('mairie:carte_marqueurs')
+        data = self.client.get(url, {'couches': 'acteurs', 'bbox': '0.5,6.8,0.7,7.0', 'zoom': 14}).json()
+        self.assertEqual(sorted(f['properties']['nom'] for f in data['features']), [f'Acteur {i}' for i in range(4)])
+
+        with mock.patch('mairie.carte.SEUIL_POINTS_INDIVIDUELS', 0):
+            data = self.client.get(url, {'couches': 'acteurs', 'zoom': 10}).json()
+        nombres = sorted(f['properties']['nombre'] for f in data['features'])
+        self.assertEqual(nombres, [1, 4])
+        self.assertTrue(all(f['properties']['regroupement'] for f in data['features']))
+
+    def test_couches_reservees_au_staff(self):
+        data = self.client.get(reverse('mairie:carte_marqueurs'), {'couches': 'acteurs'}).json()
+        self.assertEqual(data['features'], [])
+        response = self.client.get(reverse('mairie:carte_marqueurs'), {'bbox': 'a,b'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerationCotisationsAnnuellesTest(TestCase):
+    """Commande generer_cotisations_annuelles : création en masse et ré-exécution sans effet."""
+
+    def setUp(self):
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        agent = AgentCollecteur.objects.create(
+            user=User.objects.create_user(username='agent'), matricule='AGT-001',
+            nom='Agent', prenom='Test', telephone='90000000',
+        )
+        for i in range(3):
+            contribuable = Contribuable.objects.create(nom=f'Nom{i}', prenom='Prénom', telephone=f'910000{i:02d}')
+            BoutiqueMagasin.objects.create(
+                matricule=f'MKT-{i:03d}', emplacement=emplacement, contribuable=contribuable,
+                prix_location_mensuel=Decimal('1000'),
+            )
+        BoutiqueMagasin.objects.create(
+            matricule='MKT-VIDE', emplacement=emplacement, prix_location_mensuel=Decimal('1000'),
+        )
+        self.acteur = ActeurEconomique.objects.create(raison_sociale='Acteur suivi')
+        self.acteur.agents_collecteurs.add(agent)
+        CotisationAnnuelleActeur.objects.create(acteur=self.acteur, annee=2030, montant_annuel_du=Decimal('50000'))
+        ActeurEconomique.objects.create(raison_sociale='Acteur sans agent')
+
+    def test_generation_idempotente(self):
+        sortie = StringIO()
+        call_command('generer_cotisations_annuelles', '--annee', '2031', stdout=sortie)
+        self.assertEqual(CotisationAnnuelle.objects.filter(annee=2031).count(), 3)
+        self.assertEqual(
+            CotisationAnnuelle.objects.get(annee=2031, boutique__matricule='MKT-000').montant_annuel_du,
+            Decimal('12000'),
+        )
+        self.assertEqual(
+            CotisationAnnuelleActeur.objects.get(acteur=self.acteur, annee=2031).montant_annuel_du,
+            Decimal('50000'),
+        )
+        self.assertIn('4 créée(s)', sortie.getvalue())
+
+        # Relance : uniquement des lectures (8 requêtes + savepoint de la transaction)
+        with self.assertNumQueries(10):
+            resultats = generer_cotisations_annuelles(2031)
+        self.assertEqual(resultats['boutiques'], (0, 3))
+        self.assertEqual(resultats['acteurs'], (0, 1))
+        self.assertEqual(CotisationAnnuelle.objects.filter(annee=2031).count(), 3)
+
+
+class TauxRecouvrementTest(TestCase):
+    """Arriérés, taux de recouvrement et ancienneté des impayés (calcul NumPy)."""
+
+    def setUp(self):
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        self.agent = AgentCollecteur.objects.create(
+            user=User.objects.create_user(username='agent'), matricule='AGT-001',
+            nom='Agent', prenom='Test', telephone='90000000',
+        )
+        boutiques = []
+        for i, (agent, type_local) in enumerate([(self.agent, 'boutique'), (None, 'magasin')]):
+            contribuable = Contribuable.objects.create(nom=f'Nom{i}', prenom='Prénom', telephone=f'910000{i:02d}')
+            boutiques.append(BoutiqueMagasin.objects.create(
+                matricule=f'MKT-{i:03d}', emplacement=emplacement, contribuable=contribuable,
+                agent_collecteur=agent, type_local=type_local, prix_location_mensuel=Decimal('1000'),
+            ))
+        CotisationAnnuelle.objects.all().delete()
+        a_2030, a_2031, b_2031 = [
+            CotisationAnnuelle.objects.create(boutique=b, annee=annee, montant_annuel_du=Decimal('12000'))
+            for b, annee in [(boutiques[0], 2030), (boutiques[0], 2031), (boutiques[1], 2031)]
+        ]
+        for mois in range(1, 13):
+            montant = Decimal('400') if mois == 12 else Decimal('1000')
+            PaiementCotisation.objects.create(cotisation_annuelle=a_2030, mois=mois, montant_paye=montant)
+        PaiementCotisation.objects.create(cotisation_annuelle=a_2031, mois=1, montant_paye=Decimal('1000'))
+        # Trop-perçu : ne compense pas les autres mois
+        PaiementCotisation.objects.create(cotisation_annuelle=b_2031, mois=2, montant_paye=Decimal('1500'))
+
+    def test_calcul(self):
+        with self.assertNumQueries(4):
+            resultats = calculer_recouvrement(maintenant=datetime(2031, 3, 15))
+        total = resultats['global']
+        self.assertEqual((total['du'], total['recouvre'], total['arrieres']), (18000, 13400, 4600))
+        self.assertEqual(total['taux'], 74.4)
+        self.assertEqual(total['tranches'], [4000, 600, 0, 0])
+        self.assertEqual(
+            [(l['libelle'], l['arrieres']) for l in resultats['par_agent']],
+            [('Agent Test', 2600), ('Non assigné', 2000)],
+        )
+        self.assertEqual([l['libelle'] for l in resultats['par_type_local']], ['Boutique', 'Magasin'])
+
+    def test_page_et_export(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+        response = self.client.get(reverse('taux_recouvrement'), {'annee': 2031})
+        self.assertContains(response, 'Marché central')
+        response = self.client.get(reverse('export_excel_taux_recouvrement'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('spreadsheetml', response['Content-Type'])
+
+
+class FaitRecetteMensuelleTest(TestCase):
+    """Table de faits des recettes : mise à jour après commit et tableau croisé."""
+
+    def test_rafraichissement_incremental(self):
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        agent = AgentCollecteur.objects.create(
+            user=User.objects.create_user(username='agent'), matricule='AGT-001',
+            nom='Agent', prenom='Test', telephone='90000000',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            contribuable = Contribuable.objects.create(nom='Nom', prenom='Prénom', telephone='91000000')
+            boutique = BoutiqueMagasin.objects.create(
+                matricule='MKT-001', emplacement=emplacement, contribuable=contribuable,
+                agent_collecteur=agent, prix_location_mensuel=Decimal('1000'),
+            )
+            cotisation = CotisationAnnuelle.objects.create(boutique=boutique, annee=2030, montant_annuel_du=Decimal('12000'))
+            paiement = PaiementCotisation.objects.create(
+                cotisation_annuelle=cotisation, mois=4, montant_paye=Decimal('1000'), encaisse_par_agent=agent,
+            )
+            ticket = TicketMarche.objects.create(
+                date=datetime(2030, 5, 2).date(), emplacement=emplacement, montant=Decimal('200'), encaisse_par_agent=agent,
+            )
+        fait = FaitRecetteMensuelle.objects.get(mois=datetime(2030, 4, 1).date(), type_recette='cotisation_boutique')
+        self.assertEqual((fait.montant_du, fait.montant_encaisse, fait.nb_encaissements), (1000, 1000, 1))
+        self.assertEqual(FaitRecetteMensuelle.objects.filter(mois__year=2030, type_recette='cotisation_boutique').count(), 12)
+
+        with self.assertNumQueries(2):
+            cube = interroger_recettes('marche', 'trimestre', 2030)
+        self.assertEqual(cube['libelles_periodes'], ['T1 2030', 'T2 2030', 'T3 2030', 'T4 2030'])
+        self.assertEqual([c['encaisse'] for c in cube['lignes'][0]['cellules']], [0, 1200, 0, 0])
+
+        # Paiement et ticket déplacés d'un mois à l'autre : l'ancien mois perd son montant
+        with self.captureOnCommitCallbacks(execute=True):
+            paiement.mois = 7
+            paiement.save()
+            ticket.date = datetime(2030, 10, 2).date()
+            ticket.save()
+        cube = interroger_recettes('marche', 'trimestre', 2030)
+        self.assertEqual([c['encaisse'] for c in cube['lignes'][0]['cellules']], [0, 0, 1000, 200])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+        response = self.client.get(reverse('recettes_mensuelles'), {'axe': 'agent', 'periode': 'mois', 'annee': 2030})
+        self.assertContains(response, 'Agent Test')
+
+
+    def test_reaffectation_recalcule_seulement_les_cellules(self):
+        marches = [EmplacementMarche.objects.create(quartier='Centre', nom_lieu=f'Marché {i}') for i in range(2)]
+        contribuable = Contribuable.objects.create(nom='Nom', prenom='Prénom', telephone='91000000')
+        with self.captureOnCommitCallbacks(execute=True):
+            boutique = BoutiqueMagasin.objects.create(
+                matricule='MKT-001', emplacement=marches[0], contribuable=contribuable,
+                prix_location_mensuel=Decimal('1000'),
+            )
+            for annee in (2028, 2029, 2030):
+                CotisationAnnuelle.objects.create(boutique=boutique, annee=annee, montant_annuel_du=Decimal('1000'))
+
+        def faits():
+            return sorted(FaitRecetteMensuelle.objects.values_list(
+                'mois', 'emplacement_id', 'agent_id', 'type_recette', 'montant_du', 'nb_redevables',
+            ))
+
+        boutique.emplacement = marches[1]
+        with self.assertNumQueries(30), self.captureOnCommitCallbacks(execute=True):
+            boutique.save()
+        incrementaux = faits()
+        self.assertFalse(FaitRecetteMensuelle.objects.filter(emplacement=marches[0], mois__year=2029).exists())
+        for annee in (2028, 2029, 2030):
+            call_command('rafraichir_faits_recettes', annee=annee, stdout=StringIO())
+        self.assertEqual(incrementaux, faits())
+
+        # Rollback : les cellules marquées sont abandonnées avec la transaction
+        with self.captureOnCommitCallbacks(execute=True) as rappels:
+            try:
+                with transaction.atomic():
+                    CotisationAnnuelle.objects.filter(annee=2029).get().delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(rappels, [])
+        self.assertEqual(incrementaux, faits())
+
+        # Unicité des cellules sans marché ni agent
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FaitRecetteMensuelle.objects.bulk_create([
+                FaitRecetteMensuelle(mois=datetime(2030, 1, 1).date(), type_recette='cotisation_acteur')
+                for _ in range(2)
+            ])
+
+
+class ClotureExerciceTest(TestCase):
+    """Archivage d'un exercice clos : lignes déplacées, soldes, rapports et reçus inchangés."""
+
+    def setUp(self):
+        emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        agent = AgentCollecteur.objects.create(
+            user=User.objects.create_user(username='agent'), matricule='AGT-001',
+            nom='Agent', prenom='Test', telephone='90000000',
+        )
+        self.contribuable = Contribuable.objects.create(nom='Nom', prenom='Prénom', telephone='91000000')
+        boutique = BoutiqueMagasin.objects.create(
+            matricule='MKT-001', emplacement=emplacement, contribuable=self.contribuable,
+            agent_collecteur=agent, prix_location_mensuel=Decimal('1000'),
+        )
+        self.cotisation = CotisationAnnuelle.objects.create(
+            boutique=boutique, annee=2020, montant_annuel_du=Decimal('12000')
+        )
+        self.paiements = [
+            PaiementCotisation.objects.create(
+                cotisation_annuelle=self.cotisation, mois=mois, montant_paye=Decimal('1000'),
+                date_paiement=timezone.make_aware(datetime(2020, mois, 10)), encaisse_par_agent=agent,
+            )
+            for mois in (1, 2, 3)
+        ]
+        TicketMarche.objects.create(
+            date=datetime(2020, 5, 2).date(), emplacement=emplacement, montant=Decimal('200'), encaisse_par_agent=agent,
+            contribuable=self.contribuable,
+        )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+
+    def _totaux_liste(self):
+        context = self.client.get(reverse('liste_contributions'), {'annee': 2020}).context
+        return context['total_paiements_montant'], context['total_tickets_montant'], len(context['paiements'])
+
+    def _releve_2020(self):
+        donnees, = releves.preparer_releves(
+            Contribuable.objects.filter(pk=self.contribuable.pk), *releves.periode_annee(2020)
+        )
+        return sum(p['montant'] for p in donnees['paiements']), sum(t['montant'] for t in donnees['tickets'])
+
+    def test_cloture(self):
+        totaux = self._totaux_liste()
+        self.assertEqual(totaux, (Decimal('3000'), Decimal('200'), 3))
+        self.assertEqual(self._releve_2020(), (Decimal('3000'), Decimal('200')))
+        versement = VersementCotisation.objects.get(cotisation_annuelle=self.cotisation, mois=1)
+        jeton = jeton_recu('contribuable', versement)
+
+        with self.assertRaises(CommandError):
+            call_command('cloturer_exercice', timezone.now().year, stdout=StringIO())
+        cloturer_exercice(2020, simulation=True)
+        self.assertEqual(PaiementCotisation.objects.count(), 3)
+        self.assertFalse(ExerciceClos.objects.exists())
+
+        bilan = cloturer_exercice(2020, taille_lot=2)
+        self.assertEqual((bilan['paiements'], bilan['tickets'], bilan['montant']), (3, 1, Decimal('3200')))
+        self.assertFalse(PaiementCotisation.objects.exists() or TicketMarche.objects.exists())
+        self.assertEqual(
+            sorted(PaiementCotisationArchive.objects.values_list('pk', flat=True)),
+            [p.pk for p in self.paiements],
+        )
+        self.assertEqual(TicketMarcheArchive.objects.count(), 1)
+
+        self.cotisation.refresh_from_db()
+        self.assertEqual(self.cotisation.reste_a_payer(), Decimal('9000'))
+        self.assertEqual(self.cotisation.mois_payes(), [1, 2, 3])
+        self.assertEqual(self._totaux_liste(), totaux)
+        self.assertEqual(self._releve_2020(), (Decimal('3000'), Decimal('200')))
+        self.assertEqual(verifier_jeton(jeton)[1], versement)
+
+    def test_fiche_et_exports_acteurs_apres_cloture(self):
+        from openpyxl import load_workbook
+        from reportlab.platypus import Table
+
+        user = User.objects.create_user(username='acteur', password='testpass123')
+        acteur = ActeurEconomique.objects.create(raison_sociale='Acteur archivé', user=user)
+        cotisation = CotisationAnnuelleActeur.objects.create(
+            acteur=acteur, annee=2020, montant_annuel_du=Decimal('50000')
+        )
+        PaiementCotisationActeur.objects.create(
+            cotisation_annuelle=cotisation, montant_paye=Decimal('20000'),
+            date_paiement=timezone.make_aware(datetime(2020, 6, 1)),
+        )
+        cloturer_exercice(2020)
+        self.assertFalse(PaiementCotisationActeur.objects.exists())
+
+        excel = self.client.get(reverse('export_excel_cotisations_acteurs_institutions'), {'annee': 2020})
+        feuille = load_workbook(BytesIO(excel.content))['Paiements Acteurs']
+        self.assertEqual(
+            [ligne[:3] for ligne in feuille.iter_rows(min_row=2, values_only=True)], [('Acteur archivé', 2020, 20000)]
+        )
+
+        def tableaux(url, *args, **params):
+            with mock.patch(f'{url[0]}.Table', wraps=Table) as table:
+                self.assertEqual(self.client.get(reverse(url[1], args=args), params).status_code, 200)
+            return [appel.args[0] for appel in table.call_args_list]
+
+        paiements_pdf = [
+            data for data in tableaux(('mairie_kloto_platform.views', 'export_pdf_cotisations_acteurs_institutions'))
+            if data[0][:2] == ['Acteur', 'Année']
+        ]
+        paiement, total = paiements_pdf[0][1:]
+        self.assertEqual((paiement[0], Decimal(paiement[2]), Decimal(total[2])), ('Acteur archivé', 20000, 20000))
+
+        self.client.force_login(user)
+        fiche, = tableaux(('comptes.views', 'comptes:telecharger_fiche_paiements'), 'acteur')
+        self.assertEqual([ligne[5] for ligne in fiche[1:]], ['20000'])
+
+
+class ImportDonneesTest(TestCase):
+    """Import CSV / XLSX : validation par lots, rapport d'erreurs et effets des signaux reproduits."""
+
+    def setUp(self):
+        EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        Contribuable.objects.create(nom='Nom', prenom='Prénom', telephone='+228 91 00 00 00')
+        self.staff = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+
+    def test_import_boutiques_csv(self):
+        contenu = (
+            "Matricule;Emplacement;Type local;Prix location mensuel;Téléphone contribuable\n"
+            "MKT-001;marche central;Boutique;1 000;22891000000\n"
+            "MKT-002;Marché central;kiosque;500;\n"
+            "MKT-001;Marché central;boutique;500;\n"
+            "MKT-003;Marché inconnu;boutique;abc;\n"
+        ).encode('utf-8')
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('import_donnees'), {
+            'type_import': 'boutiques', 'fichier': SimpleUploadedFile('boutiques.csv', contenu),
+        })
+        self.assertContains(response, '2 importée(s)')
+        self.assertContains(response, 'Matricule déjà utilisé')
+        self.assertEqual(BoutiqueMagasin.objects.count(), 2)
+        # Cotisation de l'année courante créée pour la seule boutique occupée
+        self.assertEqual(CotisationAnnuelle.objects.filter(boutique__matricule='MKT-001').count(), 1)
+        self.assertEqual(CotisationAnnuelle.objects.count(), 1)
+
+    def test_import_paiements_xlsx(self):
+        from openpyxl import Workbook
+
+        BoutiqueMagasin.objects.create(
+            matricule='MKT-001', emplacement=EmplacementMarche.objects.get(), prix_location_mensuel=Decimal('1000'),
+        )
+        classeur = Workbook()
+        feuille = classeur.active
+        feuille.append(['matricule_boutique', 'annee', 'mois', 'montant_paye', 'date_paiement'])
+        for mois in range(1, 13):
+            feuille.append(['MKT-001', 2024, mois, 1000, datetime(2024, mois, 5)])
+        feuille.append(['MKT-001', 2024, 3, 1000, None])
+        contenu = BytesIO()
+        classeur.save(contenu)
+        contenu.seek(0)
+
+        rapport = importer_fichier('paiements', contenu, 'historique.xlsx')
+        self.assertEqual((rapport.lignes_lues, rapport.creees), (13, 12))
+        self.assertEqual(rapport.erreurs, [(14, 'Le mois 3/2024 est déjà payé pour cette boutique.')])
+        self.assertEqual(PaiementCotisation.objects.filter(cotisation_annuelle__annee=2024).count(), 12)
+        self.assertEqual(VersementCotisation.objects.filter(cotisation_annuelle__annee=2024).count(), 12)
+        fait = FaitRecetteMensuelle.objects.get(mois=datetime(2024, 3, 1).date(), type_recette='cotisation_boutique')
+        self.assertEqual(fait.montant_encaisse, 1000)
+
+    def test_montants_non_finis_ou_trop_grands_rejetes(self):
+        contenu = (
+            "date;emplacement;nom_vendeur;montant\n"
+            "2024-03-02;Marché central;A;NaN\n"
+            "2024-03-02;Marché central;B;Infinity\n"
+            "2024-03-02;Marché central;C;1e30\n"
+            "2024-03-02;Marché central;D;-5\n"
+            "2024-03-02;Marché central;E;200\n"
+        ).encode('utf-8')
+        rapport = importer_fichier('tickets', BytesIO(contenu), 'tickets.csv')
+        self.assertEqual(rapport.creees, 1)
+        self.assertEqual([numero for numero, _ in rapport.erreurs], [2, 3, 4, 5])
+        self.assertIn('trop élevé', rapport.erreurs[2][1])
+        self.assertEqual(TicketMarche.objects.get().montant, 200)
+
+    def test_entiers_infinis_rejetes(self):
+        BoutiqueMagasin.objects.create(
+            matricule='MKT-001', emplacement=EmplacementMarche.objects.get(), prix_location_mensuel=Decimal('1000'),
+        )
+        contenu = (
+            "matricule_boutique;annee;mois;montant_paye\n"
+            "MKT-001;inf;3;1000\n"
+            "MKT-001;2024;-inf;1000\n"
+            "MKT-001;2024;3;1000\n"
+        ).encode('utf-8')
+        rapport = importer_fichier('paiements', BytesIO(contenu), 'paiements.csv')
+        self.assertEqual(rapport.creees, 1)
+        self.assertEqual(rapport.erreurs, [
+            (2, 'Colonne « annee » : entier attendu (inf).'), (3, 'Colonne « mois » : entier attendu (-inf).'),
+        ])
+
+    def test_paiement_cree_la_cotisation_et_ses_douze_mois(self):
+        BoutiqueMagasin.objects.create(
+            matricule='MKT-001', emplacement=EmplacementMarche.objects.get(), prix_location_mensuel=Decimal('1000'),
+        )
+        contenu = "matricule_boutique;annee;mois;montant_paye\nMKT-001;2024;3;1000\n".encode('utf-8')
+        self.assertEqual(importer_fichier('paiements', BytesIO(contenu), 'paiements.csv').creees, 1)
+        faits = FaitRecetteMensuelle.objects.filter(mois__year=2024, type_recette='cotisation_boutique')
+        self.assertEqual(faits.count(), 12)
+        self.assertEqual(sum(f.montant_du for f in faits), 12000)
+        self.assertEqual(sum(f.montant_encaisse for f in faits), 1000)
+
+
+class RelevesContribuablesTest(TestCase):
+    """Relevés de paiement : préchargement groupé, relevé unitaire et archive ZIP en masse."""
+
+    def setUp(self):
+        self.emplacement = EmplacementMarche.objects.create(quartier='Centre', nom_lieu='Marché central')
+        autre = EmplacementMarche.objects.create(quartier='Nord', nom_lieu='Marché nord')
+        for i, emplacement in enumerate([self.emplacement, self.emplacement, autre]):
+            contribuable = Contribuable.objects.create(nom=f'Nom{i}', prenom='Prénom', telephone=f'910000{i:02d}')
+            boutique = BoutiqueMagasin.objects.create(
+                matricule=f'MKT-{i:03d}', emplacement=emplacement, contribuable=contribuable,
+                prix_location_mensuel=Decimal('1000'),
+            )
+            PaiementCotisation.objects.create(
+                cotisation_annuelle=CotisationAnnuelle.objects.get(boutique=boutique),
+                mois=1, montant_paye=Decimal('1000'),
+            )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+
+    def test_preparation_et_archive(self):
+        debut, fin = releves.periode_annee(timezone.now().year)
+        with self.assertNumQueries(6):
+            donnees = releves.preparer_releves(releves.contribuables_cibles(self.emplacement.pk), debut, fin)
+        self.assertEqual([d['nom_complet'] for d in donnees], ['Nom0 Prénom', 'Nom1 Prénom'])
+        self.assertEqual(len(donnees[0]['paiements']), 1)
+
+        response = self.client.get(reverse('export_pdf_releves_contribuables'), {'emplacement': self.emplacement.pk})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ['releve_paiements_nom0-prenom.pdf', 'releve_paiements_nom1-prenom.pdf', 'resume.txt'],
+        )
+        self.assertTrue(archive.read('releve_paiements_nom0-prenom.pdf').startswith(b'%PDF'))
+
+    def test_releve_unitaire(self):
+        contribuable = Contribuable.objects.get(nom='Nom2')
+        response = self.client.get(reverse('export_pdf_suivi_paiements_contribuable', args=[contribuable.pk]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+
+class RelevesParallelesTest(SimpleTestCase):
+    """Rendu des relevés réparti sur plusieurs processus (commande generer_releves_contribuables)."""
+
+    def test_rendu_parallele(self):
+        debut, fin = releves.periode_annee(2025)
+        donnees = [
+            {
+                'id': i, 'nom_complet': f'Nom{i} Prénom', 'telephone': '', 'start': debut, 'end': fin,
+                'months_in_period': [(2025, m) for m in range(1, 13)], 'boutiques': [], 'cotisations': {},
+                'paiements': [], 'tickets': [],
+            }
+            for i in range(releves.SEUIL_PARALLELISME + 2)
+        ]
+        sortie = BytesIO()
+        with mock.patch.object(releves, '_executeur', wraps=releves._executeur) as executeur:
+            resume = releves.ecrire_releves_zip(donnees, releves.entete_pdf(None), sortie, processus=2)
+        executeur.assert_called_once_with(2)
+        self.assertEqual(resume['nombre'], len(donnees))
+        archive = zipfile.ZipFile(sortie)
+        self.assertEqual(len(archive.namelist()), len(donnees) + 1)
+        self.assertTrue(archive.read('releve_paiements_nom9-prenom.pdf').startswith(b'%PDF'))
+
+
+class ArchiveDossiersCandidaturesTest(TestCase):
+    """Archive ZIP des dossiers d'un appel d'offres : contenu complet, reprise par plage d'octets."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        reglages = override_settings(MEDIA_ROOT=media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        maintenant = timezone.now()
+        self.appel = AppelOffre.objects.create(
+            titre='Construction du marché', reference='AO-2026-01', description='-',
+            date_debut=maintenant, date_fin=maintenant, criteres_selection='-', dossier_candidature='-',
+        )
+        for i in range(3):
+            candidat = User.objects.create_user(username=f'candidat{i}', first_name=f'Entreprise{i}')
+            Candidature.objects.create(
+                appel_offre=self.appel, candidat=candidat,
+                fichier_dossier=SimpleUploadedFile(f'dossier{i}.pdf', b'%PDF-1.4 ' + bytes([i]) * 200_000),
+            )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'testpass123'))
+        self.url = reverse('export_zip_dossiers_candidatures', args=[self.appel.pk])
+
+    def test_archive_complete_et_reprise(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        contenu = b''.join(response.streaming_content)
+        self.assertEqual(len(contenu), int(response['Content-Length']))
+        archive = zipfile.ZipFile(BytesIO(contenu))
+        self.assertIsNone(archive.testzip())
+        noms = archive.namelist()
+        self.assertEqual(noms[0], 'synthese-candidatures.pdf')
+        self.assertEqual(len(noms), 4)
+        self.assertEqual(archive.read(noms[2]), b'%PDF-1.4 ' + bytes([1]) * 200_000)
+
+        # Reprise au milieu du deuxième dossier : les octets servis sont ceux de l'archive complète
+        reprise = self.client.get(self.url, HTTP_RANGE='bytes=300000-', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(reprise.status_code, 206)
+        self.assertEqual(reprise['Content-Range'], f'bytes 300000-{len(contenu) - 1}/{len(contenu)}')
+        self.assertEqual(b''.join(reprise.streaming_content), contenu[300000:])
+
+        hors_limites = self.client.get(self.url, HTTP_RANGE=f'bytes={len(contenu)}-')
+        self.assertEqual(hors_limites.status_code, 416)
+        # ETag périmé : l'archive entière est renvoyée
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"x"').status_code, 200)
+
+
+class ServirMediaTest(TestCase):
+    """Service des médias : plages d'octets, revalidation par ETag, délégation au serveur web."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        reglages = override_settings(MEDIA_ROOT=media, MEDIA_ENVOI_SERVEUR='')
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.contenu = bytes(range(256)) * 1000
+        with open(f'{media}/spot.mp4', 'wb') as fichier:
+            fichier.write(self.contenu)
+        self.url = reverse('servir_media', args=['spot.mp4'])
+
+    def test_plages_et_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(b''.join(response.streaming_content), self.contenu)
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        partielle = self.client.get(self.url, HTTP_RANGE='bytes=1000-1999')
+        self.assertEqual(partielle.status_code, 206)
+        self.assertEqual(b''.join(partielle.streaming_content), self.contenu[1000:2000])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('servir_media', args=['../settings.py'])).status_code, 404)
+
+        with self.settings(MEDIA_ENVOI_SERVEUR='x-accel-redirect'):
+            deleguee = self.client.get(self.url)
+        self.assertEqual(deleguee['X-Accel-Redirect'], '/media-interne/spot.mp4')
+        self.assertEqual(deleguee.content, b'')
+
+
+class StockageDedoublonneTest(TestCase):
+    """Médias dédoublonnés : un contenu identique partage un blob, nettoyer_medias supprime les orphelins."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_blob_partage_et_nettoyage(self):
+        logos = [
+            ImageCarousel.objects.create(titre=f'Image {i}', image=SimpleUploadedFile('logo.png', b'meme-contenu'))
+            for i in range(2)
+        ]
+        self.assertEqual(logos[0].image.name, logos[1].image.name)
+        self.assertTrue(logos[0].image.name.startswith('blobs/'))
+        self.assertEqual(compter_references()[logos[0].image.name], 2)
+
+        # Remplacement du fichier d'un enregistrement : l'ancien blob reste utilisé par l'autre
+        logos[0].image = SimpleUploadedFile('logo.png', b'nouveau-contenu')
+        logos[0].save()
+        logos[1].delete()
+        call_command('nettoyer_medias', '--delai-heures', '0', stdout=StringIO())
+        blobs = [os.path.join(d, f) for d, _, fichiers in os.walk(self.media) for f in fichiers]
+        self.assertEqual(blobs, [os.path.join(self.media, logos[0].image.name)])
+
+        # Renvoi d'un contenu dont le blob est ancien : sa date est rafraîchie, le délai de grâce le protège
+        chemin = os.path.join(self.media, logos[0].image.name)
+        os.utime(chemin, (0, 0))
+        ImageCarousel.objects.create(titre='Renvoi', image=SimpleUploadedFile('logo.png', b'nouveau-contenu'))
+        self.assertGreater(os.path.getmtime(chemin), 0)
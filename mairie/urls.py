@@ -9,6 +9,7 @@ urlpatterns = [
     path('organigramme/', views.organigramme_mairie, name='organigramme'),
     path('organigramme/section/<int:pk>/services/', views.section_services_detail, name='section_services'),
     path('cartographie/', views.cartographie_commune, name='cartographie'),
+    path('cartographie/marqueurs/', views.carte_marqueurs, name='carte_marqueurs'),
     path('contactez-nous/', views.contactez_nous, name='contactez_nous'),
     path('appels-offres/', views.liste_appels_offres, name='appels_offres'),
     path('appels-offres/<int:pk>/', views.detail_appel_offre, name='appel_offre_detail'),
@@ -1,7 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 import json
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
@@ -33,6 +33,7 @@ from .models import (
     ServiceSection,
 )
 from .forms import CandidatureForm, SuggestionForm, ContribuableForm
+from .carte import ParametreCarteInvalide, lire_bbox, marqueurs_geojson
 from acteurs.models import ActeurEconomique, InstitutionFinanciere
 from emploi.models import ProfilEmploi
 from mairie_kloto_platform.views import _draw_pdf_header, NumberedCanvas, PDF_HEADER_HEIGHT_CM
@@ -75,7 +76,6 @@ def cartographie_commune(request):
     mairie_config = ConfigurationMairie.objects.filter(est_active=True).first()
 
     cartographie = None
-    infrastructures_data = []
     commune_boundary = []
     sante_types = []
     education_types = []
@@ -95,18 +95,8 @@ def cartographie_commune(request):
                 est_active=True,
             ).order_by("type_infrastructure", "nom")
         )
-        for infra in infrastructures_qs:
-            infrastructures_data.append(
-                {
-                    "id": infra.id,
-                    "nom": infra.nom,
-                    "type": infra.type_infrastructure,
-                    "description": infra.description,
-                    "adresse": infra.adresse,
-                    "lat": float(infra.latitude),
-                    "lng": float(infra.longitude),
-                }
-            )
+
+        # Les points de la carte sont chargés à la demande (voir carte_marqueurs)
 
         # Regrouper les infrastructures de santé par type (centre hospitalier, centres de santé, postes, cliniques…)
         def _classify_sante(nom: str) -> str:
@@ -131,10 +121,9 @@ def cartographie_commune(request):
 
         sante_groups = {}
         # Utiliser en priorité les enregistrements BD, sinon retomber sur la fiche texte
-        sante_noms = [
-            infra.nom
-            for infra in infrastructures_qs.filter(type_infrastructure="sante")
-        ]
+        sante_noms = list(
+            infrastructures_qs.filter(type_infrastructure="sante").values_list("nom", flat=True)
+        )
         if not sante_noms and cartographie.infrastructures_sante_list:
             sante_noms = list(cartographie.infrastructures_sante_list)
 
@@ -186,10 +175,9 @@ def cartographie_commune(request):
 
         edu_groups = {}
         # Utiliser en priorité les enregistrements BD, sinon retomber sur la fiche texte
-        education_noms = [
-            infra.nom
-            for infra in infrastructures_qs.filter(type_infrastructure="education")
-        ]
+        education_noms = list(
+            infrastructures_qs.filter(type_infrastructure="education").values_list("nom", flat=True)
+        )
         if not education_noms and cartographie.infrastructures_education_list:
             education_noms = list(cartographie.infrastructures_education_list)
 
@@ -239,7 +227,6 @@ def cartographie_commune(request):
 
     context = {
         "cartographie": cartographie,
-        "infrastructures_json": json.dumps(infrastructures_data, ensure_ascii=False),
         "commune_boundary_json": json.dumps(commune_boundary, ensure_ascii=False),
         "sante_types": sante_types,
         "education_types": education_types,
@@ -249,6 +236,25 @@ def cartographie_commune(request):
     return render(request, "mairie/cartographie.html", context)
 
 
+def carte_marqueurs(request):
+    """
+    Marqueurs GeoJSON pour les cartes (publique et tableau de bord), regroupés par grille.
+
+    Paramètres GET : `bbox=ouest,sud,est,nord`, `zoom`, `couches` (acteurs, institutions,
+    infrastructures). Les acteurs, institutions et infrastructures inactives sont réservés au staff.
+    """
+    couches = [c for c in request.GET.get("couches", "infrastructures").split(",") if c]
+    try:
+        bbox = lire_bbox(request.GET.get("bbox", ""))
+        zoom = int(request.GET.get("zoom", 12))
+    except (ParametreCarteInvalide, ValueError) as e:
+        message = str(e) if isinstance(e, ParametreCarteInvalide) else "Paramètre zoom invalide."
+        return JsonResponse({"success": False, "error": message}, status=400)
+
+    donnees = marqueurs_geojson(couches, bbox=bbox, zoom=max(0, min(zoom, 22)), staff=request.user.is_staff)
+    return JsonResponse(donnees)
+
+
 def organigramme_mairie(request):
     """
     Page affichant l'organigramme de la mairie :
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MairieKlotoPlatformConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'mairie_kloto_platform'
+
+    def ready(self):
+        # Enregistre le réglage des connexions SQLite (signal connection_created)
+        from . import database  # noqa: F401
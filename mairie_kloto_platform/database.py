@@ -0,0 +1,53 @@
+"""
+Réglages de performance SQLite appliqués à chaque nouvelle connexion.
+
+Par défaut, SQLite fonctionne en mode « rollback journal » : une écriture (ex. l'enregistrement
+d'une visite par `TrackVisitorMiddleware`) bloque les lectures du tableau de bord, et
+inversement. Le mode WAL permet des lectures concurrentes pendant une écriture ; les autres
+PRAGMA réduisent les accès disque.
+
+Les valeurs peuvent être surchargées via `settings.SQLITE_PRAGMAS` (ex. pour désactiver le WAL
+sur un système de fichiers réseau qui ne le supporte pas).
+
+L'attente sur un verrou est réglée par `DATABASES[...]["OPTIONS"]["timeout"]`, que sqlite3 applique
+comme busy timeout à l'ouverture : aucun PRAGMA busy_timeout ici, il l'écraserait.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Valeurs par défaut (ordre d'application conservé)
+SQLITE_PRAGMAS_DEFAUT = {
+    # Lecteurs et écrivain ne se bloquent plus mutuellement
+    "journal_mode": "WAL",
+    # En mode WAL, NORMAL reste sûr en cas de crash applicatif et évite un fsync par transaction
+    "synchronous": "NORMAL",
+    # Cache de pages : valeur négative = taille en Kio (ici 20 Mo)
+    "cache_size": -20000,
+    # Lecture des pages via mmap (128 Mo) plutôt que par appels read()
+    "mmap_size": 134217728,
+    # Tables et index temporaires (tris, GROUP BY) en mémoire
+    "temp_store": "MEMORY",
+}
+
+
+def get_sqlite_pragmas():
+    """PRAGMA à appliquer, en tenant compte des surcharges de `settings.SQLITE_PRAGMAS`."""
+    pragmas = dict(SQLITE_PRAGMAS_DEFAUT)
+    pragmas.update(getattr(settings, "SQLITE_PRAGMAS", {}) or {})
+    return {nom: valeur for nom, valeur in pragmas.items() if valeur is not None}
+
+
+def appliquer_pragmas(cursor, pragmas=None):
+    """Exécute les PRAGMA sur un curseur SQLite (DB-API ou Django)."""
+    for nom, valeur in (pragmas if pragmas is not None else get_sqlite_pragmas()).items():
+        cursor.execute(f"PRAGMA {nom} = {valeur}")
+
+
+@receiver(connection_created)
+def configurer_connexion_sqlite(sender, connection, **kwargs):
+    """Applique les PRAGMA de performance à chaque nouvelle connexion SQLite."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        appliquer_pragmas(cursor)
@@ -0,0 +1,266 @@
+"""
+Benchmark des pages publiques et du tableau de bord (latence p50/p95 et nombre de requêtes SQL).
+
+La commande travaille sur une base de test temporaire (jamais sur la base réelle) :
+1. elle rejoue les commandes de démonstration (peupler_contribuables_marche,
+   peupler_agents_collecteurs, ajouter_donnees_test) ;
+2. elle multiplie ces données jusqu'à l'échelle demandée (--echelle boutiques) ;
+3. elle mesure chaque vue avec le client de test et écrit un JSON de référence.
+
+Usage:
+    python manage.py benchmark_plateforme --echelle 2000 --iterations 10 --sortie bench.json
+    python manage.py benchmark_plateforme --comparer bench.json   # échoue en cas de régression
+"""
+import io
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from emploi.models import ProfilEmploi
+from mairie.models import (
+    AgentCollecteur, BoutiqueMagasin, Contribuable, CotisationAnnuelle, EmplacementMarche,
+    PaiementCotisation, TicketMarche,
+)
+
+TAILLE_LOT = 1000
+
+
+class Command(BaseCommand):
+    help = "Mesure latence (p50/p95) et requêtes SQL des vues critiques sur une base de test peuplée."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--echelle', type=int, default=1000, help="Nombre de boutiques/contribuables à générer.")
+        parser.add_argument('--iterations', type=int, default=10, help="Nombre de mesures par vue.")
+        parser.add_argument('--sortie', type=str, default='', help="Fichier JSON où écrire les résultats.")
+        parser.add_argument('--comparer', type=str, default='', help="JSON de référence à comparer aux résultats.")
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help="Hausse relative du p95 tolérée lors de la comparaison (0.25 = +25 %%).",
+        )
+        parser.add_argument('--sans-exports', action='store_true', help="Ne pas mesurer les exports PDF/Excel.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            self._peupler(options['echelle'])
+            resultats = self._mesurer(options)
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+            teardown_test_environment()
+
+        rapport = {
+            'genere_le': timezone.now().isoformat(),
+            'echelle': options['echelle'],
+            'iterations': options['iterations'],
+            'vues': resultats,
+        }
+        contenu = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as f:
+                f.write(contenu)
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['sortie']}"))
+        else:
+            self.stdout.write(contenu)
+
+        if options['comparer']:
+            self._comparer(options['comparer'], resultats, options['tolerance'])
+
+    # ------------------------------------------------------------------
+    # Données
+    # ------------------------------------------------------------------
+
+    def _peupler(self, echelle):
+        muet = io.StringIO()
+        call_command('peupler_contribuables_marche', stdout=muet)
+        call_command('peupler_agents_collecteurs', stdout=muet)
+        call_command('ajouter_donnees_test', stdout=muet)
+
+        emplacements = list(EmplacementMarche.objects.all())
+        agents = list(AgentCollecteur.objects.filter(statut='actif'))
+        annee = date.today().year
+
+        contribuables = Contribuable.objects.bulk_create(
+            [
+                Contribuable(nom=f"Bench{i:06d}", prenom="Contribuable", telephone=f"+228 9{i % 10} {i:06d}")
+                for i in range(echelle)
+            ],
+            batch_size=TAILLE_LOT,
+        )
+        boutiques = BoutiqueMagasin.objects.bulk_create(
+            [
+                BoutiqueMagasin(
+                    matricule=f"BENCH-{i:06d}",
+                    emplacement=emplacements[i % len(emplacements)],
+                    contribuable=c,
+                    agent_collecteur=agents[i % len(agents)] if agents else None,
+                    prix_location_mensuel=Decimal(5000 + (i % 10) * 1000),
+                    activite_vendue="Benchmark",
+                )
+                for i, c in enumerate(contribuables)
+            ],
+            batch_size=TAILLE_LOT,
+        )
+        cotisations = CotisationAnnuelle.objects.bulk_create(
+            [
+                CotisationAnnuelle(boutique=b, annee=a, montant_annuel_du=b.get_prix_annuel())
+                for b in boutiques
+                for a in (annee - 1, annee)
+            ],
+            batch_size=TAILLE_LOT,
+        )
+        paiements = []
+        for i, cot in enumerate(cotisations):
+            nb_mois = 12 if cot.annee < annee else (i % 8)
+            for mois in range(1, nb_mois + 1):
+                paiements.append(
+                    PaiementCotisation(
+                        cotisation_annuelle=cot,
+                        mois=mois,
+                        montant_paye=cot.boutique.prix_location_mensuel,
+                        date_paiement=timezone.make_aware(timezone.datetime(cot.annee, mois, 10, 9, 0)),
+                        encaisse_par_agent=cot.boutique.agent_collecteur,
+                    )
+                )
+        PaiementCotisation.objects.bulk_create(paiements, batch_size=TAILLE_LOT)
+        aujourd_hui = date.today()
+        TicketMarche.objects.bulk_create(
+            [
+                TicketMarche(
+                    date=aujourd_hui - timedelta(days=i % 60),
+                    emplacement=emplacements[i % len(emplacements)],
+                    nom_vendeur=f"Étalage {i}",
+                    montant=Decimal("500"),
+                    encaisse_par_agent=agents[i % len(agents)] if agents else None,
+                )
+                for i in range(echelle * 2)
+            ],
+            batch_size=TAILLE_LOT,
+        )
+
+        # Inscriptions : on duplique les fiches de démonstration (1 pour 10 boutiques)
+        for modele, champ in (
+            (ActeurEconomique, 'raison_sociale'),
+            (InstitutionFinanciere, 'nom_institution'),
+            (ProfilEmploi, 'nom'),
+        ):
+            fiches = list(modele.objects.all())
+            copies = []
+            for i in range(echelle // 10):
+                fiche = fiches[i % len(fiches)]
+                valeurs = {
+                    f.attname: getattr(fiche, f.attname)
+                    for f in modele._meta.concrete_fields
+                    if not f.primary_key
+                }
+                valeurs['user_id'] = None
+                valeurs[champ] = f"{getattr(fiche, champ)[:90]} #{i}"
+                copies.append(modele(**valeurs))
+            modele.objects.bulk_create(copies, batch_size=TAILLE_LOT)
+
+        for agent in agents:
+            agent.emplacements_assignes.add(*emplacements)
+
+    # ------------------------------------------------------------------
+    # Mesures
+    # ------------------------------------------------------------------
+
+    def _vues_a_mesurer(self, options):
+        agent = AgentCollecteur.objects.filter(statut='actif').order_by('pk').first()
+        contribuable = Contribuable.objects.filter(
+            boutiques_magasins__emplacement__in=agent.emplacements_assignes.all()
+        ).order_by('pk').first()
+
+        vues = [
+            ('accueil', None, reverse('mairie:accueil')),
+            ('tableau_bord', 'staff', reverse('tableau_bord')),
+            ('liste_contributions', 'staff', reverse('liste_contributions')),
+            ('liste_contribuables', 'staff', reverse('liste_contribuables')),
+            ('espace_agent', 'agent', reverse('comptes:espace_agent')),
+            ('payer_contribuable', 'agent', reverse('comptes:payer_contribuable', args=[contribuable.pk])),
+        ]
+        if not options['sans_exports']:
+            from mairie_kloto_platform import urls as projet_urls
+
+            for motif in projet_urls.urlpatterns:
+                if isinstance(motif, URLPattern) and (motif.name or '').startswith('export_'):
+                    if not motif.pattern.converters:
+                        vues.append((motif.name, 'staff', reverse(motif.name)))
+            vues.append((
+                'export_pdf_suivi_paiements_contribuable',
+                'staff',
+                reverse('export_pdf_suivi_paiements_contribuable', args=[contribuable.pk]),
+            ))
+        return vues, agent
+
+    def _mesurer(self, options):
+        staff = User.objects.create_superuser('bench_admin', 'bench@example.com', 'bench')
+        vues, agent = self._vues_a_mesurer(options)
+        clients = {None: Client(), 'staff': Client(), 'agent': Client()}
+        clients['staff'].force_login(staff)
+        clients['agent'].force_login(agent.user)
+
+        resultats = {}
+        for nom, profil, url in vues:
+            client = clients[profil]
+            client.get(url)  # échauffement (caches, compilation des gabarits)
+            durees, nb_requetes, statut = [], 0, None
+            for _ in range(max(1, options['iterations'])):
+                with CaptureQueriesContext(connection) as requetes:
+                    debut = time.perf_counter()
+                    response = client.get(url)
+                    if getattr(response, 'streaming', False):
+                        b''.join(response.streaming_content)
+                    durees.append((time.perf_counter() - debut) * 1000)
+                nb_requetes = len(requetes.captured_queries)
+                statut = response.status_code
+            resultats[nom] = {
+                'url': url,
+                'statut': statut,
+                'requetes': nb_requetes,
+                'p50_ms': round(statistics.median(durees), 2),
+                'p95_ms': round(_percentile(durees, 95), 2),
+            }
+            self.stdout.write(
+                f"{nom:55s} {statut} {nb_requetes:5d} req. "
+                f"p50 {resultats[nom]['p50_ms']:8.1f} ms  p95 {resultats[nom]['p95_ms']:8.1f} ms"
+            )
+        return resultats
+
+    def _comparer(self, chemin, resultats, tolerance):
+        with open(chemin, encoding='utf-8') as f:
+            reference = json.load(f).get('vues', {})
+        regressions = []
+        for nom, actuel in resultats.items():
+            ancien = reference.get(nom)
+            if not ancien:
+                continue
+            if actuel['requetes'] > ancien['requetes']:
+                regressions.append(f"{nom} : {ancien['requetes']} → {actuel['requetes']} requêtes")
+            if ancien['p95_ms'] and actuel['p95_ms'] > ancien['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{nom} : p95 {ancien['p95_ms']} → {actuel['p95_ms']} ms")
+        if regressions:
+            raise CommandError("Régressions détectées :\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence."))
+
+
+def _percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    if len(valeurs) == 1:
+        return valeurs[0]
+    return statistics.quantiles(valeurs, n=100, method='inclusive')[p - 1]
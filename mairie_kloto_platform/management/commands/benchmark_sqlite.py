@@ -0,0 +1,132 @@
+"""
+Mesure la contention en écriture SQLite avant/après application des PRAGMA de performance.
+
+Simule des écritures concurrentes de visites (comme TrackVisitorMiddleware) pendant que
+d'autres threads lisent des statistiques (comme le tableau de bord), sur une base temporaire.
+
+Usage: python manage.py benchmark_sqlite --ecrivains 4 --lecteurs 4 --duree 5
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from mairie_kloto_platform.database import appliquer_pragmas, get_sqlite_pragmas
+
+
+SCHEMA = """
+CREATE TABLE visite (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date REAL NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    session_key VARCHAR(40) NOT NULL
+);
+CREATE INDEX visite_date ON visite (date);
+"""
+
+REQUETE_LECTURE = (
+    "SELECT path, COUNT(*), COUNT(DISTINCT session_key) FROM visite "
+    "WHERE date >= ? GROUP BY path ORDER BY 2 DESC LIMIT 10"
+)
+
+
+class Command(BaseCommand):
+    help = "Compare la contention SQLite (écritures/lectures concurrentes) sans et avec les PRAGMA de performance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ecrivains', type=int, default=4, help="Nombre de threads qui écrivent.")
+        parser.add_argument('--lecteurs', type=int, default=4, help="Nombre de threads qui lisent.")
+        parser.add_argument('--duree', type=float, default=5.0, help="Durée de chaque scénario (secondes).")
+        parser.add_argument('--timeout', type=float, default=1.0, help="Timeout de verrou des deux scénarios (secondes).")
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ("Par défaut (rollback journal)", {}),
+            ("Optimisé (WAL + PRAGMA)", get_sqlite_pragmas()),
+        ]
+        for libelle, pragmas in scenarios:
+            resultat = self._executer_scenario(pragmas, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(libelle))
+            self.stdout.write(
+                f"  Écritures : {resultat['ecritures']} ({resultat['ecritures'] / options['duree']:.0f}/s), "
+                f"latence p95 {resultat['p95_ecriture_ms']:.1f} ms, "
+                f"erreurs « database is locked » : {resultat['erreurs_ecriture']}"
+            )
+            self.stdout.write(
+                f"  Lectures  : {resultat['lectures']} ({resultat['lectures'] / options['duree']:.0f}/s), "
+                f"erreurs : {resultat['erreurs_lecture']}"
+            )
+
+    def _executer_scenario(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "benchmark.sqlite3")
+            conn = sqlite3.connect(chemin)
+            conn.executescript(SCHEMA)
+            conn.close()
+
+            stats = {
+                "ecritures": 0, "erreurs_ecriture": 0, "lectures": 0, "erreurs_lecture": 0,
+                "latences": [],
+            }
+            verrou = threading.Lock()
+            fin = time.monotonic() + options['duree']
+
+            def connecter():
+                # Attente sur verrou : le timeout de connexion, comme OPTIONS["timeout"] côté Django
+                c = sqlite3.connect(chemin, timeout=options['timeout'], isolation_level=None)
+                if pragmas:
+                    appliquer_pragmas(c, pragmas)
+                return c
+
+            def ecrivain(numero):
+                c = connecter()
+                latences, ok, erreurs = [], 0, 0
+                while time.monotonic() < fin:
+                    debut = time.perf_counter()
+                    try:
+                        c.execute(
+                            "INSERT INTO visite (date, path, session_key) VALUES (?, ?, ?)",
+                            (time.time(), f"/page/{ok % 20}", f"s{numero}-{ok % 500}"),
+                        )
+                        ok += 1
+                        latences.append(time.perf_counter() - debut)
+                    except sqlite3.OperationalError:
+                        erreurs += 1
+                c.close()
+                with verrou:
+                    stats["ecritures"] += ok
+                    stats["erreurs_ecriture"] += erreurs
+                    stats["latences"].extend(latences)
+
+            def lecteur():
+                c = connecter()
+                ok, erreurs = 0, 0
+                while time.monotonic() < fin:
+                    try:
+                        c.execute("BEGIN")
+                        c.execute(REQUETE_LECTURE, (time.time() - 3600,)).fetchall()
+                        c.execute("SELECT COUNT(*) FROM visite").fetchone()
+                        c.execute("COMMIT")
+                        ok += 1
+                    except sqlite3.OperationalError:
+                        erreurs += 1
+                        if c.in_transaction:
+                            c.execute("ROLLBACK")
+                c.close()
+                with verrou:
+                    stats["lectures"] += ok
+                    stats["erreurs_lecture"] += erreurs
+
+            threads = [threading.Thread(target=ecrivain, args=(i,)) for i in range(options['ecrivains'])]
+            threads += [threading.Thread(target=lecteur) for _ in range(options['lecteurs'])]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        latences = sorted(stats.pop("latences"))
+        stats["p95_ecriture_ms"] = latences[int(len(latences) * 0.95)] * 1000 if latences else 0.0
+        return stats
@@ -0,0 +1,51 @@
+"""
+Compacte la table des sessions (django_session).
+
+- Supprime les sessions expirées (comme `clearsessions`).
+- Supprime les sessions vides (aucune donnée), héritées de l'ancien suivi des visites qui
+  créait une session pour chaque visiteur anonyme : une session vide n'identifie personne.
+
+À planifier chaque jour (PythonAnywhere, onglet « Tasks ») :
+    python manage.py compacter_sessions
+    python manage.py compacter_sessions --simulation    # compter sans rien supprimer
+"""
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+TAILLE_LOT = 500
+
+
+class Command(BaseCommand):
+    help = "Supprime les sessions expirées et les sessions vides des visiteurs anonymes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simulation", action="store_true", help="Compter sans rien supprimer.")
+
+    def handle(self, *args, **options):
+        simulation = options["simulation"]
+        expirees = Session.objects.filter(expire_date__lt=timezone.now())
+        nb_expirees = expirees.count()
+        if not simulation:
+            expirees.delete()
+
+        # Un dictionnaire vide encodé commence par « e30 » (base64 de « {} ») : seules ces lignes
+        # sont décodées pour confirmer qu'elles sont vides.
+        store = SessionStore()
+        vides = []
+        candidates = Session.objects.filter(
+            session_data__startswith="e30", expire_date__gte=timezone.now()
+        ).values_list("session_key", "session_data")
+        for session_key, session_data in candidates.iterator(chunk_size=TAILLE_LOT):
+            if not store.decode(session_data):
+                vides.append(session_key)
+        if not simulation:
+            for i in range(0, len(vides), TAILLE_LOT):
+                Session.objects.filter(session_key__in=vides[i:i + TAILLE_LOT]).delete()
+
+        verbe = "à supprimer" if simulation else "supprimée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{nb_expirees} session(s) expirée(s) et {len(vides)} session(s) vide(s) {verbe} ; "
+            f"{Session.objects.count()} session(s) en base."
+        ))
@@ -0,0 +1,24 @@
+"""
+Construit les formulaires d'inscription vierges (PDF) pour la configuration active.
+
+À lancer à chaque déploiement, après collectstatic (voir COMMANDES_MISE_A_JOUR.txt) :
+    python manage.py construire_modeles_pdf
+    python manage.py construire_modeles_pdf --forcer    # reconstruire même si la version existe
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mairie_kloto_platform.modeles_pdf import construire_modeles
+
+
+class Command(BaseCommand):
+    help = "Construit les PDF modèles (formulaires d'inscription vierges) pour la configuration active."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forcer", action="store_true", help="Reconstruire les PDF déjà présents.")
+
+    def handle(self, *args, **options):
+        noms = construire_modeles(forcer=options["forcer"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(noms)} modèle(s) PDF prêt(s) dans {settings.MODELES_PDF_ROOT} : {', '.join(noms)}"
+        ))
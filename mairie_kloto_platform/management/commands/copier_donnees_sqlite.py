@@ -0,0 +1,163 @@
+"""
+Copie toutes les données d'une base SQLite vers la base configurée (ex. PostgreSQL).
+
+La copie est refusée si la source et la destination n'ont pas exactement les mêmes migrations
+appliquées : on est ainsi sûr que les schémas sont identiques. Les clés primaires sont conservées
+(relations, permissions, types de contenu), puis les séquences PostgreSQL sont réinitialisées.
+
+Usage:
+    MAIRIE_DB_ENGINE=postgresql ... python manage.py migrate
+    MAIRIE_DB_ENGINE=postgresql ... python manage.py copier_donnees_sqlite --source db.sqlite3
+"""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+
+SOURCE_DB_ALIAS = "sqlite_source"
+
+# Tables régénérées automatiquement par `migrate` : toujours remplacées par celles de la source
+MODELES_DERIVES = {"contenttypes.contenttype", "auth.permission"}
+
+
+class Command(BaseCommand):
+    help = "Copie les données d'une base SQLite vers la base par défaut (migrations identiques requises)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            type=str,
+            default=str(settings.BASE_DIR / 'db.sqlite3'),
+            help="Chemin du fichier SQLite source (défaut : db.sqlite3 du projet).",
+        )
+        parser.add_argument(
+            '--destination',
+            type=str,
+            default=DEFAULT_DB_ALIAS,
+            help="Alias de la base de destination (défaut : default).",
+        )
+        parser.add_argument('--taille-lot', type=int, default=2000, help="Nombre de lignes insérées par requête.")
+        parser.add_argument(
+            '--vider',
+            action='store_true',
+            help="Vider les tables de destination avant la copie (sinon la destination doit être vide).",
+        )
+
+    def handle(self, *args, **options):
+        source_path = Path(options['source'])
+        if not source_path.exists():
+            raise CommandError(f"Fichier SQLite introuvable : {source_path}")
+        destination = options['destination']
+        if destination not in settings.DATABASES:
+            raise CommandError(f"Alias de base inconnu : {destination}")
+
+        self._declarer_source(source_path)
+        source_conn = connections[SOURCE_DB_ALIAS]
+        dest_conn = connections[destination]
+        if source_conn.settings_dict['NAME'] == dest_conn.settings_dict['NAME'] and dest_conn.vendor == 'sqlite':
+            raise CommandError("La source et la destination sont la même base.")
+
+        self._verifier_migrations(source_conn, dest_conn)
+
+        modeles = [
+            m for m in apps.get_models(include_auto_created=True)
+            if m._meta.managed and not m._meta.proxy and router.allow_migrate_model(destination, m)
+        ]
+
+        non_vides = [
+            m._meta.label for m in modeles
+            if m._meta.label_lower not in MODELES_DERIVES and m._base_manager.using(destination).exists()
+        ]
+        if non_vides and not options['vider']:
+            raise CommandError(
+                "La base de destination contient déjà des données ("
+                + ", ".join(non_vides[:5]) + ("…" if len(non_vides) > 5 else "")
+                + "). Relancez avec --vider pour les remplacer."
+            )
+
+        taille_lot = max(1, options['taille_lot'])
+        total = 0
+        with transaction.atomic(using=destination):
+            tables = [m._meta.db_table for m in modeles]
+            dest_conn.ops.execute_sql_flush(
+                dest_conn.ops.sql_flush(no_style(), tables, allow_cascade=True)
+            )
+
+            for modele in modeles:
+                copiees = self._copier_modele(modele, destination, taille_lot)
+                attendues = modele._base_manager.using(SOURCE_DB_ALIAS).count()
+                if copiees != attendues:
+                    raise CommandError(
+                        f"{modele._meta.label} : {copiees} lignes copiées sur {attendues}, copie annulée."
+                    )
+                total += copiees
+                if copiees and options['verbosity'] >= 2:
+                    self.stdout.write(f"  {modele._meta.label} : {copiees}")
+
+            # Repositionner les séquences (PostgreSQL) après insertion avec des id explicites
+            with dest_conn.cursor() as cursor:
+                for sql in dest_conn.ops.sequence_reset_sql(no_style(), modeles):
+                    cursor.execute(sql)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{total} lignes copiées ({len(modeles)} tables) vers « {destination} ».")
+        )
+
+    def _declarer_source(self, source_path):
+        """Ajoute dynamiquement un alias de connexion vers le fichier SQLite source."""
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(source_path),
+            'ATOMIC_REQUESTS': False,
+            'AUTOCOMMIT': True,
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'OPTIONS': {},
+            'TIME_ZONE': None,
+            'USER': '',
+            'PASSWORD': '',
+            'HOST': '',
+            'PORT': '',
+            'TEST': {},
+        }
+        connections.databases[SOURCE_DB_ALIAS] = config
+
+    def _verifier_migrations(self, source_conn, dest_conn):
+        executor = MigrationExecutor(dest_conn)
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            raise CommandError(
+                "La base de destination n'est pas à jour : exécutez d'abord `python manage.py migrate`."
+            )
+        appliquees_source = set(MigrationRecorder(source_conn).applied_migrations())
+        appliquees_dest = set(MigrationRecorder(dest_conn).applied_migrations())
+        if appliquees_source != appliquees_dest:
+            manquantes = sorted(appliquees_dest - appliquees_source) or sorted(appliquees_source - appliquees_dest)
+            details = ", ".join(f"{app}.{nom}" for app, nom in manquantes[:5])
+            raise CommandError(
+                "Les migrations appliquées diffèrent entre la source et la destination "
+                f"({details}). Migrez la base SQLite source avec le même code avant la copie."
+            )
+
+    def _copier_modele(self, modele, destination, taille_lot):
+        """
+        Copie un modèle par lots. Insertion « brute » (comme loaddata) : les champs
+        auto_now / auto_now_add conservent les valeurs de la source.
+        """
+        champs = modele._meta.local_concrete_fields
+        manager = modele._base_manager
+        lot, copiees = [], 0
+        for obj in manager.using(SOURCE_DB_ALIAS).order_by('pk').iterator(chunk_size=taille_lot):
+            lot.append(obj)
+            if len(lot) >= taille_lot:
+                manager.using(destination)._insert(lot, fields=champs, using=destination, raw=True)
+                copiees += len(lot)
+                lot = []
+        if lot:
+            manager.using(destination)._insert(lot, fields=champs, using=destination, raw=True)
+            copiees += len(lot)
+        return copiees
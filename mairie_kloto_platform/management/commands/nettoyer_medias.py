@@ -0,0 +1,96 @@
+"""
+Ramasse-miettes des fichiers média (stockage dédoublonné, voir mairie_kloto_platform.stockage).
+
+Un blob n'est supprimé que s'il n'est plus référencé par aucun champ fichier de la base et
+qu'il n'a pas été modifié depuis --delai-heures (un envoi en cours n'est pas encore enregistré).
+
+Usage:
+    python manage.py nettoyer_medias --simulation       # liste ce qui serait supprimé
+    python manage.py nettoyer_medias                    # supprime les blobs orphelins
+    python manage.py nettoyer_medias --migrer           # range d'abord les anciens fichiers en blobs
+    python manage.py nettoyer_medias --hors-blobs       # supprime aussi les anciens fichiers orphelins
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from mairie_kloto_platform.stockage import PREFIXE_BLOBS, StockageDedoublonne, champs_fichiers, compter_references
+
+
+class Command(BaseCommand):
+    help = "Supprime les fichiers média qui ne sont plus référencés (et range les anciens fichiers en blobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simulation", action="store_true", help="Afficher sans rien supprimer ni modifier.")
+        parser.add_argument(
+            "--delai-heures", type=float, default=24,
+            help="Ne pas toucher aux fichiers modifiés depuis moins de N heures (défaut : 24).",
+        )
+        parser.add_argument(
+            "--migrer", action="store_true",
+            help="Ranger en blobs les fichiers encore stockés sous leur chemin d'origine et mettre à jour la base.",
+        )
+        parser.add_argument(
+            "--hors-blobs", action="store_true",
+            help="Supprimer aussi les fichiers non référencés hors du dossier blobs/.",
+        )
+
+    def handle(self, *args, **options):
+        simulation = options["simulation"]
+        if options["migrer"]:
+            if not isinstance(default_storage, StockageDedoublonne):
+                raise CommandError("--migrer nécessite STORAGES['default'] = StockageDedoublonne.")
+            self.migrer(simulation)
+
+        references = compter_references()
+        limite = time.time() - options["delai_heures"] * 3600
+        racine = str(settings.MEDIA_ROOT)
+        depart = racine if options["hors_blobs"] else os.path.join(racine, PREFIXE_BLOBS)
+
+        supprimes = octets = conserves = 0
+        for dossier, _, fichiers in os.walk(depart):
+            for fichier in fichiers:
+                chemin = os.path.join(dossier, fichier)
+                nom = os.path.relpath(chemin, racine).replace(os.sep, "/")
+                etat = os.stat(chemin)
+                if references[nom] or etat.st_mtime > limite:
+                    conserves += 1
+                    continue
+                supprimes += 1
+                octets += etat.st_size
+                if simulation:
+                    self.stdout.write(f"  orphelin : {nom} ({etat.st_size} o)")
+                else:
+                    os.remove(chemin)
+
+        verbe = "à supprimer" if simulation else "supprimé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{supprimes} fichier(s) orphelin(s) {verbe} ({octets / 1024 / 1024:.1f} Mo), "
+            f"{conserves} conservé(s), {len(references)} fichier(s) référencé(s)."
+        ))
+
+    def migrer(self, simulation):
+        """Remplace chaque fichier d'origine par son blob ; les anciens fichiers deviennent orphelins."""
+        migres = manquants = 0
+        for modele, champ in champs_fichiers():
+            noms = (
+                modele._base_manager.exclude(**{champ: ""}).exclude(**{f"{champ}__isnull": True})
+                .exclude(**{f"{champ}__startswith": PREFIXE_BLOBS})
+                .order_by().values_list(champ, flat=True).distinct()
+            )
+            for nom in list(noms):
+                if not default_storage.exists(nom):
+                    manquants += 1
+                    continue
+                migres += 1
+                if simulation:
+                    continue
+                with default_storage.open(nom, "rb") as contenu:
+                    blob = default_storage.save(nom, contenu)
+                modele._base_manager.filter(**{champ: nom}).update(**{champ: blob})
+        self.stdout.write(
+            f"{migres} fichier(s) {'à ranger' if simulation else 'rangé(s)'} en blobs, {manquants} introuvable(s)."
+        )
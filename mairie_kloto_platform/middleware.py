@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils import timezone
 
 from mairie.models import VisiteSite
+from mairie_kloto_platform import profilage
+from mairie_kloto_platform.visiteurs import est_robot, identifiant_visiteur, poser_cookie_visiteur
 
 
 class TrackVisitorMiddleware:
     """
     Middleware pour enregistrer les visites du site.
 
-    - Enregistre l'IP, le user-agent, le chemin et la session.
+    - Enregistre l'IP, le user-agent, le chemin et l'identifiant du visiteur (cookie signé,
+      voir mairie_kloto_platform.visiteurs) : aucune session n'est créée pour les anonymes.
     - Ignore les fichiers statiques, médias et l'administration Django.
+    - Les visites de robots sont enregistrées sans cookie et marquées `est_robot`.
     """
 
     def __init__(self, get_response):
@@ -28,19 +37,19 @@ class TrackVisitorMiddleware:
         try:
             ip = request.META.get("REMOTE_ADDR", "")
             user_agent = request.META.get("HTTP_USER_AGENT", "") or ""
-            session_key = request.session.session_key or ""
-
-            # S'assurer que la session existe
-            if not session_key:
-                request.session.save()
-                session_key = request.session.session_key or ""
+            user_agent = user_agent[:255]
+            identifiant = ""
+            if not est_robot(user_agent):
+                identifiant, nouveau = identifiant_visiteur(request)
+                if nouveau:
+                    poser_cookie_visiteur(response, identifiant)
 
             VisiteSite.objects.create(
                 date=timezone.now(),
                 ip_address=ip or None,
-                user_agent=user_agent[:255],
+                user_agent=user_agent,
                 path=path[:255],
-                session_key=session_key[:40],
+                session_key=identifiant,
             )
         except Exception:
             # Ne jamais casser le site si la sauvegarde des stats échoue
@@ -48,3 +57,53 @@ class TrackVisitorMiddleware:
 
         return response
 
+
+
+class ProfilageSQLMiddleware:
+    """
+    Profilage SQL par vue (opt-in : settings.PROFILAGE_SQL_ACTIF).
+
+    Pour chaque requête : nom de la vue, nombre de requêtes SQL, temps SQL, requêtes
+    dupliquées (même empreinte) et temps de rendu des gabarits, conservés dans le tampon
+    circulaire de mairie_kloto_platform.profilage.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILAGE_SQL_ACTIF", False):
+            raise MiddlewareNotUsed
+        profilage.instrumenter_rendu_gabarits()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = request.path or ""
+        if path.startswith("/static/") or path.startswith("/media/"):
+            return self.get_response(request)
+
+        collecteur = profilage.CollecteurSQL()
+        temps_rendu = [0.0]
+        jeton = profilage.temps_rendu_requete.set(temps_rendu)
+        debut = time.perf_counter()
+        try:
+            with connection.execute_wrapper(collecteur):
+                response = self.get_response(request)
+        finally:
+            profilage.temps_rendu_requete.reset(jeton)
+        duree = time.perf_counter() - debut
+
+        match = getattr(request, "resolver_match", None)
+        vue = match.view_name if match else ""
+        budget = profilage.get_budget_vue(match.func) if match else None
+        resume = collecteur.resume()
+        profilage.enregistrer_profil({
+            "date": timezone.now(),
+            "methode": request.method,
+            "chemin": path[:255],
+            "vue": vue,
+            "statut": response.status_code,
+            "duree_ms": round(duree * 1000, 2),
+            "rendu_ms": round(temps_rendu[0] * 1000, 2),
+            "budget": budget,
+            "depasse_budget": budget is not None and resume["requetes"] > budget,
+            **resume,
+        })
+        return response
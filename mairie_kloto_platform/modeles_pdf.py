@@ -0,0 +1,82 @@
+"""
+Formulaires d'inscription vierges (PDF) construits une fois, puis servis comme des fichiers.
+
+Le contenu des modèles (acteurs économiques, institutions financières, jeunes, retraités) ne
+dépend que de la configuration active de la mairie (nom de la commune). Chaque PDF est donc
+écrit dans MODELES_PDF_ROOT sous `<modèle>-<version>.pdf`, la version étant tirée de la
+configuration (id + date de modification) : modifier la configuration change la version et
+le PDF est reconstruit à la demande suivante ; les anciennes versions sont supprimées.
+
+`manage.py construire_modeles_pdf` les construit au déploiement (après collectstatic), pour
+que la première visite ne paie pas le rendu ReportLab.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from mairie.models import ConfigurationMairie
+from mairie_kloto_platform.telechargements import reponse_fichier
+
+# clé : (fonction de construction (sortie, conf), nom du fichier téléchargé)
+MODELES = {
+    "acteurs": ("acteurs.views.construire_pdf_acteur", "modele_acteurs_economiques.pdf"),
+    "institutions": ("acteurs.views.construire_pdf_institution", "modele_institutions_financieres.pdf"),
+    "jeunes": ("emploi.views.construire_pdf_jeune", "modele_jeunes_demandeurs_emploi.pdf"),
+    "retraites": ("emploi.views.construire_pdf_retraite", "modele_retraites_actifs.pdf"),
+}
+
+# L'URL d'un modèle ne change pas avec la configuration : un jour de cache, puis revalidation
+# par ETag (réponse 304 sans corps tant que le fichier n'a pas été reconstruit).
+CACHE_SECONDES = 24 * 3600
+
+
+def configuration_active():
+    return ConfigurationMairie.objects.filter(est_active=True).first()
+
+
+def version_configuration(conf):
+    if conf is None:
+        return "defaut"
+    return f"{conf.pk}-{int(conf.date_modification.timestamp())}"
+
+
+def construire_modele(cle, conf, forcer=False):
+    """Nom (relatif à MODELES_PDF_ROOT) du PDF `cle` pour `conf`, construit s'il n'existe pas encore."""
+    dossier = settings.MODELES_PDF_ROOT
+    nom = f"{cle}-{version_configuration(conf)}.pdf"
+    chemin = os.path.join(dossier, nom)
+    if forcer or not os.path.exists(chemin):
+        os.makedirs(dossier, exist_ok=True)
+        # Fichier temporaire puis renommage atomique : une requête concurrente ne lit jamais un PDF partiel
+        descripteur, temporaire = tempfile.mkstemp(dir=dossier, prefix=f".{cle}-", suffix=".tmp")
+        try:
+            with os.fdopen(descripteur, "wb") as sortie:
+                import_string(MODELES[cle][0])(sortie, conf)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+        for ancien in os.listdir(dossier):
+            if ancien.startswith(f"{cle}-") and ancien.endswith(".pdf") and ancien != nom:
+                os.remove(os.path.join(dossier, ancien))
+    return nom
+
+
+def construire_modeles(forcer=False):
+    conf = configuration_active()
+    return [construire_modele(cle, conf, forcer=forcer) for cle in MODELES]
+
+
+def reponse_modele(request, cle):
+    """Téléchargement du modèle `cle` (construit au besoin), avec ETag et cache navigateur."""
+    nom = construire_modele(cle, configuration_active())
+    return reponse_fichier(
+        request, settings.MODELES_PDF_ROOT, nom,
+        nom_fichier=MODELES[cle][1],
+        piece_jointe=True,
+        cache_control=f"private, max-age={CACHE_SECONDES}",
+        delegation=False,
+    )
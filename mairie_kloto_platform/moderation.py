@@ -0,0 +1,128 @@
+"""
+Modération en lot depuis les listes du tableau de bord (validation / refus des inscriptions,
+candidatures, suggestions).
+
+Pour une sélection de N objets : une lecture des objets dont le statut change vraiment, un seul
+`UPDATE ... WHERE id IN (...)`, puis les notifications des demandeurs en un `bulk_create`.
+`update()` ne déclenche pas les signaux post_save : l'agrégat « Mon compte » des utilisateurs
+concernés est invalidé explicitement, et l'instantané des statistiques de la diaspora est
+recalculé après la validation de la transaction (comme les actions groupées de l'admin).
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from acteurs.models import ActeurEconomique, InstitutionFinanciere
+from comptes.models import Notification
+from comptes.profil_compte import invalider_profil_compte
+from diaspora.models import MembreDiaspora
+from diaspora.statistiques import rafraichir_instantane
+from emploi.models import ProfilEmploi
+from mairie.models import Candidature, Suggestion
+from osc.models import OrganisationSocieteCivile
+
+TAILLE_LOT = 500
+
+# champ_utilisateur : destinataire des notifications (None : pas de compte à notifier) ;
+# libelle : champs lus pour nommer l'objet dans la notification.
+Moderation = namedtuple("Moderation", ["modele", "filtre", "champ_utilisateur", "libelle", "objet"])
+
+MODERATIONS = {
+    "acteur": Moderation(ActeurEconomique, {}, "user", ["raison_sociale"], "inscription d'acteur économique"),
+    "institution": Moderation(InstitutionFinanciere, {}, "user", ["nom_institution"], "inscription d'institution financière"),
+    "jeune": Moderation(ProfilEmploi, {"type_profil": "jeune"}, "user", ["nom", "prenoms"], "inscription de demandeur d'emploi"),
+    "retraite": Moderation(ProfilEmploi, {"type_profil": "retraite"}, "user", ["nom", "prenoms"], "inscription de retraité actif"),
+    "diaspora": Moderation(MembreDiaspora, {}, "user", ["nom", "prenoms"], "inscription de membre de la diaspora"),
+    "osc": Moderation(OrganisationSocieteCivile, {}, "user", ["nom_osc"], "inscription d'organisation de la société civile"),
+    "candidature": Moderation(Candidature, {}, "candidat", ["appel_offre__titre"], "candidature"),
+    "suggestion": Moderation(Suggestion, {}, None, ["nom"], "suggestion"),
+}
+
+
+def valeurs_action(model_name, action):
+    """Valeurs à écrire pour `action` sur `model_name`, ou None si l'action n'existe pas pour ce type."""
+    if model_name == "candidature":
+        return {"accepter": {"statut": "acceptee"}, "refuser": {"statut": "refusee"}, "rejeter": {"statut": "refusee"}}.get(action)
+    if model_name == "suggestion":
+        return {"est_lue": True} if action == "marquer_lue" else None
+    if model_name in MODERATIONS:
+        return {"accepter": {"est_valide_par_mairie": True}, "refuser": {"est_valide_par_mairie": False},
+                "rejeter": {"est_valide_par_mairie": False}}.get(action)
+    return None
+
+
+def _message(moderation, action, libelle):
+    if moderation.modele is Candidature:
+        issue = "acceptée" if action == "accepter" else "refusée"
+        return (
+            f"Votre candidature est {issue}",
+            f"Bonjour,\n\nVotre candidature à l'appel d'offres « {libelle} » a été {issue} par la mairie.",
+        )
+    if action == "accepter":
+        return (
+            "Votre inscription a été validée",
+            f"Bonjour,\n\nVotre {moderation.objet} « {libelle} » a été validée par la mairie.",
+        )
+    return (
+        "Votre inscription n'a pas été validée",
+        f"Bonjour,\n\nVotre {moderation.objet} « {libelle} » n'a pas été validée par la mairie. "
+        f"Merci de vous rapprocher des services de la mairie pour plus d'informations.",
+    )
+
+
+def moderer_en_lot(model_name, ids, action, auteur=None):
+    """
+    Applique `action` aux objets `ids` de type `model_name`.
+
+    Retourne un résumé {"demandes", "modifies", "inchanges", "introuvables", "notifies"} ;
+    ValueError si le type ou l'action est invalide.
+    """
+    valeurs = valeurs_action(model_name, action)
+    if valeurs is None:
+        raise ValueError(f"Action « {action} » invalide pour « {model_name} ».")
+    moderation = MODERATIONS[model_name]
+    ids = sorted({int(pk) for pk in ids})
+    qs = moderation.modele.objects.filter(pk__in=ids, **moderation.filtre)
+    if model_name == "suggestion":
+        valeurs = {"est_lue": True, "date_lecture": Coalesce(F("date_lecture"), Value(timezone.now()))}
+        a_modifier = qs.exclude(est_lue=True)
+    else:
+        a_modifier = qs.exclude(**valeurs)
+
+    champs = ["pk", *moderation.libelle] + ([moderation.champ_utilisateur] if moderation.champ_utilisateur else [])
+    with transaction.atomic():
+        nb_trouves = qs.count()
+        lignes = list(a_modifier.values(*champs))
+        pks = [ligne["pk"] for ligne in lignes]
+        # Un seul UPDATE sur les objets dont le statut change vraiment
+        modifies = moderation.modele.objects.filter(pk__in=pks).update(**valeurs) if pks else 0
+        if model_name == "diaspora" and modifies:
+            transaction.on_commit(rafraichir_instantane)
+
+        notifications = []
+        destinataires = []
+        if moderation.champ_utilisateur and model_name != "suggestion":
+            for ligne in lignes:
+                destinataire = ligne[moderation.champ_utilisateur]
+                if not destinataire:
+                    continue
+                libelle = " ".join(str(ligne[champ]) for champ in moderation.libelle if ligne[champ])
+                titre, message = _message(moderation, action, libelle)
+                notifications.append(Notification(
+                    recipient_id=destinataire, title=titre, message=message,
+                    type=Notification.TYPE_INFO, created_by=auteur,
+                ))
+                destinataires.append(destinataire)
+            Notification.objects.bulk_create(notifications, batch_size=TAILLE_LOT)
+            invalider_profil_compte(*destinataires)
+
+    return {
+        "demandes": len(ids),
+        "modifies": modifies,
+        "inchanges": nb_trouves - len(pks),
+        "introuvables": len(ids) - nb_trouves,
+        "notifies": len(notifications),
+    }
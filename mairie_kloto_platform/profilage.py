@@ -0,0 +1,171 @@
+"""
+Profilage SQL par vue et budgets de requêtes.
+
+- `budget_requetes(n)` déclare le nombre maximal de requêtes SQL attendu pour une vue ;
+- `ProfilageSQLMiddleware` (voir middleware.py, activé par `PROFILAGE_SQL_ACTIF`) enregistre pour
+  chaque requête : vue, nombre de requêtes, temps SQL, requêtes dupliquées et temps de rendu,
+  dans un tampon circulaire en mémoire consultable depuis le tableau de bord ;
+- `BudgetRequetesMixin` fait échouer un test quand une vue dépasse son budget déclaré.
+
+Le tampon est propre à chaque processus (un worker WSGI = un tampon).
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+_RE_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTES = re.compile(r"\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)")
+_RE_ESPACES = re.compile(r"\s+")
+
+_tampon = None
+_verrou = threading.Lock()
+
+# Temps passé dans le rendu des gabarits pendant la requête en cours (secondes)
+temps_rendu_requete = ContextVar("temps_rendu", default=None)
+_rendu_instrumente = False
+
+
+def budget_requetes(maximum):
+    """Déclare le nombre maximal de requêtes SQL qu'une vue peut exécuter."""
+    def decorateur(vue):
+        @wraps(vue)
+        def wrapper(*args, **kwargs):
+            return vue(*args, **kwargs)
+        wrapper.budget_requetes = maximum
+        return wrapper
+    return decorateur
+
+
+def get_budget_vue(vue):
+    """Budget déclaré sur une vue (traverse les décorateurs login_required, etc.)."""
+    while vue is not None:
+        budget = getattr(vue, "budget_requetes", None)
+        if budget is not None:
+            return budget
+        vue = getattr(vue, "__wrapped__", None)
+    return None
+
+
+def empreinte_sql(sql):
+    """Normalise une requête (valeurs littérales et listes IN remplacées) pour repérer les doublons."""
+    sql = _RE_CHAINES.sub("?", sql)
+    sql = _RE_NOMBRES.sub("?", sql)
+    sql = _RE_LISTES.sub("(...)", sql)
+    return _RE_ESPACES.sub(" ", sql).strip()
+
+
+def get_tampon():
+    global _tampon
+    if _tampon is None:
+        with _verrou:
+            if _tampon is None:
+                _tampon = deque(maxlen=getattr(settings, "PROFILAGE_SQL_TAILLE_TAMPON", 500))
+    return _tampon
+
+
+def enregistrer_profil(profil):
+    tampon = get_tampon()
+    with _verrou:
+        tampon.append(profil)
+
+
+def lister_profils():
+    tampon = get_tampon()
+    with _verrou:
+        return list(tampon)
+
+
+def vider_profils():
+    tampon = get_tampon()
+    with _verrou:
+        tampon.clear()
+
+
+def instrumenter_rendu_gabarits():
+    """
+    Mesure le temps de rendu des gabarits Django (une seule fois par processus).
+    Seul le rendu de premier niveau est chronométré : les {% include %} y sont inclus.
+    """
+    global _rendu_instrumente
+    if _rendu_instrumente:
+        return
+    from django.template.backends.django import Template
+
+    rendu_original = Template.render
+
+    @wraps(rendu_original)
+    def rendu_chronometre(self, context=None, request=None):
+        cumul = temps_rendu_requete.get()
+        if cumul is None:
+            return rendu_original(self, context, request)
+        debut = time.perf_counter()
+        try:
+            return rendu_original(self, context, request)
+        finally:
+            cumul[0] += time.perf_counter() - debut
+
+    Template.render = rendu_chronometre
+    _rendu_instrumente = True
+
+
+class CollecteurSQL:
+    """execute_wrapper qui chronomètre chaque requête SQL exécutée sur la connexion."""
+
+    def __init__(self):
+        self.requetes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.requetes.append((sql, time.perf_counter() - debut))
+
+    def resume(self, seuil_doublons=2, max_doublons=5):
+        empreintes = Counter(empreinte_sql(sql) for sql, _ in self.requetes)
+        doublons = [
+            {"sql": sql[:300], "nombre": nombre}
+            for sql, nombre in empreintes.most_common(max_doublons)
+            if nombre >= seuil_doublons
+        ]
+        return {
+            "requetes": len(self.requetes),
+            "temps_sql_ms": round(sum(d for _, d in self.requetes) * 1000, 2),
+            "doublons": doublons,
+        }
+
+
+class BudgetRequetesMixin:
+    """
+    Mixin pour TestCase : `self.assertBudgetRequetes(url)` exécute la requête et échoue si
+    la vue résolue dépasse le budget déclaré avec @budget_requetes.
+    """
+
+    def assertBudgetRequetes(self, url, client=None, methode="get", **kwargs):
+        vue = resolve(url.split("?")[0]).func
+        budget = get_budget_vue(vue)
+        if budget is None:
+            self.fail(f"Aucun budget de requêtes déclaré pour la vue de {url}.")
+        client = client or self.client
+        with CaptureQueriesContext(connection) as capture:
+            response = getattr(client, methode)(url, **kwargs)
+        nombre = len(capture.captured_queries)
+        if nombre > budget:
+            empreintes = Counter(empreinte_sql(q["sql"]) for q in capture.captured_queries)
+            detail = "\n".join(
+                f"  {n} × {sql[:200]}" for sql, n in empreintes.most_common(5) if n > 1
+            )
+            self.fail(
+                f"{url} : {nombre} requêtes SQL pour un budget de {budget}."
+                + (f"\nRequêtes répétées :\n{detail}" if detail else "")
+            )
+        return response
@@ -0,0 +1,572 @@
+"""
+Relevés de paiement des contribuables (PDF), à l'unité ou en masse dans une archive ZIP.
+
+Le travail est séparé en deux temps :
+- `preparer_releves` charge en 6 requêtes toutes les données d'un ensemble de contribuables
+  (boutiques, cotisations, paiements, tickets, archives des exercices clos si la période en
+  touche un) et les réduit à des structures simples
+  (dict, Decimal, dates) que l'on peut transmettre à d'autres processus ;
+- `rendre_releve_pdf` construit le PDF avec ReportLab sans aucun accès à la base.
+
+`ecrire_releves_zip` (commande generer_releves_contribuables) répartit le rendu sur un
+ProcessPoolExecutor et écrit chaque PDF dans l'archive dès qu'il est prêt. `flux_releves_zip`
+(export HTTP via FluxZip) rend les PDF en séquence dans le processus de la requête : démarrer un
+pool de processus depuis un worker web (threads, uWSGI) et y fermer les connexions de la requête
+n'est pas sûr.
+"""
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.db import connection, connections
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.text import slugify
+
+from mairie.archives import archives_necessaires, sources
+from mairie.models import BoutiqueMagasin, Contribuable, CotisationAnnuelle, PaiementCotisation, TicketMarche
+
+MAX_TICKETS = 800
+# En dessous de ce nombre de relevés, le démarrage d'un pool de processus coûte plus qu'il ne rapporte
+SEUIL_PARALLELISME = 8
+
+
+def contribuables_cibles(emplacement_id=None, agent_id=None):
+    """Contribuables ayant au moins une boutique dans le marché et / ou la zone de l'agent."""
+    boutiques = BoutiqueMagasin.objects.filter(contribuable__isnull=False)
+    if emplacement_id:
+        boutiques = boutiques.filter(emplacement_id=emplacement_id)
+    if agent_id:
+        boutiques = boutiques.filter(agent_collecteur_id=agent_id)
+    return Contribuable.objects.filter(id__in=boutiques.values("contribuable_id"))
+
+
+def periode_annee(annee):
+    """Période d'un relevé annuel : l'année entière, ou jusqu'à aujourd'hui pour l'année en cours."""
+    aujourd_hui = timezone.localdate()
+    return date(annee, 1, 1), min(date(annee, 12, 31), aujourd_hui)
+
+
+def entete_pdf(conf):
+    """Copie picklable de la configuration utilisée par l'en-tête PDF (_draw_pdf_header)."""
+    logo = None
+    if conf and getattr(conf, "logo", None):
+        try:
+            logo = SimpleNamespace(path=conf.logo.path)
+        except (ValueError, NotImplementedError):
+            logo = None
+    return SimpleNamespace(
+        nom_commune=getattr(conf, "nom_commune", None),
+        adresse=getattr(conf, "adresse", None),
+        telephone=getattr(conf, "telephone", None),
+        email=getattr(conf, "email", None),
+        logo=logo,
+    )
+
+
+def nom_fichier_releve(donnees):
+    return f"releve_paiements_{slugify(donnees['nom_complet']) or donnees['id']}.pdf"
+
+
+def preparer_releves(contribuables, start, end):
+    """
+    Données des relevés de `contribuables` (queryset) sur la période [start, end], en 6 requêtes
+    (8 si la période touche un exercice clos).
+    Retourne une liste de dict (un par contribuable, dans l'ordre nom / prénom).
+    """
+    from mairie_kloto_platform.views import _iter_year_months
+
+    months_in_period = _iter_year_months(start, end)
+    years = sorted({y for (y, _m) in months_in_period})
+    ids = contribuables.values("id")
+
+    releves = {}
+    for c in Contribuable.objects.filter(id__in=ids).order_by("nom", "prenom").only("id", "nom", "prenom", "telephone"):
+        releves[c.id] = {
+            "id": c.id,
+            "nom_complet": c.nom_complet,
+            "telephone": c.telephone,
+            "start": start,
+            "end": end,
+            "months_in_period": months_in_period,
+            "boutiques": [],
+            "cotisations": {},
+            "paiements": [],
+            "tickets": [],
+        }
+
+    proprietaire = {}
+    boutiques = (
+        BoutiqueMagasin.objects.select_related("emplacement", "agent_collecteur")
+        .filter(contribuable_id__in=ids)
+        .order_by("emplacement__nom_lieu", "matricule")
+    )
+    for b in boutiques:
+        proprietaire[b.pk] = b.contribuable_id
+        releves[b.contribuable_id]["boutiques"].append({
+            "id": b.pk,
+            "matricule": b.matricule,
+            "emplacement": b.emplacement.nom_lieu if b.emplacement else "",
+            "type": b.get_type_local_display(),
+            "activite": b.activite_vendue or "",
+            "mensuel": Decimal(str(b.prix_location_mensuel or 0)),
+            "agent": b.agent_collecteur.nom_complet if b.agent_collecteur else "—",
+        })
+
+    cotisations = (
+        CotisationAnnuelle.objects.filter(boutique__contribuable_id__in=ids, annee__in=years)
+        .order_by()
+        .values_list("boutique_id", "annee", "montant_annuel_du")
+    )
+    for boutique_id, annee, montant in cotisations:
+        releves[proprietaire[boutique_id]]["cotisations"][(boutique_id, annee)] = montant
+
+    archives = archives_necessaires(date_du=start, date_au=end)
+    lignes = []
+    for modele in sources(PaiementCotisation, archives):
+        paiements = modele.objects.filter(cotisation_annuelle__boutique__contribuable_id__in=ids)
+        if start:
+            paiements = paiements.filter(date_paiement__date__gte=start)
+        if end:
+            paiements = paiements.filter(date_paiement__date__lte=end)
+        lignes.extend(paiements.order_by().values_list(
+            "cotisation_annuelle__boutique_id", "cotisation_annuelle__annee", "mois", "montant_paye", "date_paiement"
+        ))
+    lignes.sort(key=lambda ligne: ligne[4])
+    for boutique_id, annee, mois, montant, date_paiement in lignes:
+        releves[proprietaire[boutique_id]]["paiements"].append({
+            "boutique_id": boutique_id,
+            "annee": annee,
+            "mois": int(mois),
+            "montant": Decimal(str(montant or 0)),
+            "date_paiement": date_paiement,
+        })
+
+    tickets = []
+    for modele in sources(TicketMarche, archives):
+        qs = modele.objects.select_related("emplacement", "encaisse_par_agent").filter(contribuable_id__in=ids)
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        tickets.extend(qs.order_by())
+    tickets.sort(key=lambda t: (t.contribuable_id, t.date, t.date_creation))
+    for t in tickets:
+        liste = releves[t.contribuable_id]["tickets"]
+        if len(liste) < MAX_TICKETS:
+            liste.append({
+                "date": t.date,
+                "emplacement": t.emplacement.nom_lieu if t.emplacement else "",
+                "vendeur": t.nom_vendeur or "",
+                "montant": Decimal(str(t.montant or 0)),
+                "agent": t.encaisse_par_agent.nom_complet if t.encaisse_par_agent else "—",
+            })
+    return list(releves.values())
+
+
+def _fcfa(montant):
+    return f"{montant:,.0f} FCFA".replace(",", " ")
+
+
+def _montant_court(montant):
+    return f"{montant:,.0f}".replace(",", " ") if montant == montant.to_integral() else str(montant)
+
+
+def rendre_releve_pdf(donnees, entete):
+    """PDF (bytes) du relevé d'un contribuable, à partir des données de `preparer_releves`."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    from mairie_kloto_platform.views import PDF_HEADER_HEIGHT_CM, NumberedCanvas, _draw_pdf_header
+
+    start, end = donnees["start"], donnees["end"]
+    months_in_period = donnees["months_in_period"]
+    month_count = len(months_in_period)
+    boutiques = donnees["boutiques"]
+    cot_map = donnees["cotisations"]
+    paiements = donnees["paiements"]
+    tickets = donnees["tickets"]
+
+    montant_mensuel_total = sum((b["mensuel"] for b in boutiques), Decimal("0"))
+    boutiques_rows = [
+        [
+            b["matricule"],
+            b["emplacement"],
+            b["type"],
+            b["activite"],
+            str(b["mensuel"].quantize(Decimal("1"))) if b["mensuel"] == b["mensuel"].to_integral() else str(b["mensuel"]),
+            b["agent"],
+        ]
+        for b in boutiques
+    ]
+
+    # Paiements indexés par (boutique_id, annee, mois), paiements par boutique
+    paid_by_key = {}
+    paiements_par_boutique = {}
+    for p in paiements:
+        key = (p["boutique_id"], p["annee"], p["mois"])
+        paid_by_key[key] = paid_by_key.get(key, Decimal("0")) + p["montant"]
+        paiements_par_boutique.setdefault(p["boutique_id"], []).append(p)
+
+    # Mois à vérifier : inclure les années passées (avant la période) pour capturer les impayés historiques
+    all_months_to_check = []
+    y, m = start.year - 3, 1
+    while (y, m) <= (end.year, end.month):
+        all_months_to_check.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    months_in_period_set = set(months_in_period)
+
+    total_attendu = Decimal("0")
+    total_encaisse = Decimal("0")
+    impayes_annees_passees_par_boutique = {}
+    totaux_par_boutique = {}
+    for b in boutiques:
+        att_b = Decimal("0")
+        pay_b = Decimal("0")
+        for (y, m) in months_in_period:
+            montant_annuel = cot_map.get((b["id"], y))
+            if montant_annuel is not None:
+                attendu = Decimal(str(montant_annuel or 0)) / Decimal("12")
+            else:
+                attendu = b["mensuel"]
+            attendu = attendu.quantize(Decimal("0.01"))
+            paid = paid_by_key.get((b["id"], y, m), Decimal("0")).quantize(Decimal("0.01"))
+            total_attendu += attendu
+            att_b += attendu
+            total_encaisse += paid
+            pay_b += paid
+        # Impayés des années passées : mois avant la période (arriérés), seulement les années avec cotisation
+        arrieres = []
+        for (y, m) in all_months_to_check:
+            if (y, m) in months_in_period_set or (b["id"], y) not in cot_map:
+                continue
+            attendu = (Decimal(str(cot_map[(b["id"], y)] or 0)) / Decimal("12")).quantize(Decimal("0.01"))
+            paid = paid_by_key.get((b["id"], y, m), Decimal("0")).quantize(Decimal("0.01"))
+            if attendu - paid > 0:
+                arrieres.append((f"{m:02d}/{y}", attendu, paid, attendu - paid))
+        impayes_annees_passees_par_boutique[b["id"]] = arrieres
+        totaux_par_boutique[b["id"]] = {"attendu": att_b, "paye": pay_b, "reste": max(Decimal("0"), att_b - pay_b)}
+
+    reste_a_payer = max(Decimal("0"), total_attendu - total_encaisse)
+    taux_paiement = Decimal("0")
+    if total_attendu > 0:
+        taux_paiement = (total_encaisse / total_attendu) * Decimal("100")
+
+    sortie = BytesIO()
+    doc = SimpleDocTemplate(
+        sortie,
+        pagesize=landscape(A4),
+        topMargin=PDF_HEADER_HEIGHT_CM * cm,
+        bottomMargin=1.5 * cm,
+    )
+    story = []
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "Title",
+        parent=styles["Heading1"],
+        fontSize=15,
+        textColor=colors.HexColor("#006233"),
+        alignment=1,
+        spaceAfter=10,
+    )
+    story.append(Paragraph("Relevé / Suivi de paiement (Contribuable)", title_style))
+    story.append(
+        Paragraph(
+            f"<b>Contribuable :</b> {escape(donnees['nom_complet'])} &nbsp;&nbsp; "
+            f"<b>Téléphone :</b> {escape(donnees['telephone'])}",
+            styles["Normal"],
+        )
+    )
+    story.append(
+        Paragraph(
+            f"<b>Période :</b> {start.strftime('%d/%m/%Y')} au {end.strftime('%d/%m/%Y')} "
+            f"(<b>{month_count}</b> mois)",
+            styles["Normal"],
+        )
+    )
+    story.append(Spacer(1, 0.35 * cm))
+
+    # Boutiques
+    story.append(Paragraph("1) Boutiques / magasins rattachés", styles["Heading2"]))
+    if boutiques_rows:
+        data_b = [["Matricule", "Emplacement", "Type", "Activité", "Montant mensuel", "Agent"]]
+        data_b.extend(boutiques_rows)
+        tbl_b = Table(data_b, colWidths=[3 * cm, 5.5 * cm, 2.8 * cm, 5.8 * cm, 3.3 * cm, 5.0 * cm])
+        tbl_b.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
+                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                    ("FONTSIZE", (0, 0), (-1, -1), 8),
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                ]
+            )
+        )
+        story.append(tbl_b)
+    else:
+        story.append(Paragraph("Aucune boutique/magasin rattaché à ce contribuable.", styles["Normal"]))
+    story.append(Spacer(1, 0.25 * cm))
+
+    # Synthèse
+    story.append(Paragraph("2) Synthèse sur la période", styles["Heading2"]))
+    synth = [
+        ["Montant mensuel total", _fcfa(montant_mensuel_total)],
+        ["Total attendu (période)", _fcfa(total_attendu)],
+        ["Total encaissé (période)", _fcfa(total_encaisse)],
+        ["Reste à payer (période)", _fcfa(reste_a_payer)],
+        ["Taux de paiement", f"{taux_paiement.quantize(Decimal('0.01'))} %"],
+    ]
+    tbl_s = Table(synth, colWidths=[6 * cm, 12 * cm])
+    tbl_s.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#E8F5E9")),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]
+        )
+    )
+    story.append(tbl_s)
+    story.append(Spacer(1, 0.25 * cm))
+
+    # Suivi par boutique : pour chaque boutique, tableau des paiements + impayés + totaux
+    story.append(Paragraph("3) Suivi boutique par boutique (paiements et impayés)", styles["Heading2"]))
+    for b in boutiques:
+        story.append(Spacer(1, 0.2 * cm))
+        boutique_title = f"Boutique {b['matricule']} — {b['emplacement'] or '—'}"
+        story.append(Paragraph(f"<b>{escape(boutique_title)}</b>", styles["Heading3"]))
+
+        p_list = sorted(paiements_par_boutique.get(b["id"], []), key=lambda x: (x["annee"], x["mois"]))
+        if p_list:
+            data_p = [["Année", "Mois", "Montant", "Date", "En avance"]]
+            total_boutique_p = Decimal("0")
+            for p in p_list[:200]:
+                total_boutique_p += p["montant"]
+                dp = p["date_paiement"].date() if p["date_paiement"] else None
+                en_avance = ""
+                if dp and (dp.year < p["annee"] or (dp.year == p["annee"] and dp.month < p["mois"])):
+                    en_avance = "Oui"
+                data_p.append(
+                    [
+                        str(p["annee"]),
+                        f"{p['mois']:02d}",
+                        _fcfa(p["montant"]),
+                        p["date_paiement"].strftime("%d/%m/%Y %H:%M") if p["date_paiement"] else "",
+                        en_avance,
+                    ]
+                )
+            tot_b = totaux_par_boutique[b["id"]]
+            data_p.append(["Total à payer (période)", "", "", _fcfa(tot_b["attendu"]), ""])
+            data_p.append(["Total payé", "", "", _fcfa(total_boutique_p), ""])
+            data_p.append(["Reste à payer", "", "", _fcfa(tot_b["reste"]), ""])
+            tbl_p = Table(data_p, colWidths=[4.0 * cm, 1.4 * cm, 2.8 * cm, 4.2 * cm, 2.2 * cm])
+            n_rows = len(data_p)
+            tbl_p.setStyle(
+                TableStyle(
+                    [
+                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
+                        ("BACKGROUND", (0, n_rows - 3), (-1, n_rows - 1), colors.HexColor("#C8E6C9")),
+                        ("SPAN", (0, n_rows - 3), (2, n_rows - 3)),
+                        ("SPAN", (0, n_rows - 2), (2, n_rows - 2)),
+                        ("SPAN", (0, n_rows - 1), (2, n_rows - 1)),
+                        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                        ("FONTSIZE", (0, 0), (-1, -1), 8),
+                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                        ("FONTNAME", (0, n_rows - 3), (-1, n_rows - 1), "Helvetica-Bold"),
+                    ]
+                )
+            )
+            story.append(tbl_p)
+        else:
+            story.append(Paragraph("Aucun paiement sur cette période.", styles["Normal"]))
+
+        # Tableau Mois/Attendu/Payé/Reste : affiché uniquement s'il y a des arriérés des années passées
+        imp_annees_passees = impayes_annees_passees_par_boutique.get(b["id"], [])
+        if imp_annees_passees:
+            data_i = [["Mois", "Attendu", "Payé", "Reste"]]
+            total_ap = Decimal("0")
+            total_paye_ap = Decimal("0")
+            total_reste_ap = Decimal("0")
+            for (mois_str, attendu, paye, reste) in imp_annees_passees[:100]:
+                total_ap += attendu
+                total_paye_ap += paye
+                total_reste_ap += reste
+                data_i.append([mois_str, _montant_court(attendu), _montant_court(paye), _montant_court(reste)])
+            data_i.append(["Total arriérés", _fcfa(total_ap), _fcfa(total_paye_ap), _fcfa(total_reste_ap)])
+            tbl_i = Table(data_i, colWidths=[4.5 * cm, 3.0 * cm, 3.0 * cm, 3.0 * cm])
+            tbl_i.setStyle(
+                TableStyle(
+                    [
+                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FFF3CD")),
+                        ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#FFECB3")),
+                        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                        ("FONTSIZE", (0, 0), (-1, -1), 8),
+                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+                    ]
+                )
+            )
+            story.append(Spacer(1, 0.15 * cm))
+            story.append(tbl_i)
+        story.append(Spacer(1, 0.35 * cm))
+
+    if not boutiques:
+        story.append(Paragraph("Aucune boutique/magasin rattaché.", styles["Normal"]))
+
+    # Tickets (optionnel)
+    if tickets:
+        story.append(Spacer(1, 0.3 * cm))
+        story.append(Paragraph("4) Tickets marché (dans la période)", styles["Heading2"]))
+        data_t = [["Date", "Emplacement", "Vendeur", "Montant", "Agent"]]
+        total_tickets = Decimal("0")
+        for t in tickets:
+            total_tickets += t["montant"]
+            data_t.append(
+                [
+                    t["date"].strftime("%d/%m/%Y"),
+                    t["emplacement"][:22],
+                    t["vendeur"][:22],
+                    _fcfa(t["montant"]),
+                    t["agent"],
+                ]
+            )
+        data_t.append(["", "", "TOTAL", _fcfa(total_tickets), ""])
+        tbl_t = Table(data_t, colWidths=[2.8 * cm, 6 * cm, 6 * cm, 3.5 * cm, 6.0 * cm])
+        tbl_t.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
+                    ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#C8E6C9")),
+                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                    ("FONTSIZE", (0, 0), (-1, -1), 8),
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+                ]
+            )
+        )
+        story.append(tbl_t)
+
+    story.append(Spacer(1, 0.6 * cm))
+    story.append(Paragraph("Date et Signature : ________________________________", styles["Normal"]))
+
+    def on_first_page(c, d):
+        _draw_pdf_header(c, d, entete)
+
+    def on_later_pages(c, d):
+        pass  # Pas d'en-tête sur les pages suivantes
+
+    doc.build(story, onFirstPage=on_first_page, onLaterPages=on_later_pages, canvasmaker=NumberedCanvas)
+    return sortie.getvalue()
+
+
+def _rendre(arguments):
+    """Point d'entrée des processus de rendu : (données, en-tête) -> (nom de fichier, PDF)."""
+    donnees, entete = arguments
+    return nom_fichier_releve(donnees), rendre_releve_pdf(donnees, entete)
+
+
+def _initialiser_processus():
+    import django
+
+    django.setup()
+
+
+def _executeur(processus):
+    # fork : démarrage immédiat (Django déjà chargé) ; sinon spawn + django.setup()
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context("fork"))
+    return ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_processus)
+
+
+class FluxZip:
+    """Fichier en écriture seule, non positionnable : zipfile y écrit, on en extrait les octets au fil de l'eau."""
+
+    def __init__(self):
+        self._morceaux = []
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        octets = b"".join(self._morceaux)
+        self._morceaux = []
+        return octets
+
+
+def iterer_releves_pdf(releves, entete, processus=1):
+    """
+    Génère (nom de fichier, PDF) pour chaque relevé, dans l'ordre.
+    Avec processus > 1 (traitements hors requête uniquement) et au-delà de SEUIL_PARALLELISME
+    relevés, le rendu est réparti sur `processus` processus.
+    """
+    # Les processus fils ne doivent pas hériter d'une connexion ouverte : on la ferme avant le fork
+    # (impossible dans une transaction : rendu séquentiel dans ce cas).
+    if processus > 1 and len(releves) >= SEUIL_PARALLELISME and not connection.in_atomic_block:
+        connections.close_all()
+        with _executeur(processus) as executeur:
+            taille_lot = max(1, len(releves) // (processus * 4))
+            yield from executeur.map(_rendre, ((d, entete) for d in releves), chunksize=taille_lot)
+    else:
+        for donnees in releves:
+            yield _rendre((donnees, entete))
+
+
+def _remplir_zip(sortie, releves, entete, processus, resume):
+    """Écrit les PDF dans l'archive ; produit None après chaque fichier, remplit `resume` à la fin."""
+    debut = time.perf_counter()
+    noms = set()
+    nombre = 0
+    with zipfile.ZipFile(sortie, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for nom, pdf in iterer_releves_pdf(releves, entete, processus):
+            # Homonymes : suffixe numérique
+            base, suffixe = nom[:-4], 2
+            while nom in noms:
+                nom = f"{base}_{suffixe}.pdf"
+                suffixe += 1
+            noms.add(nom)
+            archive.writestr(nom, pdf)
+            nombre += 1
+            yield
+        duree = time.perf_counter() - debut
+        resume.update(nombre=nombre, duree=duree, par_seconde=nombre / duree if duree else 0.0)
+        archive.writestr(
+            "resume.txt",
+            f"{nombre} relevé(s) généré(s) en {duree:.1f} s ({resume['par_seconde']:.1f} relevés/s).\n",
+        )
+    yield
+
+
+def ecrire_releves_zip(releves, entete, sortie, processus=None):
+    """
+    Écrit l'archive dans `sortie` (chemin ou fichier) ; retourne {"nombre", "duree", "par_seconde"}.
+    Hors requête HTTP uniquement : processus=None utilise jusqu'à 4 processus de rendu.
+    """
+    if processus is None:
+        processus = min(4, os.cpu_count() or 1)
+    resume = {}
+    for _ in _remplir_zip(sortie, releves, entete, processus, resume):
+        pass
+    return resume
+
+
+def flux_releves_zip(releves, entete):
+    """Archive ZIP produite morceau par morceau (pour StreamingHttpResponse), rendu séquentiel."""
+    flux = FluxZip()
+    for _ in _remplir_zip(flux, releves, entete, 1, {}):
+        morceau = flux.vider()
+        if morceau:
+            yield morceau
@@ -0,0 +1,70 @@
+"""
+Routage des lectures vers une réplique PostgreSQL.
+
+Seules les pages en lecture seule et gourmandes du tableau de bord (listes et exports PDF/Excel/ZIP)
+sont envoyées sur l'alias `replica` : le middleware marque la requête, le routeur choisit la base.
+Toutes les écritures, ainsi que les autres pages, restent sur `default`. Sans alias `replica`
+dans `settings.DATABASES`, le routeur n'a aucun effet.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = "replica"
+
+# Préfixes des noms d'URL (sans namespace) dont les lectures peuvent aller sur la réplique
+PREFIXES_VUES_REPLIQUE = ("liste_", "export_pdf_", "export_excel_", "export_zip_")
+
+_lecture_sur_replique = ContextVar("lecture_sur_replique", default=False)
+
+
+def replique_disponible():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class RepliqueLectureRouter:
+    """Envoie les lectures sur la réplique quand la requête en cours l'autorise."""
+
+    def db_for_read(self, model, **hints):
+        if _lecture_sur_replique.get() and replique_disponible():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les deux alias contiennent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique est alimentée par la réplication PostgreSQL, jamais migrée directement
+        return db != REPLICA_DB_ALIAS
+
+
+class RepliqueLectureMiddleware:
+    """
+    Active la lecture sur réplique pendant l'exécution des vues de liste et d'export
+    du tableau de bord (requêtes GET uniquement).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._jeton_replique = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request._jeton_replique is not None:
+                _lecture_sur_replique.reset(request._jeton_replique)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD") or not replique_disponible():
+            return None
+        match = request.resolver_match
+        url_name = match.url_name if match else ""
+        if url_name and url_name.startswith(PREFIXES_VUES_REPLIQUE) and not match.namespace:
+            request._jeton_replique = _lecture_sur_replique.set(True)
+        return None
@@ -76,6 +76,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'mairie_kloto_platform.middleware.TrackVisitorMiddleware',
+    'mairie_kloto_platform.routers.RepliqueLectureMiddleware',
+    'mairie_kloto_platform.middleware.ProfilageSQLMiddleware',
 ]
 
 ROOT_URLCONF = 'mairie_kloto_platform.urls'
@@ -108,9 +110,63 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Secondes d'attente sur un verrou avant l'erreur « database is locked » (seul réglage :
+            # mairie_kloto_platform/database.py n'applique pas de PRAGMA busy_timeout)
+            'timeout': 20,
+        },
+        # Connexions persistantes : évite de rouvrir la base (et de rejouer les PRAGMA) à chaque requête
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Base PostgreSQL (optionnelle), configurée par variables d'environnement :
+#   MAIRIE_DB_ENGINE=postgresql, MAIRIE_DB_NAME, MAIRIE_DB_USER, MAIRIE_DB_PASSWORD,
+#   MAIRIE_DB_HOST, MAIRIE_DB_PORT
+# et, pour une réplique en lecture seule : MAIRIE_DB_REPLICA_HOST (+ MAIRIE_DB_REPLICA_PORT).
+# Nécessite : pip install psycopg2-binary
+if os.environ.get('MAIRIE_DB_ENGINE', '').lower() in ('postgresql', 'postgres'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('MAIRIE_DB_NAME', 'mairie_kloto'),
+        'USER': os.environ.get('MAIRIE_DB_USER', 'mairie_kloto'),
+        'PASSWORD': os.environ.get('MAIRIE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('MAIRIE_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('MAIRIE_DB_PORT', '5432'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if os.environ.get('MAIRIE_DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['MAIRIE_DB_REPLICA_HOST'],
+            'PORT': os.environ.get('MAIRIE_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            # En test, la réplique pointe sur la base par défaut
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# Routage des lectures du tableau de bord (listes et exports) vers la réplique, si configurée
+DATABASE_ROUTERS = ['mairie_kloto_platform.routers.RepliqueLectureRouter']
+
+# PRAGMA SQLite appliqués à chaque connexion (voir mairie_kloto_platform/database.py).
+# Surcharger ici une valeur, ou la mettre à None pour ne pas l'appliquer.
+SQLITE_PRAGMAS = {}
+
+# Profilage SQL par vue (tableau de bord > Profilage SQL). Désactivé par défaut :
+# MAIRIE_PROFILAGE_SQL=1 python manage.py runserver
+PROFILAGE_SQL_ACTIF = os.environ.get('MAIRIE_PROFILAGE_SQL', '') == '1'
+PROFILAGE_SQL_TAILLE_TAMPON = 500
+
+# Fichiers média servis par Django (plages d'octets, ETag, cache navigateur) : toujours en
+# développement ; en production, MAIRIE_SERVIR_MEDIA=1 si l'hébergeur ne sert pas /media/ lui-même.
+SERVIR_MEDIA = DEBUG or os.environ.get('MAIRIE_SERVIR_MEDIA', '') == '1'
+# Délégation de l'envoi au serveur web : '' (Django lit le fichier), 'x-accel-redirect' (nginx,
+# avec `location /media-interne/ { internal; alias <MEDIA_ROOT>/; }`) ou 'x-sendfile' (Apache).
+MEDIA_ENVOI_SERVEUR = os.environ.get('MAIRIE_MEDIA_ENVOI', '').lower()
+MEDIA_X_ACCEL_PREFIXE = '/media-interne/'
+MEDIA_CACHE_SECONDES = 30 * 24 * 3600
+
 
 # Authentication backends
 # Permet la connexion avec le nom d'utilisateur OU l'email
@@ -164,6 +220,19 @@ if ON_PYTHONANYWHERE:
 else:
     STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Cache partagé entre les processus web en production (agrégat « Mon compte », ...) ;
+# en local, cache mémoire par processus (défaut de Django).
+if ON_PYTHONANYWHERE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/home/mariekloto1tg/MairieKloto1/cache',
+        }
+    }
+
+# Formulaires d'inscription vierges (PDF) construits au déploiement : construire_modeles_pdf
+MODELES_PDF_ROOT = os.path.join(STATIC_ROOT, 'modeles_pdf')
+
 # Media files (Uploaded files)
 MEDIA_URL = '/media/'
 if ON_PYTHONANYWHERE:
@@ -171,6 +240,13 @@ if ON_PYTHONANYWHERE:
 else:
     MEDIA_ROOT = BASE_DIR / 'media'
 
+# Médias rangés par empreinte SHA-256 (un contenu identique n'est stocké qu'une fois) ;
+# les fichiers qui ne sont plus référencés sont supprimés par `manage.py nettoyer_medias`.
+STORAGES = {
+    'default': {'BACKEND': 'mairie_kloto_platform.stockage.StockageDedoublonne'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Email configuration (development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@mairie-kloto.tg'
@@ -0,0 +1,82 @@
+"""
+Stockage des médias dédoublonné par contenu (SHA-256).
+
+Chaque fichier envoyé est enregistré sous `blobs/ab/cd/<sha256><extension>` : le même logo ou
+document envoyé par plusieurs profils, ou renvoyé à chaque modification, n'occupe qu'une fois
+le disque. Les champs FileField / ImageField gardent simplement le nom du blob.
+
+Un blob peut donc être partagé : il n'est jamais supprimé directement (`delete` est sans effet
+sur les blobs). Les références sont comptées à partir des champs fichiers de tous les modèles
+(`compter_references`) et la commande `nettoyer_medias` supprime les blobs qui n'en ont plus.
+"""
+import hashlib
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+PREFIXE_BLOBS = "blobs/"
+
+
+def nom_blob(empreinte, nom_origine):
+    extension = os.path.splitext(nom_origine)[1].lower()
+    return f"{PREFIXE_BLOBS}{empreinte[:2]}/{empreinte[2:4]}/{empreinte}{extension}"
+
+
+def empreinte_contenu(contenu):
+    """SHA-256 (hex) d'un File Django, lu par blocs."""
+    sha = hashlib.sha256()
+    for bloc in contenu.chunks():
+        sha.update(bloc)
+    return sha.hexdigest()
+
+
+class StockageDedoublonne(FileSystemStorage):
+    """FileSystemStorage qui range chaque contenu une seule fois, sous son empreinte SHA-256."""
+
+    def _save(self, name, content):
+        blob = nom_blob(empreinte_contenu(content), name)
+        if self.exists(blob):
+            # Blob peut-être orphelin : rafraîchir sa date pour que le délai de grâce de
+            # nettoyer_medias le protège jusqu'au commit de l'enregistrement qui le référence.
+            os.utime(self.path(blob))
+            return blob
+        return super()._save(blob, content)
+
+    def get_available_name(self, name, max_length=None):
+        # Le chemin upload_to n'est jamais écrit (_save range le contenu sous son empreinte) :
+        # inutile de lui chercher un nom libre. Pour un blob (écriture concurrente du même
+        # contenu), le comportement standard s'applique.
+        if name.startswith(PREFIXE_BLOBS):
+            return super().get_available_name(name, max_length)
+        return name
+
+    def delete(self, name):
+        # Un blob peut être référencé par d'autres enregistrements : nettoyer_medias s'en charge
+        if name and name.startswith(PREFIXE_BLOBS):
+            return
+        super().delete(name)
+
+
+def champs_fichiers():
+    """(modèle, nom du champ) pour chaque FileField / ImageField concret du projet."""
+    return [
+        (modele, champ.name)
+        for modele in apps.get_models()
+        for champ in modele._meta.concrete_fields
+        if isinstance(champ, models.FileField)
+    ]
+
+
+def compter_references():
+    """Counter {nom de fichier: nombre d'enregistrements qui le référencent}, tous modèles confondus."""
+    references = Counter()
+    for modele, champ in champs_fichiers():
+        noms = (
+            modele._base_manager.exclude(**{champ: ""}).exclude(**{f"{champ}__isnull": True})
+            .order_by().values_list(champ, flat=True)
+        )
+        references.update(noms.iterator(chunk_size=2000))
+    return references
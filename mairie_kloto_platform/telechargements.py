@@ -0,0 +1,290 @@
+"""
+Téléchargements volumineux : archives ZIP diffusées en flux et requêtes HTTP Range (reprise).
+
+`ArchiveZipStockee` décrit une archive ZIP sans compression (méthode « stored ») dont la
+disposition est entièrement connue à l'avance : taille totale, position de chaque en-tête et de
+chaque fichier. On peut donc annoncer un Content-Length, puis servir n'importe quelle plage
+d'octets en ne lisant que les fichiers concernés, par blocs de TAILLE_BLOC.
+
+Les CRC32 ne sont pas nécessaires avant les données : ils sont écrits dans un descripteur placé
+après chaque fichier (bit 3 des drapeaux) et calculés au fil de la lecture. Lorsqu'une plage
+commence au milieu d'un fichier, son CRC est recalculé en relisant ce seul fichier.
+
+Les fichiers candidats sont déjà compressés (PDF) : « stored » ne coûte presque rien en taille
+et rend l'archive identique d'une requête à l'autre, condition de la reprise.
+
+`reponse_fichier` sert un fichier du disque (médias) avec les mêmes plages d'octets, plus ETag,
+Last-Modified et cache navigateur, ou délègue l'envoi au serveur web (X-Accel-Redirect / X-Sendfile).
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import struct
+import zlib
+from io import BytesIO
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+TAILLE_BLOC = 64 * 1024
+
+_LIMITE_ZIP32 = 0xFFFFFFFF
+_DRAPEAUX = 0x0008 | 0x0800  # descripteur de données après le fichier + noms en UTF-8
+_VERSION = 20
+
+_PLAGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class PlageNonSatisfiable(Exception):
+    """En-tête Range hors de la taille de la ressource (réponse 416)."""
+
+
+def analyser_plage(entete, taille):
+    """
+    Plage (début, fin inclusive) demandée par un en-tête Range à plage unique.
+    Retourne None si l'en-tête est absent, mal formé ou multi-plages (on répond alors en entier),
+    lève PlageNonSatisfiable si la plage est hors de la ressource.
+    """
+    if not entete:
+        return None
+    correspondance = _PLAGE.match(entete.strip())
+    if not correspondance or correspondance.groups() == ("", ""):
+        return None
+    debut, fin = correspondance.groups()
+    if debut == "":
+        # Suffixe : les N derniers octets
+        longueur = int(fin)
+        if longueur == 0 or taille == 0:
+            raise PlageNonSatisfiable
+        return max(taille - longueur, 0), taille - 1
+    debut = int(debut)
+    fin = taille - 1 if fin == "" else min(int(fin), taille - 1)
+    if debut >= taille or fin < debut:
+        raise PlageNonSatisfiable
+    return debut, fin
+
+
+def reponse_telechargement(request, taille, lire, content_type, nom_fichier, etag=None, piece_jointe=True):
+    """
+    Réponse 200 / 206 / 416 pour une ressource de `taille` octets.
+    `lire(debut, fin)` produit les octets de la plage [debut, fin] (fin incluse).
+    Un en-tête If-Range différent de l'ETag courant fait renvoyer la ressource entière.
+    """
+    plage = None
+    if etag is None or request.headers.get("If-Range", etag) == etag:
+        try:
+            plage = analyser_plage(request.headers.get("Range"), taille)
+        except PlageNonSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{taille}"
+            response["Accept-Ranges"] = "bytes"
+            return response
+
+    debut, fin = plage or (0, taille - 1)
+    response = StreamingHttpResponse(lire(debut, fin) if taille else iter(()), content_type=content_type)
+    if plage:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {debut}-{fin}/{taille}"
+    response["Content-Length"] = str(fin - debut + 1 if taille else 0)
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition_header(piece_jointe, nom_fichier)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def lire_fichier(chemin, debut, fin):
+    """Octets [debut, fin] (fin incluse) d'un fichier du disque, par blocs de TAILLE_BLOC."""
+    with open(chemin, "rb") as source:
+        source.seek(debut)
+        restant = fin - debut + 1
+        while restant > 0:
+            bloc = source.read(min(TAILLE_BLOC, restant))
+            if not bloc:
+                return
+            restant -= len(bloc)
+            yield bloc
+
+
+def reponse_fichier(request, racine, chemin_relatif, nom_fichier=None, piece_jointe=False,
+                    cache_control=None, delegation=True):
+    """
+    Sert `racine/chemin_relatif` : 304 si le navigateur a déjà la version courante, sinon
+    200 / 206 lus par blocs, ou en-tête X-Accel-Redirect / X-Sendfile selon
+    settings.MEDIA_ENVOI_SERVEUR (le serveur web gère alors lui-même les plages).
+    `delegation=False` pour les fichiers hors de MEDIA_ROOT, que le serveur web ne connaît pas.
+    """
+    try:
+        chemin = safe_join(racine, chemin_relatif)
+        etat = os.stat(chemin)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Fichier introuvable.")
+    if not os.path.isfile(chemin):
+        raise Http404("Fichier introuvable.")
+
+    # ETag façon nginx : date de modification + taille, sans relire le fichier
+    etag = f'"{etat.st_mtime_ns:x}-{etat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(etat.st_mtime))
+    if response is None:
+        content_type, encodage = mimetypes.guess_type(chemin)
+        if encodage:
+            # .gz, .bz2 : on sert l'archive telle quelle, sans que le navigateur la décompresse
+            content_type = "application/octet-stream"
+        content_type = content_type or "application/octet-stream"
+        envoi = settings.MEDIA_ENVOI_SERVEUR if delegation else ""
+        if envoi == "x-accel-redirect":
+            response = HttpResponse(content_type=content_type)
+            relatif = os.path.relpath(chemin, racine).replace(os.sep, "/")
+            response["X-Accel-Redirect"] = settings.MEDIA_X_ACCEL_PREFIXE + quote(relatif)
+        elif envoi == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = chemin
+        else:
+            response = reponse_telechargement(
+                request, etat.st_size, lambda debut, fin: lire_fichier(chemin, debut, fin),
+                content_type, nom_fichier or os.path.basename(chemin), etag=etag, piece_jointe=piece_jointe,
+            )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(etat.st_mtime)
+    response["Cache-Control"] = cache_control or f"public, max-age={settings.MEDIA_CACHE_SECONDES}"
+    return response
+
+
+def _date_dos(horodatage):
+    horodatage = timezone.localtime(horodatage) if timezone.is_aware(horodatage) else horodatage
+    annee = max(horodatage.year, 1980)
+    heure = (horodatage.hour << 11) | (horodatage.minute << 5) | (horodatage.second // 2)
+    jour = ((annee - 1980) << 9) | (horodatage.month << 5) | horodatage.day
+    return heure, jour
+
+
+class EntreeZip:
+    """Un fichier de l'archive : nom, taille connue, et fonction d'ouverture en lecture binaire."""
+
+    def __init__(self, nom, taille, horodatage, ouvrir, empreinte):
+        self.nom = nom.encode("utf-8")
+        self.taille = taille
+        self.heure_dos, self.date_dos = _date_dos(horodatage)
+        self.ouvrir = ouvrir
+        # Identifie le contenu (nom stocké + taille, ou hash) pour l'ETag de l'archive
+        self.empreinte = empreinte
+        self.position = 0
+        self._crc = None
+
+    @classmethod
+    def depuis_fichier(cls, fichier, nom, horodatage):
+        """Entrée lue depuis un FieldFile (le stockage n'est ouvert qu'au moment de la lecture)."""
+        return cls(
+            nom, fichier.size, horodatage,
+            lambda: fichier.storage.open(fichier.name, "rb"),
+            f"{fichier.name}:{fichier.size}",
+        )
+
+    @classmethod
+    def depuis_octets(cls, nom, octets, horodatage):
+        return cls(nom, len(octets), horodatage, lambda: BytesIO(octets), hashlib.sha256(octets).hexdigest())
+
+    def lire(self, debut=0, fin=None):
+        """Octets [debut, fin[ du fichier, par blocs ; échoue si le fichier a changé de taille."""
+        fin = self.taille if fin is None else fin
+        with self.ouvrir() as source:
+            if debut:
+                source.seek(debut)
+            restant = fin - debut
+            while restant > 0:
+                bloc = source.read(min(TAILLE_BLOC, restant))
+                if not bloc:
+                    raise OSError(f"{self.nom.decode()} : fichier tronqué depuis la préparation de l'archive")
+                restant -= len(bloc)
+                yield bloc
+
+    def crc(self):
+        if self._crc is None:
+            crc = 0
+            for bloc in self.lire():
+                crc = zlib.crc32(bloc, crc)
+            self._crc = crc
+        return self._crc
+
+
+class ArchiveZipStockee:
+    """Archive ZIP (sans compression ni ZIP64) servie en flux, plage par plage."""
+
+    def __init__(self, entrees):
+        self.entrees = list(entrees)
+        if len(self.entrees) > 0xFFFF:
+            raise ValueError("Trop de fichiers pour une archive ZIP sans ZIP64.")
+        # Segments (position, longueur, source) : octets fixes, fonction produisant des octets
+        # (dépendant des CRC), ou EntreeZip pour les données d'un fichier.
+        self._segments = []
+        position = 0
+        for entree in self.entrees:
+            entree.position = position
+            position = self._ajouter(position, self._entete_locale(entree))
+            position = self._ajouter(position, entree, entree.taille)
+            position = self._ajouter(position, lambda e=entree: struct.pack("<IIII", 0x08074B50, e.crc(), e.taille, e.taille), 16)
+        self._debut_repertoire = position
+        taille_repertoire = sum(46 + len(e.nom) for e in self.entrees)
+        position = self._ajouter(position, self._repertoire_central, taille_repertoire)
+        position = self._ajouter(position, struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, len(self.entrees), len(self.entrees),
+            taille_repertoire, self._debut_repertoire, 0,
+        ))
+        if self._debut_repertoire > _LIMITE_ZIP32:
+            raise ValueError("Archive trop volumineuse pour le format ZIP sans ZIP64 (4 Go).")
+        self.taille = position
+
+    def _ajouter(self, position, source, longueur=None):
+        longueur = len(source) if longueur is None else longueur
+        self._segments.append((position, longueur, source))
+        return position + longueur
+
+    @staticmethod
+    def _entete_locale(entree):
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, _VERSION, _DRAPEAUX, 0, entree.heure_dos, entree.date_dos,
+            0, entree.taille, entree.taille, len(entree.nom), 0,
+        ) + entree.nom
+
+    def _repertoire_central(self):
+        return b"".join(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, _VERSION, _VERSION, _DRAPEAUX, 0,
+                e.heure_dos, e.date_dos, e.crc(), e.taille, e.taille, len(e.nom), 0, 0, 0, 0, 0, e.position,
+            ) + e.nom
+            for e in self.entrees
+        )
+
+    @property
+    def etag(self):
+        empreintes = "\n".join(f"{e.nom.decode()}|{e.empreinte}|{e.date_dos}|{e.heure_dos}" for e in self.entrees)
+        return '"' + hashlib.sha256(empreintes.encode("utf-8")).hexdigest()[:32] + '"'
+
+    def lire(self, debut=0, fin=None):
+        """Octets [debut, fin] (fin incluse) de l'archive."""
+        fin = self.taille - 1 if fin is None else fin
+        for position, longueur, source in self._segments:
+            a = max(debut, position) - position
+            b = min(fin + 1, position + longueur) - position
+            if a >= b:
+                continue
+            if isinstance(source, EntreeZip):
+                if a == 0 and b == longueur and source._crc is None:
+                    # Fichier servi en entier : CRC calculé au passage, sans seconde lecture
+                    crc = 0
+                    for bloc in source.lire():
+                        crc = zlib.crc32(bloc, crc)
+                        yield bloc
+                    source._crc = crc
+                else:
+                    yield from source.lire(a, b)
+            else:
+                octets = source() if callable(source) else source
+                yield octets[a:b]
@@ -15,9 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 
 from . import views
 
@@ -64,16 +65,24 @@ urlpatterns = [
     path("tableau-bord/boutiques/creer-type-local/", views.creer_type_local_ajax, name="creer_type_local_ajax"),
     path("tableau-bord/infrastructures/sauvegarder/", views.sauvegarder_infrastructure_ajax, name="sauvegarder_infrastructure_ajax"),
     path("tableau-bord/contributions/", views.liste_contributions, name="liste_contributions"),
+    path("tableau-bord/import/", views.import_donnees, name="import_donnees"),
+    path("tableau-bord/recettes/", views.recettes_mensuelles, name="recettes_mensuelles"),
+    path("tableau-bord/taux-recouvrement/", views.taux_recouvrement, name="taux_recouvrement"),
+    path("tableau-bord/doublons/", views.liste_doublons, name="liste_doublons"),
+    path("tableau-bord/doublons/<int:pk>/<str:action>/", views.traiter_doublon, name="traiter_doublon"),
     path("tableau-bord/cotisations-acteurs-institutions/", views.liste_cotisations_acteurs_institutions, name="liste_cotisations_acteurs_institutions"),
     path("tableau-bord/definir-taxe-acteur/<int:acteur_id>/", views.definir_taxe_acteur, name="definir_taxe_acteur"),
     path("tableau-bord/definir-taxe-institution/<int:institution_id>/", views.definir_taxe_institution, name="definir_taxe_institution"),
     path("tableau-bord/suggestions/", views.liste_suggestions, name="liste_suggestions"),
     path("tableau-bord/suggestions/<int:pk>/", views.detail_suggestion, name="detail_suggestion"),
+    path("tableau-bord/profilage-sql/", views.profilage_sql, name="profilage_sql"),
     path("tableau-bord/candidatures/", views.liste_candidatures, name="liste_candidatures"),
     path("tableau-bord/candidatures/<int:appel_offre_id>/pdf/", views.export_pdf_candidatures, name="export_pdf_candidatures"),
+    path("tableau-bord/candidatures/<int:appel_offre_id>/dossiers.zip", views.export_zip_dossiers_candidatures, name="export_zip_dossiers_candidatures"),
     path("tableau-bord/notifications-candidats/", views.notifications_candidats, name="notifications_candidats"),
     path("tableau-bord/notifications-candidats/<int:appel_offre_id>/envoyer/", views.envoyer_notifications_candidats, name="envoyer_notifications_candidats"),
     path("tableau-bord/changer-statut/<str:model_name>/<int:pk>/<str:action>/", views.changer_statut, name="changer_statut"),
+    path("tableau-bord/moderation/<str:model_name>/", views.moderer_lot, name="moderer_lot"),
     path("tableau-bord/export/acteurs/", views.export_pdf_acteurs, name="export_pdf_acteurs"),
     path("tableau-bord/export/entreprises/", views.export_pdf_entreprises, name="export_pdf_entreprises"),
     path("tableau-bord/export/institutions/", views.export_pdf_institutions, name="export_pdf_institutions"),
@@ -96,8 +105,10 @@ urlpatterns = [
     path("tableau-bord/export-excel/agents-collecteurs/", views.export_excel_agents_collecteurs, name="export_excel_agents_collecteurs"),
     path("tableau-bord/export/contribuables/", views.export_pdf_contribuables, name="export_pdf_contribuables"),
     path("tableau-bord/export-excel/contribuables/", views.export_excel_contribuables, name="export_excel_contribuables"),
+    path("tableau-bord/export/contribuables/releves/", views.export_pdf_releves_contribuables, name="export_pdf_releves_contribuables"),
     path("tableau-bord/export/boutiques/", views.export_pdf_boutiques, name="export_pdf_boutiques"),
     path("tableau-bord/export-excel/boutiques/", views.export_excel_boutiques, name="export_excel_boutiques"),
+    path("tableau-bord/export-excel/taux-recouvrement/", views.export_excel_taux_recouvrement, name="export_excel_taux_recouvrement"),
     path("tableau-bord/export/contributions/", views.export_pdf_contributions, name="export_pdf_contributions"),
     path("tableau-bord/export/contributions/contribuable/<int:contribuable_id>/pdf/", views.export_pdf_suivi_paiements_contribuable, name="export_pdf_suivi_paiements_contribuable"),
     path("tableau-bord/export/contributions/historique-par-agent/pdf/", views.export_pdf_historique_cotisations_par_agent, name="export_pdf_historique_cotisations_par_agent"),
@@ -118,6 +129,12 @@ urlpatterns = [
     path("tableau-bord/sites-touristiques/ajouter/", views.ajouter_site_touristique, name="ajouter_site_touristique"),
 ]
 
-# Servir les fichiers média en développement
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Servir les fichiers média (développement, ou hébergeur sans service /media/) : voir SERVIR_MEDIA
+if settings.SERVIR_MEDIA:
+    urlpatterns += [
+        re_path(
+            r"^%s(?P<chemin>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+            views.servir_media,
+            name="servir_media",
+        ),
+    ]
@@ -1,16 +1,27 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib import messages
 from django.db.models import Count, Q, Sum
 from django.db.models.functions import TruncDay
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 from datetime import timedelta, datetime, date
 from decimal import Decimal, InvalidOperation
 import os
 import json
+from io import BytesIO
 from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+from mairie_kloto_platform import moderation, profilage, releves, telechargements
+from mairie_kloto_platform.profilage import budget_requetes
+from mairie.recouvrement import calculer_recouvrement
+from mairie.recettes import AXES, PERIODES, interroger_recettes
+from mairie.importation import IMPORTEURS, MAX_ERREURS_AFFICHEES, importer_fichier
+from mairie.archives import annees_closes, archives_necessaires, fusionner, sources
+from mairie.doublons import libelles_fiches
+from mairie.telephones import filtre_telephone
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
@@ -43,6 +54,8 @@ from mairie.models import (
     CartographieCommune,
     InfrastructureCommune,
     TypeLocal,
+    FaitRecetteMensuelle,
+    DoublonPotentiel,
 )
 
 from acteurs.models import ActeurEconomique, InstitutionFinanciere, SiteTouristique
@@ -276,6 +289,15 @@ def fake_admin(request):
     return render(request, "admin_fake.html", status=404)
 
 
+@require_http_methods(["GET", "HEAD"])
+def servir_media(request, chemin):
+    """
+    Fichiers média (vidéos des spots, dossiers, brochures) avec plages d'octets, ETag et cache
+    navigateur : les lecteurs vidéo peuvent se positionner et les téléchargements reprendre.
+    """
+    return telechargements.reponse_fichier(request, settings.MEDIA_ROOT, chemin)
+
+
 def politique_cookies(request):
     """
     Page d'information sur les cookies (conformité / transparence).
@@ -381,6 +403,7 @@ def newsletters_admin(request):
 
 @login_required
 @user_passes_test(is_staff_user)
+@budget_requetes(45)
 def tableau_bord(request):
     """Tableau de bord administrateur."""
     
@@ -446,37 +469,17 @@ def tableau_bord(request):
         'retraites': get_counts(ProfilEmploi.objects.filter(type_profil='retraite'), 'date_inscription'),
         'diaspora': get_counts(MembreDiaspora.objects.all(), 'date_inscription'),
         'osc': get_counts(OrganisationSocieteCivile.objects.all(), 'date_enregistrement'),
-        'visites': get_counts(VisiteSite.objects.all(), 'date'),
+        'visites': get_counts(VisiteSite.objects.filter(est_robot=False), 'date'),
     }
     
-    # Nombre total de visites sur les 30 derniers jours (toutes pages confondues)
-    total_visites_30j = VisiteSite.objects.filter(date__gte=start_date, date__lte=end_date).count()
+    # Nombre total de visites humaines sur les 30 derniers jours (toutes pages confondues)
+    total_visites_30j = VisiteSite.objects.filter(
+        est_robot=False, date__gte=start_date, date__lte=end_date
+    ).count()
 
-    # Données pour la carte : acteurs économiques et institutions avec géolocalisation
-    map_markers = []
-    for a in ActeurEconomique.objects.exclude(latitude__isnull=True).exclude(longitude__isnull=True):
-        try:
-            map_markers.append({
-                "nom": a.raison_sociale,
-                "lat": float(a.latitude),
-                "lng": float(a.longitude),
-                "type": "acteur",
-            })
-        except (TypeError, ValueError):
-            pass
-    for i in InstitutionFinanciere.objects.exclude(latitude__isnull=True).exclude(longitude__isnull=True):
-        try:
-            map_markers.append({
-                "nom": i.nom_institution,
-                "lat": float(i.latitude),
-                "lng": float(i.longitude),
-                "type": "institution",
-            })
-        except (TypeError, ValueError):
-            pass
+    # Les marqueurs des cartes sont chargés à la demande (mairie:carte_marqueurs)
 
-    # Données pour la carte des infrastructures de la commune
-    infrastructures_data = []
+    # Centre de la carte des infrastructures de la commune
     infra_center = {"lat": 6.9057, "lng": 0.6287, "zoom": 12}
 
     config_active = ConfigurationMairie.objects.filter(est_active=True).first()
@@ -497,33 +500,14 @@ def tableau_bord(request):
             infra_center["lng"] = 0.6287
             infra_center["zoom"] = 13
 
-        infrastructures_qs = InfrastructureCommune.objects.filter(
+        stats["infrastructures_commune"] = InfrastructureCommune.objects.filter(
             cartographie=cartographie
-        ).order_by("type_infrastructure", "nom")
-        stats["infrastructures_commune"] = infrastructures_qs.count()
-        for infra in infrastructures_qs:
-            try:
-                infrastructures_data.append(
-                    {
-                        "id": infra.id,
-                        "nom": infra.nom,
-                        "type": infra.type_infrastructure,
-                        "description": infra.description,
-                        "adresse": infra.adresse,
-                        "lat": float(infra.latitude),
-                        "lng": float(infra.longitude),
-                        "est_active": infra.est_active,
-                    }
-                )
-            except (TypeError, ValueError):
-                continue
+        ).count()
 
     context = {
         'stats': stats,
         'chart_data_json': json.dumps(chart_data, cls=DjangoJSONEncoder),
         'total_visites_30j': total_visites_30j,
-        'map_markers_json': json.dumps(map_markers, ensure_ascii=False),
-        'infrastructures_json': json.dumps(infrastructures_data, ensure_ascii=False),
         'infrastructures_center_json': json.dumps(infra_center, ensure_ascii=False),
     }
     
@@ -1513,7 +1497,7 @@ def liste_acteurs_economiques(request):
             Q(raison_sociale__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     
     if type_acteur:
@@ -1555,7 +1539,7 @@ def liste_institutions_financieres(request):
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     
     if type_inst:
@@ -1680,7 +1664,7 @@ def liste_diaspora_tableau_bord(request):
             Q(nom__icontains=q) |
             Q(prenoms__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone_whatsapp__icontains=q) |
+            filtre_telephone(q) |
             Q(profession_actuelle__icontains=q) |
             Q(domaine_formation__icontains=q)
         )
@@ -2115,6 +2099,7 @@ def _parse_date(s):
 
 @login_required
 @user_passes_test(is_staff_user)
+@budget_requetes(12)
 def liste_contribuables(request):
     """Liste des contribuables (marchés et places publiques)."""
     
@@ -2130,7 +2115,7 @@ def liste_contribuables(request):
         contribuables = contribuables.filter(
             Q(nom__icontains=q) |
             Q(prenom__icontains=q) |
-            Q(telephone__icontains=q)
+            filtre_telephone(q)
         )
     
     if nationalite:
@@ -2150,6 +2135,9 @@ def liste_contribuables(request):
     context = {
         'contribuables': contribuables,
         'titre': '👥 Contribuables (Marchés / Places publiques)',
+        'emplacements': EmplacementMarche.objects.order_by('nom_lieu'),
+        'agents_collecteurs': AgentCollecteur.objects.order_by('nom', 'prenom'),
+        'annee_courante': timezone.now().year,
         'current_filters': {
             'q': q,
             'nationalite': nationalite,
@@ -2598,7 +2586,11 @@ def sauvegarder_infrastructure_ajax(request):
 @login_required
 @user_passes_test(is_staff_user)
 def liste_contributions(request):
-    """Liste des contributions/taxes (cotisations annuelles, paiements mensuels, tickets marché)."""
+    """
+    Liste des contributions/taxes (cotisations annuelles, paiements mensuels, tickets marché).
+    Les paiements et tickets des exercices clos ne sont lus dans les archives que si la période
+    filtrée en touche un.
+    """
     
     # Récupération des paramètres de filtrage
     type_contribution = request.GET.get('type', '')
@@ -2613,33 +2605,22 @@ def liste_contributions(request):
         'boutique__contribuable', 'boutique__emplacement'
     ).order_by('-annee', '-date_creation')
     
-    paiements = PaiementCotisation.objects.select_related(
-        'cotisation_annuelle__boutique__contribuable',
-        'encaisse_par_agent'
-    ).order_by('-date_paiement')
-    
-    tickets = TicketMarche.objects.select_related(
-        'emplacement', 'contribuable', 'encaisse_par_agent'
-    ).order_by('-date', '-date_creation')
-    
-    # Filtres par type
-    if type_contribution == 'cotisations':
-        paiements = paiements.none()
-        tickets = tickets.none()
-    elif type_contribution == 'paiements':
+    # Filtres communs aux tables vivantes et à leurs archives
+    filtres_paiements = []
+    filtres_tickets = []
+    avec_paiements = type_contribution not in ('cotisations', 'tickets')
+    avec_tickets = type_contribution not in ('cotisations', 'paiements')
+    if type_contribution in ('paiements', 'tickets'):
         cotisations_annuelles = cotisations_annuelles.none()
-        tickets = tickets.none()
-    elif type_contribution == 'tickets':
-        cotisations_annuelles = cotisations_annuelles.none()
-        paiements = paiements.none()
     
     # Filtre par année
+    annee_int = None
     if annee:
         try:
             annee_int = int(annee)
             cotisations_annuelles = cotisations_annuelles.filter(annee=annee_int)
-            paiements = paiements.filter(cotisation_annuelle__annee=annee_int)
-            tickets = tickets.filter(date__year=annee_int)
+            filtres_paiements.append(Q(cotisation_annuelle__annee=annee_int))
+            filtres_tickets.append(Q(date__year=annee_int))
         except ValueError:
             pass
     
@@ -2648,8 +2629,8 @@ def liste_contributions(request):
         try:
             mois_int = int(mois)
             if 1 <= mois_int <= 12:
-                paiements = paiements.filter(mois=mois_int)
-                tickets = tickets.filter(date__month=mois_int)
+                filtres_paiements.append(Q(mois=mois_int))
+                filtres_tickets.append(Q(date__month=mois_int))
         except ValueError:
             pass
     
@@ -2657,8 +2638,8 @@ def liste_contributions(request):
     if agent_collecteur_id:
         try:
             agent_id = int(agent_collecteur_id)
-            paiements = paiements.filter(encaisse_par_agent_id=agent_id)
-            tickets = tickets.filter(encaisse_par_agent_id=agent_id)
+            filtres_paiements.append(Q(encaisse_par_agent_id=agent_id))
+            filtres_tickets.append(Q(encaisse_par_agent_id=agent_id))
         except (ValueError, TypeError):
             pass
     
@@ -2666,11 +2647,11 @@ def liste_contributions(request):
     date_du_parsed = _parse_date(date_du)
     date_au_parsed = _parse_date(date_au)
     if date_du_parsed:
-        paiements = paiements.filter(date_paiement__date__gte=date_du_parsed)
-        tickets = tickets.filter(date__gte=date_du_parsed)
+        filtres_paiements.append(Q(date_paiement__date__gte=date_du_parsed))
+        filtres_tickets.append(Q(date__gte=date_du_parsed))
     if date_au_parsed:
-        paiements = paiements.filter(date_paiement__date__lte=date_au_parsed)
-        tickets = tickets.filter(date__lte=date_au_parsed)
+        filtres_paiements.append(Q(date_paiement__date__lte=date_au_parsed))
+        filtres_tickets.append(Q(date__lte=date_au_parsed))
     
     # Recherche textuelle
     if q:
@@ -2679,31 +2660,46 @@ def liste_contributions(request):
             Q(boutique__contribuable__nom__icontains=q) |
             Q(boutique__contribuable__prenom__icontains=q)
         )
-        paiements = paiements.filter(
+        filtres_paiements.append(
             Q(cotisation_annuelle__boutique__matricule__icontains=q) |
             Q(cotisation_annuelle__boutique__contribuable__nom__icontains=q) |
             Q(cotisation_annuelle__boutique__contribuable__prenom__icontains=q)
         )
-        tickets = tickets.filter(
+        filtres_tickets.append(
             Q(nom_vendeur__icontains=q) |
             Q(contribuable__nom__icontains=q) |
             Q(contribuable__prenom__icontains=q)
         )
     
+    archives = archives_necessaires(annee=annee_int, date_du=date_du_parsed, date_au=date_au_parsed)
+    paiements_qs = [
+        modele.objects.select_related(
+            'cotisation_annuelle__boutique__contribuable',
+            'encaisse_par_agent'
+        ).filter(*filtres_paiements).order_by('-date_paiement')
+        for modele in sources(PaiementCotisation, archives)
+    ] if avec_paiements else []
+    tickets_qs = [
+        modele.objects.select_related(
+            'emplacement', 'contribuable', 'encaisse_par_agent'
+        ).filter(*filtres_tickets).order_by('-date', '-date_creation')
+        for modele in sources(TicketMarche, archives)
+    ] if avec_tickets else []
+    
     # Calcul des totaux sur les queryset FILTRÉS (avant limitation d'affichage)
     from django.db.models import Sum
 
     total_cotisations_montant_du = (
         cotisations_annuelles.aggregate(total=Sum("montant_annuel_du"))["total"] or 0
     )
-    total_paiements_montant = (
-        paiements.aggregate(total=Sum("montant_paye"))["total"] or 0
+    total_paiements_montant = sum(
+        qs.aggregate(total=Sum("montant_paye"))["total"] or 0 for qs in paiements_qs
     )
-    total_tickets_montant = (
-        tickets.aggregate(total=Sum("montant"))["total"] or 0
+    total_tickets_montant = sum(
+        qs.aggregate(total=Sum("montant"))["total"] or 0 for qs in tickets_qs
     )
 
-    # Années disponibles pour le filtre
+    # Années disponibles pour le filtre : les tickets vivants ne couvrent que les exercices ouverts
     annees_cotisations = sorted(
         CotisationAnnuelle.objects.values_list('annee', flat=True).distinct(),
         reverse=True
@@ -2712,13 +2708,13 @@ def liste_contributions(request):
         TicketMarche.objects.values_list('date__year', flat=True).distinct(),
         reverse=True
     )
-    annees_disponibles = sorted(set(annees_cotisations + annees_tickets), reverse=True)
+    annees_disponibles = sorted(set(annees_cotisations + annees_tickets + annees_closes()), reverse=True)
     agents_collecteurs = AgentCollecteur.objects.filter(statut="actif").order_by("matricule", "nom", "prenom")
     
     context = {
         'cotisations_annuelles': cotisations_annuelles[:100],  # Limiter pour performance
-        'paiements': paiements[:100],
-        'tickets': tickets[:100],
+        'paiements': fusionner(paiements_qs, cle=lambda p: p.date_paiement, limite=100),
+        'tickets': fusionner(tickets_qs, cle=lambda t: (t.date, t.date_creation), limite=100),
         'titre': '💰 Contributions / Taxes',
         'total_cotisations_montant_du': total_cotisations_montant_du,
         'total_paiements_montant': total_paiements_montant,
@@ -2742,7 +2738,10 @@ def liste_contributions(request):
 @login_required
 @user_passes_test(is_staff_user)
 def liste_cotisations_acteurs_institutions(request):
-    """Liste des acteurs économiques, institutions financières et leurs cotisations annuelles."""
+    """
+    Liste des acteurs économiques, institutions financières et leurs cotisations annuelles.
+    Les paiements des exercices clos ne sont lus dans les archives que si la période filtrée en touche un.
+    """
     
     # Récupération des paramètres de filtrage
     type_contribution = request.GET.get('type', '')  # 'acteurs' ou 'institutions' ou ''
@@ -2757,7 +2756,7 @@ def liste_cotisations_acteurs_institutions(request):
     acteurs_economiques = ActeurEconomique.objects.all().order_by('raison_sociale')
     institutions_financieres = InstitutionFinanciere.objects.all().order_by('nom_institution')
     
-    # Cotisations et paiements
+    # Cotisations
     cotisations_acteurs = CotisationAnnuelleActeur.objects.select_related(
         'acteur'
     ).order_by('-annee', '-date_creation')
@@ -2766,15 +2765,10 @@ def liste_cotisations_acteurs_institutions(request):
         'institution'
     ).order_by('-annee', '-date_creation')
     
-    paiements_acteurs = PaiementCotisationActeur.objects.select_related(
-        'cotisation_annuelle__acteur',
-        'encaisse_par_agent'
-    ).order_by('-date_paiement')
-    
-    paiements_institutions = PaiementCotisationInstitution.objects.select_related(
-        'cotisation_annuelle__institution',
-        'encaisse_par_agent'
-    ).order_by('-date_paiement')
+    # Filtres des paiements, communs aux tables vivantes et à leurs archives
+    filtres_paiements = []
+    filtres_paiements_acteurs = []
+    filtres_paiements_institutions = []
     
     # Filtre recherche textuelle sur acteurs et institutions
     if q:
@@ -2782,14 +2776,14 @@ def liste_cotisations_acteurs_institutions(request):
             Q(raison_sociale__icontains=q) |
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
-            Q(telephone1__icontains=q) |
+            filtre_telephone(q) |
             Q(email__icontains=q)
         )
         institutions_financieres = institutions_financieres.filter(
             Q(nom_institution__icontains=q) |
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
-            Q(telephone1__icontains=q) |
+            filtre_telephone(q) |
             Q(email__icontains=q)
         )
         cotisations_acteurs = cotisations_acteurs.filter(
@@ -2802,33 +2796,33 @@ def liste_cotisations_acteurs_institutions(request):
             Q(institution__sigle__icontains=q) |
             Q(institution__nom_responsable__icontains=q)
         )
-        paiements_acteurs = paiements_acteurs.filter(
+        filtres_paiements_acteurs.append(
             Q(cotisation_annuelle__acteur__raison_sociale__icontains=q) |
             Q(cotisation_annuelle__acteur__sigle__icontains=q)
         )
-        paiements_institutions = paiements_institutions.filter(
+        filtres_paiements_institutions.append(
             Q(cotisation_annuelle__institution__nom_institution__icontains=q) |
             Q(cotisation_annuelle__institution__sigle__icontains=q)
         )
     
     # Filtres par type (acteurs uniquement / institutions uniquement)
+    avec_acteurs = type_contribution != 'institutions'
+    avec_institutions = type_contribution != 'acteurs'
     if type_contribution == 'acteurs':
         institutions_financieres = institutions_financieres.none()
         cotisations_institutions = cotisations_institutions.none()
-        paiements_institutions = paiements_institutions.none()
     elif type_contribution == 'institutions':
         acteurs_economiques = acteurs_economiques.none()
         cotisations_acteurs = cotisations_acteurs.none()
-        paiements_acteurs = paiements_acteurs.none()
     
     # Filtre par année (pour cotisations et paiements)
+    annee_int = None
     if annee:
         try:
             annee_int = int(annee)
             cotisations_acteurs = cotisations_acteurs.filter(annee=annee_int)
             cotisations_institutions = cotisations_institutions.filter(annee=annee_int)
-            paiements_acteurs = paiements_acteurs.filter(cotisation_annuelle__annee=annee_int)
-            paiements_institutions = paiements_institutions.filter(cotisation_annuelle__annee=annee_int)
+            filtres_paiements.append(Q(cotisation_annuelle__annee=annee_int))
         except ValueError:
             pass
     
@@ -2837,8 +2831,7 @@ def liste_cotisations_acteurs_institutions(request):
         try:
             mois_int = int(mois)
             if 1 <= mois_int <= 12:
-                paiements_acteurs = paiements_acteurs.filter(date_paiement__month=mois_int)
-                paiements_institutions = paiements_institutions.filter(date_paiement__month=mois_int)
+                filtres_paiements.append(Q(date_paiement__month=mois_int))
         except ValueError:
             pass
     
@@ -2846,8 +2839,7 @@ def liste_cotisations_acteurs_institutions(request):
     if agent_collecteur_id:
         try:
             agent_id = int(agent_collecteur_id)
-            paiements_acteurs = paiements_acteurs.filter(encaisse_par_agent_id=agent_id)
-            paiements_institutions = paiements_institutions.filter(encaisse_par_agent_id=agent_id)
+            filtres_paiements.append(Q(encaisse_par_agent_id=agent_id))
         except (ValueError, TypeError):
             pass
     
@@ -2855,11 +2847,25 @@ def liste_cotisations_acteurs_institutions(request):
     date_du_parsed = _parse_date(date_du)
     date_au_parsed = _parse_date(date_au)
     if date_du_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__gte=date_du_parsed)
-        paiements_institutions = paiements_institutions.filter(date_paiement__date__gte=date_du_parsed)
+        filtres_paiements.append(Q(date_paiement__date__gte=date_du_parsed))
     if date_au_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__lte=date_au_parsed)
-        paiements_institutions = paiements_institutions.filter(date_paiement__date__lte=date_au_parsed)
+        filtres_paiements.append(Q(date_paiement__date__lte=date_au_parsed))
+    
+    archives = archives_necessaires(annee=annee_int, date_du=date_du_parsed, date_au=date_au_parsed)
+    paiements_acteurs = [
+        modele.objects.select_related(
+            'cotisation_annuelle__acteur',
+            'encaisse_par_agent'
+        ).filter(*filtres_paiements, *filtres_paiements_acteurs).order_by('-date_paiement')
+        for modele in sources(PaiementCotisationActeur, archives)
+    ] if avec_acteurs else []
+    paiements_institutions = [
+        modele.objects.select_related(
+            'cotisation_annuelle__institution',
+            'encaisse_par_agent'
+        ).filter(*filtres_paiements, *filtres_paiements_institutions).order_by('-date_paiement')
+        for modele in sources(PaiementCotisationInstitution, archives)
+    ] if avec_institutions else []
     
     # Années disponibles pour le filtre
     annees_acteurs = sorted(
@@ -2878,8 +2884,8 @@ def liste_cotisations_acteurs_institutions(request):
         'institutions_financieres': institutions_financieres,
         'cotisations_acteurs': cotisations_acteurs[:100],
         'cotisations_institutions': cotisations_institutions[:100],
-        'paiements_acteurs': paiements_acteurs[:100],
-        'paiements_institutions': paiements_institutions[:100],
+        'paiements_acteurs': fusionner(paiements_acteurs, cle=lambda p: p.date_paiement, limite=100),
+        'paiements_institutions': fusionner(paiements_institutions, cle=lambda p: p.date_paiement, limite=100),
         'titre': '💰 Cotisations Acteurs & Institutions',
         'annees_disponibles': annees_disponibles,
         'agents_collecteurs': agents_collecteurs,
@@ -3125,8 +3131,10 @@ def liste_candidatures(request):
         if appel_id not in appels_offres_avec_candidatures:
             appels_offres_avec_candidatures[appel_id] = {
                 'appel_offre': candidature.appel_offre,
-                'nb_acceptees': 0
+                'nb_acceptees': 0,
+                'nb_candidatures': 0,
             }
+        appels_offres_avec_candidatures[appel_id]['nb_candidatures'] += 1
         if candidature.statut == 'acceptee':
             appels_offres_avec_candidatures[appel_id]['nb_acceptees'] += 1
     
@@ -3152,32 +3160,31 @@ def liste_candidatures(request):
     return render(request, "admin/liste_candidatures.html", context)
 
 
-@login_required
-@user_passes_test(is_staff_user)
-def export_pdf_candidatures(request, appel_offre_id):
-    """
-    Génère un PDF des candidatures acceptées pour un appel d'offres spécifique.
-    """
-    appel_offre = get_object_or_404(AppelOffre, pk=appel_offre_id)
-    
-    candidatures = Candidature.objects.filter(
-        appel_offre=appel_offre,
-        statut="acceptee"
-    ).select_related("appel_offre", "candidat").order_by("-date_soumission")
+def _identite_candidat(user):
+    """(Nom ou raison sociale, téléphone) d'un candidat selon son profil (entreprise, institution, emploi)."""
+    acteur = getattr(user, "acteur_economique", None)
+    institution = getattr(user, "institution_financiere", None)
+    profil = getattr(user, "profil_emploi", None)
 
-    if not candidatures.exists():
-        messages.warning(
-            request,
-            f"Aucun dossier accepté pour l'appel d'offres '{appel_offre.titre}'.",
-        )
-        return redirect("liste_candidatures")
+    # Si l'utilisateur est lié à une entreprise ou institution, on affiche la raison sociale
+    if acteur is not None:
+        return acteur.raison_sociale, acteur.telephone1
+    if institution is not None:
+        return institution.nom_institution, institution.telephone1
+    if profil is not None:
+        return f"{profil.nom} {profil.prenoms}", profil.telephone1
+    return user.get_full_name() or user.username, ""
 
-    conf = ConfigurationMairie.objects.filter(est_active=True).first()
-    response = HttpResponse(content_type="application/pdf")
-    filename = _make_pdf_filename("candidatures-acceptees", appel_offre.reference or appel_offre.titre)
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4), topMargin=PDF_HEADER_HEIGHT_CM * cm, bottomMargin=1.5 * cm)
+def _pdf_candidatures(sortie, appel_offre, candidatures, conf, titre="Candidatures acceptées", invariant=None):
+    """
+    Écrit dans `sortie` le PDF récapitulatif des candidatures d'un appel d'offres.
+    `invariant=1` rend le PDF identique octet pour octet à données égales (archive ZIP reprenable).
+    """
+    doc = SimpleDocTemplate(
+        sortie, pagesize=landscape(A4), topMargin=PDF_HEADER_HEIGHT_CM * cm, bottomMargin=1.5 * cm,
+        invariant=invariant,
+    )
     styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
         "Title",
@@ -3188,7 +3195,7 @@ def export_pdf_candidatures(request, appel_offre_id):
         spaceAfter=12,
     )
     story = [
-        Paragraph("Candidatures acceptées", title_style),
+        Paragraph(titre, title_style),
         Paragraph(f"Appel d'offres : {escape(appel_offre.titre)}", styles["Heading2"]),
         Spacer(1, 0.2 * cm),
     ]
@@ -3202,32 +3209,7 @@ def export_pdf_candidatures(request, appel_offre_id):
     data = [["Nom / Raison sociale", "Email", "Date de soumission", "Téléphone"]]
     for candidature in candidatures:
         user = candidature.candidat
-
-        # Nom / Raison sociale
-        full_name = user.get_full_name() or user.username
-        display_name = full_name
-
-        # Si l'utilisateur est lié à une entreprise ou institution, on affiche la raison sociale
-        acteur = getattr(user, "acteur_economique", None)
-        institution = getattr(user, "institution_financiere", None)
-        profil = getattr(user, "profil_emploi", None)
-
-        if acteur is not None:
-            display_name = acteur.raison_sociale
-        elif institution is not None:
-            display_name = institution.nom_institution
-        elif profil is not None:
-            display_name = f"{profil.nom} {profil.prenoms}"
-
-        # Numéro de téléphone
-        telephone = ""
-        if acteur is not None:
-            telephone = acteur.telephone1
-        elif institution is not None:
-            telephone = institution.telephone1
-        elif profil is not None:
-            telephone = profil.telephone1
-
+        display_name, telephone = _identite_candidat(user)
         data.append(
             [
                 escape(display_name),
@@ -3262,9 +3244,102 @@ def export_pdf_candidatures(request, appel_offre_id):
         _draw_pdf_header(canvas, doc, conf)
 
     doc.build(story, onFirstPage=on_page, onLaterPages=on_page, canvasmaker=NumberedCanvas)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def export_pdf_candidatures(request, appel_offre_id):
+    """
+    Génère un PDF des candidatures acceptées pour un appel d'offres spécifique.
+    """
+    appel_offre = get_object_or_404(AppelOffre, pk=appel_offre_id)
+    
+    candidatures = Candidature.objects.filter(
+        appel_offre=appel_offre,
+        statut="acceptee"
+    ).select_related("appel_offre", "candidat").order_by("-date_soumission")
+
+    if not candidatures.exists():
+        messages.warning(
+            request,
+            f"Aucun dossier accepté pour l'appel d'offres '{appel_offre.titre}'.",
+        )
+        return redirect("liste_candidatures")
+
+    conf = ConfigurationMairie.objects.filter(est_active=True).first()
+    response = HttpResponse(content_type="application/pdf")
+    filename = _make_pdf_filename("candidatures-acceptees", appel_offre.reference or appel_offre.titre)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    _pdf_candidatures(response, appel_offre, candidatures, conf)
     return response
 
 
+@login_required
+@user_passes_test(is_staff_user)
+def export_zip_dossiers_candidatures(request, appel_offre_id):
+    """
+    Archive ZIP de tous les dossiers de candidature d'un appel d'offres, avec le PDF récapitulatif.
+    L'archive est diffusée par blocs (jamais entièrement en mémoire) et accepte les requêtes
+    Range : un téléchargement interrompu peut reprendre là où il s'était arrêté.
+    """
+    appel_offre = get_object_or_404(AppelOffre, pk=appel_offre_id)
+    candidatures = list(
+        Candidature.objects.filter(appel_offre=appel_offre)
+        .select_related(
+            "candidat",
+            "candidat__acteur_economique",
+            "candidat__institution_financiere",
+            "candidat__profil_emploi",
+        )
+        .order_by("date_soumission", "id")
+    )
+    if not candidatures:
+        messages.warning(request, f"Aucune candidature pour l'appel d'offres '{appel_offre.titre}'.")
+        return redirect("liste_candidatures")
+
+    conf = ConfigurationMairie.objects.filter(est_active=True).first()
+    synthese = BytesIO()
+    _pdf_candidatures(synthese, appel_offre, candidatures, conf, titre="Candidatures reçues", invariant=1)
+    entrees = [
+        telechargements.EntreeZip.depuis_octets(
+            "synthese-candidatures.pdf", synthese.getvalue(), candidatures[-1].date_soumission
+        )
+    ]
+    manquants = []
+    for candidature in candidatures:
+        fichier = candidature.fichier_dossier
+        nom_candidat, _ = _identite_candidat(candidature.candidat)
+        extension = os.path.splitext(fichier.name)[1].lower() or ".pdf"
+        nom = f"dossiers/{candidature.pk:05d}-{slugify(nom_candidat) or 'candidat'}-{candidature.statut}{extension}"
+        try:
+            entrees.append(telechargements.EntreeZip.depuis_fichier(fichier, nom, candidature.date_soumission))
+        except (OSError, ValueError):
+            manquants.append(f"{nom} (fichier introuvable : {fichier.name or '-'})")
+    if manquants:
+        entrees.append(telechargements.EntreeZip.depuis_octets(
+            "fichiers-manquants.txt", "\n".join(manquants).encode("utf-8"), candidatures[-1].date_soumission
+        ))
+
+    archive = telechargements.ArchiveZipStockee(entrees)
+    nom_archive = f"dossiers-{slugify(appel_offre.reference or appel_offre.titre) or appel_offre.pk}.zip"
+    return telechargements.reponse_telechargement(
+        request, archive.taille, archive.lire, "application/zip", nom_archive, etag=archive.etag
+    )
+
+
+# Liste du tableau de bord de chaque type d'objet modérable
+LISTES_MODERATION = {
+    'candidature': 'liste_candidatures',
+    'acteur': 'liste_acteurs',
+    'institution': 'liste_institutions',
+    'jeune': 'liste_jeunes',
+    'retraite': 'liste_retraites',
+    'diaspora': 'liste_diaspora_tableau_bord',
+    'suggestion': 'liste_suggestions',
+    'osc': 'liste_osc_tableau_bord',
+}
+
+
 @login_required
 @user_passes_test(is_staff_user)
 @require_POST
@@ -3319,18 +3394,44 @@ def changer_statut(request, model_name, pk, action):
         return redirect(redirect_to)
     
     # Redirection vers la liste appropriée
-    redirect_map = {
-        'candidature': 'liste_candidatures',
-        'acteur': 'liste_acteurs',
-        'institution': 'liste_institutions',
-        'jeune': 'liste_jeunes',
-        'retraite': 'liste_retraites',
-        'diaspora': 'liste_diaspora_tableau_bord',
-        'suggestion': 'liste_suggestions',
-        'osc': 'liste_osc_tableau_bord',
-    }
-    
-    return redirect(redirect_map.get(model_name, 'tableau_bord'))
+    return redirect(LISTES_MODERATION.get(model_name, 'tableau_bord'))
+
+
+@login_required
+@user_passes_test(is_staff_user)
+@require_POST
+def moderer_lot(request, model_name):
+    """
+    Valide / refuse (ou marque comme lues) les lignes cochées d'une liste du tableau de bord,
+    en une seule requête UPDATE (voir mairie_kloto_platform.moderation).
+    """
+    action = request.POST.get('action', '')
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+    reponse_json = request.accepts('application/json') and not request.accepts('text/html')
+    try:
+        resume = moderation.moderer_en_lot(model_name, ids, action, auteur=request.user)
+    except ValueError as exc:
+        if reponse_json:
+            return JsonResponse({'success': False, 'error': str(exc)}, status=400)
+        messages.error(request, str(exc))
+        resume = None
+
+    if resume is not None:
+        if reponse_json:
+            return JsonResponse({'success': True, **resume})
+        texte = f"{resume['modifies']} élément(s) mis à jour sur {resume['demandes']} sélectionné(s)"
+        if resume['inchanges']:
+            texte += f", {resume['inchanges']} déjà dans cet état"
+        if resume['introuvables']:
+            texte += f", {resume['introuvables']} introuvable(s)"
+        if resume['notifies']:
+            texte += f" ; {resume['notifies']} notification(s) envoyée(s)"
+        messages.success(request, texte + ".")
+
+    redirect_to = request.POST.get('redirect_to')
+    if redirect_to and url_has_allowed_host_and_scheme(redirect_to, allowed_hosts={request.get_host()}):
+        return redirect(redirect_to)
+    return redirect(LISTES_MODERATION.get(model_name, 'tableau_bord'))
 
 
 @login_required
@@ -4231,7 +4332,7 @@ def export_excel_acteurs(request):
             Q(raison_sociale__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_acteur:
         acteurs = acteurs.filter(type_acteur=type_acteur)
@@ -4321,7 +4422,7 @@ def export_excel_institutions(request):
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_inst:
         institutions = institutions.filter(type_institution=type_inst)
@@ -4588,7 +4689,7 @@ def export_excel_diaspora(request):
             Q(nom__icontains=q) |
             Q(prenoms__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone_whatsapp__icontains=q) |
+            filtre_telephone(q) |
             Q(profession_actuelle__icontains=q) |
             Q(domaine_formation__icontains=q)
         )
@@ -4935,7 +5036,7 @@ def export_pdf_contribuables(request):
     qs = Contribuable.objects.select_related("user").prefetch_related("boutiques_magasins").order_by("-date_creation")
     if q:
         qs = qs.filter(
-            Q(nom__icontains=q) | Q(prenom__icontains=q) | Q(telephone__icontains=q)
+            Q(nom__icontains=q) | Q(prenom__icontains=q) | filtre_telephone(q)
         )
     if nationalite:
         qs = qs.filter(nationalite__icontains=nationalite)
@@ -5021,7 +5122,7 @@ def export_excel_contribuables(request):
     qs = Contribuable.objects.select_related("user").prefetch_related("boutiques_magasins").order_by("-date_creation")
     if q:
         qs = qs.filter(
-            Q(nom__icontains=q) | Q(prenom__icontains=q) | Q(telephone__icontains=q)
+            Q(nom__icontains=q) | Q(prenom__icontains=q) | filtre_telephone(q)
         )
     if nationalite:
         qs = qs.filter(nationalite__icontains=nationalite)
@@ -5306,69 +5407,75 @@ def export_pdf_contributions(request):
     cotisations = CotisationAnnuelle.objects.select_related(
         "boutique__contribuable", "boutique__emplacement"
     ).order_by("-annee", "-date_creation")
-    paiements = PaiementCotisation.objects.select_related(
-        "cotisation_annuelle__boutique__contribuable",
-        "encaisse_par_agent",
-    ).order_by("-date_paiement")
-    tickets = TicketMarche.objects.select_related(
-        "emplacement", "contribuable", "encaisse_par_agent"
-    ).order_by("-date", "-date_creation")
-    if type_contribution == "paiements":
-        cotisations = cotisations.none()
-        tickets = tickets.none()
-    elif type_contribution == "tickets":
+    # Filtres communs aux tables vivantes et à leurs archives
+    filtres_paiements = []
+    filtres_tickets = []
+    avec_paiements = type_contribution not in ("cotisations", "tickets")
+    avec_tickets = type_contribution not in ("cotisations", "paiements")
+    if type_contribution in ("paiements", "tickets"):
         cotisations = cotisations.none()
-        paiements = paiements.none()
-    elif type_contribution == "cotisations":
-        paiements = paiements.none()
-        tickets = tickets.none()
+    annee_int = None
     if annee:
         try:
             annee_int = int(annee)
             cotisations = cotisations.filter(annee=annee_int)
-            paiements = paiements.filter(cotisation_annuelle__annee=annee_int)
-            tickets = tickets.filter(date__year=annee_int)
+            filtres_paiements.append(Q(cotisation_annuelle__annee=annee_int))
+            filtres_tickets.append(Q(date__year=annee_int))
         except ValueError:
             pass
     if mois:
         try:
             mois_int = int(mois)
             if 1 <= mois_int <= 12:
-                paiements = paiements.filter(mois=mois_int)
-                tickets = tickets.filter(date__month=mois_int)
+                filtres_paiements.append(Q(mois=mois_int))
+                filtres_tickets.append(Q(date__month=mois_int))
         except ValueError:
             pass
     if agent_collecteur_id:
         try:
             agent_id = int(agent_collecteur_id)
-            paiements = paiements.filter(encaisse_par_agent_id=agent_id)
-            tickets = tickets.filter(encaisse_par_agent_id=agent_id)
+            filtres_paiements.append(Q(encaisse_par_agent_id=agent_id))
+            filtres_tickets.append(Q(encaisse_par_agent_id=agent_id))
         except (ValueError, TypeError):
             pass
     date_du_parsed = _parse_date(date_du)
     date_au_parsed = _parse_date(date_au)
     if date_du_parsed:
-        paiements = paiements.filter(date_paiement__date__gte=date_du_parsed)
-        tickets = tickets.filter(date__gte=date_du_parsed)
+        filtres_paiements.append(Q(date_paiement__date__gte=date_du_parsed))
+        filtres_tickets.append(Q(date__gte=date_du_parsed))
     if date_au_parsed:
-        paiements = paiements.filter(date_paiement__date__lte=date_au_parsed)
-        tickets = tickets.filter(date__lte=date_au_parsed)
+        filtres_paiements.append(Q(date_paiement__date__lte=date_au_parsed))
+        filtres_tickets.append(Q(date__lte=date_au_parsed))
     if q:
         cotisations = cotisations.filter(
             Q(boutique__matricule__icontains=q)
             | Q(boutique__contribuable__nom__icontains=q)
             | Q(boutique__contribuable__prenom__icontains=q)
         )
-        paiements = paiements.filter(
+        filtres_paiements.append(
             Q(cotisation_annuelle__boutique__matricule__icontains=q)
             | Q(cotisation_annuelle__boutique__contribuable__nom__icontains=q)
             | Q(cotisation_annuelle__boutique__contribuable__prenom__icontains=q)
         )
-        tickets = tickets.filter(
+        filtres_tickets.append(
             Q(nom_vendeur__icontains=q)
             | Q(contribuable__nom__icontains=q)
             | Q(contribuable__prenom__icontains=q)
         )
+    archives = archives_necessaires(annee=annee_int, date_du=date_du_parsed, date_au=date_au_parsed)
+    paiements = fusionner([
+        modele.objects.select_related(
+            "cotisation_annuelle__boutique__contribuable",
+            "encaisse_par_agent",
+        ).filter(*filtres_paiements).order_by("-date_paiement")
+        for modele in sources(PaiementCotisation, archives)
+    ] if avec_paiements else [], cle=lambda p: p.date_paiement, limite=500)
+    tickets = fusionner([
+        modele.objects.select_related(
+            "emplacement", "contribuable", "encaisse_par_agent"
+        ).filter(*filtres_tickets).order_by("-date", "-date_creation")
+        for modele in sources(TicketMarche, archives)
+    ] if avec_tickets else [], cle=lambda t: (t.date, t.date_creation), limite=500)
     conf = ConfigurationMairie.objects.filter(est_active=True).first()
     response = HttpResponse(content_type="application/pdf")
     response["Content-Disposition"] = 'attachment; filename="contributions.pdf"'
@@ -5645,15 +5752,21 @@ def export_pdf_historique_cotisations_par_agent(request):
     )
     cot_map = {(c.boutique_id, c.annee): c for c in cotisations}
 
-    paiements_qs = PaiementCotisation.objects.select_related(
-        "cotisation_annuelle__boutique__emplacement",
-        "encaisse_par_agent",
-    ).filter(date_paiement__date__gte=start, date_paiement__date__lte=end).order_by("encaisse_par_agent", "date_paiement")
-    tickets_qs = TicketMarche.objects.select_related("emplacement", "encaisse_par_agent").filter(
-        date__gte=start, date__lte=end
-    ).order_by("encaisse_par_agent", "date")
-    paiements = list(paiements_qs)
-    tickets = list(tickets_qs)
+    # Tables d'archives lues seulement si la période touche un exercice clos
+    archives = archives_necessaires(date_du=start, date_au=end)
+    paiements = []
+    for modele in sources(PaiementCotisation, archives):
+        paiements.extend(modele.objects.select_related(
+            "cotisation_annuelle__boutique__emplacement",
+            "encaisse_par_agent",
+        ).filter(date_paiement__date__gte=start, date_paiement__date__lte=end))
+    paiements.sort(key=lambda p: p.date_paiement)
+    tickets = []
+    for modele in sources(TicketMarche, archives):
+        tickets.extend(modele.objects.select_related("emplacement", "encaisse_par_agent").filter(
+            date__gte=start, date__lte=end
+        ))
+    tickets.sort(key=lambda t: t.date)
 
     agent_ids_with_activity = set()
     for p in paiements:
@@ -5841,24 +5954,23 @@ def export_pdf_versement_journalier_agent(request):
         except (ValueError, TypeError, AgentCollecteur.DoesNotExist):
             agent = None
 
-    # Paiements et tickets du jour pour cet agent
-    paiements_qs = PaiementCotisation.objects.select_related(
-        "cotisation_annuelle__boutique__contribuable",
-        "cotisation_annuelle__boutique__emplacement",
-        "encaisse_par_agent",
-    ).filter(date_paiement__date=jour)
-    tickets_qs = TicketMarche.objects.select_related(
-        "emplacement",
-        "contribuable",
-        "encaisse_par_agent",
-    ).filter(date=jour)
-
-    if agent:
-        paiements_qs = paiements_qs.filter(encaisse_par_agent=agent)
-        tickets_qs = tickets_qs.filter(encaisse_par_agent=agent)
-
-    paiements = list(paiements_qs)
-    tickets = list(tickets_qs)
+    # Paiements et tickets du jour pour cet agent (archives comprises si le jour est dans un exercice clos)
+    archives = archives_necessaires(date_du=jour, date_au=jour)
+    filtre_agent = {"encaisse_par_agent": agent} if agent else {}
+    paiements = []
+    for modele in sources(PaiementCotisation, archives):
+        paiements.extend(modele.objects.select_related(
+            "cotisation_annuelle__boutique__contribuable",
+            "cotisation_annuelle__boutique__emplacement",
+            "encaisse_par_agent",
+        ).filter(date_paiement__date=jour, **filtre_agent))
+    tickets = []
+    for modele in sources(TicketMarche, archives):
+        tickets.extend(modele.objects.select_related(
+            "emplacement",
+            "contribuable",
+            "encaisse_par_agent",
+        ).filter(date=jour, **filtre_agent))
 
     total_paiements = sum(Decimal(str(p.montant_paye or 0)) for p in paiements)
     total_tickets = sum(Decimal(str(t.montant or 0)) for t in tickets)
@@ -6062,392 +6174,11 @@ def export_pdf_suivi_paiements_contribuable(request, contribuable_id: int):
     if start and end and start > end:
         start, end = end, start
 
-    months_in_period = _iter_year_months(start, end)
-    month_count = len(months_in_period) if months_in_period else 0
-
-    boutiques = (
-        BoutiqueMagasin.objects.select_related("emplacement", "agent_collecteur")
-        .filter(contribuable=contribuable)
-        .order_by("emplacement__nom_lieu", "matricule")
-    )
-
-    # Cotisations annuelles pour les boutiques du contribuable (années utiles)
-    years = sorted({y for (y, _m) in months_in_period}) if months_in_period else []
-    cotisations = (
-        CotisationAnnuelle.objects.select_related("boutique")
-        .filter(boutique__in=boutiques, annee__in=years)
-        .order_by("annee", "boutique__matricule")
-    )
-    cot_map = {(c.boutique_id, c.annee): c for c in cotisations}
-
-    # Paiements du contribuable dans la période (date paiement)
-    paiements_qs = (
-        PaiementCotisation.objects.select_related(
-            "cotisation_annuelle__boutique__emplacement",
-            "encaisse_par_agent",
-        )
-        .filter(cotisation_annuelle__boutique__in=boutiques)
-        .order_by("date_paiement")
-    )
-    if start:
-        paiements_qs = paiements_qs.filter(date_paiement__date__gte=start)
-    if end:
-        paiements_qs = paiements_qs.filter(date_paiement__date__lte=end)
-    paiements = list(paiements_qs)
-
-    # Tickets marché du contribuable dans la période (si existants)
-    tickets_qs = TicketMarche.objects.select_related("emplacement", "encaisse_par_agent").filter(contribuable=contribuable)
-    if start:
-        tickets_qs = tickets_qs.filter(date__gte=start)
-    if end:
-        tickets_qs = tickets_qs.filter(date__lte=end)
-    tickets = list(tickets_qs.order_by("date", "date_creation")[:800])
-
-    # Montants mensuels (par boutique + total)
-    montant_mensuel_total = Decimal("0")
-    boutiques_rows = []
-    for b in boutiques:
-        mensuel = Decimal(str(b.prix_location_mensuel or 0))
-        montant_mensuel_total += mensuel
-        boutiques_rows.append(
-            [
-                b.matricule,
-                b.emplacement.nom_lieu if b.emplacement else "",
-                b.get_type_local_display() if hasattr(b, "get_type_local_display") else (b.type_local or ""),
-                b.activite_vendue or "",
-                str(mensuel.quantize(Decimal("1"))) if mensuel == mensuel.to_integral() else str(mensuel),
-                (b.agent_collecteur.nom_complet if b.agent_collecteur else "—"),
-            ]
-        )
-
-    # Paiements indexés par (boutique_id, annee, mois)
-    paid_by_key = {}
-    for p in paiements:
-        cot = p.cotisation_annuelle
-        key = (cot.boutique_id, cot.annee, int(p.mois))
-        paid_by_key[key] = paid_by_key.get(key, Decimal("0")) + Decimal(str(p.montant_paye or 0))
-
-    # Calcul attendu / encaissé / impayés sur la période (par mois), groupés par boutique
-    total_attendu = Decimal("0")
-    total_encaisse = Decimal("0")
-    impayes_par_boutique = {}  # boutique_id -> [(mois_str, attendu, payé, reste), ...] période
-    impayes_annees_passees_par_boutique = {}  # boutique_id -> [(mois_str, attendu, payé, reste), ...] arriérés
-    paiements_par_boutique = {}  # boutique_id -> [list of paiements]
-    avance_par_boutique = {}  # boutique_id -> [(annee, mois, montant, date_paiement), ...]
-
-    for p in paiements:
-        cot = p.cotisation_annuelle
-        bid = cot.boutique_id
-        if bid not in paiements_par_boutique:
-            paiements_par_boutique[bid] = []
-        paiements_par_boutique[bid].append(p)
-        # Paiement en avance = date_paiement (mois/an) < mois/annee du paiement
-        dp = p.date_paiement
-        if hasattr(dp, "date"):
-            dp = dp.date()
-        if dp and (dp.year < cot.annee or (dp.year == cot.annee and dp.month < int(p.mois))):
-            if bid not in avance_par_boutique:
-                avance_par_boutique[bid] = []
-            avance_par_boutique[bid].append((cot.annee, int(p.mois), Decimal(str(p.montant_paye or 0)), dp))
-
-    totaux_par_boutique = {}  # boutique_id -> {attendu, paye, reste}
-    # Mois à vérifier : inclure les années passées (avant la période) pour capturer les impayés historiques
-    min_year = start.year - 3 if start else (today.year - 3)
-    all_months_to_check = []
-    y, m = min_year, 1
-    end_y, end_m = end.year if end else today.year, end.month if end else today.month
-    while (y, m) <= (end_y, end_m):
-        all_months_to_check.append((y, m))
-        if m == 12:
-            y, m = y + 1, 1
-        else:
-            m += 1
-
-    for b in boutiques:
-        impayes_par_boutique[b.pk] = []
-        impayes_annees_passees_par_boutique[b.pk] = []
-        att_b = Decimal("0")
-        pay_b = Decimal("0")
-        for (y, m) in months_in_period:
-            cot = cot_map.get((b.pk, y))
-            if cot:
-                attendu = (Decimal(str(cot.montant_annuel_du or 0)) / Decimal("12"))
-            else:
-                attendu = Decimal(str(b.prix_location_mensuel or 0))
-
-            attendu = attendu.quantize(Decimal("0.01"))
-            total_attendu += attendu
-            att_b += attendu
-
-            paid = paid_by_key.get((b.pk, y, m), Decimal("0")).quantize(Decimal("0.01"))
-            total_encaisse += paid
-            pay_b += paid
-
-            reste = (attendu - paid)
-            if reste > 0:
-                impayes_par_boutique[b.pk].append(
-                    (
-                        f"{m:02d}/{y}",
-                        attendu,
-                        paid,
-                        reste,
-                    )
-                )
-        # Impayés des années passées : mois avant la période (arriérés)
-        # On ne compte que les années où une cotisation existe (boutique active cette année)
-        months_in_period_set = set(months_in_period)
-        for (y, m) in all_months_to_check:
-            if (y, m) in months_in_period_set:
-                continue
-            cot = cot_map.get((b.pk, y))
-            if not cot:
-                continue  # Pas de cotisation = boutique pas encore active, pas d'arriéré
-            attendu = (Decimal(str(cot.montant_annuel_du or 0)) / Decimal("12")).quantize(Decimal("0.01"))
-            paid = paid_by_key.get((b.pk, y, m), Decimal("0")).quantize(Decimal("0.01"))
-            reste = (attendu - paid)
-            if reste > 0:
-                impayes_annees_passees_par_boutique[b.pk].append(
-                    (
-                        f"{m:02d}/{y}",
-                        attendu,
-                        paid,
-                        reste,
-                    )
-                )
-        totaux_par_boutique[b.pk] = {"attendu": att_b, "paye": pay_b, "reste": max(Decimal("0"), att_b - pay_b)}
-
-    reste_a_payer = max(Decimal("0"), (total_attendu - total_encaisse))
-    taux_paiement = Decimal("0")
-    if total_attendu > 0:
-        taux_paiement = (total_encaisse / total_attendu) * Decimal("100")
-
-    # PDF
+    donnees = releves.preparer_releves(Contribuable.objects.filter(pk=contribuable.pk), start, end)[0]
     conf = ConfigurationMairie.objects.filter(est_active=True).first()
     response = HttpResponse(content_type="application/pdf")
-    filename = _make_pdf_filename("releve_paiements", contribuable.nom_complet) if "_make_pdf_filename" in globals() else f"releve_paiements_{slugify(contribuable.nom_complet)}.pdf"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    doc = SimpleDocTemplate(
-        response,
-        pagesize=landscape(A4),
-        topMargin=PDF_HEADER_HEIGHT_CM * cm,
-        bottomMargin=1.5 * cm,
-    )
-    story = []
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        "Title",
-        parent=styles["Heading1"],
-        fontSize=15,
-        textColor=colors.HexColor("#006233"),
-        alignment=1,
-        spaceAfter=10,
-    )
-    story.append(Paragraph("Relevé / Suivi de paiement (Contribuable)", title_style))
-    story.append(
-        Paragraph(
-            f"<b>Contribuable :</b> {escape(contribuable.nom_complet)} &nbsp;&nbsp; "
-            f"<b>Téléphone :</b> {escape(contribuable.telephone)}",
-            styles["Normal"],
-        )
-    )
-    story.append(
-        Paragraph(
-            f"<b>Période :</b> {start.strftime('%d/%m/%Y') if start else '...'} au {end.strftime('%d/%m/%Y') if end else '...'} "
-            f"(<b>{month_count}</b> mois)",
-            styles["Normal"],
-        )
-    )
-    story.append(Spacer(1, 0.35 * cm))
-
-    # Boutiques
-    story.append(Paragraph("1) Boutiques / magasins rattachés", styles["Heading2"]))
-    if boutiques_rows:
-        data_b = [["Matricule", "Emplacement", "Type", "Activité", "Montant mensuel", "Agent"]]
-        data_b.extend(boutiques_rows)
-        tbl_b = Table(data_b, colWidths=[3 * cm, 5.5 * cm, 2.8 * cm, 5.8 * cm, 3.3 * cm, 5.0 * cm])
-        tbl_b.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ]
-            )
-        )
-        story.append(tbl_b)
-    else:
-        story.append(Paragraph("Aucune boutique/magasin rattaché à ce contribuable.", styles["Normal"]))
-    story.append(Spacer(1, 0.25 * cm))
-
-    # Synthèse
-    story.append(Paragraph("2) Synthèse sur la période", styles["Heading2"]))
-    synth = [
-        ["Montant mensuel total", f"{montant_mensuel_total:,.0f} FCFA".replace(",", " ")],
-        ["Total attendu (période)", f"{total_attendu:,.0f} FCFA".replace(",", " ")],
-        ["Total encaissé (période)", f"{total_encaisse:,.0f} FCFA".replace(",", " ")],
-        ["Reste à payer (période)", f"{reste_a_payer:,.0f} FCFA".replace(",", " ")],
-        ["Taux de paiement", f"{taux_paiement.quantize(Decimal('0.01'))} %"],
-    ]
-    tbl_s = Table(synth, colWidths=[6 * cm, 12 * cm])
-    tbl_s.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#E8F5E9")),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-            ]
-        )
-    )
-    story.append(tbl_s)
-    story.append(Spacer(1, 0.25 * cm))
-
-    # Suivi par boutique : pour chaque boutique, tableau des paiements + impayés + totaux
-    story.append(Paragraph("3) Suivi boutique par boutique (paiements et impayés)", styles["Heading2"]))
-    for b in boutiques:
-        story.append(Spacer(1, 0.2 * cm))
-        boutique_title = f"Boutique {b.matricule} — {b.emplacement.nom_lieu if b.emplacement else '—'}"
-        story.append(Paragraph(f"<b>{escape(boutique_title)}</b>", styles["Heading3"]))
-
-        # Paiements pour cette boutique
-        p_list = paiements_par_boutique.get(b.pk, [])
-        p_list = sorted(p_list, key=lambda x: (x.cotisation_annuelle.annee, int(x.mois)))
-        if p_list:
-            data_p = [["Année", "Mois", "Montant", "Date", "En avance"]]
-            total_boutique_p = Decimal("0")
-            for p in p_list[:200]:
-                cot = p.cotisation_annuelle
-                montant = Decimal(str(p.montant_paye or 0))
-                total_boutique_p += montant
-                dp = p.date_paiement
-                if hasattr(dp, "date"):
-                    dp = dp.date()
-                en_avance = ""
-                if dp and (dp.year < cot.annee or (dp.year == cot.annee and dp.month < int(p.mois))):
-                    en_avance = "Oui"
-                data_p.append(
-                    [
-                        str(getattr(cot, "annee", "")),
-                        f"{int(p.mois):02d}",
-                        f"{montant:,.0f} FCFA".replace(",", " "),
-                        p.date_paiement.strftime("%d/%m/%Y %H:%M") if hasattr(p.date_paiement, "strftime") else "",
-                        en_avance,
-                    ]
-                )
-            tot_b = totaux_par_boutique.get(b.pk, {})
-            total_attendu_b = tot_b.get("attendu", Decimal("0"))
-            reste_b = tot_b.get("reste", Decimal("0"))
-            data_p.append(["Total à payer (période)", "", "", f"{total_attendu_b:,.0f} FCFA".replace(",", " "), ""])
-            data_p.append(["Total payé", "", "", f"{total_boutique_p:,.0f} FCFA".replace(",", " "), ""])
-            data_p.append(["Reste à payer", "", "", f"{reste_b:,.0f} FCFA".replace(",", " "), ""])
-            tbl_p = Table(data_p, colWidths=[4.0 * cm, 1.4 * cm, 2.8 * cm, 4.2 * cm, 2.2 * cm])
-            n_rows = len(data_p)
-            tbl_p.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
-                        ("BACKGROUND", (0, n_rows - 3), (-1, n_rows - 1), colors.HexColor("#C8E6C9")),
-                        ("SPAN", (0, n_rows - 3), (2, n_rows - 3)),
-                        ("SPAN", (0, n_rows - 2), (2, n_rows - 2)),
-                        ("SPAN", (0, n_rows - 1), (2, n_rows - 1)),
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                        ("FONTSIZE", (0, 0), (-1, -1), 8),
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("FONTNAME", (0, n_rows - 3), (-1, n_rows - 1), "Helvetica-Bold"),
-                    ]
-                )
-            )
-            story.append(tbl_p)
-        else:
-            story.append(Paragraph("Aucun paiement sur cette période.", styles["Normal"]))
-
-        # Tableau Mois/Attendu/Payé/Reste : affiché uniquement s'il y a des arriérés des années passées
-        imp_annees_passees = impayes_annees_passees_par_boutique.get(b.pk, [])
-        if imp_annees_passees:
-            data_i = [["Mois", "Attendu", "Payé", "Reste"]]
-            total_ap = Decimal("0")
-            total_paye_ap = Decimal("0")
-            total_reste_ap = Decimal("0")
-            for (mois_str, attendu, paye, reste) in imp_annees_passees[:100]:
-                total_ap += attendu
-                total_paye_ap += paye
-                total_reste_ap += reste
-                data_i.append(
-                    [
-                        mois_str,
-                        f"{attendu:,.0f}".replace(",", " ") if attendu == attendu.to_integral() else str(attendu),
-                        f"{paye:,.0f}".replace(",", " ") if paye == paye.to_integral() else str(paye),
-                        f"{reste:,.0f}".replace(",", " ") if reste == reste.to_integral() else str(reste),
-                    ]
-                )
-            data_i.append(["Total arriérés", f"{total_ap:,.0f} FCFA".replace(",", " "), f"{total_paye_ap:,.0f} FCFA".replace(",", " "), f"{total_reste_ap:,.0f} FCFA".replace(",", " ")])
-            tbl_i = Table(data_i, colWidths=[4.5 * cm, 3.0 * cm, 3.0 * cm, 3.0 * cm])
-            tbl_i.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FFF3CD")),
-                        ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#FFECB3")),
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                        ("FONTSIZE", (0, 0), (-1, -1), 8),
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
-                    ]
-                )
-            )
-            story.append(Spacer(1, 0.15 * cm))
-            story.append(tbl_i)
-        story.append(Spacer(1, 0.35 * cm))
-
-    if not boutiques:
-        story.append(Paragraph("Aucune boutique/magasin rattaché.", styles["Normal"]))
-
-    # Tickets (optionnel)
-    if tickets:
-        story.append(Spacer(1, 0.3 * cm))
-        story.append(Paragraph("4) Tickets marché (dans la période)", styles["Heading2"]))
-        data_t = [["Date", "Emplacement", "Vendeur", "Montant", "Agent"]]
-        total_tickets = Decimal("0")
-        for t in tickets[:800]:
-            mnt = Decimal(str(t.montant or 0))
-            total_tickets += mnt
-            data_t.append(
-                [
-                    t.date.strftime("%d/%m/%Y") if hasattr(t.date, "strftime") else "",
-                    (t.emplacement.nom_lieu if t.emplacement else "")[:22],
-                    (t.nom_vendeur or "")[:22],
-                    f"{mnt:,.0f} FCFA".replace(",", " "),
-                    t.encaisse_par_agent.nom_complet if t.encaisse_par_agent else "—",
-                ]
-            )
-        data_t.append(["", "", "TOTAL", f"{total_tickets:,.0f} FCFA".replace(",", " "), ""])
-        tbl_t = Table(data_t, colWidths=[2.8 * cm, 6 * cm, 6 * cm, 3.5 * cm, 6.0 * cm])
-        tbl_t.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8F5E9")),
-                    ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#C8E6C9")),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                    ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
-                ]
-            )
-        )
-        story.append(tbl_t)
-
-    story.append(Spacer(1, 0.6 * cm))
-    story.append(Paragraph("Date et Signature : ________________________________", styles["Normal"]))
-
-    def on_first_page(c, d):
-        _draw_pdf_header(c, d, conf)
-
-    def on_later_pages(c, d):
-        pass  # Pas d'en-tête sur les pages suivantes
-
-    doc.build(story, onFirstPage=on_first_page, onLaterPages=on_later_pages, canvasmaker=NumberedCanvas)
+    response["Content-Disposition"] = f'attachment; filename="{releves.nom_fichier_releve(donnees)}"'
+    response.write(releves.rendre_releve_pdf(donnees, releves.entete_pdf(conf)))
     return response
 
 
@@ -6465,69 +6196,75 @@ def export_excel_contributions(request):
     cotisations = CotisationAnnuelle.objects.select_related(
         "boutique__contribuable", "boutique__emplacement"
     ).order_by("-annee", "-date_creation")
-    paiements = PaiementCotisation.objects.select_related(
-        "cotisation_annuelle__boutique__contribuable",
-        "encaisse_par_agent",
-    ).order_by("-date_paiement")
-    tickets = TicketMarche.objects.select_related(
-        "emplacement", "contribuable", "encaisse_par_agent"
-    ).order_by("-date", "-date_creation")
-    if type_contribution == "paiements":
-        cotisations = cotisations.none()
-        tickets = tickets.none()
-    elif type_contribution == "tickets":
+    # Filtres communs aux tables vivantes et à leurs archives
+    filtres_paiements = []
+    filtres_tickets = []
+    avec_paiements = type_contribution not in ("cotisations", "tickets")
+    avec_tickets = type_contribution not in ("cotisations", "paiements")
+    if type_contribution in ("paiements", "tickets"):
         cotisations = cotisations.none()
-        paiements = paiements.none()
-    elif type_contribution == "cotisations":
-        paiements = paiements.none()
-        tickets = tickets.none()
+    annee_int = None
     if annee:
         try:
             annee_int = int(annee)
             cotisations = cotisations.filter(annee=annee_int)
-            paiements = paiements.filter(cotisation_annuelle__annee=annee_int)
-            tickets = tickets.filter(date__year=annee_int)
+            filtres_paiements.append(Q(cotisation_annuelle__annee=annee_int))
+            filtres_tickets.append(Q(date__year=annee_int))
         except ValueError:
             pass
     if mois:
         try:
             mois_int = int(mois)
             if 1 <= mois_int <= 12:
-                paiements = paiements.filter(mois=mois_int)
-                tickets = tickets.filter(date__month=mois_int)
+                filtres_paiements.append(Q(mois=mois_int))
+                filtres_tickets.append(Q(date__month=mois_int))
         except ValueError:
             pass
     if agent_collecteur_id:
         try:
             agent_id = int(agent_collecteur_id)
-            paiements = paiements.filter(encaisse_par_agent_id=agent_id)
-            tickets = tickets.filter(encaisse_par_agent_id=agent_id)
+            filtres_paiements.append(Q(encaisse_par_agent_id=agent_id))
+            filtres_tickets.append(Q(encaisse_par_agent_id=agent_id))
         except (ValueError, TypeError):
             pass
     date_du_parsed = _parse_date(date_du)
     date_au_parsed = _parse_date(date_au)
     if date_du_parsed:
-        paiements = paiements.filter(date_paiement__date__gte=date_du_parsed)
-        tickets = tickets.filter(date__gte=date_du_parsed)
+        filtres_paiements.append(Q(date_paiement__date__gte=date_du_parsed))
+        filtres_tickets.append(Q(date__gte=date_du_parsed))
     if date_au_parsed:
-        paiements = paiements.filter(date_paiement__date__lte=date_au_parsed)
-        tickets = tickets.filter(date__lte=date_au_parsed)
+        filtres_paiements.append(Q(date_paiement__date__lte=date_au_parsed))
+        filtres_tickets.append(Q(date__lte=date_au_parsed))
     if q:
         cotisations = cotisations.filter(
             Q(boutique__matricule__icontains=q)
             | Q(boutique__contribuable__nom__icontains=q)
             | Q(boutique__contribuable__prenom__icontains=q)
         )
-        paiements = paiements.filter(
+        filtres_paiements.append(
             Q(cotisation_annuelle__boutique__matricule__icontains=q)
             | Q(cotisation_annuelle__boutique__contribuable__nom__icontains=q)
             | Q(cotisation_annuelle__boutique__contribuable__prenom__icontains=q)
         )
-        tickets = tickets.filter(
+        filtres_tickets.append(
             Q(nom_vendeur__icontains=q)
             | Q(contribuable__nom__icontains=q)
             | Q(contribuable__prenom__icontains=q)
         )
+    archives = archives_necessaires(annee=annee_int, date_du=date_du_parsed, date_au=date_au_parsed)
+    paiements = fusionner([
+        modele.objects.select_related(
+            "cotisation_annuelle__boutique__contribuable",
+            "encaisse_par_agent",
+        ).filter(*filtres_paiements).order_by("-date_paiement")
+        for modele in sources(PaiementCotisation, archives)
+    ] if avec_paiements else [], cle=lambda p: p.date_paiement, limite=None)
+    tickets = fusionner([
+        modele.objects.select_related(
+            "emplacement", "contribuable", "encaisse_par_agent"
+        ).filter(*filtres_tickets).order_by("-date", "-date_creation")
+        for modele in sources(TicketMarche, archives)
+    ] if avec_tickets else [], cle=lambda t: (t.date, t.date_creation), limite=None)
     wb = Workbook()
     # Feuille Cotisations
     ws_cot = wb.active
@@ -6592,63 +6329,48 @@ def export_excel_contributions(request):
     return response
 
 
-@login_required
-@user_passes_test(is_staff_user)
-def export_pdf_cotisations_acteurs_institutions(request):
-    """Export PDF des cotisations acteurs / institutions (filtres type, annee, mois, agent, date_du, date_au, q)."""
-    type_contribution = request.GET.get("type", "").strip()
-    annee = request.GET.get("annee", "").strip()
-    mois = request.GET.get("mois", "").strip()
-    agent_collecteur_id = request.GET.get("agent_collecteur", "").strip()
-    date_du = request.GET.get("date_du", "").strip()
-    date_au = request.GET.get("date_au", "").strip()
-    q = request.GET.get("q", "").strip()
+def _cotisations_paiements_acteurs_institutions(type_contribution, annee, mois, agent_collecteur_id, date_du, date_au, q):
+    """
+    Cotisations (querysets) et paiements filtrés des exports acteurs / institutions. Les paiements
+    sont une liste de querysets : la table vivante, et son archive si la période touche un exercice clos.
+    """
     cot_acteurs = CotisationAnnuelleActeur.objects.select_related("acteur").order_by("-annee", "-date_creation")
     cot_inst = CotisationAnnuelleInstitution.objects.select_related("institution").order_by("-annee", "-date_creation")
-    paiements_acteurs = PaiementCotisationActeur.objects.select_related(
-        "cotisation_annuelle__acteur", "encaisse_par_agent"
-    ).order_by("-date_paiement")
-    paiements_inst = PaiementCotisationInstitution.objects.select_related(
-        "cotisation_annuelle__institution", "encaisse_par_agent"
-    ).order_by("-date_paiement")
+    filtres_paiements = []
+    filtres_acteurs = []
+    filtres_inst = []
     if type_contribution == "institutions":
         cot_acteurs = cot_acteurs.none()
-        paiements_acteurs = paiements_acteurs.none()
     elif type_contribution == "acteurs":
         cot_inst = cot_inst.none()
-        paiements_inst = paiements_inst.none()
+    annee_int = None
     if annee:
         try:
             annee_int = int(annee)
             cot_acteurs = cot_acteurs.filter(annee=annee_int)
             cot_inst = cot_inst.filter(annee=annee_int)
-            paiements_acteurs = paiements_acteurs.filter(cotisation_annuelle__annee=annee_int)
-            paiements_inst = paiements_inst.filter(cotisation_annuelle__annee=annee_int)
+            filtres_paiements.append(Q(cotisation_annuelle__annee=annee_int))
         except ValueError:
             pass
     if mois:
         try:
             mois_int = int(mois)
             if 1 <= mois_int <= 12:
-                paiements_acteurs = paiements_acteurs.filter(date_paiement__month=mois_int)
-                paiements_inst = paiements_inst.filter(date_paiement__month=mois_int)
+                filtres_paiements.append(Q(date_paiement__month=mois_int))
         except ValueError:
             pass
     if agent_collecteur_id:
         try:
             agent_id = int(agent_collecteur_id)
-            paiements_acteurs = paiements_acteurs.filter(encaisse_par_agent_id=agent_id)
-            paiements_inst = paiements_inst.filter(encaisse_par_agent_id=agent_id)
+            filtres_paiements.append(Q(encaisse_par_agent_id=agent_id))
         except (ValueError, TypeError):
             pass
     date_du_parsed = _parse_date(date_du)
     date_au_parsed = _parse_date(date_au)
     if date_du_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__gte=date_du_parsed)
-        paiements_inst = paiements_inst.filter(date_paiement__date__gte=date_du_parsed)
+        filtres_paiements.append(Q(date_paiement__date__gte=date_du_parsed))
     if date_au_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__lte=date_au_parsed)
-        paiements_inst = paiements_inst.filter(date_paiement__date__lte=date_au_parsed)
+        filtres_paiements.append(Q(date_paiement__date__lte=date_au_parsed))
     if q:
         cot_acteurs = cot_acteurs.filter(
             Q(acteur__raison_sociale__icontains=q)
@@ -6660,14 +6382,42 @@ def export_pdf_cotisations_acteurs_institutions(request):
             | Q(institution__sigle__icontains=q)
             | Q(institution__nom_responsable__icontains=q)
         )
-        paiements_acteurs = paiements_acteurs.filter(
+        filtres_acteurs.append(
             Q(cotisation_annuelle__acteur__raison_sociale__icontains=q)
             | Q(cotisation_annuelle__acteur__sigle__icontains=q)
         )
-        paiements_inst = paiements_inst.filter(
+        filtres_inst.append(
             Q(cotisation_annuelle__institution__nom_institution__icontains=q)
             | Q(cotisation_annuelle__institution__sigle__icontains=q)
         )
+    archives = archives_necessaires(annee=annee_int, date_du=date_du_parsed, date_au=date_au_parsed)
+    paiements_acteurs = [
+        modele.objects.select_related("cotisation_annuelle__acteur", "encaisse_par_agent")
+        .filter(*filtres_paiements, *filtres_acteurs).order_by("-date_paiement")
+        for modele in sources(PaiementCotisationActeur, archives)
+    ] if type_contribution != "institutions" else []
+    paiements_inst = [
+        modele.objects.select_related("cotisation_annuelle__institution", "encaisse_par_agent")
+        .filter(*filtres_paiements, *filtres_inst).order_by("-date_paiement")
+        for modele in sources(PaiementCotisationInstitution, archives)
+    ] if type_contribution != "acteurs" else []
+    return cot_acteurs, cot_inst, paiements_acteurs, paiements_inst
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def export_pdf_cotisations_acteurs_institutions(request):
+    """Export PDF des cotisations acteurs / institutions (filtres type, annee, mois, agent, date_du, date_au, q)."""
+    type_contribution = request.GET.get("type", "").strip()
+    annee = request.GET.get("annee", "").strip()
+    mois = request.GET.get("mois", "").strip()
+    agent_collecteur_id = request.GET.get("agent_collecteur", "").strip()
+    date_du = request.GET.get("date_du", "").strip()
+    date_au = request.GET.get("date_au", "").strip()
+    q = request.GET.get("q", "").strip()
+    cot_acteurs, cot_inst, paiements_acteurs, paiements_inst = _cotisations_paiements_acteurs_institutions(
+        type_contribution, annee, mois, agent_collecteur_id, date_du, date_au, q
+    )
     conf = ConfigurationMairie.objects.filter(est_active=True).first()
     response = HttpResponse(content_type="application/pdf")
     response["Content-Disposition"] = 'attachment; filename="cotisations_acteurs_institutions.pdf"'
@@ -6777,10 +6527,11 @@ def export_pdf_cotisations_acteurs_institutions(request):
             story.append(table_inst)
     # Paiements acteurs
     if not type_contribution or type_contribution == "acteurs":
-        agg_pay_act = paiements_acteurs.aggregate(total=Sum("montant_paye"))
-        total_recettes_pay_act = agg_pay_act.get("total") or Decimal("0")
+        total_recettes_pay_act = sum(
+            (qs.aggregate(total=Sum("montant_paye"))["total"] or Decimal("0") for qs in paiements_acteurs), Decimal("0")
+        )
         data_pay_act = [["Acteur", "Année", "Montant", "Date paiement", "Agent"]]
-        for p in paiements_acteurs[:300]:
+        for p in fusionner(paiements_acteurs, cle=lambda p: p.date_paiement, limite=300):
             data_pay_act.append(
                 [
                     (p.cotisation_annuelle.acteur.raison_sociale if p.cotisation_annuelle and p.cotisation_annuelle.acteur else "")[:25],
@@ -6807,10 +6558,11 @@ def export_pdf_cotisations_acteurs_institutions(request):
             story.append(Spacer(1, 0.3 * cm))
     # Paiements institutions
     if not type_contribution or type_contribution == "institutions":
-        agg_pay_inst = paiements_inst.aggregate(total=Sum("montant_paye"))
-        total_recettes_pay_inst = agg_pay_inst.get("total") or Decimal("0")
+        total_recettes_pay_inst = sum(
+            (qs.aggregate(total=Sum("montant_paye"))["total"] or Decimal("0") for qs in paiements_inst), Decimal("0")
+        )
         data_pay_inst = [["Institution", "Année", "Montant", "Date paiement", "Agent"]]
-        for p in paiements_inst[:300]:
+        for p in fusionner(paiements_inst, cle=lambda p: p.date_paiement, limite=300):
             data_pay_inst.append(
                 [
                     (p.cotisation_annuelle.institution.nom_institution if p.cotisation_annuelle and p.cotisation_annuelle.institution else "")[:25],
@@ -6855,71 +6607,9 @@ def export_excel_cotisations_acteurs_institutions(request):
     date_du = request.GET.get("date_du", "").strip()
     date_au = request.GET.get("date_au", "").strip()
     q = request.GET.get("q", "").strip()
-    cot_acteurs = CotisationAnnuelleActeur.objects.select_related("acteur").order_by("-annee", "-date_creation")
-    cot_inst = CotisationAnnuelleInstitution.objects.select_related("institution").order_by("-annee", "-date_creation")
-    paiements_acteurs = PaiementCotisationActeur.objects.select_related(
-        "cotisation_annuelle__acteur", "encaisse_par_agent"
-    ).order_by("-date_paiement")
-    paiements_inst = PaiementCotisationInstitution.objects.select_related(
-        "cotisation_annuelle__institution", "encaisse_par_agent"
-    ).order_by("-date_paiement")
-    if type_contribution == "institutions":
-        cot_acteurs = cot_acteurs.none()
-        paiements_acteurs = paiements_acteurs.none()
-    elif type_contribution == "acteurs":
-        cot_inst = cot_inst.none()
-        paiements_inst = paiements_inst.none()
-    if annee:
-        try:
-            annee_int = int(annee)
-            cot_acteurs = cot_acteurs.filter(annee=annee_int)
-            cot_inst = cot_inst.filter(annee=annee_int)
-            paiements_acteurs = paiements_acteurs.filter(cotisation_annuelle__annee=annee_int)
-            paiements_inst = paiements_inst.filter(cotisation_annuelle__annee=annee_int)
-        except ValueError:
-            pass
-    if mois:
-        try:
-            mois_int = int(mois)
-            if 1 <= mois_int <= 12:
-                paiements_acteurs = paiements_acteurs.filter(date_paiement__month=mois_int)
-                paiements_inst = paiements_inst.filter(date_paiement__month=mois_int)
-        except ValueError:
-            pass
-    if agent_collecteur_id:
-        try:
-            agent_id = int(agent_collecteur_id)
-            paiements_acteurs = paiements_acteurs.filter(encaisse_par_agent_id=agent_id)
-            paiements_inst = paiements_inst.filter(encaisse_par_agent_id=agent_id)
-        except (ValueError, TypeError):
-            pass
-    date_du_parsed = _parse_date(date_du)
-    date_au_parsed = _parse_date(date_au)
-    if date_du_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__gte=date_du_parsed)
-        paiements_inst = paiements_inst.filter(date_paiement__date__gte=date_du_parsed)
-    if date_au_parsed:
-        paiements_acteurs = paiements_acteurs.filter(date_paiement__date__lte=date_au_parsed)
-        paiements_inst = paiements_inst.filter(date_paiement__date__lte=date_au_parsed)
-    if q:
-        cot_acteurs = cot_acteurs.filter(
-            Q(acteur__raison_sociale__icontains=q)
-            | Q(acteur__sigle__icontains=q)
-            | Q(acteur__nom_responsable__icontains=q)
-        )
-        cot_inst = cot_inst.filter(
-            Q(institution__nom_institution__icontains=q)
-            | Q(institution__sigle__icontains=q)
-            | Q(institution__nom_responsable__icontains=q)
-        )
-        paiements_acteurs = paiements_acteurs.filter(
-            Q(cotisation_annuelle__acteur__raison_sociale__icontains=q)
-            | Q(cotisation_annuelle__acteur__sigle__icontains=q)
-        )
-        paiements_inst = paiements_inst.filter(
-            Q(cotisation_annuelle__institution__nom_institution__icontains=q)
-            | Q(cotisation_annuelle__institution__sigle__icontains=q)
-        )
+    cot_acteurs, cot_inst, paiements_acteurs, paiements_inst = _cotisations_paiements_acteurs_institutions(
+        type_contribution, annee, mois, agent_collecteur_id, date_du, date_au, q
+    )
     wb = Workbook()
     ws_act = wb.active
     ws_act.title = "Cotisations Acteurs"
@@ -6960,7 +6650,7 @@ def export_excel_cotisations_acteurs_institutions(request):
     h_pay_act = ["Acteur", "Année", "Montant", "Date paiement", "Agent"]
     ws_pay_act.append(h_pay_act)
     _style_excel_header(ws_pay_act, 1)
-    for p in paiements_acteurs:
+    for p in fusionner(paiements_acteurs, cle=lambda p: p.date_paiement, limite=None):
         ws_pay_act.append(
             [
                 p.cotisation_annuelle.acteur.raison_sociale if p.cotisation_annuelle and p.cotisation_annuelle.acteur else "",
@@ -6974,7 +6664,7 @@ def export_excel_cotisations_acteurs_institutions(request):
     h_pay_inst = ["Institution", "Année", "Montant", "Date paiement", "Agent"]
     ws_pay_inst.append(h_pay_inst)
     _style_excel_header(ws_pay_inst, 1)
-    for p in paiements_inst:
+    for p in fusionner(paiements_inst, cle=lambda p: p.date_paiement, limite=None):
         ws_pay_inst.append(
             [
                 p.cotisation_annuelle.institution.nom_institution if p.cotisation_annuelle and p.cotisation_annuelle.institution else "",
@@ -7395,7 +7085,7 @@ def export_excel_acteurs(request):
             Q(raison_sociale__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_acteur:
         acteurs = acteurs.filter(type_acteur=type_acteur)
@@ -7566,7 +7256,7 @@ def export_excel_institutions(request):
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_inst:
         institutions = institutions.filter(type_institution=type_inst)
@@ -7833,7 +7523,7 @@ def export_excel_diaspora(request):
             Q(nom__icontains=q) |
             Q(prenoms__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone_whatsapp__icontains=q) |
+            filtre_telephone(q) |
             Q(profession_actuelle__icontains=q) |
             Q(domaine_formation__icontains=q)
         )
@@ -8278,7 +7968,7 @@ def export_excel_acteurs(request):
             Q(raison_sociale__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_acteur:
         acteurs = acteurs.filter(type_acteur=type_acteur)
@@ -8368,7 +8058,7 @@ def export_excel_institutions(request):
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_inst:
         institutions = institutions.filter(type_institution=type_inst)
@@ -8635,7 +8325,7 @@ def export_excel_diaspora(request):
             Q(nom__icontains=q) |
             Q(prenoms__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone_whatsapp__icontains=q) |
+            filtre_telephone(q) |
             Q(profession_actuelle__icontains=q) |
             Q(domaine_formation__icontains=q)
         )
@@ -9098,7 +8788,7 @@ def export_excel_acteurs(request):
             Q(raison_sociale__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_acteur:
         acteurs = acteurs.filter(type_acteur=type_acteur)
@@ -9188,7 +8878,7 @@ def export_excel_institutions(request):
             Q(sigle__icontains=q) |
             Q(nom_responsable__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone1__icontains=q)
+            filtre_telephone(q)
         )
     if type_inst:
         institutions = institutions.filter(type_institution=type_inst)
@@ -9455,7 +9145,7 @@ def export_excel_diaspora(request):
             Q(nom__icontains=q) |
             Q(prenoms__icontains=q) |
             Q(email__icontains=q) |
-            Q(telephone_whatsapp__icontains=q) |
+            filtre_telephone(q) |
             Q(profession_actuelle__icontains=q) |
             Q(domaine_formation__icontains=q)
         )
@@ -9630,3 +9320,276 @@ def export_excel_candidatures(request):
     response['Content-Disposition'] = 'attachment; filename="candidatures.xlsx"'
     wb.save(response)
     return response
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def profilage_sql(request):
+    """Profilage SQL par vue (tampon circulaire alimenté par ProfilageSQLMiddleware)."""
+
+    if request.method == "POST" and request.POST.get("action") == "vider":
+        profilage.vider_profils()
+        messages.success(request, "Le tampon de profilage a été vidé.")
+        return redirect("profilage_sql")
+
+    profils = profilage.lister_profils()
+
+    # Synthèse par vue : nombre d'appels, requêtes moyennes / max, temps moyens
+    par_vue = {}
+    for p in profils:
+        cle = p["vue"] or p["chemin"]
+        ligne = par_vue.setdefault(cle, {
+            "vue": cle, "appels": 0, "requetes_total": 0, "requetes_max": 0,
+            "duree_total": 0.0, "sql_total": 0.0, "rendu_total": 0.0,
+            "budget": p["budget"], "depassements": 0,
+        })
+        ligne["appels"] += 1
+        ligne["requetes_total"] += p["requetes"]
+        ligne["requetes_max"] = max(ligne["requetes_max"], p["requetes"])
+        ligne["duree_total"] += p["duree_ms"]
+        ligne["sql_total"] += p["temps_sql_ms"]
+        ligne["rendu_total"] += p["rendu_ms"]
+        ligne["depassements"] += 1 if p["depasse_budget"] else 0
+    synthese = []
+    for ligne in par_vue.values():
+        n = ligne["appels"]
+        ligne["requetes_moy"] = round(ligne["requetes_total"] / n, 1)
+        ligne["duree_moy"] = round(ligne["duree_total"] / n, 1)
+        ligne["sql_moy"] = round(ligne["sql_total"] / n, 1)
+        ligne["rendu_moy"] = round(ligne["rendu_total"] / n, 1)
+        synthese.append(ligne)
+    tri = request.GET.get("tri", "requetes_max")
+    if tri not in ("requetes_max", "requetes_moy", "duree_moy", "sql_moy", "appels"):
+        tri = "requetes_max"
+    synthese.sort(key=lambda l: l[tri], reverse=True)
+
+    context = {
+        "titre": "Profilage SQL par vue",
+        "actif": getattr(settings, "PROFILAGE_SQL_ACTIF", False),
+        "synthese": synthese,
+        "derniers": list(reversed(profils))[:50],
+        "taille_tampon": len(profils),
+        "tri": tri,
+    }
+    return render(request, "admin/profilage_sql.html", context)
+
+
+def _annee_recouvrement(request):
+    """Paramètre GET `annee` (vide = toutes les années)."""
+    try:
+        return int(request.GET.get("annee", "").strip())
+    except ValueError:
+        return None
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def taux_recouvrement(request):
+    """Arriérés et taux de recouvrement des boutiques par marché, agent collecteur et type de local."""
+    annee = _annee_recouvrement(request)
+    resultats = calculer_recouvrement(annee)
+    context = {
+        "titre": "Taux de recouvrement",
+        "annee": annee,
+        "annees": CotisationAnnuelle.objects.order_by("-annee").values_list("annee", flat=True).distinct(),
+        "resultats": resultats,
+        "sections": [
+            ("Par marché", "Marché", resultats["par_marche"]),
+            ("Par agent collecteur", "Agent collecteur", resultats["par_agent"]),
+            ("Par type de local", "Type de local", resultats["par_type_local"]),
+        ],
+    }
+    return render(request, "admin/taux_recouvrement.html", context)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def export_excel_taux_recouvrement(request):
+    """Export Excel du taux de recouvrement (une feuille par regroupement, filtre annee)."""
+    annee = _annee_recouvrement(request)
+    resultats = calculer_recouvrement(annee)
+    wb = Workbook()
+    ws = wb.active
+    feuilles = [
+        ("Par marché", "Marché", [resultats["global"]] + resultats["par_marche"]),
+        ("Par agent", "Agent collecteur", resultats["par_agent"]),
+        ("Par type de local", "Type de local", resultats["par_type_local"]),
+    ]
+    for index, (titre, colonne, lignes) in enumerate(feuilles):
+        if index:
+            ws = wb.create_sheet()
+        ws.title = titre
+        headers = [colonne, "Boutiques", "Montant dû", "Recouvré", "Arriérés", "Taux (%)"] + resultats["tranches"]
+        ws.append(headers)
+        _style_excel_header(ws, 1)
+        for ligne in lignes:
+            ws.append(
+                [
+                    ligne["libelle"],
+                    ligne["nb_boutiques"],
+                    ligne["du"],
+                    ligne["recouvre"],
+                    ligne["arrieres"],
+                    ligne["taux"] if ligne["taux"] is not None else "",
+                ]
+                + ligne["tranches"]
+            )
+        for idx in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(idx)].width = 18
+    response = HttpResponse(
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    nom = f"taux_recouvrement_{annee}.xlsx" if annee else "taux_recouvrement.xlsx"
+    response["Content-Disposition"] = f'attachment; filename="{nom}"'
+    wb.save(response)
+    return response
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def recettes_mensuelles(request):
+    """
+    Exploration des recettes (par marché, agent ou type × mois, trimestre ou année),
+    lue uniquement dans la table de faits FaitRecetteMensuelle.
+    """
+    axe = request.GET.get("axe", "marche")
+    if axe not in AXES:
+        axe = "marche"
+    periode = request.GET.get("periode", "mois")
+    if periode not in PERIODES:
+        periode = "mois"
+    type_recette = request.GET.get("type_recette", "")
+    if type_recette not in dict(FaitRecetteMensuelle.TYPE_RECETTE_CHOICES):
+        type_recette = ""
+    annee = _annee_recouvrement(request)
+    if annee is None and "annee" not in request.GET:
+        annee = timezone.now().year
+
+    context = {
+        "titre": "Recettes mensuelles",
+        "axe": axe,
+        "libelle_axe": AXES[axe][1],
+        "periode": periode,
+        "annee": annee,
+        "type_recette": type_recette,
+        "types_recette": FaitRecetteMensuelle.TYPE_RECETTE_CHOICES,
+        "annees": FaitRecetteMensuelle.objects.dates("mois", "year", order="DESC"),
+        "cube": interroger_recettes(axe, periode, annee, type_recette or None),
+        "derniere_mise_a_jour": FaitRecetteMensuelle.objects.order_by("-date_calcul").values_list("date_calcul", flat=True).first(),
+    }
+    return render(request, "admin/recettes_mensuelles.html", context)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def import_donnees(request):
+    """
+    Import en masse d'un fichier CSV / XLSX (contribuables, boutiques, paiements historiques, tickets).
+    Même traitement que la commande importer_donnees ; le rapport d'erreurs peut être téléchargé en CSV.
+    """
+    rapport = None
+    type_import = request.POST.get("type_import", "boutiques")
+    if request.method == "POST":
+        fichier = request.FILES.get("fichier")
+        if type_import not in IMPORTEURS:
+            messages.error(request, "Type d'import inconnu.")
+        elif not fichier or not fichier.name.lower().endswith((".csv", ".txt", ".xlsx", ".xlsm")):
+            messages.error(request, "Veuillez choisir un fichier CSV ou XLSX.")
+        else:
+            try:
+                rapport = importer_fichier(
+                    type_import, fichier, fichier.name, simulation=bool(request.POST.get("simulation"))
+                )
+            except ValueError as exc:
+                messages.error(request, str(exc))
+            if rapport and rapport.erreurs and request.POST.get("telecharger_rapport"):
+                response = HttpResponse(rapport.erreurs_csv(), content_type="text/csv; charset=utf-8")
+                response["Content-Disposition"] = f'attachment; filename="erreurs_import_{type_import}.csv"'
+                return response
+
+    context = {
+        "titre": "Import de données",
+        "type_import": type_import,
+        "importeurs": [(cle, libelle, classe.colonnes) for cle, (libelle, classe) in IMPORTEURS.items()],
+        "rapport": rapport,
+        "erreurs": rapport.erreurs[:MAX_ERREURS_AFFICHEES] if rapport else [],
+    }
+    return render(request, "admin/import_donnees.html", context)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def export_pdf_releves_contribuables(request):
+    """
+    Relevés de paiement annuels de tous les contribuables d'un marché et / ou d'une zone d'agent
+    (sans filtre : tous les locataires), dans une archive ZIP envoyée au fil du rendu. Le rendu
+    est séquentiel dans la requête ; les gros volumes passent par generer_releves_contribuables.
+    """
+    try:
+        emplacement_id = int(request.GET.get("emplacement") or 0) or None
+        agent_id = int(request.GET.get("agent_collecteur") or 0) or None
+    except ValueError:
+        emplacement_id = agent_id = None
+    annee = _annee_recouvrement(request) or timezone.now().year
+    start, end = releves.periode_annee(annee)
+
+    donnees = releves.preparer_releves(releves.contribuables_cibles(emplacement_id, agent_id), start, end)
+    conf = ConfigurationMairie.objects.filter(est_active=True).first()
+    response = StreamingHttpResponse(
+        releves.flux_releves_zip(donnees, releves.entete_pdf(conf)), content_type="application/zip"
+    )
+    response["Content-Disposition"] = f'attachment; filename="releves_contribuables_{annee}.zip"'
+    return response
+
+
+NB_DOUBLONS_AFFICHES = 200
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def liste_doublons(request):
+    """File d'examen des doublons potentiels entre registres (voir mairie.doublons), par score décroissant."""
+    statut = request.GET.get("statut") or "a_examiner"
+    if statut not in dict(DoublonPotentiel.STATUT_CHOICES):
+        statut = "a_examiner"
+    doublons = list(DoublonPotentiel.objects.filter(statut=statut).select_related("traite_par")[:NB_DOUBLONS_AFFICHES])
+    libelles = libelles_fiches(
+        [(d.type_a, d.id_a) for d in doublons] + [(d.type_b, d.id_b) for d in doublons]
+    )
+    for d in doublons:
+        d.libelle_a = libelles.get((d.type_a, d.id_a), f"#{d.id_a}")
+        d.libelle_b = libelles.get((d.type_b, d.id_b), f"#{d.id_b}")
+    nb_par_statut = dict(
+        DoublonPotentiel.objects.order_by().values("statut").annotate(n=Count("id")).values_list("statut", "n")
+    )
+    context = {
+        "titre": "Doublons potentiels entre registres",
+        "doublons": doublons,
+        "statut": statut,
+        "statuts": [(valeur, libelle, nb_par_statut.get(valeur, 0)) for valeur, libelle in DoublonPotentiel.STATUT_CHOICES],
+        "limite": NB_DOUBLONS_AFFICHES,
+    }
+    return render(request, "admin/liste_doublons.html", context)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+@require_POST
+def traiter_doublon(request, pk, action):
+    """Confirme un doublon, l'écarte (personnes différentes) ou le remet à examiner."""
+    from django.urls import reverse
+
+    statuts = {"confirmer": "confirme", "ecarter": "ecarte", "rouvrir": "a_examiner"}
+    if action not in statuts:
+        messages.error(request, "Action invalide.")
+        return redirect("liste_doublons")
+    doublon = get_object_or_404(DoublonPotentiel, pk=pk)
+    doublon.statut = statuts[action]
+    doublon.traite_par = request.user if action != "rouvrir" else None
+    doublon.date_traitement = timezone.now() if action != "rouvrir" else None
+    doublon.save(update_fields=["statut", "traite_par", "date_traitement"])
+    messages.success(request, f"Doublon marqué : {doublon.get_statut_display()}.")
+    statut_liste = request.POST.get("statut_liste")
+    if statut_liste not in dict(DoublonPotentiel.STATUT_CHOICES):
+        statut_liste = "a_examiner"
+    return redirect(f"{reverse('liste_doublons')}?statut={statut_liste}")
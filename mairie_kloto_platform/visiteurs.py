@@ -0,0 +1,42 @@
+"""
+Identifiant des visiteurs pour les statistiques de fréquentation (VisiteSite).
+
+Un visiteur est reconnu par un cookie signé (`mk_visiteur`, un an) plutôt que par une session :
+aucune ligne django_session n'est créée pour un visiteur anonyme, et le nombre de visiteurs
+uniques se compte toujours sur VisiteSite.session_key (qui reçoit désormais cet identifiant).
+Les robots (voir mairie.agents_utilisateurs) ne reçoivent pas de cookie : leurs visites sont
+enregistrées sans identifiant et marquées `est_robot`.
+"""
+import re
+import uuid
+
+from django.conf import settings
+
+from mairie.agents_utilisateurs import classer_user_agent
+
+COOKIE_VISITEUR = "mk_visiteur"
+SEL_COOKIE = "mairie_kloto_platform.visiteurs"
+DUREE_COOKIE = 365 * 24 * 3600
+
+
+def est_robot(user_agent):
+    """Vrai pour un user-agent vide ou de robot (moteurs de recherche, aperçus de liens, scripts)."""
+    return classer_user_agent(user_agent).est_robot
+
+
+def identifiant_visiteur(request):
+    """(identifiant, nouveau) : l'identifiant du cookie signé, ou un nouvel identifiant à poser."""
+    identifiant = request.get_signed_cookie(COOKIE_VISITEUR, default=None, salt=SEL_COOKIE)
+    if identifiant and re.fullmatch(r"[0-9a-f]{32}", identifiant):
+        return identifiant, False
+    return uuid.uuid4().hex, True
+
+
+def poser_cookie_visiteur(response, identifiant):
+    response.set_signed_cookie(
+        COOKIE_VISITEUR, identifiant, salt=SEL_COOKIE,
+        max_age=DUREE_COOKIE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )